@@ -0,0 +1,127 @@
+# bench/bench_cache.py
+"""
+Cache en disco de data_live: store con índice vs el esquema anterior.
+
+Escribe --entries entradas con una serie de --points floats (un histórico de
+yf_ohlc) y después hace --lookups lecturas al azar (--miss-ratio de claves que
+no existen), directo contra el disco, sin el frente en memoria.
+
+  legacy     un archivo JSON por clave, os.stat + open en cada lectura, sin límite
+  store      CacheStore: índice en memoria (un hit no hace stat), presupuesto de
+             --max-entries con desalojo LRU, barrido de vencidos
+  gzip       store con INVEST_MCP_CACHE_COMPRESS=1
+
+Reporta µs por escritura, p50/p99 de hits y misses, archivos y bytes en disco y
+la duración de un barrido sobre el directorio lleno.
+
+Uso:
+    python bench/bench_cache.py [--entries 5000] [--points 500] [--lookups 20000] [--miss-ratio 0.2]
+                                [--max-entries 2000] [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, random, shutil, tempfile, time
+from typing import Any, Dict, List, Optional
+
+from bench.bench_load import _pct
+
+class Legacy:
+    """El cache de data_live antes de CacheStore."""
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        from invest_mcp.lib.cache_store import key_hash
+        return os.path.join(self.root, f"{key_hash(key)}.json")
+
+    def put(self, key: str, obj: Any) -> None:
+        with open(self._path(key), "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False)
+
+    def get(self, key: str, max_age: float) -> Optional[Any]:
+        try:
+            st = os.stat(self._path(key))
+            if time.time() - st.st_mtime <= max_age:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    return st.st_mtime, json.load(f)
+        except Exception:
+            pass
+        return None
+
+    def sweep(self) -> None:
+        pass
+
+def _disk(root: str) -> Dict[str, int]:
+    n = size = 0
+    for de in os.scandir(root):
+        n += 1
+        size += de.stat().st_size
+    return {"files": n, "bytes": size}
+
+def run(mode: str, args, work: str) -> Dict[str, Any]:
+    from invest_mcp.lib import cache_store
+    root = os.path.join(work, mode)
+    cache_store.COMPRESS = mode == "gzip"
+    cache_store.MAX_ENTRIES = args.max_entries
+    cache_store.SWEEP_S = 0  # barrido medido a mano
+    store = Legacy(root) if mode == "legacy" else cache_store.CacheStore(root)
+    rng = random.Random(11)
+    series = [round(100.0 + rng.gauss(0, 1), 4) for _ in range(args.points)]
+    keys = [f"yf_ohlc:T{i:05d}:2y:1d" for i in range(args.entries)]
+
+    t0 = time.perf_counter()
+    for k in keys:
+        store.put(k, series)
+    write_us = (time.perf_counter() - t0) * 1e6 / len(keys)
+
+    live = keys[-args.max_entries:] if mode != "legacy" else keys  # lo que sobrevivió al presupuesto
+    hits: List[float] = []
+    misses: List[float] = []
+    for _ in range(args.lookups):
+        miss = rng.random() < args.miss_ratio
+        k = f"yf_ohlc:X{rng.randrange(10 ** 6)}:2y:1d" if miss else rng.choice(live)
+        t1 = time.perf_counter()
+        got = store.get(k, 600)
+        dt = (time.perf_counter() - t1) * 1e6
+        (misses if got is None else hits).append(dt)
+    t2 = time.perf_counter()
+    store.sweep()
+    sweep_ms = (time.perf_counter() - t2) * 1000.0
+    hits.sort()
+    misses.sort()
+    return {"writeUs": round(write_us, 1), "hitP50Us": round(_pct(hits, .5), 1), "hitP99Us": round(_pct(hits, .99), 1),
+            "missP50Us": round(_pct(misses, .5), 1), "sweepMs": round(sweep_ms, 2), **_disk(root)}
+
+def main():
+    ap = argparse.ArgumentParser(description="CacheStore (índice, presupuesto, compresión) vs cache de archivos plano")
+    ap.add_argument("--entries", type=int, default=5000)
+    ap.add_argument("--points", type=int, default=500, help="Floats por entrada")
+    ap.add_argument("--lookups", type=int, default=20000)
+    ap.add_argument("--miss-ratio", type=float, default=0.2)
+    ap.add_argument("--max-entries", type=int, default=2000, help="Presupuesto de entradas del store")
+    ap.add_argument("--modes", default="legacy,store,gzip")
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="invest_cache_")
+    results: Dict[str, Any] = {}
+    try:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            results[mode] = run(mode, args, work)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"\n{'modo':<8} {'put µs':>8} {'hit p50':>8} {'hit p99':>8} {'miss p50':>9} {'archivos':>9} "
+          f"{'MB':>7} {'sweep ms':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['writeUs']:>8.1f} {r['hitP50Us']:>8.1f} {r['hitP99Us']:>8.1f} {r['missP50Us']:>9.1f} "
+              f"{r['files']:>9} {r['bytes'] / 1e6:>7.2f} {r['sweepMs']:>9.2f}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
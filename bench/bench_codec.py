@@ -0,0 +1,102 @@
+# bench/bench_codec.py
+"""
+Benchmark de codificación de resultados grandes del invest server.
+
+Compara el modo clásico (structuredContent + json.dumps en content[0].text,
+parseado dos veces por el cliente) contra las variantes compactas negociables
+(columnar, floats base64, orjson). Reporta encode/decode en ms y bytes por frame.
+
+Uso:
+    python bench/bench_codec.py [--repeat 5] [--rows 5000]
+"""
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse, json, random, time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+from invest_mcp.lib import codec
+
+def _history_payload(rows: int) -> Dict[str, Any]:
+    d0 = date(2015, 1, 1)
+    p = 100.0
+    pts = []
+    for i in range(rows):
+        p *= 1.0 + random.gauss(0.0003, 0.01)
+        pts.append({"t": (d0 + timedelta(days=i)).isoformat(), "o": p * 0.99, "h": p * 1.01, "l": p * 0.98, "c": p})
+    return {"series": [{"symbol": "SPY", "points": pts}], "nextCursor": None}
+
+def _bulk_payload(accounts: int) -> Dict[str, Any]:
+    syms = [f"S{i}" for i in range(60)]
+    out = []
+    for a in range(accounts):
+        trades = [{"symbol": s, "action": "BUY", "shares": float(random.randint(1, 50)),
+                   "price": random.uniform(5, 500), "delta": random.uniform(-5e3, 5e3)} for s in random.sample(syms, 20)]
+        out.append({"accountId": a, "totalCurrent": random.uniform(1e4, 1e6), "cashAfter": random.uniform(0, 500),
+                    "trackingError": random.random() / 100, "trades": trades})
+    return {"accounts": out, "accountsProcessed": accounts}
+
+def _frame(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": 1, "result": result}
+
+def _legacy(payload: Dict[str, Any]) -> Tuple[Callable[[], str], Callable[[str], Any]]:
+    def enc() -> str:
+        res = {"content": [{"type": "text", "text": json.dumps(payload, ensure_ascii=False)}],
+               "structuredContent": payload, "isError": False}
+        return json.dumps(_frame(res), ensure_ascii=False)
+    def dec(s: str) -> Any:
+        msg = json.loads(s)
+        json.loads(msg["result"]["content"][0]["text"])  # el cliente vuelve a parsear el texto
+        return msg["result"]["structuredContent"]
+    return enc, dec
+
+def _compact(payload: Dict[str, Any], opts: Dict[str, Any]) -> Tuple[Callable[[], str], Callable[[str], Any]]:
+    fast = opts.get("json") == "orjson"
+    def enc() -> str:
+        res = codec.finalize_result(codec.tool_result(payload), opts)
+        return codec.dumps(_frame(res), fast=fast)
+    def dec(s: str) -> Any:
+        msg = codec.loads(s) if fast else json.loads(s)
+        return codec.decode(msg["result"]["structuredContent"])
+    return enc, dec
+
+def _time(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de codificación compacta")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--rows", type=int, default=5000, help="Puntos de historia")
+    ap.add_argument("--accounts", type=int, default=1000, help="Cuentas en bulk_rebalance")
+    args = ap.parse_args()
+    random.seed(1)
+
+    payloads = {"history": _history_payload(args.rows), "bulk": _bulk_payload(args.accounts)}
+    modes: List[Tuple[str, Callable[[Dict[str, Any]], Tuple[Callable, Callable]]]] = [
+        ("legacy (text+structured)", _legacy),
+        ("single json", lambda p: _compact(p, {"columnar": False, "floats": "json", "json": "json"})),
+        ("columnar json", lambda p: _compact(p, {"columnar": True, "floats": "json", "json": "json", "minRows": 8})),
+        ("columnar+b64", lambda p: _compact(p, {"columnar": True, "floats": "b64", "json": "json", "minRows": 8})),
+    ]
+    if codec.has_orjson():
+        modes.append(("columnar+b64+orjson", lambda p: _compact(p, {"columnar": True, "floats": "b64", "json": "orjson", "minRows": 8})))
+    else:
+        print("(orjson no instalado: se omite la variante orjson)")
+
+    print(f"{'payload':<8} {'mode':<26} {'encode ms':>10} {'decode ms':>10} {'bytes':>12}")
+    for pname, payload in payloads.items():
+        for mname, mk in modes:
+            enc, dec = mk(payload)
+            t_enc, s = _time(enc, args.repeat)
+            t_dec, back = _time(lambda: dec(s), args.repeat)
+            assert back == payload, f"roundtrip distinto en {pname}/{mname}"
+            print(f"{pname:<8} {mname:<26} {t_enc:>10.2f} {t_dec:>10.2f} {len(s.encode('utf-8')):>12,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench/bench_deadline.py
+"""
+Propagación de deadlines (MCP_PROPAGATE_DEADLINE) con llamadas que vencen.
+
+Contra el servidor invest por stdio (datos sintéticos) se lanza --rounds veces
+un backtest_rebalance pesado con un timeout corto (--timeout-ms, plazo duro: sin
+progressToken) y, apenas el cliente se rinde, un ping. Para cada modo se mide:
+
+  * latencia del ping posterior al timeout: sin propagación el servidor sigue
+    calculando una respuesta que nadie espera y el ping queda detrás;
+  * CPU consumida por el servidor durante la ronda (vía /proc, solo Linux);
+  * cancelled_total del servidor (por reason: deadline | cancelled).
+
+  off        el servidor no conoce el plazo del cliente
+  deadline   tools/call lleva _meta.timeoutMs y, si vence aquí, notifications/cancelled
+
+Uso:
+    python bench/bench_deadline.py [--rounds 5] [--timeout-ms 300] [--paths 2000] [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, shutil, tempfile, time
+from typing import Any, Dict, List
+
+from bench.bench_load import _pct, _prepare_env, _proc_cpu_rss
+
+def _args(paths: int) -> Dict[str, Any]:
+    return {"targetWeights": [{"symbol": "SPY", "weight": 0.5}, {"symbol": "QQQ", "weight": 0.3},
+                              {"symbol": "DIA", "weight": 0.2}],
+            "grid": {"periodDays": [5, 21, 63, 126], "thresholds": [0.02, 0.05, 0.1], "costBps": [5, 10]},
+            "paths": paths, "years": 10, "useLive": False, "workers": 0}
+
+def run(mode: str, args) -> Dict[str, Any]:
+    from chatbot import mcp_runtime
+    from chatbot.mcp_runtime import MCPServer
+    mcp_runtime.MCP_PROPAGATE_DEADLINE = mode == "deadline"
+    srv = MCPServer("invest", [sys.executable, "-m", "invest_mcp.main"], progress=True)
+    srv.start()
+    params = {"name": "backtest_rebalance", "arguments": _args(args.paths)}
+    pings: List[float] = []
+    cpu: List[float] = []
+    try:
+        for _ in range(args.rounds):
+            c0 = (_proc_cpu_rss(srv.proc.pid) or (0.0, 0.0))[0]
+            try:
+                srv.request("tools/call", params, timeout=args.timeout_ms / 1000.0)
+            except RuntimeError:
+                pass  # timeout local o -32800 del servidor
+            t1 = time.perf_counter()
+            srv.request("ping", {}, timeout=120)
+            pings.append((time.perf_counter() - t1) * 1000.0)
+            cpu.append((_proc_cpu_rss(srv.proc.pid) or (0.0, 0.0))[0] - c0)
+        time.sleep(0.2)
+        counters = srv.metrics().get("counters") or []
+    finally:
+        srv.stop()
+    cancelled: Dict[str, float] = {}
+    for c in counters:
+        if c["name"] == "cancelled_total":
+            reason = c["labels"].get("reason", "")
+            cancelled[reason] = cancelled.get(reason, 0) + c["value"]
+    pings.sort()
+    return {"pingP50Ms": round(_pct(pings, .5), 2), "pingMaxMs": round(pings[-1], 2),
+            "serverCpuS": round(sum(cpu), 2), "cancelled": cancelled}
+
+def main():
+    ap = argparse.ArgumentParser(description="Deadlines propagados al servidor vs timeout solo local")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--timeout-ms", type=float, default=300.0)
+    ap.add_argument("--paths", type=int, default=2000, help="Caminos del backtest (su costo)")
+    ap.add_argument("--modes", default="off,deadline")
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="mcp_deadline_")
+    results: Dict[str, Any] = {}
+    try:
+        _prepare_env(work, 1)
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            results[mode] = run(mode, args)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"\n{'modo':<10} {'ping p50':>10} {'ping max':>10} {'CPU srv s':>10}  cancelados")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['pingP50Ms']:>10.2f} {r['pingMaxMs']:>10.2f} {r['serverCpuS']:>10.2f}  "
+              f"{json.dumps(r['cancelled'])}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# bench/bench_embedded.py
+"""
+Backend invest embebido (INVEST_MCP_EMBEDDED) contra el subproceso stdio.
+
+Para cada backend mide:
+  * arranque: start() hasta poder atender (stdio: proceso + handshake);
+  * costo fijo del transporte: p50 de un ping (sin trabajo de tool);
+  * latencia por tool en serie (p50/p99), con los mismos argumentos que bench_load;
+  * throughput con --concurrency clientes a la vez (stdio: un proceso por cliente,
+    como un MCPFleet por sesión; embebido: un solo backend compartido).
+
+Todo corre offline (datos sintéticos) con cache y logs en un directorio temporal.
+
+Uso:
+    python bench/bench_embedded.py [--backends stdio,inline,thread,process] [--calls 200]
+                                   [--concurrency 4] [--duration 5] [--size 1] [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, random, shutil, tempfile, threading, time
+from typing import Any, Dict, List
+
+from bench.bench_load import OPS, _pct, _prepare_env
+
+TOOLS = ["price_quote", "risk_metrics", "price_history", "rebalance_plan", "build_portfolio"]
+
+def _backend(kind: str, workers: int):
+    from chatbot.mcp_runtime import MCPServer, MCPEmbeddedServer
+    if kind == "stdio":
+        return MCPServer("invest", [sys.executable, "-m", "invest_mcp.main"], progress=True)
+    return MCPEmbeddedServer("invest", kind, workers)
+
+def latency(kind: str, calls: int, size: int, seed: int) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    srv = _backend(kind, 1)
+    srv.start()
+    startup_ms = (time.perf_counter() - t0) * 1000.0
+    out: Dict[str, Any] = {"startupMs": round(startup_ms, 1), "tools": {}}
+    try:
+        lat: List[float] = []
+        for _ in range(calls):
+            t1 = time.perf_counter()
+            srv.request("ping", {}, timeout=10)
+            lat.append((time.perf_counter() - t1) * 1000.0)
+        out["pingP50Ms"] = round(_pct(sorted(lat), .5), 3)
+        for tool in TOOLS:
+            rng = random.Random(seed)
+            server, name, make = OPS[tool]
+            args = [make(rng, size) for _ in range(calls)]
+            srv.tools_call(name, args[0], timeout=60)  # primer uso: imports diferidos
+            lat = []
+            for a in args:
+                t1 = time.perf_counter()
+                srv.tools_call(name, a, timeout=60)
+                lat.append((time.perf_counter() - t1) * 1000.0)
+            lat.sort()
+            out["tools"][tool] = {"p50Ms": round(_pct(lat, .5), 3), "p99Ms": round(_pct(lat, .99), 3),
+                                  "meanMs": round(sum(lat) / len(lat), 3)}
+    finally:
+        srv.stop()
+    return out
+
+def throughput(kind: str, concurrency: int, duration: float, size: int, seed: int) -> float:
+    if kind == "stdio":
+        clients = [_backend(kind, 1) for _ in range(concurrency)]
+    else:
+        clients = [_backend(kind, concurrency)] * concurrency
+    for c in set(clients):
+        c.start()
+    done = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def _run(i: int, srv):
+        rng = random.Random(seed + i)
+        n = 0
+        while time.perf_counter() < stop_at:
+            server, name, make = OPS[rng.choice(TOOLS)]
+            srv.tools_call(name, make(rng, size), timeout=60)
+            n += 1
+        with lock:
+            done[0] += n
+
+    try:
+        threads = [threading.Thread(target=_run, args=(i, c)) for i, c in enumerate(clients)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return done[0] / (time.perf_counter() - t0)
+    finally:
+        for c in set(clients):
+            c.stop()
+
+def main():
+    ap = argparse.ArgumentParser(description="Invest embebido vs stdio")
+    ap.add_argument("--backends", default="stdio,inline,thread,process")
+    ap.add_argument("--calls", type=int, default=200, help="Llamadas en serie por tool")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--duration", type=float, default=5.0, help="Segundos de la prueba de throughput")
+    ap.add_argument("--size", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+    kinds = [k.strip() for k in args.backends.split(",") if k.strip()]
+
+    work = tempfile.mkdtemp(prefix="invest_embedded_")
+    results: Dict[str, Any] = {}
+    try:
+        _prepare_env(work, args.size)
+        for kind in kinds:
+            res = latency(kind, args.calls, args.size, args.seed)
+            res["rps"] = round(throughput(kind, args.concurrency, args.duration, args.size, args.seed), 1)
+            results[kind] = res
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    base = results.get("stdio")
+    print(f"\n{'backend':<9} {'arranque ms':>12} {'ping ms':>8} {'req/s x' + str(args.concurrency):>11}"
+          + "".join(f" {t[:14] + ' p50':>18}" for t in TOOLS))
+    for kind, res in results.items():
+        cells = []
+        for t in TOOLS:
+            p50 = res["tools"][t]["p50Ms"]
+            ref = base["tools"][t]["p50Ms"] if base else None
+            cells.append(f"{p50:>9.3f}" + (f" ({ref / p50:4.1f}x)" if ref and kind != "stdio" and p50 > 0 else " " * 8))
+        print(f"{kind:<9} {res['startupMs']:>12.1f} {res['pingP50Ms']:>8.3f} {res['rps']:>11.1f}" + "".join(f" {c:>18}" for c in cells))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
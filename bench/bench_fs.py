@@ -0,0 +1,125 @@
+# bench/bench_fs.py
+"""
+Servidor de filesystem en Python (fs_mcp) contra el de node (npx @modelcontextprotocol/server-filesystem).
+
+Genera un árbol sintético (--dirs x --files archivos más uno grande de --big-mb)
+y, para cada backend, mide el arranque (spawn + initialize) y p50/p99 de las
+tools más usadas, todas por MCPServer igual que desde el chat:
+
+  native        fs_mcp con cache invalidada por inotify (o poll si no hay)
+  native-poll   fs_mcp validando por mtime (FS_MCP_WATCH=poll)
+  native-off    fs_mcp sin cache (solo scandir)
+  node          npx -y @modelcontextprotocol/server-filesystem (se omite si no arranca,
+                p. ej. sin red para descargar el paquete)
+
+Uso:
+    python bench/bench_fs.py [--backends native,native-poll,native-off,node] [--calls 50]
+                             [--dirs 50] [--files 40] [--big-mb 64] [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, shutil, tempfile, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench.bench_load import _pct, _prepare_env
+
+def make_tree(root: str, dirs: int, files: int, big_mb: int) -> None:
+    for d in range(dirs):
+        sub = os.path.join(root, f"dir_{d:03d}", "nested")
+        os.makedirs(sub, exist_ok=True)
+        for f in range(files):
+            with open(os.path.join(root, f"dir_{d:03d}", f"file_{f:03d}.txt"), "w") as fh:
+                fh.write(f"archivo {d}/{f}\n" * 20)
+        with open(os.path.join(sub, f"target_{d}.md"), "w") as fh:
+            fh.write("# target\n")
+    line = "x" * 79 + "\n"
+    with open(os.path.join(root, "big.log"), "w") as fh:
+        chunk = line * 12800  # ~1 MB
+        for _ in range(big_mb):
+            fh.write(chunk)
+
+OPS: List[Tuple[str, str, Dict[str, Any]]] = [
+    ("list_directory", "list_directory", {"path": "."}),
+    ("list_with_sizes", "list_directory_with_sizes", {"path": "dir_000"}),
+    ("read_small", "read_text_file", {"path": "dir_000/file_000.txt"}),
+    ("read_big_head", "read_text_file", {"path": "big.log", "head": 20}),
+    ("read_big_tail", "read_text_file", {"path": "big.log", "tail": 20}),
+    ("get_file_info", "get_file_info", {"path": "big.log"}),
+    ("search_files", "search_files", {"path": ".", "pattern": "target_"}),
+    ("directory_tree", "directory_tree", {"path": "."}),
+]
+
+def _launch(kind: str, root: str) -> Tuple[List[str], Dict[str, str]]:
+    if kind == "node":
+        return ["npx", "-y", "@modelcontextprotocol/server-filesystem", root], {}
+    watch = {"native": "auto", "native-poll": "poll", "native-off": "off"}[kind]
+    return [sys.executable, "-m", "fs_mcp.main", root], {"FS_MCP_WATCH": watch}
+
+def run(kind: str, root: str, calls: int) -> Optional[Dict[str, Any]]:
+    from chatbot.mcp_runtime import MCPServer
+    launch, env = _launch(kind, root)
+    srv = MCPServer("filesystem", launch, env=env)
+    t0 = time.perf_counter()
+    try:
+        srv.start()
+    except Exception as e:
+        srv.stop()
+        print(f"  {kind}: no arrancó ({str(e).splitlines()[0][:120]})")
+        return None
+    startup_ms = (time.perf_counter() - t0) * 1000.0
+    out: Dict[str, Any] = {"startupMs": round(startup_ms, 1), "ops": {}}
+    try:
+        for label, tool, args in OPS:
+            a = dict(args)
+            if kind == "node":  # node resuelve relativas contra su cwd
+                a = {k: (os.path.join(root, v) if k == "path" else v) for k, v in a.items()}
+            srv.tools_call(tool, a, timeout=120)
+            lat: List[float] = []
+            for _ in range(calls):
+                t1 = time.perf_counter()
+                res = srv.tools_call(tool, a, timeout=120)
+                lat.append((time.perf_counter() - t1) * 1000.0)
+                if res.get("isError"):
+                    raise RuntimeError(f"{kind} {tool}: {res['content'][0].get('text')}")
+            lat.sort()
+            out["ops"][label] = {"p50Ms": round(_pct(lat, .5), 3), "p99Ms": round(_pct(lat, .99), 3)}
+    finally:
+        srv.stop()
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="fs_mcp (Python) vs server-filesystem (node)")
+    ap.add_argument("--backends", default="native,native-poll,native-off,node")
+    ap.add_argument("--calls", type=int, default=50)
+    ap.add_argument("--dirs", type=int, default=50)
+    ap.add_argument("--files", type=int, default=40)
+    ap.add_argument("--big-mb", type=int, default=64)
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="fs_bench_")
+    results: Dict[str, Any] = {}
+    try:
+        _prepare_env(work, 1)
+        root = os.path.join(work, "tree")
+        make_tree(root, args.dirs, args.files, args.big_mb)
+        for kind in [k.strip() for k in args.backends.split(",") if k.strip()]:
+            res = run(kind, root, args.calls)
+            if res is not None:
+                results[kind] = res
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    kinds = list(results)
+    print(f"\n{'':<20}" + "".join(f"{k:>14}" for k in kinds))
+    print(f"{'arranque ms':<20}" + "".join(f"{results[k]['startupMs']:>14.1f}" for k in kinds))
+    for label, _, _ in OPS:
+        print(f"{label + ' p50':<20}" + "".join(f"{results[k]['ops'][label]['p50Ms']:>14.3f}" for k in kinds))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
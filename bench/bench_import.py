@@ -0,0 +1,106 @@
+# bench/bench_import.py
+"""
+Guardia de regresión del arranque en frío del invest server.
+
+Mide, en procesos nuevos:
+  - import de invest_mcp.protocol y qué módulos pesados quedaron cargados
+  - latencia hasta la respuesta de initialize y de tools/list por stdio
+  - primera llamada a un tool (paga los imports diferidos)
+
+Sale con código 1 si algún módulo pesado se importa al arrancar o si la mediana
+de initialize supera --max-init-ms.
+
+Uso:
+    python bench/bench_import.py [--repeat 5] [--max-init-ms 500] [--preload]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, statistics, subprocess, tempfile, time
+from typing import Dict, List
+
+HEAVY = ("numpy", "pandas", "yfinance", "requests")
+
+def _env(preload: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    tmp = tempfile.gettempdir()
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("MCP_LOG_FILE", os.path.join(tmp, "bench_import_server.log"))
+    env.setdefault("INVEST_MCP_CACHE_DIR", os.path.join(tmp, "bench_import_cache"))
+    env["INVEST_MCP_PRELOAD"] = "1" if preload else "0"
+    return env
+
+def _import_probe(env: Dict[str, str]) -> Dict[str, object]:
+    code = (
+        "import sys, time, json\n"
+        "t = time.perf_counter()\n"
+        "import invest_mcp.protocol\n"
+        "ms = (time.perf_counter() - t) * 1000\n"
+        f"print(json.dumps({{'ms': ms, 'loaded': [m for m in {HEAVY!r} if m in sys.modules]}}))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def _rpc(proc: subprocess.Popen, _id: int, method: str, params: dict) -> dict:
+    proc.stdin.write(json.dumps({"jsonrpc": "2.0", "id": _id, "method": method, "params": params}) + "\n")
+    proc.stdin.flush()
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("el servidor cerró stdout")
+        msg = json.loads(line)
+        if msg.get("id") == _id:
+            return msg
+
+def _session(env: Dict[str, str]) -> Dict[str, float]:
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "invest_mcp.main"], cwd=ROOT, env=env, text=True,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        _rpc(proc, 1, "initialize", {"protocolVersion": "2025-06-18", "capabilities": {}})
+        t_init = time.perf_counter()
+        proc.stdin.write(json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + "\n")
+        _rpc(proc, 2, "tools/list", {})
+        t_list = time.perf_counter()
+        _rpc(proc, 3, "tools/call", {"name": "rebalance_plan", "arguments": {
+            "current": [{"symbol": "SPY", "amount": 1000}], "targetWeights": [{"symbol": "SPY", "weight": 1}],
+            "prices": {"SPY": 500.0}, "useLive": False}})
+        t_call = time.perf_counter()
+        _rpc(proc, 4, "shutdown", {})
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=10)
+    return {"init": (t_init - t0) * 1000, "list": (t_list - t0) * 1000, "firstCall": (t_call - t_list) * 1000}
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de arranque en frío del invest server")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--max-init-ms", type=float, default=500.0, help="Umbral de la mediana de initialize")
+    ap.add_argument("--preload", action="store_true", help="Activa INVEST_MCP_PRELOAD=1")
+    args = ap.parse_args()
+    env = _env(args.preload)
+
+    probes = [_import_probe(env) for _ in range(args.repeat)]
+    loaded = sorted({m for p in probes for m in p["loaded"]})
+    print(f"import invest_mcp.protocol: {statistics.median(p['ms'] for p in probes):.1f} ms (mediana)")
+    print(f"módulos pesados cargados al importar: {loaded or 'ninguno'}")
+
+    runs: List[Dict[str, float]] = [_session(env) for _ in range(args.repeat)]
+    print(f"{'fase':<12} {'p50 ms':>9} {'max ms':>9}")
+    for k in ("init", "list", "firstCall"):
+        xs = [r[k] for r in runs]
+        print(f"{k:<12} {statistics.median(xs):>9.1f} {max(xs):>9.1f}")
+
+    fail = False
+    if loaded:
+        print(f"REGRESIÓN: {loaded} se importan al arrancar")
+        fail = True
+    init_p50 = statistics.median(r["init"] for r in runs)
+    if init_p50 > args.max_init_ms:
+        print(f"REGRESIÓN: initialize p50 {init_p50:.1f} ms > {args.max_init_ms:.0f} ms")
+        fail = True
+    sys.exit(1 if fail else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+# bench/bench_load.py
+"""
+Generador de carga y benchmark reproducible del stack MCP (host -> fleet -> servidores).
+
+Cada worker es un cliente con su propio MCPFleet: invest real (stdio) más fs/gh
+falsos (bench/fake_mcp.py) en lugar de npx. Las llamadas pasan por
+handle_command_line igual que las del chat. Todo corre sin red
+(INVEST_MCP_OFFLINE=1: datos sintéticos) y con cache/logs en un directorio temporal.
+
+Mide throughput, latencia por operación (p50/p90/p99/max), errores, y CPU y RSS
+pico del host y de cada tipo de servidor (vía /proc, solo Linux). Con --baseline
+compara contra un resultado guardado y sale con código 1 si algo empeora más
+que --tolerance.
+
+Uso:
+    python bench/bench_load.py [--concurrency 4] [--duration 15] [--mix price_quote=4,read_file=2,...]
+                               [--size 1] [--rate 0] [--seed 1]
+                               [--out res.json] [--baseline bench/baselines/load.json] [--save-baseline PATH]
+
+--rate > 0 reparte ese total de requests/s entre los workers (lazo abierto): la
+latencia se mide desde el instante programado, así las colas no esconden el atraso.
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, platform, random, resource, shutil, tempfile, threading, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SYMBOLS = ["SPY", "QQQ", "DIA", "GLD", "BTC", "ETH"]
+FAKE = os.path.join(ROOT, "bench", "fake_mcp.py")
+
+# -------- Operaciones: (servidor, tool, args(rng, size)) --------
+def _weights(rng: random.Random, syms: List[str]) -> List[Dict[str, Any]]:
+    w = [rng.random() + 0.1 for _ in syms]
+    return [{"symbol": s, "weight": x / sum(w)} for s, x in zip(syms, w)]
+
+def _holdings(rng: random.Random, syms: List[str]) -> List[Dict[str, Any]]:
+    return [{"symbol": s, "amount": round(rng.uniform(500, 20000), 2)} for s in syms]
+
+OPS: Dict[str, Tuple[str, str, Callable[[random.Random, int], Dict[str, Any]]]] = {
+    "price_quote": ("invest", "price_quote", lambda r, n: {
+        "symbols": r.sample(SYMBOLS, min(len(SYMBOLS), 2 * n)), "useLive": True}),
+    "risk_metrics": ("invest", "risk_metrics", lambda r, n: {
+        "symbols": r.sample(SYMBOLS, min(len(SYMBOLS), 2 + n)), "lookbackDays": 252, "useLive": True}),
+    "build_portfolio": ("invest", "build_portfolio", lambda r, n: {
+        "capital": 10000, "riskLevel": r.randint(1, 5), "allowedSymbols": SYMBOLS, "useLive": True}),
+    "rebalance_plan": ("invest", "rebalance_plan", lambda r, n: {
+        "accounts": [{"accountId": i, "current": _holdings(r, SYMBOLS), "targetWeights": _weights(r, SYMBOLS)}
+                     for i in range(n)],
+        "useLive": False}),
+    "price_history": ("invest", "price_history", lambda r, n: {
+        "symbols": r.sample(SYMBOLS, 2), "days": 365 * n, "maxPoints": 500, "useLive": True}),
+    "backtest_rebalance": ("invest", "backtest_rebalance", lambda r, n: {
+        "targetWeights": _weights(r, SYMBOLS[:4]), "years": 2, "paths": 20 * n, "workers": 1, "useLive": False}),
+    "bulk_rebalance": ("invest", "bulk_rebalance", lambda r, n: {
+        "accounts": [{"accountId": i, "current": _holdings(r, SYMBOLS[:4]), "model": "m"} for i in range(50 * n)],
+        "models": {"m": _weights(r, SYMBOLS[:4])}, "workers": 1, "useLive": False}),
+    # Con pool de procesos (workers > 1) sobre stdio: el camino de los hilos lectores + spawn
+    "backtest_parallel": ("invest", "backtest_rebalance", lambda r, n: {
+        "targetWeights": _weights(r, SYMBOLS[:4]), "years": 2, "paths": 20 * n, "workers": 2, "useLive": False}),
+    "bulk_parallel": ("invest", "bulk_rebalance", lambda r, n: {
+        "accounts": [{"accountId": i, "current": _holdings(r, SYMBOLS[:4]), "model": "m"} for i in range(50 * n)],
+        "models": {"m": _weights(r, SYMBOLS[:4])}, "batchSize": 10 * n, "workers": 2, "useLive": False}),
+    "read_file": ("fs", "read_file", lambda r, n: {"path": f"data_{r.randrange(8)}.txt"}),
+    "write_file": ("fs", "write_file", lambda r, n: {"path": f"out_{r.randrange(8)}.txt",
+                                                     "content": "y" * (4096 * n)}),
+    "list_directory": ("fs", "list_directory", lambda r, n: {"path": "."}),
+    "list_commits": ("gh", "list_commits", lambda r, n: {"owner": "acme", "repo": "api", "per_page": 10 * n}),
+    "get_file_contents": ("gh", "get_file_contents", lambda r, n: {"owner": "acme", "repo": "api", "path": "README.md"}),
+}
+
+DEFAULT_MIX = "price_quote=4,risk_metrics=2,rebalance_plan=2,price_history=2,build_portfolio=1,read_file=3,write_file=1,list_commits=1,get_file_contents=1"
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    out = []
+    for part in spec.split(","):
+        name, _, w = part.strip().partition("=")
+        if name not in OPS:
+            raise SystemExit(f"operación desconocida '{name}'; opciones: {', '.join(OPS)}")
+        out.append((name, float(w or 1)))
+    return out
+
+# -------- Entorno aislado --------
+def _prepare_env(work: str, size: int) -> None:
+    """Antes de importar chatbot.*: sin red, sin pool caliente, cache/logs en 'work'."""
+    os.environ.update({
+        "INVEST_MCP_OFFLINE": "1",
+        "INVEST_MCP_WARM_POOL": "0",
+        "INVEST_MCP_CACHE_DIR": os.path.join(work, "cache"),
+        "MCP_LOG_FILE": os.path.join(work, "invest_server.log"),
+        "CHAT_LOG_DIR": os.path.join(work, "logs"),
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench"),
+        "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+    })
+    for k in ("INVEST_MCP_URL", "INVEST_MCP_SOCKET", "INVEST_MCP_TRACE", "INVEST_MCP_PROFILE"):
+        os.environ.pop(k, None)
+    fs_root = os.path.join(work, "fs")
+    os.makedirs(fs_root, exist_ok=True)
+    for i in range(8):
+        with open(os.path.join(fs_root, f"data_{i}.txt"), "w") as f:
+            f.write(("z" * 63 + "\n") * (64 * size))
+
+def _make_fleet(work: str, gh_latency_ms: float, payload_kb: float, needs: set):
+    from chatbot.mcp_runtime import MCPFleet, MCPServer
+    fleet = MCPFleet(enabled={"invest"} if "invest" in needs else set())
+    if "fs" in needs:
+        fleet.fs = MCPServer("filesystem", [sys.executable, FAKE, "fs", os.path.join(work, "fs")])
+    if "gh" in needs:
+        fleet.gh = MCPServer("github", [sys.executable, FAKE, "gh", "--latency-ms", str(gh_latency_ms),
+                                        "--payload-kb", str(payload_kb)])
+    fleet.start_all()
+    return fleet
+
+# -------- Recursos (/proc) --------
+_TICK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def _proc_cpu_rss(pid: int) -> Optional[Tuple[float, float]]:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / _TICK
+        with open(f"/proc/{pid}/status") as f:
+            rss = next((int(l.split()[1]) / 1024 for l in f if l.startswith("VmRSS:")), 0.0)
+        return cpu, rss
+    except (OSError, IndexError, ValueError):
+        return None
+
+class ResourceSampler:
+    """CPU (s) y RSS pico (MB) por rol: host y cada tipo de servidor (suma de sus procesos)."""
+    def __init__(self, roles: Dict[str, List[int]], interval: float = 0.2):
+        self.roles = roles
+        self.interval = interval
+        self.cpu0: Dict[int, float] = {}
+        self.cpu1: Dict[int, float] = {}
+        self.rss_peak: Dict[str, float] = {r: 0.0 for r in roles}
+        self._stop = threading.Event()
+        self._t = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self, into: Optional[Dict[int, float]] = None) -> None:
+        for role, pids in self.roles.items():
+            rss = 0.0
+            for pid in pids:
+                v = _proc_cpu_rss(pid)
+                if v is None:
+                    continue
+                if into is not None:
+                    into[pid] = v[0]
+                rss += v[1]
+            self.rss_peak[role] = max(self.rss_peak[role], rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._sample(self.cpu0)
+        self._t.start()
+
+    def stop(self, seconds: float) -> Dict[str, Dict[str, float]]:
+        self._stop.set()
+        self._t.join()
+        self._sample(self.cpu1)
+        out = {}
+        for role, pids in self.roles.items():
+            cpu = sum(self.cpu1.get(p, 0.0) - self.cpu0.get(p, 0.0) for p in pids)
+            out[role] = {"cpuS": round(cpu, 3), "cpuPct": round(100.0 * cpu / max(seconds, 1e-9), 1),
+                         "rssPeakMB": round(self.rss_peak[role], 1)}
+        return out
+
+# -------- Carga --------
+def _pct(xs: List[float], q: float) -> float:
+    if not xs:
+        return 0.0
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+def _worker(wid: int, fleet, mix, size: int, seed: int, stop_at: float, max_requests: Optional[int],
+            counter: List[int], lock: threading.Lock, interval: float, samples: Dict[str, List[float]],
+            errors: Dict[str, int], warmup: int):
+    from chatbot.mcp_runtime import handle_command_line
+    rng = random.Random(seed * 1000 + wid)
+    names = [n for n, _ in mix]
+    weights = [w for _, w in mix]
+    line_for = lambda name: "!mcp " + json.dumps({"server": OPS[name][0], "tool": OPS[name][1],
+                                                  "args": OPS[name][2](rng, size)})
+    for name in names:  # calentamiento: imports diferidos, caches, primer fork
+        for _ in range(warmup):
+            try:
+                handle_command_line(line_for(name), fleet)
+            except Exception:
+                pass
+    next_at = time.perf_counter()
+    while time.perf_counter() < stop_at:
+        with lock:
+            if max_requests is not None and counter[0] >= max_requests:
+                return
+            counter[0] += 1
+        name = rng.choices(names, weights)[0]
+        line = line_for(name)
+        if interval:
+            now = time.perf_counter()
+            if next_at > now:
+                time.sleep(next_at - now)
+            t0 = next_at
+            next_at += interval
+        else:
+            t0 = time.perf_counter()
+        ok = True
+        try:
+            res = handle_command_line(line, fleet)
+            ok = not (isinstance(res, dict) and res.get("isError"))
+        except Exception:
+            ok = False
+        dt = (time.perf_counter() - t0) * 1000.0
+        with lock:
+            samples.setdefault(name, []).append(dt)
+            if not ok:
+                errors[name] = errors.get(name, 0) + 1
+
+def run(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    needs = {OPS[n][0] for n, _ in mix}
+    work = tempfile.mkdtemp(prefix="bench_load_")
+    _prepare_env(work, args.size)
+    try:
+        fleets = [_make_fleet(work, args.gh_latency_ms, args.payload_kb, needs) for _ in range(args.concurrency)]
+        roles: Dict[str, List[int]] = {"host": [os.getpid()]}
+        for fl in fleets:
+            for key in ("invest", "fs", "gh"):
+                s = getattr(fl, key, None)
+                if s is not None and getattr(s, "proc", None) is not None:
+                    roles.setdefault(key, []).append(s.proc.pid)
+
+        samples: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        counter, lock = [0], threading.Lock()
+        interval = args.concurrency / args.rate if args.rate > 0 else 0.0
+        # calentamiento fuera de la ventana medida
+        for i, fl in enumerate(fleets):
+            _worker(i, fl, mix, args.size, args.seed, time.perf_counter(), None, [0], lock, 0.0, {}, {}, args.warmup)
+        sampler = ResourceSampler(roles)
+        sampler.start()
+        t0 = time.perf_counter()
+        stop_at = t0 + (args.duration if args.requests is None else 1e9)
+        threads = [threading.Thread(target=_worker, args=(i, fl, mix, args.size, args.seed, stop_at, args.requests,
+                                                          counter, lock, interval, samples, errors, 0))
+                   for i, fl in enumerate(fleets)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        res_usage = sampler.stop(elapsed)
+        for fl in fleets:
+            fl.stop_all()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    ops = {}
+    all_lat: List[float] = []
+    for name, xs in sorted(samples.items()):
+        xs.sort()
+        all_lat.extend(xs)
+        ops[name] = {"count": len(xs), "errors": errors.get(name, 0), "meanMs": round(sum(xs) / len(xs), 3),
+                     "p50Ms": round(_pct(xs, 0.5), 3), "p90Ms": round(_pct(xs, 0.9), 3),
+                     "p99Ms": round(_pct(xs, 0.99), 3), "maxMs": round(xs[-1], 3)}
+    all_lat.sort()
+    total = len(all_lat)
+    return {
+        "config": {"mix": args.mix, "concurrency": args.concurrency, "duration": args.duration,
+                   "requests": args.requests, "size": args.size, "rate": args.rate, "seed": args.seed,
+                   "ghLatencyMs": args.gh_latency_ms, "payloadKb": args.payload_kb},
+        "env": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "totals": {"requests": total, "errors": sum(errors.values()), "seconds": round(elapsed, 3),
+                   "throughput": round(total / elapsed, 2) if elapsed else 0.0,
+                   "p50Ms": round(_pct(all_lat, 0.5), 3), "p99Ms": round(_pct(all_lat, 0.99), 3),
+                   "hostMaxRssMB": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)},
+        "ops": ops,
+        "resources": res_usage,
+    }
+
+# -------- Reporte y baseline --------
+def report(r: Dict[str, Any]) -> None:
+    t = r["totals"]
+    print(f"{t['requests']} requests en {t['seconds']:.1f}s -> {t['throughput']:.1f} req/s, "
+          f"errores {t['errors']}, p50 {t['p50Ms']:.1f} ms, p99 {t['p99Ms']:.1f} ms")
+    print(f"{'operación':<20} {'n':>6} {'err':>4} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for name, o in r["ops"].items():
+        print(f"{name:<20} {o['count']:>6} {o['errors']:>4} {o['p50Ms']:>9.2f} {o['p90Ms']:>9.2f} "
+              f"{o['p99Ms']:>9.2f} {o['maxMs']:>9.2f}")
+    print(f"{'rol':<10} {'cpu s':>8} {'cpu %':>7} {'rss pico MB':>12}")
+    for role, u in r["resources"].items():
+        print(f"{role:<10} {u['cpuS']:>8.2f} {u['cpuPct']:>7.1f} {u['rssPeakMB']:>12.1f}")
+
+def compare(cur: Dict[str, Any], base: Dict[str, Any], tol: float, min_ms: float = 2.0) -> List[str]:
+    """
+    Lista de regresiones (vacía si todo está dentro de la tolerancia). Las latencias
+    de ops de pocos ms son ruidosas: además del % deben empeorar al menos min_ms.
+    """
+    bad: List[str] = []
+    if cur["config"] != base["config"]:
+        print("aviso: la configuración difiere de la del baseline; la comparación es orientativa")
+    if cur["env"].get("cpus") != base["env"].get("cpus"):
+        print(f"aviso: baseline medido con {base['env'].get('cpus')} CPUs, ahora {cur['env'].get('cpus')}")
+
+    def check(label: str, now: float, was: float, higher_is_worse: bool = True, floor: float = 0.0):
+        if not was:
+            return
+        d = now / was - 1.0
+        worse = (d > tol and now - was > floor) if higher_is_worse else d < -tol
+        print(f"  {label:<34} {was:>10.2f} -> {now:>10.2f}  {d:+7.1%}{'  REGRESIÓN' if worse else ''}")
+        if worse:
+            bad.append(f"{label} {d:+.1%}")
+
+    print("comparación con baseline:")
+    check("throughput req/s", cur["totals"]["throughput"], base["totals"]["throughput"], higher_is_worse=False)
+    for name, o in cur["ops"].items():
+        b = base["ops"].get(name)
+        if b:
+            check(f"{name} p50 ms", o["p50Ms"], b["p50Ms"], floor=min_ms)
+            check(f"{name} p99 ms", o["p99Ms"], b["p99Ms"], floor=min_ms)
+    for role, u in cur["resources"].items():
+        b = base["resources"].get(role)
+        if b:
+            check(f"{role} rss pico MB", u["rssPeakMB"], b["rssPeakMB"], floor=5.0)
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de carga del stack MCP (offline)")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="op=peso,... (ops: " + ", ".join(OPS) + ")")
+    ap.add_argument("--concurrency", type=int, default=4, help="Clientes en paralelo (cada uno con su fleet)")
+    ap.add_argument("--duration", type=float, default=15.0, help="Segundos de medición")
+    ap.add_argument("--requests", type=int, default=None, help="Total fijo de requests (ignora --duration)")
+    ap.add_argument("--size", type=int, default=1, help="Escala de payloads (símbolos, cuentas, días, KB)")
+    ap.add_argument("--rate", type=float, default=0.0, help="req/s totales en lazo abierto (0 = lazo cerrado)")
+    ap.add_argument("--warmup", type=int, default=2, help="Llamadas por operación y worker antes de medir")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--gh-latency-ms", type=float, default=0.0, help="Latencia simulada del GitHub falso")
+    ap.add_argument("--payload-kb", type=float, default=4.0, help="Tamaño de get_file_contents")
+    ap.add_argument("--out", default="", help="Guardar el resultado (JSON)")
+    ap.add_argument("--baseline", default="", help="Comparar contra este resultado")
+    ap.add_argument("--save-baseline", default="", help="Guardar el resultado como baseline")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="Empeoramiento relativo tolerado")
+    ap.add_argument("--min-delta-ms", type=float, default=2.0, help="Empeoramiento absoluto mínimo de latencia")
+    args = ap.parse_args()
+
+    r = run(args)
+    report(r)
+    for path in (args.out, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(r, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            bad = compare(r, json.load(f), args.tolerance, args.min_delta_ms)
+        if bad:
+            print("REGRESIÓN: " + "; ".join(bad))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
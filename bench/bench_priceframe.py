@@ -0,0 +1,128 @@
+# bench/bench_priceframe.py
+"""
+Estadísticas de las tools de invest sobre un panel de precios: listas recortadas
+por largo (el esquema anterior) vs PriceFrame.
+
+Genera --symbols series sintéticas de --days días calendario: una de cada
+--crypto-every cotiza todos los días (cripto) y el resto solo días hábiles. En
+cada pasada se calculan media y volatilidad anuales por símbolo (risk_metrics) y
+la matriz de covarianza (build_portfolio), --rounds veces.
+
+  lists      dict de listas sin fechas, recortadas a la longitud mínima por el
+             final; retornos, medias y covarianza con bucles de Python
+  frame      PriceFrame.from_dated: unión de fechas, retornos de cada símbolo en
+             su calendario, covarianza en las fechas comunes (numpy)
+
+Reporta ms por pasada (p50/p99) y, para 'lists', cuántas filas de la
+covarianza mezclan fechas distintas entre cripto y acciones.
+
+Uso:
+    python bench/bench_priceframe.py [--symbols 10,50] [--days 730] [--crypto-every 4] [--rounds 20]
+                                     [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, random, time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from bench.bench_load import _pct
+
+def _panel(n: int, days: int, crypto_every: int) -> Dict[str, Dict[str, List]]:
+    rng = random.Random(7)
+    start = date.today() - timedelta(days=days)
+    out: Dict[str, Dict[str, List]] = {}
+    for j in range(n):
+        crypto = crypto_every > 0 and j % crypto_every == 0
+        t: List[str] = []
+        c: List[float] = []
+        px = 100.0
+        for k in range(days):
+            d = start + timedelta(days=k)
+            if not crypto and d.weekday() >= 5:
+                continue
+            px *= 1.0 + rng.gauss(0.0003, 0.02 if crypto else 0.01)
+            t.append(d.isoformat())
+            c.append(px)
+        out[f"S{j:03d}"] = {"t": t, "c": c}
+    return out
+
+def _lists(series: Dict[str, Dict[str, List]]) -> Dict[str, Any]:
+    """Lo que hacían get_history + risk_metrics/build_portfolio antes de PriceFrame."""
+    hist = {s: v["c"] for s, v in series.items()}
+    T = min(len(v) for v in hist.values())
+    hist = {s: v[-T:] for s, v in hist.items()}  # align_min_length
+    rets = [[p[i] / p[i - 1] - 1.0 for i in range(1, len(p))] for p in hist.values()]
+    stats = []
+    for r in rets:
+        m = sum(r) / len(r)
+        sd = (sum((x - m) ** 2 for x in r) / len(r)) ** 0.5
+        stats.append((m * 252, sd * 252 ** 0.5))
+    n = len(rets)
+    mus = [sum(r) / len(r) for r in rets]
+    C = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i, n):
+            acc = sum((a - mus[i]) * (b - mus[j]) for a, b in zip(rets[i], rets[j]))
+            C[i][j] = C[j][i] = acc / len(rets[i])
+    return {"stats": stats, "cov": C, "rows": T}
+
+def _frame(series: Dict[str, Dict[str, List]]) -> Dict[str, Any]:
+    import numpy as np
+    from invest_mcp.lib.priceframe import PriceFrame
+    frame = PriceFrame.from_dated(series)
+    R = frame.returns()
+    ppy = frame.periods_per_year()
+    mean = np.nanmean(R, axis=0)
+    sd = np.nanstd(R, axis=0)
+    stats = np.column_stack([mean * ppy, sd * np.sqrt(ppy)])
+    common = frame.common()
+    C = np.cov(common.returns()[1:], rowvar=False, bias=True)
+    return {"stats": stats, "cov": C, "rows": len(common)}
+
+def _misaligned(series: Dict[str, Dict[str, List]]) -> int:
+    """Filas de la ventana recortada en que los símbolos no tienen la misma fecha."""
+    dates = [v["t"] for v in series.values()]
+    T = min(len(t) for t in dates)
+    return sum(1 for k in range(T) if len({t[len(t) - T + k] for t in dates}) > 1)
+
+def run(mode: str, n: int, args) -> Dict[str, Any]:
+    series = _panel(n, args.days, args.crypto_every)
+    fn = _lists if mode == "lists" else _frame
+    fn(series)  # importa numpy / calienta
+    lat: List[float] = []
+    for _ in range(args.rounds):
+        t0 = time.perf_counter()
+        r = fn(series)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    lat.sort()
+    return {"symbols": n, "p50Ms": round(_pct(lat, .5), 2), "p99Ms": round(_pct(lat, .99), 2),
+            "covRows": r["rows"], "misalignedRows": _misaligned(series) if mode == "lists" else 0}
+
+def main():
+    ap = argparse.ArgumentParser(description="PriceFrame (fechas alineadas, numpy) vs listas recortadas por largo")
+    ap.add_argument("--symbols", default="10,50", help="Tamaños del panel, separados por coma")
+    ap.add_argument("--days", type=int, default=730, help="Días calendario de historia")
+    ap.add_argument("--crypto-every", type=int, default=4, help="Uno de cada N símbolos cotiza 7 días (0 = ninguno)")
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("--modes", default="lists,frame")
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    results: Dict[str, Any] = {}
+    for n in [int(x) for x in args.symbols.split(",") if x.strip()]:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            results[f"{mode}:{n}"] = {"mode": mode, **run(mode, n, args)}
+
+    print(f"\n{'modo':<7} {'símbolos':>9} {'p50 ms':>8} {'p99 ms':>8} {'filas cov':>10} {'desalineadas':>13}")
+    for r in results.values():
+        print(f"{r['mode']:<7} {r['symbols']:>9} {r['p50Ms']:>8.2f} {r['p99Ms']:>8.2f} {r['covRows']:>10} "
+              f"{r['misalignedRows']:>13}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# bench/bench_replicas.py
+"""
+Réplicas por servidor (ReplicaPool, MCP_REPLICAS) bajo concurrencia.
+
+Un github falso (bench/fake_mcp.py gh) con latencia --latency-ms y una cola de
+llamadas lentas (--slow-p con --slow-ms) atiende --concurrency clientes que
+comparten el mismo servidor, como las sesiones de un MCPFleet. Para cada
+configuración se mide throughput, p50/p99 vistos por el cliente, réplicas al
+final y hedges:
+
+  1          un proceso: las llamadas se serializan
+  N          N réplicas fijas
+  1:N        autoescalado por cola desde 1
+  N+hedge    N réplicas con hedge de list_commits (--hedge-ms, o "auto" = p95); el
+             hedge solo usa réplicas libres, así que necesita N > --concurrency
+
+Uso:
+    python bench/bench_replicas.py [--configs 1,4,1:8,8+hedge] [--concurrency 4] [--duration 5]
+                                   [--latency-ms 20] [--slow-p 0.05] [--slow-ms 300] [--hedge-ms auto]
+                                   [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, random, shutil, tempfile, threading, time
+from typing import Any, Dict, List, Tuple
+
+from bench.bench_load import FAKE, _pct, _prepare_env
+
+def _parse(cfg: str) -> Tuple[int, int, bool]:
+    spec, _, hedge = cfg.partition("+")
+    lo, _, hi = spec.partition(":")
+    return int(lo), int(hi or lo), hedge == "hedge"
+
+def run(cfg: str, args) -> Dict[str, Any]:
+    from chatbot.mcp_runtime import MCPServer, ReplicaPool
+    lo, hi, hedge = _parse(cfg)
+    hedge_ms = (args.hedge_ms if args.hedge_ms == "auto" else float(args.hedge_ms)) if hedge else None
+    launch = [sys.executable, FAKE, "gh", "--latency-ms", str(args.latency_ms),
+              "--slow-p", str(args.slow_p), "--slow-ms", str(args.slow_ms)]
+    pool = ReplicaPool(MCPServer("github", launch), lo, hi, hedge_ms=hedge_ms, idle_s=args.duration * 2)
+    pool.start()
+    lat: List[float] = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+
+    def _client(i: int):
+        rng = random.Random(args.seed + i)
+        mine: List[float] = []
+        while time.perf_counter() < stop_at:
+            a = {"owner": "octo", "repo": f"repo{rng.randrange(50)}", "per_page": 10}
+            t1 = time.perf_counter()
+            pool.tools_call("list_commits", a, timeout=60)
+            mine.append((time.perf_counter() - t1) * 1000.0)
+        with lock:
+            lat.extend(mine)
+
+    try:
+        threads = [threading.Thread(target=_client, args=(i,)) for i in range(args.concurrency)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        st = pool.stats()
+    finally:
+        pool.stop()
+    lat.sort()
+    return {"rps": round(len(lat) / elapsed, 1), "p50Ms": round(_pct(lat, .5), 2), "p99Ms": round(_pct(lat, .99), 2),
+            "replicas": len(st["replicas"]), "scaleUps": st["scaleUps"], "queued": st["queued"],
+            "hedges": st["hedges"], "hedgeWins": st["hedgeWins"]}
+
+def main():
+    ap = argparse.ArgumentParser(description="ReplicaPool: réplicas, autoescalado y hedging")
+    ap.add_argument("--configs", default="1,4,1:8,8+hedge")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--duration", type=float, default=5.0)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--slow-p", type=float, default=0.05)
+    ap.add_argument("--slow-ms", type=float, default=300.0)
+    ap.add_argument("--hedge-ms", default="auto")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="mcp_replicas_")
+    results: Dict[str, Any] = {}
+    try:
+        _prepare_env(work, 1)
+        for cfg in [c.strip() for c in args.configs.split(",") if c.strip()]:
+            results[cfg] = run(cfg, args)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"\n{'config':<10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'réplicas':>9} {'cola':>6} {'hedges':>7} {'ganados':>8}")
+    for cfg, r in results.items():
+        print(f"{cfg:<10} {r['rps']:>8.1f} {r['p50Ms']:>8.2f} {r['p99Ms']:>8.2f} {r['replicas']:>9} "
+              f"{r['queued']:>6} {r['hedges']:>7} {r['hedgeWins']:>8}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
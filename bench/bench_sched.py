@@ -0,0 +1,124 @@
+# bench/bench_sched.py
+"""
+Scheduler de prioridades (MCP_SCHEDULER) con carga batch de fondo.
+
+Un github falso (bench/fake_mcp.py gh, --latency-ms) con --replicas réplicas
+recibe a la vez:
+  * --batch clientes batch que llaman sin pausa (warmups, rebalanceos masivos);
+    si el scheduler los descarta (Overloaded) esperan --backoff-ms y reintentan;
+  * un cliente interactivo que hace una llamada cada --think-ms (el chat).
+
+Se compara el servidor sin scheduler (cola FIFO de las réplicas: el interactivo
+espera detrás del batch) con el mismo servidor detrás del Scheduler (cupo =
+réplicas, --reserve cupos solo para interactive, cola batch de --queue).
+Reporta p50/p99 del interactivo, throughput batch y pedidos descartados.
+
+Uso:
+    python bench/bench_sched.py [--replicas 4] [--batch 12] [--duration 5] [--latency-ms 20]
+                                [--think-ms 50] [--reserve 1] [--queue 8] [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, random, shutil, tempfile, threading, time
+from typing import Any, Dict, List
+
+from bench.bench_load import FAKE, _pct, _prepare_env
+
+def run(mode: str, args) -> Dict[str, Any]:
+    from chatbot.mcp_runtime import MCPServer, ReplicaPool, ScheduledServer
+    from chatbot.scheduler import Scheduler, Overloaded, priority
+    launch = [sys.executable, FAKE, "gh", "--latency-ms", str(args.latency_ms)]
+    pool = ReplicaPool(MCPServer("github", launch), args.replicas, args.replicas)
+    pool.start()
+    srv: Any = pool
+    sched = None
+    if mode == "scheduler":
+        sched = Scheduler(queue_max=args.queue, reserve=args.reserve)
+        sched.configure("gh", args.replicas)
+        srv = ScheduledServer("gh", pool, sched)
+    stop_at = time.perf_counter() + args.duration
+    inter: List[float] = []
+    counts = {"batch": 0, "shed": 0}
+    lock = threading.Lock()
+
+    def _call(rng: random.Random):
+        srv.tools_call("list_commits", {"owner": "octo", "repo": f"repo{rng.randrange(50)}", "per_page": 10},
+                       timeout=60)
+
+    def _batch(i: int):
+        rng = random.Random(args.seed + i)
+        done = shed = 0
+        with priority("batch"):
+            while time.perf_counter() < stop_at:
+                try:
+                    _call(rng)
+                    done += 1
+                except Overloaded:
+                    shed += 1
+                    time.sleep(args.backoff_ms / 1000.0)
+        with lock:
+            counts["batch"] += done
+            counts["shed"] += shed
+
+    def _interactive():
+        rng = random.Random(args.seed)
+        while time.perf_counter() < stop_at:
+            t1 = time.perf_counter()
+            _call(rng)
+            inter.append((time.perf_counter() - t1) * 1000.0)
+            time.sleep(args.think_ms / 1000.0)
+
+    try:
+        threads = [threading.Thread(target=_batch, args=(i,)) for i in range(args.batch)]
+        threads.append(threading.Thread(target=_interactive))
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    finally:
+        pool.stop()
+    inter.sort()
+    out = {"interactiveCalls": len(inter), "interactiveP50Ms": round(_pct(inter, .5), 2),
+           "interactiveP99Ms": round(_pct(inter, .99), 2), "batchRps": round(counts["batch"] / elapsed, 1),
+           "shed": counts["shed"]}
+    if sched is not None:
+        out["scheduler"] = sched.stats()["servers"]["gh"]
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Scheduler de prioridades bajo carga batch")
+    ap.add_argument("--replicas", type=int, default=4)
+    ap.add_argument("--batch", type=int, default=12, help="Clientes batch concurrentes")
+    ap.add_argument("--duration", type=float, default=5.0)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--think-ms", type=float, default=50.0, help="Pausa del cliente interactivo entre llamadas")
+    ap.add_argument("--reserve", type=int, default=1)
+    ap.add_argument("--queue", type=int, default=8, help="Cola a partir de la cual se descarta batch")
+    ap.add_argument("--backoff-ms", type=float, default=20.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="mcp_sched_")
+    results: Dict[str, Any] = {}
+    try:
+        _prepare_env(work, 1)
+        for mode in ("fifo", "scheduler"):
+            results[mode] = run(mode, args)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"\n{'modo':<10} {'inter p50':>10} {'inter p99':>10} {'batch req/s':>12} {'descartados':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['interactiveP50Ms']:>10.2f} {r['interactiveP99Ms']:>10.2f} "
+              f"{r['batchRps']:>12.1f} {r['shed']:>12}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# bench/bench_soak.py
+"""
+Soak test del canal stdio host <-> invest server.
+
+El invest server escribe una línea JSON a stderr por cada request y respuesta
+(protocol._writeline). Sin un lector continuo, el pipe del SO se llena tras unos
+cientos de requests y el hijo se bloquea en ese write. MCPServer ahora drena
+stderr con StderrPump; este benchmark manda muchas llamadas seguidas por un
+solo cliente y reporta throughput, p99 y RSS por ventana, para comprobar que
+se mantienen planos.
+
+Sale con código 1 si:
+  * alguna llamada no responde (timeout) o falla;
+  * el throughput de las últimas ventanas cae más que --tolerance respecto de
+    las primeras;
+  * el RSS de host o servidor crece más de --max-rss-growth-mb.
+
+Uso:
+    python bench/bench_soak.py [--requests 100000] [--window 5000] [--tool price_quote]
+                               [--tolerance 0.2] [--max-rss-growth-mb 25] [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, shutil, tempfile, time
+from typing import Any, Dict, List
+
+from bench.bench_load import _pct, _prepare_env, _proc_cpu_rss
+
+CALLS: Dict[str, Dict[str, Any]] = {
+    "price_quote": {"symbols": ["SPY", "BTC"], "useLive": True},
+    "risk_metrics": {"symbols": ["SPY", "QQQ", "GLD"], "lookbackDays": 252, "useLive": True},
+}
+
+def _rss(pid: int) -> float:
+    v = _proc_cpu_rss(pid)
+    return v[1] if v else 0.0
+
+def run(requests: int, window: int, tool: str, timeout: float) -> Dict[str, Any]:
+    from chatbot.mcp_runtime import MCPServer
+    srv = MCPServer("invest", [sys.executable, "-m", "invest_mcp.main"], progress=True)
+    srv.start()
+    args = CALLS[tool]
+    windows: List[Dict[str, Any]] = []
+    failures = 0
+    try:
+        for _ in range(50):  # calentamiento: imports diferidos y cache en memoria
+            srv.tools_call(tool, args, timeout=timeout)
+        done = 0
+        while done < requests:
+            n = min(window, requests - done)
+            lat: List[float] = []
+            t0 = time.perf_counter()
+            for _ in range(n):
+                t1 = time.perf_counter()
+                try:
+                    res = srv.tools_call(tool, args, timeout=timeout)
+                    if isinstance(res, dict) and res.get("isError"):
+                        failures += 1
+                except Exception as e:
+                    failures += 1
+                    print(f"  fallo tras {done + len(lat)} requests: {str(e).splitlines()[0]}")
+                    if srv.proc is None or srv.proc.poll() is not None:
+                        raise
+                lat.append((time.perf_counter() - t1) * 1000.0)
+            dt = time.perf_counter() - t0
+            done += n
+            lat.sort()
+            w = {"requests": done, "rps": round(n / dt, 1), "p50Ms": round(_pct(lat, .5), 3),
+                 "p99Ms": round(_pct(lat, .99), 3), "maxMs": round(lat[-1], 3),
+                 "hostRssMB": round(_rss(os.getpid()), 1), "serverRssMB": round(_rss(srv.proc.pid), 1),
+                 "stderrLines": srv.stderr_pump.count if srv.stderr_pump else 0}
+            windows.append(w)
+            print(f"{w['requests']:>10} {w['rps']:>9.1f} {w['p50Ms']:>8.2f} {w['p99Ms']:>8.2f} {w['maxMs']:>9.2f} "
+                  f"{w['hostRssMB']:>8.1f} {w['serverRssMB']:>8.1f} {w['stderrLines']:>11}")
+    finally:
+        srv.stop()
+    return {"tool": tool, "requests": requests, "window": window, "failures": failures, "windows": windows}
+
+def verdict(res: Dict[str, Any], tolerance: float, max_rss_growth: float) -> List[str]:
+    ws = res["windows"]
+    problems = []
+    if res["failures"]:
+        problems.append(f"{res['failures']} llamadas fallidas")
+    if len(ws) < 2:
+        return problems
+    k = max(1, min(3, len(ws) // 3))
+    head = sum(w["rps"] for w in ws[:k]) / k
+    tail = sum(w["rps"] for w in ws[-k:]) / k
+    if tail < head * (1 - tolerance):
+        problems.append(f"throughput cae {100 * (1 - tail / head):.1f}% ({head:.0f} -> {tail:.0f} req/s)")
+    for key in ("hostRssMB", "serverRssMB"):
+        growth = ws[-1][key] - ws[0][key]
+        if growth > max_rss_growth:
+            problems.append(f"{key} crece {growth:.1f} MB")
+    return problems
+
+def main():
+    ap = argparse.ArgumentParser(description="Soak test stdio: throughput y RSS planos con stderr drenado")
+    ap.add_argument("--requests", type=int, default=100000)
+    ap.add_argument("--window", type=int, default=5000)
+    ap.add_argument("--tool", choices=sorted(CALLS), default="price_quote")
+    ap.add_argument("--timeout", type=float, default=10.0, help="Por llamada; un hijo bloqueado aparece como timeout")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    ap.add_argument("--max-rss-growth-mb", type=float, default=25.0)
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="invest_soak_")
+    try:
+        _prepare_env(work, 1)
+        print(f"{'requests':>10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>9} "
+              f"{'host MB':>8} {'srv MB':>8} {'stderr lín':>11}")
+        res = run(args.requests, args.window, args.tool, args.timeout)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    problems = verdict(res, args.tolerance, args.max_rss_growth_mb)
+    res["problems"] = problems
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2)
+    print("\nOK: throughput y memoria estables" if not problems else "\nREGRESIÓN:\n  " + "\n  ".join(problems))
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
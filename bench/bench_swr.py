@@ -0,0 +1,171 @@
+# bench/bench_swr.py
+"""
+Política de cache de data_live (stale-while-revalidate + circuit breakers) ante
+una caída del proveedor.
+
+En proceso, sin red: requests.get se reemplaza por un CoinGecko falso que tarda
+--latency-ms y, durante la ventana de caída, cuelga --hang-ms y falla (como un
+timeout) o responde 429 al instante (--outage-kind). --clients hilos piden cada
+--think-ms get_frame + spot de BTC/ETH (lo que hace price_quote) con TTL blando
+--soft-ttl, cada uno dentro de un CallContext para contar la frescura servida.
+Fases: sano (--healthy s), caída (--outage s) y recuperación (--recovery s).
+
+  blocking   INVEST_MCP_SWR=0 y sin breakers: al vencer el TTL cada llamada va al
+             proveedor y espera; si falla sirve lo que quede en cache
+  swr        el dato viejo se sirve al instante y se refresca en segundo plano;
+             el breaker corta las llamadas al proveedor caído (--cooldown s)
+
+Reporta por fase p50/p99/max, respuestas fresh/stale/unavailable y llamadas al
+proveedor.
+
+Uso:
+    python bench/bench_swr.py [--clients 4] [--think-ms 10] [--soft-ttl 0.5] [--healthy 2] [--outage 4]
+                              [--recovery 6] [--hang-ms 300] [--outage-kind hang|429] [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, shutil, tempfile, threading, time
+from typing import Any, Dict, List
+
+from bench.bench_load import _pct
+
+class _Resp:
+    def __init__(self, status: int, data: Any):
+        self.status_code = status
+        self._data = data
+
+    def json(self) -> Any:
+        return self._data
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+class FakeCoinGecko:
+    """Responde simple/price y market_chart; 'down' simula la caída."""
+    def __init__(self, latency_ms: float, hang_ms: float, kind: str):
+        self.latency = latency_ms / 1000.0
+        self.hang = hang_ms / 1000.0
+        self.kind = kind
+        self.down = False
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: Dict[str, Any] = None, timeout: float = 20, **_kw) -> _Resp:
+        import requests
+        with self._lock:
+            self.calls += 1
+        if self.down:
+            if self.kind == "429":
+                return _Resp(429, {})
+            time.sleep(min(self.hang, timeout))
+            raise requests.Timeout("fake upstream hang")
+        time.sleep(self.latency)
+        now = int(time.time() * 1000)
+        if url.endswith("/simple/price"):
+            return _Resp(200, {i: {"usd": 100.0} for i in (params or {}).get("ids", "").split(",")})
+        return _Resp(200, {"prices": [[now - (800 - k) * 86400000, 100.0 + k * 0.1] for k in range(800)]})
+
+def run(mode: str, args, work: str) -> Dict[str, Any]:
+    from invest_mcp.lib import data_live, context
+    data_live.CACHE_DIR = os.path.join(work, mode)
+    data_live._cache_ready = False
+    data_live._mem.clear()
+    data_live._breakers.clear()
+    data_live.SWR = mode == "swr"
+    data_live.BREAKER_FAILS = 3 if mode == "swr" else 0
+    data_live.BREAKER_COOLDOWN_S = args.cooldown
+    for k in ("cg_simple", "cg_hist_dated"):
+        data_live.SOFT_TTL[k] = args.soft_ttl
+
+    fake = FakeCoinGecko(args.latency_ms, args.hang_ms, args.outage_kind)
+    import requests
+    real_get, requests.get = requests.get, fake.get
+    phases = [("healthy", args.healthy), ("outage", args.outage), ("recovery", args.recovery)]
+    lat: Dict[str, List[float]] = {p: [] for p, _ in phases}
+    fresh: Dict[str, Dict[str, int]] = {p: {"fresh": 0, "stale": 0, "unavailable": 0} for p, _ in phases}
+    calls: Dict[str, int] = {}
+    phase = ["healthy"]
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def _client():
+        while not stop.is_set():
+            p = phase[0]
+            tok = context.activate(context.CallContext(0))
+            t1 = time.perf_counter()
+            try:
+                frame = data_live.get_frame(["BTC", "ETH"], days=252)
+                data_live.last_and_returns(frame)
+                fr = context.freshness()
+            finally:
+                context.deactivate(tok)
+            dt = (time.perf_counter() - t1) * 1000.0
+            with lock:
+                lat[p].append(dt)
+                if fr is not None:
+                    fresh[p][fr["state"]] += 1
+            time.sleep(args.think_ms / 1000.0)
+
+    threads = [threading.Thread(target=_client) for _ in range(args.clients)]
+    try:
+        for t in threads:
+            t.start()
+        for name, secs in phases:
+            phase[0] = name
+            fake.down = name == "outage"
+            c0 = fake.calls
+            time.sleep(secs)
+            calls[name] = fake.calls - c0
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        requests.get = real_get
+    out: Dict[str, Any] = {}
+    for name, _ in phases:
+        xs = sorted(lat[name])
+        out[name] = {"calls": len(xs), "p50Ms": round(_pct(xs, .5), 2), "p99Ms": round(_pct(xs, .99), 2),
+                     "maxMs": round(xs[-1], 2) if xs else 0.0, **fresh[name], "upstreamCalls": calls[name]}
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="SWR + circuit breakers de data_live ante una caída del proveedor")
+    ap.add_argument("--clients", type=int, default=4)
+    ap.add_argument("--think-ms", type=float, default=10.0, help="Pausa de cada cliente entre llamadas")
+    ap.add_argument("--soft-ttl", type=float, default=0.5)
+    ap.add_argument("--healthy", type=float, default=2.0)
+    ap.add_argument("--outage", type=float, default=4.0)
+    ap.add_argument("--recovery", type=float, default=6.0)
+    ap.add_argument("--latency-ms", type=float, default=30.0)
+    ap.add_argument("--hang-ms", type=float, default=300.0)
+    ap.add_argument("--outage-kind", choices=("hang", "429"), default="hang")
+    ap.add_argument("--cooldown", type=float, default=1.0, help="Espera del breaker abierto (s)")
+    ap.add_argument("--modes", default="blocking,swr")
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="invest_swr_")
+    os.environ.update({"INVEST_MCP_OFFLINE": "0", "INVEST_MCP_CACHE_DIR": work,
+                       "MCP_LOG_FILE": os.path.join(work, "invest_server.log")})
+    results: Dict[str, Any] = {}
+    try:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            results[mode] = run(mode, args, work)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"\n{'modo':<9} {'fase':<9} {'n':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'fresh':>6} {'stale':>6} {'unavail':>8} {'upstream':>9}")
+    for mode, r in results.items():
+        for name, x in r.items():
+            print(f"{mode:<9} {name:<9} {x['calls']:>6} {x['p50Ms']:>8.2f} {x['p99Ms']:>8.2f} {x['maxMs']:>8.2f} "
+                  f"{x['fresh']:>6} {x['stale']:>6} {x['unavailable']:>8} {x['upstreamCalls']:>9}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
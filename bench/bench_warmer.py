@@ -0,0 +1,134 @@
+# bench/bench_warmer.py
+"""
+Calentador de cache (INVEST_MCP_WARMER) con tráfico esporádico.
+
+En proceso, sin red: yfinance y requests.get se reemplazan por proveedores falsos
+que tardan --yf-ms y --cg-ms. Un cliente llama a collect_quotes (la ruta de
+price_quote) cada --gap-ms con --symbols símbolos al azar del UNIVERSE, siempre
+dentro de un CallContext. Con --soft-ttl y --hard-ttl menores que --gap-ms cada
+llamada encuentra la cache vencida: es el "primer usuario del día" en escala
+comprimida.
+
+  cold     sin warmer: la llamada espera al proveedor (miss)
+  warmer   el warmer refresca la watchlist al LEAD del TTL blando, a --rpm
+           pedidos por minuto por proveedor
+
+Reporta p50/p99/max de las llamadas, cuántas esperaron al proveedor (más de la
+mitad de la latencia más corta) y llamadas al proveedor (el costo del warmer).
+
+Uso:
+    python bench/bench_warmer.py [--calls 20] [--gap-ms 2500] [--symbols 3] [--soft-ttl 2]
+                                 [--hard-ttl 2.2] [--yf-ms 250] [--cg-ms 150] [--rpm 300] [--out res.json]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, random, shutil, tempfile, threading, time
+from typing import Any, Dict, List
+
+from bench.bench_load import _pct
+from bench.bench_swr import FakeCoinGecko
+
+class FakeYahoo:
+    """Reemplazo de yf.download: OHLC diario (días hábiles) por ticker tras --yf-ms."""
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def download(self, tickers: List[str] = (), **_kw):
+        import numpy as np, pandas as pd
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        idx = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=504)
+        cols = pd.MultiIndex.from_product([list(tickers), ["Open", "High", "Low", "Close"]])
+        px = np.repeat(100.0 + np.arange(504.0)[:, None], 4 * len(tickers), axis=1)
+        return pd.DataFrame(px, index=idx, columns=cols)
+
+def run(mode: str, args, work: str) -> Dict[str, Any]:
+    from invest_mcp.lib import data_live, context, warmer
+    from invest_mcp.tools.data import UNIVERSE
+    from invest_mcp.tools.price_quote import collect_quotes
+    data_live.CACHE_DIR = os.path.join(work, mode)
+    data_live._cache_ready = False
+    data_live._mem.clear()
+    data_live._recent.clear()
+    data_live._breakers.clear()
+    data_live.HARD_TTL = args.hard_ttl
+    for k in list(data_live.SOFT_TTL):
+        data_live.SOFT_TTL[k] = args.soft_ttl
+
+    yf, cg = FakeYahoo(args.yf_ms), FakeCoinGecko(args.cg_ms, 0, "hang")
+    import requests
+    real_get, requests.get = requests.get, cg.get
+    real_dl, data_live._yf_download = data_live._yf_download, yf.download
+    w = None
+    if mode == "warmer":
+        warmer.TICK_S = args.tick_ms / 1000.0
+        warmer.RPM.update({"yfinance": args.rpm, "coingecko": args.rpm})
+        w = warmer.Warmer()
+        w.start()
+        time.sleep(args.warmup)
+    rng = random.Random(7)
+    symbols = list(UNIVERSE)
+    u0 = yf.calls + cg.calls
+    lat: List[float] = []
+    try:
+        for _ in range(args.calls):
+            syms = rng.sample(symbols, min(args.symbols, len(symbols)))
+            tok = context.activate(context.CallContext(0))
+            t1 = time.perf_counter()
+            try:
+                collect_quotes(syms, use_live=True, days=60)
+            finally:
+                context.deactivate(tok)
+            lat.append((time.perf_counter() - t1) * 1000.0)
+            time.sleep(args.gap_ms / 1000.0)
+    finally:
+        if w is not None:
+            w.stop()
+        requests.get = real_get
+        data_live._yf_download = real_dl
+    waited = sum(1 for x in lat if x > min(args.yf_ms, args.cg_ms) / 2)
+    lat.sort()
+    return {"calls": len(lat), "p50Ms": round(_pct(lat, .5), 2), "p99Ms": round(_pct(lat, .99), 2),
+            "maxMs": round(lat[-1], 2), "waited": waited, "upstreamCalls": yf.calls + cg.calls - u0}
+
+def main():
+    ap = argparse.ArgumentParser(description="Primera llamada con cache vencida: sin warmer vs con warmer")
+    ap.add_argument("--calls", type=int, default=20)
+    ap.add_argument("--gap-ms", type=float, default=2500.0, help="Pausa entre llamadas (mayor que los TTL)")
+    ap.add_argument("--symbols", type=int, default=3, help="Símbolos del UNIVERSE por llamada")
+    ap.add_argument("--soft-ttl", type=float, default=2.0)
+    ap.add_argument("--hard-ttl", type=float, default=2.2)
+    ap.add_argument("--yf-ms", type=float, default=250.0)
+    ap.add_argument("--cg-ms", type=float, default=150.0)
+    ap.add_argument("--rpm", type=float, default=300.0, help="Pedidos/min por proveedor del warmer")
+    ap.add_argument("--tick-ms", type=float, default=100.0)
+    ap.add_argument("--warmup", type=float, default=1.0, help="Segundos del warmer antes de la primera llamada")
+    ap.add_argument("--modes", default="cold,warmer")
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="invest_warmer_")
+    os.environ.update({"INVEST_MCP_OFFLINE": "0", "INVEST_MCP_CACHE_DIR": work,
+                       "MCP_LOG_FILE": os.path.join(work, "invest_server.log")})
+    results: Dict[str, Any] = {}
+    try:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            results[mode] = run(mode, args, work)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"\n{'modo':<8} {'n':>4} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'esperó':>7} {'upstream':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['calls']:>4} {r['p50Ms']:>8.2f} {r['p99Ms']:>8.2f} {r['maxMs']:>8.2f} "
+              f"{r['waited']:>7} {r['upstreamCalls']:>9}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
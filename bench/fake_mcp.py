@@ -0,0 +1,172 @@
+# bench/fake_mcp.py
+"""
+Servidor MCP de reemplazo (stdio, NDJSON) para benchmarks sin npx ni red.
+
+Imita un subconjunto de @modelcontextprotocol/server-filesystem y server-github
+con los mismos nombres de tool y forma de resultado (content[0].text), de modo
+que MCPFleet/handle_command_line se ejercitan igual que con los servidores reales.
+
+Uso:
+    python bench/fake_mcp.py fs <raíz>
+    python bench/fake_mcp.py gh [--latency-ms 20] [--payload-kb 4] [--slow-p 0.05 --slow-ms 500]
+"""
+import sys, os, json, time, random, hashlib, argparse, fnmatch
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+PROTOCOL_VERSION = "2025-06-18"
+
+def _text(obj: Any) -> Dict[str, Any]:
+    return {"content": [{"type": "text", "text": obj if isinstance(obj, str) else json.dumps(obj)}]}
+
+def _tool(name: str, props: Dict[str, str], required: List[str]) -> Dict[str, Any]:
+    return {"name": name, "description": f"fake {name}",
+            "inputSchema": {"type": "object", "properties": {k: {"type": t} for k, t in props.items()},
+                            "required": required}}
+
+# -------- filesystem --------
+class FakeFS:
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _p(self, path: str) -> str:
+        p = os.path.abspath(path if os.path.isabs(path) else os.path.join(self.root, path))
+        if not (p == self.root or p.startswith(self.root + os.sep)):
+            raise ValueError(f"Access denied - path outside allowed directories: {path}")
+        return p
+
+    def tools(self) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+        return {"read_file": self.read_file, "write_file": self.write_file, "list_directory": self.list_directory,
+                "search_files": self.search_files, "get_file_info": self.get_file_info}
+
+    def defs(self) -> List[Dict[str, Any]]:
+        return [_tool("read_file", {"path": "string"}, ["path"]),
+                _tool("write_file", {"path": "string", "content": "string"}, ["path", "content"]),
+                _tool("list_directory", {"path": "string"}, ["path"]),
+                _tool("search_files", {"path": "string", "pattern": "string"}, ["path", "pattern"]),
+                _tool("get_file_info", {"path": "string"}, ["path"])]
+
+    def read_file(self, a):
+        with open(self._p(a["path"]), encoding="utf-8") as f:
+            return _text(f.read())
+
+    def write_file(self, a):
+        with open(self._p(a["path"]), "w", encoding="utf-8") as f:
+            f.write(a["content"])
+        return _text(f"Successfully wrote to {a['path']}")
+
+    def list_directory(self, a):
+        p = self._p(a["path"])
+        lines = [f"{'[DIR]' if e.is_dir() else '[FILE]'} {e.name}" for e in sorted(os.scandir(p), key=lambda e: e.name)]
+        return _text("\n".join(lines))
+
+    def search_files(self, a):
+        base, pat = self._p(a["path"]), a["pattern"].lower()
+        hits = []
+        for d, dirs, files in os.walk(base):
+            for n in dirs + files:
+                if pat in n.lower() or fnmatch.fnmatch(n.lower(), pat):
+                    hits.append(os.path.join(d, n))
+        return _text("\n".join(hits) if hits else "No matches found")
+
+    def get_file_info(self, a):
+        st = os.stat(self._p(a["path"]))
+        return _text(f"size: {st.st_size}\nmodified: {datetime.fromtimestamp(st.st_mtime)}\n"
+                     f"isDirectory: {os.path.isdir(self._p(a['path']))}")
+
+# -------- github --------
+class FakeGH:
+    def __init__(self, latency_ms: float, payload_kb: float, slow_p: float = 0.0, slow_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.payload_kb = payload_kb
+        self.slow_p = slow_p
+        self.slow = slow_ms / 1000.0
+
+    def _wait(self):
+        if self.slow_p and random.random() < self.slow_p:
+            time.sleep(self.slow)  # cola larga: rate limit, GC, red lenta
+        elif self.latency:
+            time.sleep(self.latency * random.uniform(0.5, 1.5))
+
+    def tools(self):
+        return {"list_commits": self.list_commits, "get_file_contents": self.get_file_contents,
+                "search_repositories": self.search_repositories}
+
+    def defs(self):
+        return [_tool("list_commits", {"owner": "string", "repo": "string", "sha": "string", "per_page": "number"},
+                      ["owner", "repo"]),
+                _tool("get_file_contents", {"owner": "string", "repo": "string", "path": "string"},
+                      ["owner", "repo", "path"]),
+                _tool("search_repositories", {"query": "string", "perPage": "number"}, ["query"])]
+
+    def list_commits(self, a):
+        self._wait()
+        n = int(a.get("per_page") or 30)
+        t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        out = []
+        for i in range(n):
+            sha = hashlib.sha1(f"{a['owner']}/{a['repo']}/{i}".encode()).hexdigest()
+            out.append({"sha": sha, "html_url": f"https://github.com/{a['owner']}/{a['repo']}/commit/{sha}",
+                        "commit": {"message": f"commit {i}", "author": {"name": "dev", "email": "dev@example.com",
+                                   "date": (t0 - timedelta(hours=i)).isoformat()}}})
+        return _text(out)
+
+    def get_file_contents(self, a):
+        self._wait()
+        body = ("x" * 63 + "\n") * int(self.payload_kb * 16)
+        return _text({"type": "file", "path": a["path"], "size": len(body), "encoding": "utf-8", "content": body})
+
+    def search_repositories(self, a):
+        self._wait()
+        n = int(a.get("perPage") or 30)
+        return _text({"total_count": n, "items": [{"full_name": f"org/{a['query']}-{i}", "stargazers_count": i}
+                                                   for i in range(n)]})
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor MCP falso (fs/gh) para benchmarks")
+    ap.add_argument("kind", choices=("fs", "gh"))
+    ap.add_argument("root", nargs="?", default=".")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="Latencia simulada de la API (gh)")
+    ap.add_argument("--payload-kb", type=float, default=4.0, help="Tamaño de get_file_contents (gh)")
+    ap.add_argument("--slow-p", type=float, default=0.0, help="Probabilidad de una llamada lenta (gh)")
+    ap.add_argument("--slow-ms", type=float, default=0.0, help="Latencia de las llamadas lentas (gh)")
+    args = ap.parse_args()
+    impl = FakeFS(args.root) if args.kind == "fs" else FakeGH(args.latency_ms, args.payload_kb, args.slow_p, args.slow_ms)
+    tools, defs = impl.tools(), impl.defs()
+
+    def reply(obj):
+        sys.stdout.write(json.dumps(obj) + "\n")
+        sys.stdout.flush()
+
+    for raw in sys.stdin:
+        if not raw.strip():
+            continue
+        msg = json.loads(raw)
+        mid, method = msg.get("id"), msg.get("method")
+        if mid is None:
+            continue
+        if method == "initialize":
+            reply({"jsonrpc": "2.0", "id": mid, "result": {
+                "protocolVersion": PROTOCOL_VERSION, "capabilities": {"tools": {}},
+                "serverInfo": {"name": f"fake-{args.kind}", "version": "0.1"}}})
+        elif method == "tools/list":
+            reply({"jsonrpc": "2.0", "id": mid, "result": {"tools": defs}})
+        elif method == "tools/call":
+            p = msg.get("params") or {}
+            fn = tools.get(p.get("name"))
+            if fn is None:
+                reply({"jsonrpc": "2.0", "id": mid, "error": {"code": -32601, "message": f"Unknown tool: {p.get('name')}"}})
+                continue
+            try:
+                reply({"jsonrpc": "2.0", "id": mid, "result": fn(p.get("arguments") or {})})
+            except Exception as e:
+                reply({"jsonrpc": "2.0", "id": mid, "result": {**_text(f"Error: {e}"), "isError": True}})
+        elif method == "shutdown":
+            reply({"jsonrpc": "2.0", "id": mid, "result": {}})
+            break
+        else:
+            reply({"jsonrpc": "2.0", "id": mid, "error": {"code": -32601, "message": f"Method not found: {method}"}})
+
+if __name__ == "__main__":
+    main()
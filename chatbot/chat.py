@@ -6,13 +6,14 @@ from rich.panel import Panel
 from .llm import LLM
 from .mcp_runtime import MCPFleet
 from .config import CHAT_LOG_FILE
+from invest_mcp.lib import tracing
 
 console = Console()
 
 # ---------------- util/log ----------------
 def log_chat(role: str, content: str):
     with open(CHAT_LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps({"role": role, "content": content}, ensure_ascii=False) + "\n")
+        f.write(json.dumps({"role": role, "content": content, **tracing.ids()}, ensure_ascii=False) + "\n")
 
 def pretty(obj: Any) -> str:
     return json.dumps(obj, ensure_ascii=False, indent=2)
@@ -143,57 +144,61 @@ def main():
             user = console.input("[bold cyan]tú> [/]")
             if user.strip().lower() in ("exit", "quit"):
                 break
-
-            # 1) Ejecutar comando directo (!fs/!gh/!local/!invest)
-            cmd = parse_tool_line(user.strip())
-            if cmd:
-                kind, payload = cmd
-                tool = payload.get("tool")
-                args = payload.get("args", {})
-                try:
-                    res = _exec_with_adapter(fleet, kind, tool, args)
-                    console.print(Panel.fit(pretty(res), title=f"{kind}:{tool} ✓"))
-                    log_chat("tool", f"{kind}:{tool} -> {pretty(res)}")
-                except Exception as e:
-                    console.print(Panel.fit(str(e), title=f"{kind}:{tool} ✗"))
-                    log_chat("tool_error", f"{kind}:{tool} -> {e}")
-                continue
-
-            # 2) Conversación con LLM
-            history.append({"role": "user", "content": user})
-            log_chat("user", user)
-
-            answer = llm.chat(history, user)
-            log_chat("assistant", answer)
-            console.print(Panel(answer, title="asistente"))
-
-            # 3) Auto-ejecutar comandos sugeridos por el LLM (si los hay)
-            executed = False
-            for line in answer.splitlines():
-                cmd2 = parse_tool_line(line.strip())
-                if not cmd2:
-                    continue
-                kind, payload = cmd2
-                tool = payload.get("tool")
-                args = payload.get("args", {})
-                try:
-                    res = _exec_with_adapter(fleet, kind, tool, args)
-                    executed = True
-                    console.print(Panel.fit(pretty(res), title=f"{kind}:{tool} ✓"))
-                    log_chat("tool", f"{kind}:{tool} -> {pretty(res)}")
-                    history.append({"role": "user", "content": f"[{kind}:{tool} RESULT]\n{pretty(res)}"})
-                except Exception as e:
-                    console.print(Panel.fit(str(e), title=f"{kind}:{tool} ✗"))
-                    log_chat("tool_error", f"{kind}:{tool} -> {e}")
-
-            # 4) Si se ejecutó algo, pedir una síntesis al modelo
-            if executed:
-                synth = llm.chat(history, "Resume y continúa.")
-                log_chat("assistant", synth)
-                console.print(Panel(synth, title="asistente (síntesis)"))
-                history.append({"role": "assistant", "content": synth})
+            with tracing.span("chat.turn", **{"chat.ui": "cli"}):
+                _turn(llm, fleet, history, user)
     finally:
         fleet.stop_all()
 
+def _turn(llm: LLM, fleet: MCPFleet, history: List[Dict[str, str]], user: str):
+    """Un turno: comando directo o LLM + auto-ejecución de las líneas !cmd sugeridas."""
+    # 1) Ejecutar comando directo (!fs/!gh/!local/!invest)
+    cmd = parse_tool_line(user.strip())
+    if cmd:
+        kind, payload = cmd
+        tool = payload.get("tool")
+        args = payload.get("args", {})
+        try:
+            res = _exec_with_adapter(fleet, kind, tool, args)
+            console.print(Panel.fit(pretty(res), title=f"{kind}:{tool} ✓"))
+            log_chat("tool", f"{kind}:{tool} -> {pretty(res)}")
+        except Exception as e:
+            console.print(Panel.fit(str(e), title=f"{kind}:{tool} ✗"))
+            log_chat("tool_error", f"{kind}:{tool} -> {e}")
+        return
+
+    # 2) Conversación con LLM
+    history.append({"role": "user", "content": user})
+    log_chat("user", user)
+
+    answer = llm.chat(history, user)
+    log_chat("assistant", answer)
+    console.print(Panel(answer, title="asistente"))
+
+    # 3) Auto-ejecutar comandos sugeridos por el LLM (si los hay)
+    executed = False
+    for line in answer.splitlines():
+        cmd2 = parse_tool_line(line.strip())
+        if not cmd2:
+            continue
+        kind, payload = cmd2
+        tool = payload.get("tool")
+        args = payload.get("args", {})
+        try:
+            res = _exec_with_adapter(fleet, kind, tool, args)
+            executed = True
+            console.print(Panel.fit(pretty(res), title=f"{kind}:{tool} ✓"))
+            log_chat("tool", f"{kind}:{tool} -> {pretty(res)}")
+            history.append({"role": "user", "content": f"[{kind}:{tool} RESULT]\n{pretty(res)}"})
+        except Exception as e:
+            console.print(Panel.fit(str(e), title=f"{kind}:{tool} ✗"))
+            log_chat("tool_error", f"{kind}:{tool} -> {e}")
+
+    # 4) Si se ejecutó algo, pedir una síntesis al modelo
+    if executed:
+        synth = llm.chat(history, "Resume y continúa.")
+        log_chat("assistant", synth)
+        console.print(Panel(synth, title="asistente (síntesis)"))
+        history.append({"role": "assistant", "content": synth})
+
 if __name__ == "__main__":
     main()
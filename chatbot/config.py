@@ -18,10 +18,108 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 FS_ROOT = os.getenv("FS_ROOT", os.path.join(PROJECT_ROOT, "Filesystem"))
 
 os.makedirs(FS_ROOT, exist_ok=True)
+# Servidor de filesystem en Python (fs_mcp) en lugar de npx @modelcontextprotocol/server-filesystem
+FS_MCP_NATIVE = os.getenv("FS_MCP_NATIVE", "").lower() in ("1", "true", "yes", "on")
 LOG_DIR = os.getenv("CHAT_LOG_DIR", "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 CHAT_LOG_FILE = os.path.join(LOG_DIR, "chat_host.jsonl")
 
+# Codificación compacta del invest server (opt-in): "columnar", "b64", "orjson" separados por coma
+def _compact_opts(raw: str):
+    flags = {x.strip().lower() for x in raw.split(",") if x.strip()}
+    if not flags or flags & {"0", "off", "false"}:
+        return None
+    return {
+        "columnar": True,
+        "floats": "b64" if "b64" in flags else "json",
+        "json": "orjson" if "orjson" in flags else "json",
+    }
+
+INVEST_MCP_COMPACT = _compact_opts(os.getenv("INVEST_MCP_COMPACT", ""))
+
+# Workers invest precalentados (prefork) que recibe cada MCPFleet nuevo; 0 = desactivado.
+# Opt-in: cada worker es un proceso invest extra en segundo plano (numpy/pandas cargados).
+INVEST_MCP_WARM_POOL = int(os.getenv("INVEST_MCP_WARM_POOL", "0"))
+
+# Backend invest compartido por socket ("unix:/ruta.sock" o "tcp:127.0.0.1:8765"); vacío = stdio
+INVEST_MCP_SOCKET = os.getenv("INVEST_MCP_SOCKET", "")
+
+# Servicio invest por streamable HTTP (p. ej. http://127.0.0.1:8765/mcp); tiene prioridad sobre el socket
+INVEST_MCP_URL = os.getenv("INVEST_MCP_URL", "")
+
+# stderr de los hijos: últimas N líneas en memoria (para errores) y copia opcional a logs/mcp_<name>.stderr.log
+MCP_STDERR_TAIL = int(os.getenv("MCP_STDERR_TAIL", "200"))
+MCP_STDERR_LOG = os.getenv("MCP_STDERR_LOG", "").lower() in ("1", "true", "yes", "on")
+
+# Directorio con logs mcp_<name>.jsonl: fs/gh se sirven con host/mcp_replay.py en vez de npx (offline)
+MCP_REPLAY_DIR = os.getenv("MCP_REPLAY_DIR", "")
+
+# Backend invest dentro del host (sin subproceso): "inline", "thread[:N]" o "process[:N]"; vacío = stdio
+def _embedded_opts(raw: str):
+    mode, _, n = raw.strip().lower().partition(":")
+    if mode in ("", "0", "off", "false"):
+        return None
+    if mode in ("1", "on", "true"):
+        mode = "thread"
+    if mode not in ("inline", "thread", "process"):
+        raise RuntimeError(f"INVEST_MCP_EMBEDDED inválido: {raw!r} (inline | thread[:N] | process[:N])")
+    return mode, int(n or (4 if mode == "thread" else 2))
+
+INVEST_MCP_EMBEDDED = _embedded_opts(os.getenv("INVEST_MCP_EMBEDDED", ""))
+
+# Réplicas por servidor del MCPFleet: "invest=2,fs=1:3" (fijo o min:max con autoescalado por cola); vacío = una
+def _replica_opts(raw: str):
+    out = {}
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        key, _, n = part.partition("=")
+        lo, _, hi = n.strip().partition(":")
+        try:
+            lo_n, hi_n = int(lo), int(hi or lo)
+        except ValueError:
+            raise RuntimeError(f"MCP_REPLICAS inválido: {raw!r} (p. ej. invest=2,fs=1:3)")
+        out[key.strip().lower()] = (max(1, lo_n), max(1, lo_n, hi_n))
+    return out
+
+MCP_REPLICAS = _replica_opts(os.getenv("MCP_REPLICAS", ""))
+
+# Hedge de tools de solo lectura entre réplicas: ms fijos o "auto" (p95 de la tool); vacío = sin hedge
+def _hedge_opts(raw: str):
+    raw = raw.strip().lower()
+    if raw in ("", "0", "off", "false"):
+        return None
+    return "auto" if raw == "auto" else float(raw)
+
+MCP_HEDGE_MS = _hedge_opts(os.getenv("MCP_HEDGE_MS", ""))
+# Segundos sin uso tras los que se retira una réplica por encima del mínimo
+MCP_REPLICA_IDLE_S = float(os.getenv("MCP_REPLICA_IDLE_S", "60"))
+
+# Deadline en _meta (timeoutMs/maxTimeoutMs) de cada tools/call y notifications/cancelled al vencer
+MCP_PROPAGATE_DEADLINE = os.getenv("MCP_PROPAGATE_DEADLINE", "1").lower() in ("1", "true", "yes", "on")
+
+# Scheduler de llamadas del fleet (chatbot/scheduler.py): prioridades, cupo por servidor y shedding de batch
+MCP_SCHEDULER = os.getenv("MCP_SCHEDULER", "").lower() in ("1", "true", "yes", "on")
+
+def _limit_opts(raw: str):
+    out = {}
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        key, _, n = part.partition("=")
+        try:
+            out[key.strip().lower()] = max(1, int(n))
+        except ValueError:
+            raise RuntimeError(f"MCP_SCHED_LIMITS inválido: {raw!r} (p. ej. invest=4,gh=2)")
+    return out
+
+# Llamadas simultáneas por servidor; sin valor: réplicas/workers del backend (1 para un proceso stdio)
+MCP_SCHED_LIMITS = _limit_opts(os.getenv("MCP_SCHED_LIMITS", ""))
+# Pedidos en cola por servidor a partir de los cuales se descarta batch
+MCP_SCHED_QUEUE = int(os.getenv("MCP_SCHED_QUEUE", "32"))
+# Cupos por servidor que solo puede usar interactive
+MCP_SCHED_RESERVE = int(os.getenv("MCP_SCHED_RESERVE", "1"))
+
 REMOTE_MCP_URL = os.getenv("REMOTE_MCP_URL")
 REMOTE_MCP_PATH = os.getenv("REMOTE_MCP_PATH", "/rpc")
 
@@ -2,6 +2,7 @@ import json, time
 from typing import List, Dict, Any
 from openai import OpenAI
 from .config import OPENAI_API_KEY
+from invest_mcp.lib import tracing
 
 SYSTEM_PROMPT = """
 Eres un asistente-orquestador MCP en español.
@@ -43,7 +44,11 @@ class LLM:
 
     def chat(self, history, user_msg: str) -> str:
         messages = [{"role":"system","content":SYSTEM_PROMPT}, *history, {"role":"user","content":user_msg}]
-        resp = self.client.chat.completions.create(
-            model=self.model, messages=messages, temperature=0.2
-        )
+        with tracing.span("llm.chat", kind="client", **{"llm.model": self.model, "llm.messages": len(messages)}) as sp:
+            resp = self.client.chat.completions.create(
+                model=self.model, messages=messages, temperature=0.2
+            )
+            if sp is not None and getattr(resp, "usage", None) is not None:
+                sp.set("llm.prompt_tokens", resp.usage.prompt_tokens)
+                sp.set("llm.completion_tokens", resp.usage.completion_tokens)
         return resp.choices[0].message.content.strip()
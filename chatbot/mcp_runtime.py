@@ -1,10 +1,16 @@
 # chatbot/mcp_runtime.py
-import os, json, time, subprocess, shutil, platform, io
-from typing import Dict, Any, Optional, List
+import os, json, time, subprocess, shutil, platform, io, threading, atexit, socket, sys, itertools, queue, contextvars
+from collections import deque
+from typing import Dict, Any, Optional, List, Callable, Union
 import requests
 
+from invest_mcp.lib import codec, metrics, tracing
+from .scheduler import Scheduler, priority
 from .config import (
-    LOG_DIR, FS_ROOT, REMOTE_MCP_URL, REMOTE_MCP_PATH,
+    LOG_DIR, FS_ROOT, FS_MCP_NATIVE, REMOTE_MCP_URL, REMOTE_MCP_PATH, INVEST_MCP_COMPACT, INVEST_MCP_WARM_POOL,
+    INVEST_MCP_SOCKET, INVEST_MCP_URL, INVEST_MCP_EMBEDDED, MCP_REPLAY_DIR, MCP_STDERR_TAIL, MCP_STDERR_LOG,
+    MCP_REPLICAS, MCP_HEDGE_MS, MCP_REPLICA_IDLE_S,
+    MCP_SCHEDULER, MCP_SCHED_LIMITS, MCP_SCHED_QUEUE, MCP_SCHED_RESERVE, MCP_PROPAGATE_DEADLINE,
     MCP_WARFRAME_COMMAND, MCP_WARFRAME_ARGS,
     WFM_JWT, WFM_BASE_URL, WFM_LANGUAGE, WFM_PLATFORM,
     FITNESS_SERVER_PATH
@@ -15,6 +21,8 @@ PROTO = "2025-06-18"
 
 # ---------------- utils ----------------
 
+tracing.set_service("chat-host")
+
 def _project_root() -> str:
     return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
@@ -31,15 +39,112 @@ def _which(cmd: str) -> Optional[str]:
 def _log_jsonl(path: str, obj: Dict[str, Any]):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        f.write(json.dumps({"ts": time.time(), **obj, **tracing.ids()}, ensure_ascii=False) + "\n")
+
+def _replay_launch(name: str, launch: List[str]) -> List[str]:
+    """Con MCP_REPLAY_DIR y un log grabado para 'name', el servidor es host/mcp_replay.py serve."""
+    if not MCP_REPLAY_DIR:
+        return launch
+    log = os.path.join(MCP_REPLAY_DIR, f"mcp_{name}.jsonl")
+    if not os.path.exists(log):
+        return launch
+    return [sys.executable, os.path.join(_project_root(), "host", "mcp_replay.py"), "serve", log]
+
+class StderrPump:
+    """
+    Lee el stderr de un hijo en un hilo daemon desde que arranca. Sin lector el
+    pipe del SO (~64 KB) se llena con los logs del hijo, su write bloquea y con
+    él el request en curso. Guarda las últimas 'tail' líneas para los mensajes de
+    error y, con MCP_STDERR_LOG, las copia a logs/mcp_<name>.stderr.log.
+    """
+    LINE_MAX = 4096
+
+    def __init__(self, name: str, stream: io.TextIOBase, tail: int = MCP_STDERR_TAIL,
+                 sink: Optional[str] = None):
+        self.name = name
+        self.lines: deque = deque(maxlen=max(1, tail))
+        self.count = 0
+        self._stream = stream
+        self._sink = sink
+        self._thread = threading.Thread(target=self._run, name=f"stderr-{name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        out = None
+        try:
+            if self._sink:
+                os.makedirs(os.path.dirname(self._sink) or ".", exist_ok=True)
+                out = open(self._sink, "a", encoding="utf-8", buffering=1)
+            for line in self._stream:
+                self.lines.append(line[:self.LINE_MAX].rstrip("\n"))
+                self.count += 1
+                if out is not None:
+                    out.write(line)
+        except (OSError, ValueError):
+            pass  # pipe cerrado al terminar el hijo
+        finally:
+            if out is not None:
+                out.close()
+            metrics.inc("child_stderr_lines_total", self.count, server=self.name)
 
-def _read_all_safe(stream: Optional[io.TextIOBase]) -> str:
-    try:
-        if not stream:
+    def text(self, wait: float = 0.0) -> str:
+        """Últimas líneas; 'wait' deja que el hilo lea lo que quedó si el hijo ya salió."""
+        if wait > 0:
+            self._thread.join(wait)
+        return "\n".join(list(self.lines))
+
+class StdoutPump:
+    """
+    Lee el stdout de un hijo en un hilo daemon y entrega líneas con plazo. Un
+    readline directo bloquea hasta que el hijo escribe algo: con una tool larga
+    y muda el timeout del request no vencía nunca (ni se podía cancelar).
+    """
+    def __init__(self, name: str, stream: io.TextIOBase):
+        self.name = name
+        self._stream = stream
+        self._q: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._pending = ""
+        self._eof = False
+        self._thread = threading.Thread(target=self._run, name=f"stdout-{name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for line in self._stream:
+                self._q.put(line)
+        except (OSError, ValueError):
+            pass  # pipe cerrado al terminar el hijo
+        finally:
+            self._q.put("")
+
+    def readline(self, timeout: float) -> Optional[str]:
+        """Próxima línea; "" si el hijo cerró stdout, None si no llegó nada en 'timeout'."""
+        if self._pending:
+            line, self._pending = self._pending, ""
+            return line
+        if self._eof:
             return ""
-        return stream.read() or ""
-    except Exception:
-        return ""
+        try:
+            line = self._q.get(timeout=max(0.0, timeout))
+        except queue.Empty:
+            return None
+        self._eof = line == ""
+        return line
+
+    def read(self, n: int, timeout: float) -> Optional[str]:
+        """Exactamente 'n' caracteres (cuerpo LSP); lo que sobra queda para el próximo readline."""
+        deadline = time.time() + timeout
+        buf = ""
+        while len(buf) < n:
+            line = self.readline(deadline - time.time())
+            if not line:
+                return None
+            buf += line
+        buf, self._pending = buf[:n], buf[n:]
+        return buf
+
+def _stderr_sink(name: str) -> Optional[str]:
+    return os.path.join(LOG_DIR, f"mcp_{name}.stderr.log") if MCP_STDERR_LOG else None
 
 def _find_local_wfm_entry() -> Optional[str]:
     """
@@ -61,26 +166,71 @@ def _find_local_wfm_entry() -> Optional[str]:
             return p
     return None
 
+# ---------------- Progreso ----------------
+
+PROGRESS_MAX_TIMEOUT = 600.0  # tope duro de una llamada que sigue reportando progreso
+_token_seq = itertools.count(1)
+
+def _progress_token(name: str) -> str:
+    return f"{name}-{os.getpid()}-{next(_token_seq)}"
+
+def _progress_router(on_notification: Optional[Callable[[Dict[str, Any]], None]],
+                     on_progress: Optional[Callable[[Dict[str, Any]], None]],
+                     compact: Optional[Dict[str, Any]] = None) -> Optional[Callable[[Dict[str, Any]], None]]:
+    """Separa notifications/progress hacia on_progress; el resto va a on_notification."""
+    if on_progress is None:
+        return on_notification
+    def _route(msg: Dict[str, Any]):
+        if msg.get("method") == "notifications/progress":
+            params = msg.get("params") or {}
+            on_progress(codec.decode(params) if compact else params)
+        elif on_notification:
+            on_notification(msg)
+    return _route
+
 # ---------------- MCP stdio (autodetección de framing) ----------------
 
+STOP_GRACE_S = 0.5  # espera de salida ordenada en stop() antes de terminate
+ABANDON_POLL_S = 0.05  # con 'abandon' (copia de un hedge) la espera mira el evento cada tanto
+
 class MCPServer:
     """
     Soporta ambos formatos por stdio:
       - LSP headers: 'Content-Length: N' + body JSON
       - NDJSON:      una línea JSON por mensaje
     """
-    def __init__(self, name: str, launch: List[str], env: Optional[Dict[str,str]] = None):
+    def __init__(self, name: str, launch: List[str], env: Optional[Dict[str,str]] = None,
+                 compact: Optional[Dict[str, Any]] = None, pool: Optional["WarmPool"] = None,
+                 progress: bool = False):
         self.name = name
         self.launch = launch
         self.env = {**os.environ, **(env or {})}
         self.proc: Optional[subprocess.Popen] = None
+        self.stderr_pump: Optional[StderrPump] = None
+        self.stdout_pump: Optional[StdoutPump] = None
         self.seq = 0
         self.log_file = os.path.join(LOG_DIR, f"mcp_{name}.jsonl")
+        # Codificación compacta pedida (invest/compact) y la aceptada por el servidor
+        self.compact_request = compact
+        self.compact: Optional[Dict[str, Any]] = None
+        # Pool prefork opcional: si hay un worker caliente, se adopta en lugar de lanzar
+        self.pool = pool
+        # El servidor emite notifications/progress (invest): tools_call pide progressToken
+        self.progress = progress
+        # Evento del ReplicaPool para la copia perdedora de un hedge: el servidor no
+        # responde a un request cancelado, así que se deja de esperar acá
+        self.abandon: Optional[threading.Event] = None
 
     def start(self):
         if self.proc and self.proc.poll() is None:
             return
 
+        if self.pool is not None:
+            warm = self.pool.acquire()
+            if warm is not None:
+                self._adopt(warm)
+                return
+
         exe = _which(self.launch[0])
         use_shell = False
         popen_cmd = None
@@ -99,14 +249,56 @@ class MCPServer:
             stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
             text=True, bufsize=1, env=self.env, shell=use_shell
         )
+        self.stderr_pump = StderrPump(self.name, self.proc.stderr, sink=_stderr_sink(self.name))
+        self.stdout_pump = StdoutPump(self.name, self.proc.stdout)
 
         time.sleep(0.05)
         if self.proc.poll() is not None:
-            stderr_text = _read_all_safe(self.proc.stderr)
+            stderr_text = self._stderr_text()
             raise RuntimeError(f"[{self.name}] failed to start (exit={self.proc.returncode}). Stderr:\n{stderr_text}")
 
         self._initialize()
 
+    def clone(self) -> "MCPServer":
+        """Otro cliente igual, sin arrancar (réplicas de ReplicaPool)."""
+        return MCPServer(self.name, self.launch, env=self.env, compact=self.compact_request, pool=self.pool,
+                         progress=self.progress)
+
+    def _adopt(self, other: "MCPServer"):
+        """Toma el proceso ya inicializado de otro MCPServer (handshake incluido)."""
+        self.proc, other.proc = other.proc, None
+        self.stderr_pump, other.stderr_pump = other.stderr_pump, None
+        self.stdout_pump, other.stdout_pump = other.stdout_pump, None
+        self.seq = other.seq
+        self.compact = other.compact
+        _log_jsonl(self.log_file, {"dir": "meta", "event": "adopt", "pid": self.proc.pid})
+
+    def _stderr_text(self) -> str:
+        if self.stderr_pump is None:
+            return ""
+        dead = self.proc is not None and self.proc.poll() is not None
+        return self.stderr_pump.text(wait=0.2 if dead else 0.0)
+
+    def stop(self):
+        """
+        shutdown + EOF en stdin y una espera corta para que el hijo salga solo
+        (vacía sus trazas/logs); si no, terminate.
+        """
+        if not (self.proc and self.proc.poll() is None):
+            return
+        try:
+            self.seq += 1
+            self._send({"jsonrpc": JSONRPC, "id": self.seq, "method": "shutdown"})
+            self.proc.stdin.close()
+            self.proc.wait(timeout=STOP_GRACE_S)
+            return
+        except Exception:
+            pass
+        try:
+            self.proc.terminate()
+        except Exception:
+            pass
+
     # ----- I/O helpers -----
 
     def _send(self, obj: Dict[str, Any]):
@@ -118,7 +310,7 @@ class MCPServer:
             self.proc.stdin.flush()
             _log_jsonl(self.log_file, {"dir":"out","obj":obj})
         except OSError as e:
-            stderr_text = _read_all_safe(self.proc.stderr)
+            stderr_text = self._stderr_text()
             raise RuntimeError(f"[{self.name}] write to stdin failed: {e}\nChild stderr:\n{stderr_text}") from e
 
     def _recv(self, timeout: float = 20.0) -> Optional[Dict[str, Any]]:
@@ -126,8 +318,9 @@ class MCPServer:
         Lee una respuesta. Si el server habla LSP, detecta 'Content-Length:' y
         luego consume 'N' caracteres de body. Si habla NDJSON, intenta json por línea.
         """
-        if not (self.proc and self.proc.stdout):
+        if not (self.proc and self.stdout_pump):
             return None
+        out = self.stdout_pump
 
         t0 = time.time()
         header_lines: List[str] = []
@@ -135,12 +328,9 @@ class MCPServer:
         saw_headers = False
 
         while time.time() - t0 < timeout:
-            line = self.proc.stdout.readline()
+            line = out.readline(t0 + timeout - time.time())
             if not line:
-                if self.proc.poll() is not None:
-                    break
-                time.sleep(0.01)
-                continue
+                break  # plazo vencido o EOF
 
             s = line.rstrip("\r\n")
             if not s and not header_lines:
@@ -149,17 +339,15 @@ class MCPServer:
             # 1) JSON por línea
             if s and s[0] in "{[":
                 try:
-                    msg = json.loads(s)
+                    msg = codec.loads(s)
                     _log_jsonl(self.log_file, {"dir":"in","obj":msg})
                     return msg
                 except json.JSONDecodeError:
                     body = s
                     while time.time() - t0 < timeout:
-                        more = self.proc.stdout.readline()
+                        more = out.readline(t0 + timeout - time.time())
                         if not more:
-                            if self.proc.poll() is not None:
-                                break
-                            time.sleep(0.01); continue
+                            break
                         body += more
                         try:
                             msg = json.loads(body)
@@ -181,11 +369,9 @@ class MCPServer:
 
                 # consume headers hasta línea en blanco
                 while time.time() - t0 < timeout:
-                    h = self.proc.stdout.readline()
+                    h = out.readline(t0 + timeout - time.time())
                     if not h:
-                        if self.proc.poll() is not None:
-                            break
-                        time.sleep(0.01); continue
+                        break
                     hs = h.rstrip("\r\n")
                     if hs == "":
                         break
@@ -195,14 +381,8 @@ class MCPServer:
                     return None
 
                 # leer body exacto
-                body = ""
-                while len(body) < content_length and (time.time() - t0) < timeout:
-                    chunk = self.proc.stdout.read(content_length - len(body))
-                    if not chunk:
-                        time.sleep(0.005); continue
-                    body += chunk
-
-                if len(body) != content_length:
+                body = out.read(content_length, t0 + timeout - time.time())
+                if body is None:
                     return None
 
                 try:
@@ -223,41 +403,146 @@ class MCPServer:
 
     def _initialize(self):
         self.seq += 1
+        caps: Dict[str, Any] = {}
+        if self.compact_request:
+            caps["experimental"] = {codec.CAPABILITY: self.compact_request}
         self._send({
             "jsonrpc": JSONRPC,
             "id": self.seq,
             "method": "initialize",
             "params": {
                 "protocolVersion": PROTO,
-                "capabilities": {},
+                "capabilities": caps,
                 "clientInfo": {"name": "ChatHost", "version": "0.1"}
             }
         })
         rsp = self._recv()
         if not rsp or "result" not in rsp:
-            stderr_text = _read_all_safe(self.proc.stderr)
+            stderr_text = self._stderr_text()
             raise RuntimeError(f"[{self.name}] initialize failed. Child stderr:\n{stderr_text}")
+        server_caps = (rsp["result"].get("capabilities") or {}).get("experimental") or {}
+        self.compact = server_caps.get(codec.CAPABILITY) if self.compact_request else None
         try:
             self._send({"jsonrpc": JSONRPC, "method": "notifications/initialized"})
         except RuntimeError:
             raise
 
-    def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 12.0) -> Dict[str, Any]:
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 12.0,
+                on_notification: Optional[Callable[[Dict[str, Any]], None]] = None,
+                max_timeout: float = PROGRESS_MAX_TIMEOUT) -> Dict[str, Any]:
+        """
+        Envía un request y espera la respuesta con el mismo id. Las notificaciones
+        del servidor que lleguen antes (chunks, progreso) se pasan a on_notification.
+        Si params._meta.progressToken está presente, cada notifications/progress con
+        ese token reinicia el plazo ('timeout' pasa a ser de inactividad), con tope
+        duro 'max_timeout' desde el envío. En tools/call los dos plazos viajan en
+        _meta (timeoutMs, maxTimeoutMs) para que el servidor corte la tool cuando
+        aquí ya no se espera, y al vencer se envía notifications/cancelled.
+        """
+        tool = (params or {}).get("name") if method == "tools/call" else None
+        with tracing.span(f"mcp {method}", kind="client", **{"mcp.server": self.name, "rpc.method": method,
+                                                            "mcp.tool": tool}) as sp, \
+                metrics.timer("client_request_ms", server=self.name, method=method) as m:
+            if sp is not None:
+                params = {**(params or {}), "_meta": tracing.inject((params or {}).get("_meta"))}
+            if method == "tools/call" and MCP_PROPAGATE_DEADLINE:
+                params = {**(params or {}), "_meta": {**((params or {}).get("_meta") or {}),
+                                                      "timeoutMs": int(timeout * 1000),
+                                                      "maxTimeoutMs": int(max(timeout, max_timeout) * 1000)}}
+            m["status"] = "error"
+            res = self._request(method, params, timeout, on_notification, max_timeout)
+            m["status"] = "ok"
+        return res
+
+    def _request(self, method: str, params: Optional[Dict[str, Any]], timeout: float,
+                 on_notification: Optional[Callable[[Dict[str, Any]], None]],
+                 max_timeout: float) -> Dict[str, Any]:
         self.seq += 1
-        self._send({"jsonrpc": JSONRPC, "id": self.seq, "method": method, "params": (params or {})})
-        rsp = self._recv(timeout=timeout)
-        if not rsp:
-            stderr_text = _read_all_safe(self.proc.stderr)
-            raise RuntimeError(f"[{self.name}] timeout waiting response for {method}. Child stderr:\n{stderr_text}")
-        if "result" in rsp:
-            return rsp["result"]
-        if "error" in rsp:
-            raise RuntimeError(f"[{self.name}] {json.dumps(rsp['error'], ensure_ascii=False)}")
-        raise RuntimeError(f"[{self.name}] unexpected {rsp}")
-    
+        rid = self.seq
+        token = ((params or {}).get("_meta") or {}).get("progressToken")
+        self._send({"jsonrpc": JSONRPC, "id": rid, "method": method, "params": (params or {})})
+        t_sent = time.time()
+        deadline = t_sent + timeout
+        while True:
+            remaining = deadline - time.time()
+            abandon = self.abandon
+            wait = min(remaining, ABANDON_POLL_S) if abandon is not None else remaining
+            rsp = self._recv(timeout=wait) if remaining > 0 else None
+            if not rsp and abandon is not None and time.time() < deadline and not self._closed():
+                if abandon.is_set():
+                    raise RuntimeError(f"[{self.name}] {method} abandonado (otra réplica respondió antes)")
+                continue
+            if not rsp:
+                self._cancel(rid, "timeout")
+                stderr_text = self._stderr_text()
+                raise RuntimeError(f"[{self.name}] timeout waiting response for {method}. Child stderr:\n{stderr_text}")
+            if "method" in rsp and "id" not in rsp:
+                if (token is not None and rsp.get("method") == "notifications/progress"
+                        and (rsp.get("params") or {}).get("progressToken") == token):
+                    deadline = min(time.time() + timeout, t_sent + max(timeout, max_timeout))
+                if on_notification:
+                    on_notification(rsp)
+                continue
+            if rsp.get("id") != rid:
+                continue  # respuesta tardía de un request anterior
+            if "result" in rsp:
+                return rsp["result"]
+            if "error" in rsp:
+                raise RuntimeError(f"[{self.name}] {json.dumps(rsp['error'], ensure_ascii=False)}")
+            raise RuntimeError(f"[{self.name}] unexpected {rsp}")
 
-    def tools_call(self, tool: str, args: Dict[str, Any], timeout: float = 15.0) -> Dict[str, Any]:
-        return self.request("tools/call", {"name": tool, "arguments": args}, timeout=timeout)
+    def _closed(self) -> bool:
+        """El hijo cerró stdout o salió: un _recv vacío no es un plazo cortado."""
+        return (self.proc is not None and self.proc.poll() is not None) or \
+            (self.stdout_pump is not None and self.stdout_pump._eof)
+
+    def _cancel(self, rid: Any, reason: str) -> None:
+        """notifications/cancelled para un request que aquí ya no se espera (mejor esfuerzo)."""
+        if not MCP_PROPAGATE_DEADLINE:
+            return
+        metrics.inc("client_cancelled_total", server=self.name, reason=reason)
+        try:
+            self._send({"jsonrpc": JSONRPC, "method": "notifications/cancelled",
+                        "params": {"requestId": rid, "reason": reason}})
+        except RuntimeError:
+            pass  # el hijo murió: no hay nada que cancelar
+
+    def tools_call(self, tool: str, args: Dict[str, Any], timeout: float = 15.0,
+                   meta: Optional[Dict[str, Any]] = None,
+                   on_notification: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Pide progreso (_meta.progressToken) si el servidor lo emite (progress=True) o
+        si se pasa on_progress: mientras el servidor reporte avance no se corta por
+        'timeout'. on_progress recibe los params de cada aviso.
+        """
+        params: Dict[str, Any] = {"name": tool, "arguments": args}
+        if self.progress or on_progress is not None:
+            meta = {"progressToken": _progress_token(self.name), **(meta or {})}
+        if meta:
+            params["_meta"] = meta
+        res = self.request("tools/call", params, timeout=timeout,
+                           on_notification=_progress_router(on_notification, on_progress, self.compact))
+        if self.compact and isinstance(res, dict) and (res.get("_meta") or {}).get(codec.CAPABILITY):
+            res["structuredContent"] = codec.decode(res.get("structuredContent"))
+        return res
+
+    def metrics(self, fmt: str = "json", timeout: float = 5.0) -> Dict[str, Any]:
+        """Snapshot de server/metrics del hijo (solo servidores Python de este repo)."""
+        return self.request("server/metrics", {"format": fmt}, timeout=timeout)
+
+    def tools_call_stream(self, tool: str, args: Dict[str, Any],
+                          on_chunk: Callable[[Dict[str, Any]], None], timeout: float = 120.0) -> Dict[str, Any]:
+        """
+        Pide al servidor emitir resultados parciales (notifications/invest/chunk) y
+        los entrega a on_chunk a medida que llegan; retorna el resultado final (resumen).
+        """
+        def _on_notification(msg: Dict[str, Any]):
+            if msg.get("method") == "notifications/invest/chunk":
+                params = msg.get("params") or {}
+                on_chunk(codec.decode(params) if self.compact else params)
+        return self.tools_call(tool, args, timeout=timeout, meta={"streamChunks": True},
+                               on_notification=_on_notification)
 
     def list_tools(self, timeout: float = 8.0) -> List[Dict[str, Any]]:
         self.seq += 1
@@ -269,7 +554,7 @@ class MCPServer:
         })
         rsp = self._recv(timeout=timeout)
         if not rsp:
-            stderr_text = _read_all_safe(self.proc.stderr)
+            stderr_text = self._stderr_text()
             raise RuntimeError(f"[{self.name}] timeout waiting response (tools/list). Child stderr:\n{stderr_text}")
         if "result" in rsp:
             res = rsp["result"]
@@ -282,24 +567,781 @@ class MCPServer:
             raise RuntimeError(f"[{self.name}] {json.dumps(rsp['error'], ensure_ascii=False)}")
         return []
 
+# ---------------- Socket (backend invest compartido) ----------------
+
+class MCPSocketServer(MCPServer):
+    """
+    Cliente NDJSON sobre Unix socket o TCP (invest_mcp.transport_socket): varias
+    sesiones de UI comparten un único invest server con caché en memoria.
+    Con autostart, si nadie escucha se lanza el daemon desacoplado de este proceso.
+    """
+    def __init__(self, name: str, address: str, compact: Optional[Dict[str, Any]] = None,
+                 autostart: bool = True, connect_timeout: float = 15.0):
+        super().__init__(name, [sys.executable, "-m", "invest_mcp.main", "--listen", address], compact=compact)
+        self.address = address
+        self.autostart = autostart
+        self.connect_timeout = connect_timeout
+        self.sock: Optional[socket.socket] = None
+        self._buf = b""
+        self._eof = False
+
+    def clone(self) -> "MCPSocketServer":
+        return MCPSocketServer(self.name, self.address, compact=self.compact_request,
+                               autostart=self.autostart, connect_timeout=self.connect_timeout)
+
+    def _open(self) -> socket.socket:
+        from invest_mcp.transport_socket import parse_address
+        kind, target = parse_address(self.address)
+        sock = socket.socket(socket.AF_INET if kind == "tcp" else socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(target)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def start(self):
+        if self.sock is not None:
+            return
+        try:
+            self.sock = self._open()
+        except OSError:
+            if not self.autostart:
+                raise RuntimeError(f"[{self.name}] no hay invest server escuchando en {self.address}")
+            subprocess.Popen(self.launch, cwd=_project_root(), env=self.env, start_new_session=True,
+                             stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            _log_jsonl(self.log_file, {"dir": "meta", "event": "daemon_spawn", "address": self.address})
+            deadline = time.time() + self.connect_timeout
+            while self.sock is None:
+                try:
+                    self.sock = self._open()
+                except OSError:
+                    if time.time() > deadline:
+                        raise RuntimeError(f"[{self.name}] el daemon no abrió {self.address}")
+                    time.sleep(0.05)
+        self._buf = b""
+        self._eof = False
+        self._initialize()
+
+    def stop(self):
+        if self.sock is None:
+            return
+        try:
+            self.seq += 1
+            self._send({"jsonrpc": JSONRPC, "id": self.seq, "method": "shutdown"})  # cierra solo esta sesión
+        except Exception:
+            pass
+        try:
+            self.sock.close()
+        finally:
+            self.sock = None
+
+    def _stderr_text(self) -> str:
+        return ""
+
+    def _closed(self) -> bool:
+        return self.sock is None or self._eof
+
+    def _send(self, obj: Dict[str, Any]):
+        if self.sock is None:
+            raise RuntimeError(f"[{self.name}] socket not connected")
+        try:
+            self.sock.sendall((json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8"))
+            _log_jsonl(self.log_file, {"dir":"out","obj":obj})
+        except OSError as e:
+            raise RuntimeError(f"[{self.name}] write to socket failed: {e}") from e
+
+    def _recv(self, timeout: float = 20.0) -> Optional[Dict[str, Any]]:
+        if self.sock is None:
+            return None
+        deadline = time.time() + timeout
+        while b"\n" not in self._buf:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            self.sock.settimeout(remaining)
+            try:
+                chunk = self.sock.recv(1 << 16)
+            except socket.timeout:
+                return None
+            if not chunk:
+                self._eof = True
+                return None  # el servidor cerró la conexión
+            self._buf += chunk
+        line, _, self._buf = self._buf.partition(b"\n")
+        msg = codec.loads(line.decode("utf-8"))
+        _log_jsonl(self.log_file, {"dir":"in","obj":msg})
+        return msg
+
+# ---------------- En proceso (embebido) ----------------
+
+class MCPEmbeddedServer(MCPServer):
+    """
+    Backend invest dentro del host (INVEST_MCP_EMBEDDED). Misma interfaz que
+    MCPServer, pero cada request va directo a protocol.handle_request vía
+    invest_mcp.transport_inproc: sin subproceso, sin JSON de ida y vuelta y con
+    las caches del servidor compartidas con el host.
+      inline       en el hilo del llamador (sin timeout)
+      thread[:N]   pool de N hilos; respeta timeout y extensión por progreso
+      process[:N]  pool de N procesos (spawn) para tools CPU-bound: evita el GIL,
+                   pero el progreso llega al final y cada worker tiene su cache
+    El tráfico no se registra en logs/mcp_<name>.jsonl (sería volver a serializar).
+    """
+    def __init__(self, name: str, mode: str = "thread", workers: int = 4):
+        super().__init__(name, [])
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        # inline/thread escriben en el mismo registro de métricas que el host
+        self.shares_registry = mode != "process"
+        self._ids = itertools.count(1)
+        self._call: Optional[Callable[..., Any]] = None
+        self._pool = None
+
+    def start(self):
+        if self._call is not None:
+            return
+        from invest_mcp import transport_inproc
+        if self.mode == "thread":
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix=f"embedded-{self.name}")
+        elif self.mode == "process":
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn: los workers no heredan hilos ni locks del host (pools, exportador de trazas)
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=transport_inproc.worker_init)
+            for f in [self._pool.submit(transport_inproc.call, {"jsonrpc": JSONRPC, "id": 0, "method": "ping"})
+                      for _ in range(self.workers)]:
+                f.result(timeout=60)  # arranque de los workers fuera del primer request
+        self._call = transport_inproc.call
+
+    def stop(self):
+        self._call = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=self.mode == "process", cancel_futures=True)
+            self._pool = None
+
+    def _stderr_text(self) -> str:
+        return ""
+
+    def _cancel(self, rid: Any, reason: str) -> None:
+        """En thread/inline la tool ve la cancelación en su próximo check(); en process solo rige el deadline."""
+        if not MCP_PROPAGATE_DEADLINE or self.mode == "process":
+            return
+        from invest_mcp import transport_inproc
+        metrics.inc("client_cancelled_total", server=self.name, reason=reason)
+        transport_inproc.cancel(id(self), rid, reason)
+
+    def _request(self, method: str, params: Optional[Dict[str, Any]], timeout: float,
+                 on_notification: Optional[Callable[[Dict[str, Any]], None]],
+                 max_timeout: float) -> Dict[str, Any]:
+        call = self._call
+        if call is None:
+            raise RuntimeError(f"[{self.name}] embedded backend not started")
+        req = {"jsonrpc": JSONRPC, "id": next(self._ids), "method": method, "params": (params or {})}
+        token = ((params or {}).get("_meta") or {}).get("progressToken")
+        last = [time.time()]
+
+        def _notify(msg: Dict[str, Any]):
+            if (token is not None and msg.get("method") == "notifications/progress"
+                    and (msg.get("params") or {}).get("progressToken") == token):
+                last[0] = time.time()
+            if on_notification:
+                on_notification(msg)
+
+        if self._pool is None:
+            rsp, _ = call(req, _notify, id(self))
+        else:
+            from concurrent.futures import TimeoutError as FutureTimeout
+            t_sent = last[0]
+            fut = self._pool.submit(call, req) if self.mode == "process" else self._pool.submit(call, req, _notify, id(self))
+            while True:
+                deadline = min(last[0] + timeout, t_sent + max(timeout, max_timeout))
+                try:
+                    rsp, pending = fut.result(timeout=max(0.0, deadline - time.time()))
+                    break
+                except FutureTimeout:
+                    if time.time() >= min(last[0] + timeout, t_sent + max(timeout, max_timeout)):
+                        fut.cancel()  # si aún no empezó; si ya corre, la corta _cancel en su próximo check()
+                        self._cancel(req["id"], "timeout")
+                        raise RuntimeError(f"[{self.name}] timeout waiting response for {method} (embedded)")
+            for msg in pending:  # workers de proceso: notificaciones acumuladas
+                _notify(msg)
+        if rsp is None:
+            raise RuntimeError(f"[{self.name}] no response for {method}")
+        if "result" in rsp:
+            return rsp["result"]
+        if "error" in rsp:
+            raise RuntimeError(f"[{self.name}] {json.dumps(rsp['error'], ensure_ascii=False)}")
+        raise RuntimeError(f"[{self.name}] unexpected {rsp}")
+
+    def list_tools(self, timeout: float = 8.0) -> List[Dict[str, Any]]:
+        return (self.request("tools/list", {}, timeout=timeout) or {}).get("tools") or []
+
+# ---------------- Prefork (workers calientes) ----------------
+
+class WarmPool:
+    """
+    Supervisor prefork: mantiene 'size' procesos MCP ya lanzados, con el handshake
+    hecho y los imports pesados precargados (INVEST_MCP_PRELOAD=1). acquire() entrega
+    uno al instante y un hilo de fondo repone el pool.
+    """
+    def __init__(self, name: str, launch: List[str], size: int = 1,
+                 env: Optional[Dict[str, str]] = None, compact: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.launch = launch
+        self.size = max(1, int(size))
+        self.env = {**(env or {}), "INVEST_MCP_PRELOAD": "1"}
+        self.compact = compact
+        self.stats = {"spawned": 0, "handed": 0, "misses": 0, "discarded": 0, "errors": 0}
+        self._ready: deque = deque()
+        self._cv = threading.Condition()
+        self._spawning = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "WarmPool":
+        with self._cv:
+            if self._thread is None:
+                self._spawning = True  # el primer acquire espera a este worker en vez de lanzar otro
+                self._thread = threading.Thread(target=self._refill_loop, name=f"warm-{self.name}", daemon=True)
+                self._thread.start()
+        return self
+
+    def _refill_loop(self):
+        while True:
+            with self._cv:
+                while not self._closed and len(self._ready) >= self.size:
+                    self._cv.wait()
+                if self._closed:
+                    return
+                self._spawning = True
+            srv = MCPServer(self.name, self.launch, env=self.env, compact=self.compact)
+            try:
+                srv.start()
+            except Exception as e:
+                with self._cv:
+                    self._spawning = False
+                    self.stats["errors"] += 1
+                    self._cv.notify_all()
+                _log_jsonl(srv.log_file, {"dir": "meta", "event": "warm_spawn_failed", "error": str(e)})
+                time.sleep(2.0)
+                continue
+            with self._cv:
+                self._spawning = False
+                if self._closed:
+                    srv.stop()
+                    return
+                self._ready.append(srv)
+                self.stats["spawned"] += 1
+                self._cv.notify_all()
+
+    def acquire(self, timeout: float = 15.0) -> Optional[MCPServer]:
+        """
+        Entrega un worker vivo. Si no hay ninguno listo pero hay uno arrancando, lo
+        espera (hasta 'timeout'); si no, retorna None y el llamador arranca en frío.
+        """
+        deadline = time.time() + timeout
+        with self._cv:
+            while True:
+                while self._ready:
+                    srv = self._ready.popleft()
+                    self._cv.notify_all()  # despierta al hilo de reposición
+                    if srv.proc and srv.proc.poll() is None:
+                        self.stats["handed"] += 1
+                        return srv
+                    self.stats["discarded"] += 1
+                remaining = deadline - time.time()
+                if self._closed or not self._spawning or remaining <= 0:
+                    self.stats["misses"] += 1
+                    return None
+                self._cv.wait(remaining)
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            idle = list(self._ready)
+            self._ready.clear()
+            self._cv.notify_all()
+        for srv in idle:
+            srv.stop()
+
+_WARM_POOLS: Dict[str, WarmPool] = {}
+_WARM_LOCK = threading.Lock()
+
+def warm_pool(name: str, launch: List[str], size: int, compact: Optional[Dict[str, Any]] = None) -> Optional[WarmPool]:
+    """
+    Pool compartido por proceso (sobrevive a recrear el MCPFleet, p. ej. en Streamlit).
+    size <= 0 lo desactiva.
+    """
+    if size <= 0:
+        return None
+    with _WARM_LOCK:
+        pool = _WARM_POOLS.get(name)
+        if pool is None:
+            pool = _WARM_POOLS[name] = WarmPool(name, launch, size=size, compact=compact).start()
+        return pool
+
+@atexit.register
+def _close_warm_pools():
+    for pool in list(_WARM_POOLS.values()):
+        pool.close()
+
+# ---------------- Réplicas (MCP_REPLICAS) ----------------
+
+# Tools sin efectos laterales: se pueden repetir en otra réplica (hedge) sin riesgo
+_READ_ONLY_TOOLS = {
+    "filesystem": {"read_file", "read_text_file", "read_media_file", "read_multiple_files", "list_directory",
+                   "list_directory_with_sizes", "directory_tree", "search_files", "get_file_info",
+                   "list_allowed_directories"},
+}
+
+# invest: solo lecturas baratas. backtest/bulk/build son CPU pesada (duplicarlas
+# quita CPU a la otra copia) y cache_warmer con runNow dispara pedidos al proveedor.
+_INVEST_HEDGE_TOOLS = {"price_quote", "risk_metrics", "price_history", "cache_stats"}
+
+def read_only_tool(server: str, tool: str) -> bool:
+    if server == "invest":
+        return tool in _INVEST_HEDGE_TOOLS
+    if server == "github":
+        return tool.startswith(("get_", "list_", "search_"))
+    return tool in _READ_ONLY_TOOLS.get(server, ())
+
+def _alive(srv: MCPServer) -> bool:
+    if isinstance(srv, MCPSocketServer):
+        return srv.sock is not None
+    return srv.proc is not None and srv.proc.poll() is None
+
+class _Replica:
+    def __init__(self, idx: int, srv: MCPServer):
+        self.idx = idx
+        self.srv = srv
+        self.busy = False
+        self.calls = 0
+        self.errors = 0
+        self.ewma_ms = 0.0
+        self.lat: deque = deque(maxlen=256)
+        self.idle_since = time.monotonic()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.abandoned = False  # copia perdedora de un hedge, cancelada: no cuenta en stats
+
+class ReplicaPool:
+    """
+    Varias réplicas de un servidor MCP con la interfaz de MCPServer. Cada llamada
+    toma una réplica libre (a igualdad, la de menor latencia EWMA); si están todas
+    ocupadas espera en cola hasta 'timeout'. Un hilo de fondo agrega réplicas
+    mientras haya cola (hasta max_n), retira las que llevan idle_s sin uso (hasta
+    min_n) y reemplaza las que murieron. Con hedge_ms, una tool de solo lectura
+    que supera ese umbral (o el p95 de la tool con "auto") se repite en otra
+    réplica libre y gana la primera respuesta correcta.
+    """
+    EWMA_ALPHA = 0.2
+    TICK_S = 0.5
+    HEDGE_MIN_SAMPLES = 20
+
+    def __init__(self, proto: MCPServer, min_n: int = 1, max_n: int = 1,
+                 hedge_ms: Optional[Union[float, str]] = None, idle_s: float = 60.0):
+        self.name = proto.name
+        self.proto = proto
+        self.min_n = max(1, int(min_n))
+        self.max_n = max(self.min_n, int(max_n))
+        if hedge_ms is not None and self.max_n >= 2:
+            self.min_n = max(self.min_n, 2)  # el hedge necesita otra réplica ya caliente
+        self.hedge_ms = hedge_ms
+        self.idle_s = idle_s
+        self.log_file = proto.log_file
+        self.counts = {"queued": 0, "scaleUps": 0, "scaleDowns": 0, "replaced": 0, "hedges": 0, "hedgeWins": 0}
+        self._replicas: List[_Replica] = []
+        self._tool_lat: Dict[str, deque] = {}
+        self._cv = threading.Condition()
+        self._wake = threading.Event()
+        self._queue: deque = deque()  # tickets de los llamadores en espera, en orden de llegada
+        self._starting = 0
+        self._ids = itertools.count()
+        self._closed = True
+        self._thread: Optional[threading.Thread] = None
+        self._executor = None
+
+    @property
+    def compact(self) -> Optional[Dict[str, Any]]:
+        return self.proto.compact
+
+    # ----- ciclo de vida -----
+
+    def start(self):
+        with self._cv:
+            if not self._closed:
+                return
+            self._closed = False
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(2 * self.max_n, thread_name_prefix=f"replica-{self.name}")
+        first = [self.proto] + [self.proto.clone() for _ in range(self.min_n - 1)]
+        try:
+            for srv in first:
+                srv.start()
+                self._add(srv)
+        except Exception:
+            self.stop()
+            raise
+        self._thread = threading.Thread(target=self._scale_loop, name=f"replicas-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cv:
+            self._closed = True
+            replicas, self._replicas = self._replicas, []
+            self._cv.notify_all()
+        self._wake.set()
+        for r in replicas:
+            r.srv.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        metrics.gauge_set("mcp_replicas", 0, server=self.name)
+
+    def _add(self, srv: MCPServer):
+        with self._cv:
+            if self._closed:
+                srv.stop()
+                return
+            self._replicas.append(_Replica(next(self._ids), srv))
+            metrics.gauge_set("mcp_replicas", len(self._replicas), server=self.name)
+            self._cv.notify_all()
+        _log_jsonl(self.log_file, {"dir": "meta", "event": "replica_up", "replicas": len(self._replicas)})
+
+    def _scale_loop(self):
+        while True:
+            self._wake.wait(self.TICK_S)
+            self._wake.clear()
+            now = time.monotonic()
+            with self._cv:
+                if self._closed:
+                    return
+                dead = [r for r in self._replicas if not r.busy and not _alive(r.srv)]
+                retire: Optional[_Replica] = None
+                n = len(self._replicas) - len(dead) + self._starting
+                grow = n < self.min_n or (bool(self._queue) and n < self.max_n)
+                if not grow and not self._queue and n > self.min_n:
+                    idle = [r for r in self._replicas
+                            if not r.busy and r not in dead and now - r.idle_since > self.idle_s]
+                    if idle:
+                        retire = max(idle, key=lambda r: r.ewma_ms)
+                for r in dead + ([retire] if retire else []):
+                    self._replicas.remove(r)
+                if grow:
+                    self._starting += 1
+                metrics.gauge_set("mcp_replicas", len(self._replicas), server=self.name)
+            for r in dead:
+                self.counts["replaced"] += 1
+                metrics.inc("mcp_replica_scale_total", server=self.name, direction="replace")
+                _log_jsonl(self.log_file, {"dir": "meta", "event": "replica_dead", "replica": r.idx})
+                r.srv.stop()
+            if retire is not None:
+                self.counts["scaleDowns"] += 1
+                metrics.inc("mcp_replica_scale_total", server=self.name, direction="down")
+                _log_jsonl(self.log_file, {"dir": "meta", "event": "replica_down", "replica": retire.idx})
+                retire.srv.stop()
+            if grow:
+                self._spawn()
+
+    def _spawn(self):
+        srv = self.proto.clone()
+        try:
+            srv.start()
+        except Exception as e:
+            srv.stop()
+            _log_jsonl(self.log_file, {"dir": "meta", "event": "replica_spawn_failed", "error": str(e)})
+            time.sleep(2.0)
+            return
+        finally:
+            with self._cv:
+                self._starting -= 1
+        self.counts["scaleUps"] += 1
+        metrics.inc("mcp_replica_scale_total", server=self.name, direction="up")
+        self._add(srv)
+
+    # ----- reparto -----
+
+    def _acquire(self, timeout: float, wait: bool = True, only: Optional[_Replica] = None) -> Optional[_Replica]:
+        """
+        Réplica libre con menor EWMA; sin 'wait' retorna None si no hay ninguna.
+        La cola es FIFO: quien llega no se adelanta a los que ya esperan (sin eso
+        el hilo que acaba de liberar vuelve a tomar la réplica y los demás esperan
+        indefinidamente). 'only' espera a esa réplica en particular (None si ya no
+        está en el pool) y no hace cola.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cv:
+            ticket: Optional[object] = None
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"[{self.name}] replica pool not started")
+                    if only is not None and only not in self._replicas:
+                        return None
+                    free = [r for r in self._replicas
+                            if not r.busy and (only is None or r is only) and _alive(r.srv)]
+                    turn = only is not None or not self._queue or self._queue[0] is ticket
+                    if free and turn:
+                        r = min(free, key=lambda x: x.ewma_ms)
+                        r.busy = True
+                        return r
+                    if not wait:
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(f"[{self.name}] timeout waiting for a free replica "
+                                           f"({len(self._replicas)} busy)")
+                    if ticket is None and only is None:
+                        ticket = object()
+                        self._queue.append(ticket)
+                        self.counts["queued"] += 1
+                        metrics.gauge_set("mcp_replica_queue", len(self._queue), server=self.name)
+                        self._wake.set()  # el autoescalado no espera al próximo tick
+                    self._cv.wait(remaining)
+            finally:
+                if ticket is not None:
+                    self._queue.remove(ticket)
+                    metrics.gauge_set("mcp_replica_queue", len(self._queue), server=self.name)
+                    self._cv.notify_all()  # el siguiente de la cola pasa a ser cabeza
+
+    def _run(self, r: _Replica, fn: Callable[[MCPServer], Any], tool: Optional[str] = None,
+             record: bool = True) -> Any:
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            res = fn(r.srv)
+            ok = True
+            return res
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            with self._cv:
+                r.busy = False
+                r.idle_since = time.monotonic()
+                if r.abandoned:
+                    r.abandoned = record = False
+                if record:
+                    r.calls += 1
+                    r.errors += 0 if ok else 1
+                    r.ewma_ms = ms if r.calls == 1 else r.ewma_ms + self.EWMA_ALPHA * (ms - r.ewma_ms)
+                    r.lat.append(ms)
+                    if ok and tool:
+                        self._tool_lat.setdefault(tool, deque(maxlen=256)).append(ms)
+                self._cv.notify_all()
+
+    def _hedge_delay(self, tool: str, meta: Optional[Dict[str, Any]]) -> Optional[float]:
+        if self.hedge_ms is None or self.max_n < 2 or (meta or {}).get("streamChunks"):
+            return None
+        if not read_only_tool(self.name, tool):
+            return None
+        if self.hedge_ms != "auto":
+            return float(self.hedge_ms)
+        with self._cv:
+            lat = sorted(self._tool_lat.get(tool) or ())
+        if len(lat) < self.HEDGE_MIN_SAMPLES:
+            return None
+        return lat[min(len(lat) - 1, int(0.95 * len(lat)))]
+
+    def _hedged(self, tool: str, call: Callable[..., Dict[str, Any]], delay_ms: float, timeout: float,
+                on_notification, on_progress) -> Dict[str, Any]:
+        """
+        La llamada principal corre en el executor; si no respondió en delay_ms se
+        repite en otra réplica libre (sin callbacks, para no duplicar avisos).
+        Gana la primera respuesta correcta; a la otra se le envía notifications/cancelled
+        para que libere su réplica sin terminar el cálculo.
+        """
+        done: "queue.Queue" = queue.Queue()
+        rids: Dict[int, int] = {}
+        evs: Dict[int, threading.Event] = {}
+
+        def _go(r: _Replica, primary: bool):
+            cb = {"on_notification": on_notification, "on_progress": on_progress} if primary else {}
+            ev = evs.setdefault(r.idx, threading.Event())
+
+            def _call(s: MCPServer) -> Dict[str, Any]:
+                rids[r.idx] = s.seq + 1  # réplica tomada en exclusiva: su próximo request lleva este id
+                if ev.is_set():  # perdió antes de enviar: ni se envía
+                    raise RuntimeError(f"[{s.name}] {tool} abandonado (otra réplica respondió antes)")
+                s.abandon = ev
+                try:
+                    return call(s, **cb)
+                finally:
+                    s.abandon = None
+            try:
+                done.put((r, self._run(r, _call, tool), None))
+            except Exception as e:
+                done.put((r, None, e))
+
+        first = self._acquire(timeout)
+        self._executor.submit(contextvars.copy_context().run, _go, first, True)
+        try:
+            r, res, err = done.get(timeout=delay_ms / 1000.0)
+        except queue.Empty:
+            second = self._acquire(0, wait=False)
+            if second is None:
+                r, res, err = done.get()
+            else:
+                self.counts["hedges"] += 1
+                second.hedges += 1
+                self._executor.submit(contextvars.copy_context().run, _go, second, False)
+                r, res, err = done.get()
+                if err is not None:
+                    r, res, err = done.get()  # la otra puede haber salido bien
+                else:
+                    self._abandon(second if r is first else first, rids, evs)
+                won = r is second and err is None
+                if won:
+                    self.counts["hedgeWins"] += 1
+                    second.hedge_wins += 1
+                metrics.inc("mcp_hedges_total", server=self.name, result="won" if won else "lost")
+        if err is not None:
+            raise err
+        return res
+
+    def _abandon(self, loser: _Replica, rids: Dict[int, int], evs: Dict[int, threading.Event]) -> None:
+        """
+        Cancela la copia perdedora si sigue en curso: el servidor deja de calcular y
+        la réplica se libera sin esperar el timeout (un id ya terminado se ignora).
+        """
+        with self._cv:
+            if not loser.busy:
+                return
+            loser.abandoned = True
+        evs.setdefault(loser.idx, threading.Event()).set()  # antes de leer rid: ver _call
+        rid = rids.get(loser.idx)
+        if rid is not None:
+            loser.srv._cancel(rid, "hedge_lost")
+
+    # ----- interfaz de MCPServer -----
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 12.0,
+                on_notification: Optional[Callable[[Dict[str, Any]], None]] = None,
+                max_timeout: float = PROGRESS_MAX_TIMEOUT) -> Dict[str, Any]:
+        r = self._acquire(timeout)
+        return self._run(r, lambda s: s.request(method, params, timeout=timeout, on_notification=on_notification,
+                                                max_timeout=max_timeout))
+
+    def tools_call(self, tool: str, args: Dict[str, Any], timeout: float = 15.0,
+                   meta: Optional[Dict[str, Any]] = None,
+                   on_notification: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        call = lambda s, **cb: s.tools_call(tool, args, timeout=timeout, meta=meta, **cb)
+        delay = self._hedge_delay(tool, meta)
+        if delay is not None:
+            return self._hedged(tool, call, delay, timeout, on_notification, on_progress)
+        r = self._acquire(timeout)
+        return self._run(r, lambda s: call(s, on_notification=on_notification, on_progress=on_progress), tool)
+
+    def tools_call_stream(self, tool: str, args: Dict[str, Any],
+                          on_chunk: Callable[[Dict[str, Any]], None], timeout: float = 120.0) -> Dict[str, Any]:
+        r = self._acquire(timeout)
+        return self._run(r, lambda s: s.tools_call_stream(tool, args, on_chunk, timeout=timeout), tool)
+
+    def list_tools(self, timeout: float = 8.0) -> List[Dict[str, Any]]:
+        r = self._acquire(timeout)
+        return self._run(r, lambda s: s.list_tools(timeout=timeout), record=False)
+
+    def metrics(self, fmt: str = "json", timeout: float = 5.0) -> Dict[str, Any]:
+        """server/metrics de cada réplica, con el label replica (pasa por la cola como una llamada más)."""
+        snaps: Dict[str, Dict[str, Any]] = {}
+        with self._cv:
+            replicas = list(self._replicas)
+        for rep in replicas:
+            r = self._acquire(timeout, only=rep)
+            if r is not None:
+                snaps[str(r.idx)] = self._run(r, lambda s: s.metrics(timeout=timeout), record=False)
+        by = metrics.merge(snaps, label="replica")["byServer"]
+        return {"text": metrics.prometheus(by)} if fmt == "prometheus" else by
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado por réplica: pid, ocupada, llamadas, errores, EWMA y p50/p95 recientes, hedges."""
+        with self._cv:
+            out = []
+            for r in self._replicas:
+                lat = sorted(r.lat)
+                pct = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))], 3) if lat else None
+                proc = getattr(r.srv, "proc", None)
+                out.append({"replica": r.idx, "pid": proc.pid if proc else None, "busy": r.busy,
+                            "calls": r.calls, "errors": r.errors, "ewmaMs": round(r.ewma_ms, 3),
+                            "p50Ms": pct(0.5), "p95Ms": pct(0.95), "hedges": r.hedges, "hedgeWins": r.hedge_wins,
+                            "idleS": None if r.busy else round(time.monotonic() - r.idle_since, 1)})
+            return {"min": self.min_n, "max": self.max_n, "hedgeMs": self.hedge_ms, "waiting": len(self._queue),
+                    "starting": self._starting, **self.counts, "replicas": out}
+
 # ---------------- HTTP (opcional) ----------------
 
 class MCPHttpServer:
-    def __init__(self, name: str, base_url: str, rpc_path: str = "/rpc"):
+    """
+    Cliente MCP por HTTP. Habla el transporte streamable-HTTP (Mcp-Session-Id,
+    respuestas JSON o SSE, gzip, keep-alive vía requests.Session) y sigue aceptando
+    servidores JSON-RPC simples que responden JSON a cada POST.
+    """
+    def __init__(self, name: str, base_url: str, rpc_path: str = "/rpc", timeout: float = 12.0):
         if not base_url:
             raise RuntimeError(f"[{name}] REMOTE_MCP_URL no configurado")
         self.name = name
         self.base_url = base_url.rstrip("/")
-        self.rpc_url = self.base_url + (rpc_path if rpc_path.startswith("/") else f"/{rpc_path}")
+        self.rpc_url = self.base_url + (rpc_path if not rpc_path or rpc_path.startswith("/") else f"/{rpc_path}")
+        self.timeout = timeout
         self.seq = 0
+        self.session_id: Optional[str] = None
+        self._session_lock = threading.Lock()
+        self.http = requests.Session()
+        self.log_file = os.path.join(LOG_DIR, f"mcp_{name}.jsonl")
 
-    def _send(self, obj: dict) -> dict:
-        resp = requests.post(self.rpc_url, headers={"Content-Type": "application/json"}, json=obj, timeout=12)
+    def _send(self, obj: dict, timeout: Optional[float] = None,
+              on_notification: Optional[Callable[[Dict[str, Any]], None]] = None, retry: bool = True) -> dict:
+        headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+        sid = self.session_id
+        if sid:
+            headers["Mcp-Session-Id"] = sid
+        resp = self.http.post(self.rpc_url, headers=headers, data=json.dumps(obj, ensure_ascii=False).encode("utf-8"),
+                              timeout=timeout or self.timeout, stream=True)
+        if resp.status_code == 404 and sid and retry and obj.get("method") not in ("initialize", "notifications/cancelled"):
+            # sesión desconocida: venció (SESSION_TTL_S), el servidor reinició u otra instancia
+            # detrás del balanceador atendió el POST -> nueva sesión y un reintento
+            resp.close()
+            self._reinit(sid)
+            return self._send(obj, timeout, on_notification, retry=False)
         try:
             resp.raise_for_status()
         except requests.HTTPError as e:
             raise RuntimeError(f"[{self.name}] HTTP {resp.status_code} at {self.rpc_url}\nBody: {resp.text}") from e
-        return resp.json()
+        sid = resp.headers.get("Mcp-Session-Id")
+        if sid:
+            self.session_id = sid
+        _log_jsonl(self.log_file, {"dir": "out", "obj": obj})
+        if resp.headers.get("Content-Type", "").startswith("text/event-stream"):
+            return self._read_sse(resp, obj.get("id"), on_notification)
+        if resp.status_code == 202 or not resp.content:
+            return {}  # notificación aceptada sin cuerpo
+        msg = resp.json()
+        _log_jsonl(self.log_file, {"dir": "in", "obj": msg})
+        return msg
+
+    def _read_sse(self, resp, rid: Any, on_notification: Optional[Callable[[Dict[str, Any]], None]]) -> dict:
+        """Consume eventos SSE: notificaciones -> on_notification, retorna la respuesta con id == rid."""
+        data: List[str] = []
+        for raw in resp.iter_lines(decode_unicode=True):
+            if raw is None:
+                continue
+            if raw.startswith("data:"):
+                data.append(raw[5:].lstrip())
+                continue
+            if raw or not data:
+                continue  # 'event:' / 'id:' / comentarios, o línea vacía sin datos
+            msg = json.loads("\n".join(data))
+            data = []
+            _log_jsonl(self.log_file, {"dir": "in", "obj": msg})
+            if "method" in msg and "id" not in msg:
+                if on_notification:
+                    on_notification(msg)
+                continue
+            if msg.get("id") == rid:
+                resp.close()
+                return msg
+        raise RuntimeError(f"[{self.name}] stream SSE terminó sin respuesta para id={rid}")
 
     def start(self):
         self.seq += 1
@@ -316,16 +1358,88 @@ class MCPHttpServer:
         _ = self._send(init_req)
         self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
 
-    def tools_call(self, tool: str, args: dict) -> dict:
+    def _reinit(self, stale: str) -> None:
+        """Rehace initialize una sola vez aunque varios hilos vean el 404 de la misma sesión."""
+        with self._session_lock:
+            if self.session_id not in (stale, None):
+                return  # otro hilo ya la renovó
+            self.session_id = None
+            metrics.inc("client_session_reinit_total", server=self.name)
+            self.start()
+
+    def stop(self):
+        if self.session_id:
+            try:
+                self.http.delete(self.rpc_url, headers={"Mcp-Session-Id": self.session_id}, timeout=3)
+            except requests.RequestException:
+                pass
+            self.session_id = None
+        self.http.close()
+
+    def metrics(self, fmt: str = "json", timeout: float = 5.0) -> Dict[str, Any]:
         self.seq += 1
-        req = {"jsonrpc": "2.0", "id": self.seq, "method": "tools/call", "params": {"name": tool, "arguments": args}}
-        rsp = self._send(req)
+        rsp = self._send({"jsonrpc": "2.0", "id": self.seq, "method": "server/metrics",
+                          "params": {"format": fmt}}, timeout=timeout)
+        if "result" in rsp:
+            return rsp["result"]
+        raise RuntimeError(f"{self.name}: {rsp.get('error') or rsp}")
+
+    def tools_call(self, tool: str, args: dict, timeout: Optional[float] = None,
+                   meta: Optional[Dict[str, Any]] = None,
+                   on_notification: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> dict:
+        """El timeout de requests es entre bytes: cada evento SSE de progreso lo reinicia."""
+        self.seq += 1
+        t0 = time.perf_counter()
+        params: Dict[str, Any] = {"name": tool, "arguments": args}
+        if on_progress is not None:
+            meta = {"progressToken": _progress_token(self.name), **(meta or {})}
+        if MCP_PROPAGATE_DEADLINE:
+            # el timeout de requests es de inactividad: el mismo plazo, con tope PROGRESS_MAX_TIMEOUT
+            budget = timeout or self.timeout
+            meta = {**(meta or {}), "timeoutMs": int(budget * 1000),
+                    "maxTimeoutMs": int(max(budget, PROGRESS_MAX_TIMEOUT) * 1000)}
+        if meta:
+            params["_meta"] = meta
+        with tracing.span("mcp tools/call", kind="client", **{"mcp.server": self.name, "rpc.method": "tools/call",
+                                                             "mcp.tool": tool}) as sp:
+            if sp is not None:
+                params["_meta"] = tracing.inject(params.get("_meta"))
+            req = {"jsonrpc": "2.0", "id": self.seq, "method": "tools/call", "params": params}
+            try:
+                rsp = self._send(req, timeout=timeout,
+                                 on_notification=_progress_router(on_notification, on_progress))
+            except requests.Timeout:
+                self._cancel(req["id"], "timeout")
+                raise
+            if sp is not None and "result" not in rsp:
+                sp.status, sp.message = 2, "error"
+        metrics.observe("client_request_ms", (time.perf_counter() - t0) * 1000, server=self.name,
+                        method="tools/call", status="ok" if "result" in rsp else "error")
         if "result" in rsp:
             return rsp["result"]
         if "error" in rsp:
             raise RuntimeError(f"{self.name}: {rsp['error']}")
         raise RuntimeError(f"{self.name}: unexpected {rsp}")
 
+    def _cancel(self, rid: Any, reason: str) -> None:
+        if not MCP_PROPAGATE_DEADLINE:
+            return
+        metrics.inc("client_cancelled_total", server=self.name, reason=reason)
+        try:
+            self._send({"jsonrpc": "2.0", "method": "notifications/cancelled",
+                        "params": {"requestId": rid, "reason": reason}}, timeout=3)
+        except (requests.RequestException, RuntimeError):
+            pass
+
+    def tools_call_stream(self, tool: str, args: Dict[str, Any],
+                          on_chunk: Callable[[Dict[str, Any]], None], timeout: float = 120.0) -> Dict[str, Any]:
+        def _on_notification(msg: Dict[str, Any]):
+            if msg.get("method") == "notifications/invest/chunk":
+                on_chunk(msg.get("params") or {})
+        return self.tools_call(tool, args, timeout=timeout, meta={"streamChunks": True},
+                               on_notification=_on_notification)
+
     def list_tools(self) -> List[Dict[str, Any]]:
         self.seq += 1
         req = {"jsonrpc": "2.0", "id": self.seq, "method": "tools/list", "params": {}}
@@ -340,6 +1454,60 @@ class MCPHttpServer:
             raise RuntimeError(f"{self.name}: {rsp['error']}")
         return []
 
+# ---------------- Scheduler (MCP_SCHEDULER) ----------------
+
+class ScheduledServer:
+    """
+    Envoltorio de un servidor del fleet: cada llamada pide turno al Scheduler
+    (prioridad del contexto, cupo del servidor) y usa lo que queda del timeout.
+    El resto de atributos (start, stop, name, stats...) son los del servidor.
+    """
+    def __init__(self, key: str, inner: Any, scheduler: Scheduler):
+        self.key = key
+        self.inner = inner
+        self.scheduler = scheduler
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.inner, attr)
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 12.0,
+                on_notification: Optional[Callable[[Dict[str, Any]], None]] = None,
+                max_timeout: float = PROGRESS_MAX_TIMEOUT) -> Dict[str, Any]:
+        return self.scheduler.run(self.key, lambda t: self.inner.request(
+            method, params, timeout=t, on_notification=on_notification, max_timeout=max_timeout), timeout)
+
+    def tools_call(self, tool: str, args: Dict[str, Any], timeout: Optional[float] = 15.0,
+                   meta: Optional[Dict[str, Any]] = None,
+                   on_notification: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        timeout = timeout or getattr(self.inner, "timeout", 15.0)
+        return self.scheduler.run(self.key, lambda t: self.inner.tools_call(
+            tool, args, timeout=t, meta=meta, on_notification=on_notification, on_progress=on_progress), timeout)
+
+    def tools_call_stream(self, tool: str, args: Dict[str, Any],
+                          on_chunk: Callable[[Dict[str, Any]], None], timeout: float = 120.0) -> Dict[str, Any]:
+        return self.scheduler.run(self.key, lambda t: self.inner.tools_call_stream(tool, args, on_chunk, timeout=t),
+                                  timeout)
+
+    def list_tools(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return self.scheduler.run(self.key, lambda t: self.inner.list_tools(*args, **kwargs), 30.0, "interactive")
+
+    def metrics(self, fmt: str = "json", timeout: float = 5.0) -> Dict[str, Any]:
+        return self.scheduler.run(self.key, lambda t: self.inner.metrics(fmt, timeout=t), timeout, "interactive")
+
+def _inner(srv: Any) -> Any:
+    return srv.inner if isinstance(srv, ScheduledServer) else srv
+
+def _sched_limit(srv: Any) -> int:
+    """Cupo natural del backend: réplicas, workers del embebido o 4 para HTTP; 1 para un proceso stdio."""
+    if isinstance(srv, ReplicaPool):
+        return srv.max_n
+    if isinstance(srv, MCPEmbeddedServer):
+        return srv.workers if srv.mode != "inline" else 4
+    if isinstance(srv, MCPHttpServer):
+        return 4
+    return 1
+
 # ---------------- Fleet ----------------
 
 class MCPFleet:
@@ -355,9 +1523,26 @@ class MCPFleet:
             enabled = {k for k in enabled if k in all_keys}
         self.enabled = enabled
 
-        self.fs = MCPServer("filesystem", ["npx","-y","@modelcontextprotocol/server-filesystem", FS_ROOT]) if "fs" in enabled else None
-        self.gh = MCPServer("github", ["npx","-y","@modelcontextprotocol/server-github"]) if "gh" in enabled else None
-        self.invest = MCPServer("invest", ["python","-m","invest_mcp.main"]) if "invest" in enabled else None
+        fs_launch = [sys.executable, "-m", "fs_mcp.main", FS_ROOT] if FS_MCP_NATIVE else \
+            ["npx","-y","@modelcontextprotocol/server-filesystem", FS_ROOT]
+        self.fs = MCPServer("filesystem", _replay_launch("filesystem", fs_launch)) if "fs" in enabled else None
+        # Servidores que implementan server/metrics (los node y el replay no responden:
+        # preguntarles cuesta el timeout entero)
+        self.metrics_keys = {"invest"}
+        if self.fs is not None and FS_MCP_NATIVE and self.fs.launch == fs_launch:
+            self.metrics_keys.add("fs")
+        self.gh = MCPServer("github", _replay_launch("github", ["npx","-y","@modelcontextprotocol/server-github"])) if "gh" in enabled else None
+        self.invest = None
+        if "invest" in enabled and INVEST_MCP_URL:
+            self.invest = MCPHttpServer("invest", INVEST_MCP_URL, "")
+        elif "invest" in enabled and INVEST_MCP_SOCKET:
+            self.invest = MCPSocketServer("invest", INVEST_MCP_SOCKET, compact=INVEST_MCP_COMPACT)
+        elif "invest" in enabled and INVEST_MCP_EMBEDDED:
+            self.invest = MCPEmbeddedServer("invest", *INVEST_MCP_EMBEDDED)
+        elif "invest" in enabled:
+            launch = ["python","-m","invest_mcp.main"]
+            pool = warm_pool("invest", launch, INVEST_MCP_WARM_POOL, compact=INVEST_MCP_COMPACT)
+            self.invest = MCPServer("invest", launch, compact=INVEST_MCP_COMPACT, pool=pool, progress=True)
         self.local = MCPHttpServer("local-remote", REMOTE_MCP_URL, REMOTE_MCP_PATH) if ("local" in enabled and REMOTE_MCP_URL) else None
         self.fitness = None
         if "fitness" in enabled:
@@ -386,12 +1571,29 @@ class MCPFleet:
                 self.wfm = None
                 self.enabled.discard("wfm")
 
+        for key in ("fs", "gh", "invest", "wfm", "fitness"):
+            setattr(self, key, self._replicated(key, getattr(self, key)))
+        self.scheduler: Optional[Scheduler] = None
+        if MCP_SCHEDULER:
+            self.scheduler = Scheduler(MCP_SCHED_LIMITS, queue_max=MCP_SCHED_QUEUE, reserve=MCP_SCHED_RESERVE)
+            for key in self.server_keys():
+                srv = getattr(self, key)
+                self.scheduler.configure(key, _sched_limit(srv))
+                setattr(self, key, ScheduledServer(key, srv, self.scheduler))
         self._started = False
 
+    @staticmethod
+    def _replicated(key: str, srv: Any) -> Any:
+        """Con MCP_REPLICAS[key], un ReplicaPool en lugar del cliente único (solo stdio y socket)."""
+        spec = MCP_REPLICAS.get(key)
+        if srv is None or spec is None or type(srv) not in (MCPServer, MCPSocketServer):
+            return srv
+        return ReplicaPool(srv, *spec, hedge_ms=MCP_HEDGE_MS, idle_s=MCP_REPLICA_IDLE_S)
+
     def _iter_servers(self):
         for s in (self.fs, self.gh, self.invest, self.local, self.wfm, self.fitness):
             if s is not None:
-                yield s
+                yield _inner(s)
 
     def server_keys(self) -> List[str]:
         out = []
@@ -429,6 +1631,9 @@ class MCPFleet:
 
     def stop_all(self):
         for s in self._iter_servers():
+            if isinstance(s, (MCPServer, ReplicaPool)):
+                s.stop()
+                continue
             try:
                 if hasattr(s, "seq"):
                     s.seq += 1
@@ -441,8 +1646,42 @@ class MCPFleet:
                     s.proc.terminate()
             except Exception:
                 pass
+            if isinstance(s, MCPHttpServer):
+                s.stop()  # DELETE de la sesión + cierra el pool keep-alive
         self._started = False
 
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Agrega server/metrics de los hijos que lo soportan (metrics_keys: invest y
+        fs_mcp; los servidores node no) más las métricas del host (latencia vista por
+        el cliente) bajo server="host".
+        """
+        snaps: Dict[str, Dict[str, Any]] = {"host": metrics.snapshot()}
+        for key in self.server_keys():
+            if key not in self.metrics_keys:
+                continue
+            srv = getattr(self, key)
+            if not hasattr(srv, "metrics") or getattr(srv, "shares_registry", False):
+                continue  # embebido en el hilo del host: ya está en el snapshot "host"
+            try:
+                snaps[key] = srv.metrics()
+            except Exception:
+                continue  # sin server/metrics o caído: no bloquea el resto
+        return metrics.merge(snaps)
+
+    def replica_stats(self) -> Dict[str, Any]:
+        """Estado de cada ReplicaPool del fleet (servidores con MCP_REPLICAS)."""
+        return {key: _inner(getattr(self, key)).stats() for key in self.server_keys()
+                if isinstance(_inner(getattr(self, key)), ReplicaPool)}
+
+    def scheduler_stats(self) -> Dict[str, Any]:
+        """Cupos, colas por prioridad y pedidos descartados/vencidos (vacío sin MCP_SCHEDULER)."""
+        return self.scheduler.stats() if self.scheduler is not None else {}
+
+    def prometheus(self) -> str:
+        """Formato texto de Prometheus, una serie por servidor (label server)."""
+        return metrics.prometheus(self.metrics()["byServer"])
+
     def list_all_tools(self) -> Dict[str, List[str]]:
         out: Dict[str, List[str]] = {}
         for key, srv in [
@@ -463,7 +1702,12 @@ def handle_command_line(line: str, fleet: "MCPFleet") -> Dict[str, Any]:
     """
     !mcp {"tool":"<tool>", "args":{...}, "server":"fs|gh|invest|local|wfm"}
     Si no se especifica 'server', intenta en orden fs -> gh -> invest -> local -> wfm.
+    "priority": "interactive|normal|batch" fija la clase de la llamada en el scheduler.
     """
+    with tracing.span("mcp.command", **{"mcp.line": line[:200]}):
+        return _handle_command_line(line, fleet)
+
+def _handle_command_line(line: str, fleet: "MCPFleet") -> Dict[str, Any]:
     if not line.lower().startswith("!mcp "):
         raise ValueError("Formato no reconocido. Usa: !mcp { ... }")
     payload = json.loads(line[4:].strip())
@@ -482,6 +1726,20 @@ def handle_command_line(line: str, fleet: "MCPFleet") -> Dict[str, Any]:
             pass
         return {"tools": fleet.list_all_tools()}
 
+    if tool in ("metrics", "__metrics__"):
+        return {"metrics": fleet.metrics()}
+
+    if tool in ("replicas", "__replicas__"):
+        return {"replicas": fleet.replica_stats()}
+
+    if tool in ("scheduler", "__scheduler__"):
+        return {"scheduler": fleet.scheduler_stats()}
+
+    with priority(payload.get("priority")):
+        return _dispatch(payload, tool, args, server_key, fleet)
+
+def _dispatch(payload: Dict[str, Any], tool: str, args: Dict[str, Any], server_key: Optional[str],
+              fleet: "MCPFleet") -> Dict[str, Any]:
     server_map: Dict[str, Any] = {
         "fs": getattr(fleet, "fs", None),
         "gh": getattr(fleet, "gh", None),
@@ -500,6 +1758,9 @@ def handle_command_line(line: str, fleet: "MCPFleet") -> Dict[str, Any]:
         s = server_map.get(server_key)
         if not s:
             raise ValueError(f"Servidor desconocido o no habilitado: {server_key}")
+        if "profile" in payload:
+            # Perfil de esta llamada (solo invest): el resumen vuelve en result._meta["invest/profile"]
+            return s.tools_call(tool, _wrap_if_needed(server_key, args), meta={"profile": payload["profile"]})
         return s.tools_call(tool, _wrap_if_needed(server_key, args))
 
     for key in ("fs", "gh", "invest", "local", "fitness"):
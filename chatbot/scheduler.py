@@ -0,0 +1,147 @@
+# chatbot/scheduler.py
+import contextvars, heapq, itertools, threading, time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from invest_mcp.lib import metrics
+
+# Control de admisión de las llamadas del fleet (MCP_SCHEDULER). Cada servidor
+# tiene un cupo de llamadas simultáneas y una cola ordenada por clase de
+# prioridad y, dentro de la clase, por deadline (primero el que vence antes):
+#
+#   interactive  chat y UI (por defecto); nunca se descarta
+#   normal       trabajo que puede esperar: no usa los cupos reservados
+#   batch        warmups, rebalanceos masivos: no usa los cupos reservados y se
+#                descarta (Overloaded) si la cola del servidor ya está llena
+#
+# La prioridad se toma del contexto (with priority("batch"): ...), así el código
+# de fondo no necesita otra API. Un pedido cuyo deadline vence en la cola falla
+# sin llegar al servidor: no se gasta trabajo en una respuesta que nadie espera.
+
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+_NAMES = {v: k for k, v in PRIORITIES.items()}
+_current: contextvars.ContextVar = contextvars.ContextVar("mcp_priority", default="interactive")
+
+T = TypeVar("T")
+
+class Overloaded(RuntimeError):
+    """Cola llena: el pedido batch se descartó sin ejecutarse."""
+
+def _check(name: str) -> str:
+    if name not in PRIORITIES:
+        raise ValueError(f"prioridad desconocida: {name!r} ({' | '.join(PRIORITIES)})")
+    return name
+
+@contextmanager
+def priority(name: Optional[str]) -> Iterator[None]:
+    """Prioridad de las llamadas hechas dentro del bloque (None = la actual)."""
+    token = _current.set(_check(name)) if name else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            _current.reset(token)
+
+def current_priority() -> str:
+    return _current.get()
+
+class _Lane:
+    def __init__(self, key: str, limit: int, reserve: int):
+        self.key = key
+        self.limit = max(1, limit)
+        self.reserve = max(0, min(reserve, self.limit - 1))  # con cupo 1 no hay reserva posible
+        self.heap: List[list] = []  # [prioridad, deadline, seq]
+        self.running = [0, 0, 0]
+        self.counts = {"admitted": 0, "shed": 0, "expired": 0}
+
+class Scheduler:
+    def __init__(self, limits: Optional[Dict[str, int]] = None, default_limit: int = 1,
+                 queue_max: int = 32, reserve: int = 1):
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self.queue_max = max(1, queue_max)
+        self.reserve = reserve
+        self._lanes: Dict[str, _Lane] = {}
+        self._cv = threading.Condition()
+        self._seq = itertools.count()
+
+    def configure(self, key: str, limit: Optional[int] = None) -> None:
+        """Cupo de 'key': MCP_SCHED_LIMITS manda sobre el sugerido por el fleet."""
+        with self._cv:
+            n = self.limits.get(key) or limit or self.default_limit
+            self._lanes[key] = _Lane(key, n, self.reserve)
+
+    def _lane(self, key: str) -> _Lane:
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane(key, self.limits.get(key) or self.default_limit, self.reserve)
+        return lane
+
+    def _admissible(self, lane: _Lane, item: list) -> bool:
+        if lane.heap[0] is not item:
+            return False
+        used = sum(lane.running)
+        if item[0] > 0:
+            return used < lane.limit - lane.reserve
+        return used < lane.limit
+
+    def run(self, key: str, fn: Callable[[float], T], timeout: float, prio: Optional[str] = None) -> T:
+        """
+        Espera turno en la cola de 'key' y ejecuta fn(restante) en el hilo del
+        llamador; 'restante' es lo que queda de 'timeout' tras la espera.
+        """
+        name = _check(prio or _current.get())
+        p = PRIORITIES[name]
+        t0 = time.monotonic()
+        deadline = t0 + timeout
+        item = [p, deadline, next(self._seq)]
+        with self._cv:
+            lane = self._lane(key)
+            if p == PRIORITIES["batch"] and len(lane.heap) >= self.queue_max:
+                lane.counts["shed"] += 1
+                metrics.inc("sched_shed_total", server=key, priority=name)
+                raise Overloaded(f"[{key}] scheduler queue full ({len(lane.heap)}): batch call shed")
+            heapq.heappush(lane.heap, item)
+            metrics.gauge_set("sched_queued", len(lane.heap), server=key)
+            try:
+                while not self._admissible(lane, item):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        lane.counts["expired"] += 1
+                        metrics.inc("sched_expired_total", server=key, priority=name)
+                        raise RuntimeError(f"[{key}] deadline expired in scheduler queue "
+                                           f"({(time.monotonic() - t0) * 1000:.0f} ms, priority {name})")
+                    self._cv.wait(remaining)
+            except BaseException:
+                lane.heap.remove(item)
+                heapq.heapify(lane.heap)
+                metrics.gauge_set("sched_queued", len(lane.heap), server=key)
+                self._cv.notify_all()
+                raise
+            heapq.heappop(lane.heap)
+            lane.running[p] += 1
+            lane.counts["admitted"] += 1
+            metrics.gauge_set("sched_queued", len(lane.heap), server=key)
+            metrics.gauge_set("sched_inflight", sum(lane.running), server=key)
+            self._cv.notify_all()  # el nuevo primero de la cola puede tener cupo
+        waited = time.monotonic() - t0
+        metrics.observe("sched_wait_ms", waited * 1000.0, server=key, priority=name)
+        try:
+            return fn(max(0.001, timeout - waited))
+        finally:
+            with self._cv:
+                lane.running[p] -= 1
+                metrics.gauge_set("sched_inflight", sum(lane.running), server=key)
+                self._cv.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cv:
+            out: Dict[str, Any] = {}
+            for key, lane in self._lanes.items():
+                queued = [0, 0, 0]
+                for it in lane.heap:
+                    queued[it[0]] += 1
+                out[key] = {"limit": lane.limit, "reserve": lane.reserve, **lane.counts,
+                            "running": {_NAMES[i]: n for i, n in enumerate(lane.running)},
+                            "queued": {_NAMES[i]: n for i, n in enumerate(queued)}}
+            return {"queueMax": self.queue_max, "servers": out}
@@ -0,0 +1,181 @@
+# fs_mcp/cache.py
+from __future__ import annotations
+import os, struct, threading, time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# Cache de listados de directorio (scandir + stat de cada entrada) para
+# list_directory*, directory_tree y search_files. Invalidación:
+#   inotify  (Linux, vía ctypes) un hilo lee los eventos y descarta el directorio
+#            afectado: un hit no cuesta ninguna syscall
+#   poll     cada hit compara el mtime del directorio; además la entrada expira a
+#            los POLL_S para ver cambios de tamaño (no tocan el mtime del directorio)
+#   off      sin cache
+#
+#   FS_MCP_WATCH = auto (inotify si está disponible, si no poll) | inotify | poll | off
+#   FS_MCP_POLL_S = 2.0      FS_MCP_CACHE_DIRS = 4096 (LRU; al salir se quita el watch)
+
+WATCH = os.environ.get("FS_MCP_WATCH", "auto").strip().lower()
+POLL_S = float(os.environ.get("FS_MCP_POLL_S", "2.0"))
+MAX_DIRS = int(os.environ.get("FS_MCP_CACHE_DIRS", "4096"))
+
+class Entry(NamedTuple):
+    name: str
+    is_dir: bool        # sin seguir symlinks, como Dirent.isDirectory() en node
+    size: int           # -1 si no se pidió stat
+    mtime: float
+
+def scan(path: str, with_stat: bool) -> List[Entry]:
+    out: List[Entry] = []
+    with os.scandir(path) as it:
+        for e in it:
+            try:
+                is_dir = e.is_dir(follow_symlinks=False)
+                if with_stat:
+                    st = e.stat(follow_symlinks=False)
+                    out.append(Entry(e.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime))
+                else:
+                    out.append(Entry(e.name, is_dir, -1, 0.0))
+            except OSError:
+                continue  # borrado entre readdir y stat
+    out.sort(key=lambda x: x.name)
+    return out
+
+# -------- inotify (ctypes, sin dependencias) --------
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_DELETE_SELF, IN_MOVE_SELF, IN_Q_OVERFLOW, IN_IGNORED = 0x400, 0x800, 0x4000, 0x8000
+IN_ONLYDIR = 0x01000000
+_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+         | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct("iIII")
+
+class Inotify:
+    """Watches por directorio; on_change(path) por evento, on_change(None) si la cola desbordó."""
+    def __init__(self, on_change: Callable[[Optional[str]], None]):
+        import ctypes, ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._on_change = on_change
+        self._wd_path: Dict[int, str] = {}
+        self._path_wd: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._loop, name="fs-inotify", daemon=True).start()
+
+    def add(self, path: str) -> bool:
+        with self._lock:
+            if path in self._path_wd:
+                return True
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _MASK)
+            if wd < 0:
+                return False  # p. ej. ENOSPC (max_user_watches): ese directorio se valida por mtime
+            self._wd_path[wd] = path
+            self._path_wd[path] = wd
+            return True
+
+    def remove(self, path: str) -> None:
+        with self._lock:
+            wd = self._path_wd.pop(path, None)
+            if wd is not None:
+                self._wd_path.pop(wd, None)
+                self._libc.inotify_rm_watch(self.fd, wd)
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except OSError:
+                return
+            off = 0
+            while off + _EVENT.size <= len(buf):
+                wd, mask, _cookie, ln = _EVENT.unpack_from(buf, off)
+                off += _EVENT.size + ln
+                if mask & IN_Q_OVERFLOW:
+                    self._on_change(None)
+                    continue
+                with self._lock:
+                    path = self._wd_path.get(wd)
+                    if mask & IN_IGNORED and path is not None:
+                        self._wd_path.pop(wd, None)
+                        self._path_wd.pop(path, None)
+                if path is not None:
+                    self._on_change(path)
+
+# -------- Cache --------
+class DirCache:
+    def __init__(self, mode: str = WATCH, max_dirs: int = MAX_DIRS, poll_s: float = POLL_S):
+        self.max_dirs = max(1, max_dirs)
+        self.poll_s = poll_s
+        self._lock = threading.Lock()
+        # path -> (entries, con stat, mtime_ns del directorio, instante, vigilado por inotify)
+        self._dirs: "OrderedDict[str, tuple]" = OrderedDict()
+        self._ver: Dict[str, int] = defaultdict(int)
+        self._epoch = 0  # sube si inotify desbordó: invalida también los scans en curso
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+        self.inotify: Optional[Inotify] = None
+        if mode in ("auto", "inotify"):
+            try:
+                self.inotify = Inotify(self._changed)
+            except (OSError, AttributeError):
+                if mode == "inotify":
+                    raise
+        self.mode = "off" if mode in ("off", "0", "false") else ("inotify" if self.inotify else "poll")
+
+    def _changed(self, path: Optional[str]) -> None:
+        with self._lock:
+            self.stats["invalidations"] += 1
+            if path is None:
+                self._epoch += 1
+                self._dirs.clear()
+                return
+            self._ver[path] += 1
+            self._dirs.pop(path, None)
+
+    def invalidate(self, path: str) -> None:
+        """Cambio hecho por el propio servidor (write/move/mkdir): no espera al evento."""
+        self._changed(path)
+
+    def entries(self, path: str, with_stat: bool = True) -> List[Entry]:
+        if self.mode == "off":
+            return scan(path, with_stat)
+        with self._lock:
+            hit = self._dirs.get(path)
+            ver = (self._epoch, self._ver.get(path, 0))
+        if hit is not None:
+            items, has_stat, mtime_ns, t, watched = hit
+            fresh = has_stat or not with_stat
+            if fresh and not watched:
+                try:
+                    fresh = os.stat(path).st_mtime_ns == mtime_ns and time.monotonic() - t < self.poll_s
+                except OSError:
+                    fresh = False
+            if fresh:
+                with self._lock:
+                    self.stats["hits"] += 1
+                    if path in self._dirs:
+                        self._dirs.move_to_end(path)
+                return items
+        watched = self.inotify.add(path) if self.inotify is not None else False  # antes del scan: no se pierde ningún evento
+        mtime_ns = os.stat(path).st_mtime_ns
+        items = scan(path, with_stat)
+        evicted: List[str] = []
+        with self._lock:
+            self.stats["misses"] += 1
+            if (self._epoch, self._ver.get(path, 0)) == ver:  # sin cambios durante el scan
+                self._dirs[path] = (items, with_stat, mtime_ns, time.monotonic(), watched)
+                self._dirs.move_to_end(path)
+                while len(self._dirs) > self.max_dirs:
+                    old, _ = self._dirs.popitem(last=False)
+                    evicted.append(old)
+                    self.stats["evictions"] += 1
+        if self.inotify is not None:
+            for old in evicted:
+                self.inotify.remove(old)
+        return items
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {"mode": self.mode, "dirs": len(self._dirs), **self.stats}
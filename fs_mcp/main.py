@@ -0,0 +1,86 @@
+"""
+Servidor MCP de filesystem en Python (stdio, NDJSON), alternativa a
+`npx @modelcontextprotocol/server-filesystem` con las mismas tools.
+
+Uso:
+    python -m fs_mcp.main <raíz> [<raíz> ...]
+"""
+import sys, json, time
+from fs_mcp import tools
+from invest_mcp.lib import metrics
+
+PROTOCOL_VERSION = "2025-06-18"
+
+def _reply(obj):
+    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+def handle(msg) -> bool:
+    """Atiende un mensaje; True si hay que terminar (shutdown)."""
+    mid, method = msg.get("id"), msg.get("method")
+    if mid is None:
+        return False  # notifications/initialized y demás notificaciones
+    t0 = time.perf_counter()
+    labels = {"method": str(method)}
+    status = "ok"
+    try:
+        if method == "initialize":
+            _reply({"jsonrpc": "2.0", "id": mid, "result": {
+                "protocolVersion": PROTOCOL_VERSION, "capabilities": {"tools": {}},
+                "serverInfo": {"name": "fs-mcp-python", "version": "0.1.0"}}})
+        elif method == "tools/list":
+            _reply({"jsonrpc": "2.0", "id": mid, "result": {"tools": tools.TOOLS}})
+        elif method == "tools/call":
+            p = msg.get("params") or {}
+            name = p.get("name")
+            labels["tool"] = str(name)
+            fn = tools.TOOL_IMPL.get(name)
+            if fn is None:
+                status = "unknown_tool"
+                _reply({"jsonrpc": "2.0", "id": mid, "error": {"code": -32601, "message": f"Unknown tool: {name}"}})
+                return False
+            try:
+                result = fn(p.get("arguments") or {})
+            except Exception as e:
+                status = "tool_error"
+                result = {"content": [{"type": "text", "text": f"Error: {e}"}], "isError": True}
+            _reply({"jsonrpc": "2.0", "id": mid, "result": result})
+        elif method == "ping":
+            _reply({"jsonrpc": "2.0", "id": mid, "result": {}})
+        elif method == "server/metrics":
+            metrics.gauge_set("fs_cache_dirs", tools.CACHE.snapshot()["dirs"])
+            for k in ("hits", "misses", "invalidations", "evictions"):
+                metrics.gauge_set("fs_cache_total", tools.CACHE.stats[k], result=k)
+            snap = metrics.snapshot()
+            fmt = (msg.get("params") or {}).get("format", "json")
+            _reply({"jsonrpc": "2.0", "id": mid, "result": {"text": metrics.prometheus(snap)} if fmt == "prometheus" else snap})
+        elif method == "shutdown":
+            _reply({"jsonrpc": "2.0", "id": mid, "result": {}})
+            return True
+        else:
+            status = "error"
+            _reply({"jsonrpc": "2.0", "id": mid, "error": {"code": -32601, "message": f"Method not found: {method}"}})
+        return False
+    finally:
+        metrics.observe("request_ms", (time.perf_counter() - t0) * 1000, **labels)
+        metrics.inc("requests_total", **labels, status=status)
+
+def main():
+    roots = sys.argv[1:]
+    if not roots:
+        sys.stderr.write("Usage: python -m fs_mcp.main <allowed-directory> [additional-directories...]\n")
+        sys.exit(1)
+    tools.configure(roots)
+    sys.stderr.write(f"fs_mcp: raíces {', '.join(tools.ROOTS)} (cache {tools.CACHE.mode})\n")
+    for raw in sys.stdin:
+        if not raw.strip():
+            continue
+        try:
+            msg = json.loads(raw)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(msg, dict) and handle(msg):
+            break
+
+if __name__ == "__main__":
+    main()
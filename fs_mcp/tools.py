@@ -0,0 +1,383 @@
+# fs_mcp/tools.py
+from __future__ import annotations
+import fnmatch, json, os, stat, tempfile, threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .cache import DirCache
+
+# Mismos nombres, argumentos y formato de texto que @modelcontextprotocol/server-filesystem,
+# para que MCPFleet y el LLM no noten el cambio de backend.
+#   - rutas relativas: contra el cwd si caen dentro de una raíz permitida, si no contra la primera raíz
+#   - lecturas: head por líneas sin cargar el archivo, tail escaneando desde el final con mmap
+#   - listados/árbol/búsqueda: DirCache (scandir, invalidado por inotify o mtime)
+#   - search_files: un hilo por subdirectorio de primer nivel (scandir libera el GIL)
+
+MMAP_MIN = int(os.environ.get("FS_MCP_MMAP_MIN", str(1 << 20)))  # bytes; por debajo, read() directo
+SEARCH_WORKERS = int(os.environ.get("FS_MCP_SEARCH_WORKERS", str(min(8, (os.cpu_count() or 1) * 2))))
+
+ROOTS: List[str] = []
+CACHE: Optional[DirCache] = None
+_pool = None
+_pool_lock = threading.Lock()
+
+def configure(roots: List[str], cache: Optional[DirCache] = None) -> None:
+    global CACHE
+    ROOTS[:] = [os.path.realpath(os.path.abspath(os.path.expanduser(r))) for r in roots]
+    for r in ROOTS:
+        os.makedirs(r, exist_ok=True)
+    CACHE = cache or DirCache()
+
+def _executor():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _pool = ThreadPoolExecutor(max(1, SEARCH_WORKERS), thread_name_prefix="fs-search")
+    return _pool
+
+# -------- Rutas --------
+def _inside(p: str) -> bool:
+    return any(p == r or p.startswith(r.rstrip(os.sep) + os.sep) for r in ROOTS)
+
+def resolve(path: str) -> str:
+    """Ruta absoluta real dentro de alguna raíz; PermissionError si no."""
+    if not isinstance(path, str) or not path:
+        raise ValueError("path is required")
+    p = os.path.expanduser(path)
+    if os.path.isabs(p):
+        ab = os.path.normpath(p)
+    else:
+        ab = os.path.normpath(os.path.abspath(p))
+        if not _inside(ab):
+            ab = os.path.normpath(os.path.join(ROOTS[0], p))
+    if not _inside(ab):
+        raise PermissionError(f"Access denied - path outside allowed directories: {ab} not in {', '.join(ROOTS)}")
+    real = os.path.realpath(ab)
+    if not _inside(real):
+        raise PermissionError("Access denied - symlink target outside allowed directories")
+    return real
+
+def _text(s: str) -> Dict[str, Any]:
+    return {"content": [{"type": "text", "text": s}]}
+
+def _schema(props: Dict[str, Any], required: List[str]) -> Dict[str, Any]:
+    return {"type": "object", "properties": props, "required": required, "additionalProperties": False}
+
+_S = {"type": "string"}
+_N = {"type": "number"}
+
+# -------- Lectura --------
+def _head(path: str, n: int) -> str:
+    out: List[str] = []
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        for line in f:
+            if len(out) >= n:
+                break
+            out.append(line.rstrip("\r\n"))
+    return "\n".join(out)
+
+def _tail(path: str, n: int) -> str:
+    if n <= 0:
+        return ""
+    size = os.path.getsize(path)
+    if size < MMAP_MIN:
+        with open(path, encoding="utf-8", errors="replace", newline="") as f:
+            lines = f.read().splitlines()
+        return "\n".join(lines[-n:])
+    import mmap
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        end = size
+        if m[end - 1:end] == b"\n":
+            end -= 1  # el salto final no abre una línea vacía
+        pos = end
+        for _ in range(n):
+            pos = m.rfind(b"\n", 0, pos)
+            if pos < 0:
+                break
+        data = m[pos + 1:end]
+    return "\n".join(data.decode("utf-8", errors="replace").splitlines())
+
+def _read_all(path: str) -> str:
+    size = os.path.getsize(path)
+    if size < MMAP_MIN:
+        with open(path, encoding="utf-8", errors="replace", newline="") as f:
+            return f.read()
+    import mmap
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return m[:].decode("utf-8", errors="replace")
+
+def read_text_file(a: Dict[str, Any]) -> Dict[str, Any]:
+    path = resolve(a.get("path"))
+    head, tail = a.get("head"), a.get("tail")
+    if head is not None and tail is not None:
+        raise ValueError("Cannot specify both head and tail parameters simultaneously")
+    if head is not None:
+        return _text(_head(path, int(head)))
+    if tail is not None:
+        return _text(_tail(path, int(tail)))
+    return _text(_read_all(path))
+
+def read_media_file(a: Dict[str, Any]) -> Dict[str, Any]:
+    import base64, mimetypes
+    path = resolve(a.get("path"))
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as f:
+        data = base64.b64encode(f.read()).decode("ascii")
+    kind = "image" if mime.startswith("image/") else "audio" if mime.startswith("audio/") else "blob"
+    return {"content": [{"type": kind, "data": data, "mimeType": mime}]}
+
+def read_multiple_files(a: Dict[str, Any]) -> Dict[str, Any]:
+    paths = a.get("paths") or []
+
+    def _one(p: str) -> str:
+        try:
+            return f"{p}:\n{_read_all(resolve(p))}\n"
+        except Exception as e:
+            return f"{p}: Error - {e}"
+
+    parts = list(_executor().map(_one, paths)) if len(paths) > 1 else [_one(p) for p in paths]
+    return _text("\n---\n".join(parts))
+
+# -------- Escritura --------
+# mkstemp crea con 0600; un archivo nuevo debe quedar como con open(): 0666 & ~umask.
+# os.umask solo se lee cambiándolo, así que se hace una vez al importar (no entre hilos).
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _atomic_write(path: str, content: str) -> None:
+    d = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(prefix=".fs_mcp_", dir=d)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        if os.path.exists(path):
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        else:
+            os.chmod(tmp, 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    CACHE.invalidate(d)
+
+def write_file(a: Dict[str, Any]) -> Dict[str, Any]:
+    path = resolve(a.get("path"))
+    _atomic_write(path, a.get("content") or "")
+    return _text(f"Successfully wrote to {a.get('path')}")
+
+def _apply_edit(content: str, old: str, new: str) -> str:
+    if old in content:
+        return content.replace(old, new, 1)
+    # Igual que node: coincidencia por líneas ignorando espacios, conservando la indentación
+    old_lines, lines = old.split("\n"), content.split("\n")
+    for i in range(len(lines) - len(old_lines) + 1):
+        if all(lines[i + j].strip() == ol.strip() for j, ol in enumerate(old_lines)):
+            indent = lines[i][:len(lines[i]) - len(lines[i].lstrip())]
+            out = []
+            for j, line in enumerate(new.split("\n")):
+                if j == 0:
+                    out.append(indent + line.lstrip())
+                    continue
+                old_indent = old_lines[j][:len(old_lines[j]) - len(old_lines[j].lstrip())] if j < len(old_lines) else ""
+                new_indent = line[:len(line) - len(line.lstrip())]
+                if old_indent and new_indent:
+                    out.append(indent + " " * max(0, len(new_indent) - len(old_indent)) + line.lstrip())
+                else:
+                    out.append(line)
+            lines[i:i + len(old_lines)] = out
+            return "\n".join(lines)
+    raise ValueError(f"Could not find exact match for edit:\n{old}")
+
+def edit_file(a: Dict[str, Any]) -> Dict[str, Any]:
+    import difflib
+    path = resolve(a.get("path"))
+    with open(path, encoding="utf-8", newline="") as f:
+        original = f.read().replace("\r\n", "\n")
+    content = original
+    for e in a.get("edits") or []:
+        content = _apply_edit(content, (e.get("oldText") or "").replace("\r\n", "\n"),
+                              (e.get("newText") or "").replace("\r\n", "\n"))
+    diff = "".join(difflib.unified_diff(original.splitlines(True), content.splitlines(True),
+                                        fromfile=f"{path}\toriginal", tofile=f"{path}\tmodified"))
+    ticks = 3
+    while "`" * ticks in diff:
+        ticks += 1
+    if not a.get("dryRun"):
+        _atomic_write(path, content)
+    return _text(f"{'`' * ticks}diff\n{diff}{'`' * ticks}\n\n")
+
+def create_directory(a: Dict[str, Any]) -> Dict[str, Any]:
+    path = resolve(a.get("path"))
+    os.makedirs(path, exist_ok=True)
+    CACHE.invalidate(os.path.dirname(path))
+    return _text(f"Successfully created directory {a.get('path')}")
+
+def move_file(a: Dict[str, Any]) -> Dict[str, Any]:
+    src, dst = resolve(a.get("source")), resolve(a.get("destination"))
+    os.rename(src, dst)
+    for d in {os.path.dirname(src), os.path.dirname(dst), src}:
+        CACHE.invalidate(d)
+    return _text(f"Successfully moved {a.get('source')} to {a.get('destination')}")
+
+# -------- Listados --------
+def list_directory(a: Dict[str, Any]) -> Dict[str, Any]:
+    path = resolve(a.get("path"))
+    return _text("\n".join(f"{'[DIR]' if e.is_dir else '[FILE]'} {e.name}"
+                           for e in CACHE.entries(path, with_stat=False)))
+
+def _fmt_size(n: int) -> str:
+    units = ["B", "KB", "MB", "GB", "TB"]
+    if n == 0:
+        return "0 B"
+    i = 0
+    while n >= 1024 ** (i + 1) and i < len(units) - 1:
+        i += 1
+    return f"{n} {units[i]}" if i == 0 else f"{n / 1024 ** i:.2f} {units[i]}"
+
+def list_directory_with_sizes(a: Dict[str, Any]) -> Dict[str, Any]:
+    path = resolve(a.get("path"))
+    entries = CACHE.entries(path, with_stat=True)
+    if a.get("sortBy") == "size":
+        entries = sorted(entries, key=lambda e: e.size, reverse=True)
+    lines = [f"{'[DIR]' if e.is_dir else '[FILE]'} {e.name.ljust(30)} {'' if e.is_dir else _fmt_size(e.size).rjust(10)}"
+             for e in entries]
+    files = [e for e in entries if not e.is_dir]
+    lines += ["", f"Total: {len(files)} files, {len(entries) - len(files)} directories",
+              f"Combined size: {_fmt_size(sum(e.size for e in files))}"]
+    return _text("\n".join(lines))
+
+def _tree(path: str) -> List[Dict[str, Any]]:
+    out = []
+    for e in CACHE.entries(path, with_stat=False):
+        node: Dict[str, Any] = {"name": e.name, "type": "directory" if e.is_dir else "file"}
+        if e.is_dir:
+            node["children"] = _tree(os.path.join(path, e.name))
+        out.append(node)
+    return out
+
+def directory_tree(a: Dict[str, Any]) -> Dict[str, Any]:
+    return _text(json.dumps(_tree(resolve(a.get("path"))), indent=2))
+
+# -------- Búsqueda --------
+def _excluded(rel: str, name: str, patterns: List[str]) -> bool:
+    for p in patterns:
+        if "*" not in p and "?" not in p:
+            if p in rel.split(os.sep):
+                return True  # node: '**/<p>/**'
+        elif fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p):
+            return True
+    return False
+
+def _walk(root: str, start: str, needle: str, excludes: List[str]) -> List[str]:
+    hits: List[str] = []
+    stack = [start]
+    while stack:
+        d = stack.pop()
+        try:
+            entries = CACHE.entries(d, with_stat=False)
+        except OSError:
+            continue
+        for e in entries:
+            full = os.path.join(d, e.name)
+            if excludes and _excluded(os.path.relpath(full, root), e.name, excludes):
+                continue
+            if needle in e.name.lower():
+                hits.append(full)
+            if e.is_dir:
+                stack.append(full)
+    return hits
+
+def search_files(a: Dict[str, Any]) -> Dict[str, Any]:
+    root = resolve(a.get("path"))
+    needle = str(a.get("pattern") or "").lower()
+    excludes = list(a.get("excludePatterns") or [])
+    hits: List[str] = []
+    subdirs: List[str] = []
+    for e in CACHE.entries(root, with_stat=False):
+        full = os.path.join(root, e.name)
+        if excludes and _excluded(e.name, e.name, excludes):
+            continue
+        if needle in e.name.lower():
+            hits.append(full)
+        if e.is_dir:
+            subdirs.append(full)
+    if len(subdirs) > 1 and SEARCH_WORKERS > 1:
+        for part in _executor().map(lambda d: _walk(root, d, needle, excludes), subdirs):
+            hits.extend(part)
+    else:
+        for d in subdirs:
+            hits.extend(_walk(root, d, needle, excludes))
+    hits.sort()
+    return _text("\n".join(hits) if hits else "No matches found")
+
+def get_file_info(a: Dict[str, Any]) -> Dict[str, Any]:
+    path = resolve(a.get("path"))
+    st = os.stat(path)
+    ts = lambda t: datetime.fromtimestamp(t).astimezone().isoformat()
+    info = {
+        "size": st.st_size,
+        "created": ts(getattr(st, "st_birthtime", st.st_ctime)),
+        "modified": ts(st.st_mtime),
+        "accessed": ts(st.st_atime),
+        "isDirectory": "true" if stat.S_ISDIR(st.st_mode) else "false",
+        "isFile": "true" if stat.S_ISREG(st.st_mode) else "false",
+        "permissions": oct(st.st_mode)[-3:],
+    }
+    return _text("\n".join(f"{k}: {v}" for k, v in info.items()))
+
+def list_allowed_directories(a: Dict[str, Any]) -> Dict[str, Any]:
+    return _text("Allowed directories:\n" + "\n".join(ROOTS))
+
+# -------- Registro --------
+_READ_PROPS = {"path": _S, "tail": {**_N, "description": "If provided, returns only the last N lines of the file"},
+               "head": {**_N, "description": "If provided, returns only the first N lines of the file"}}
+
+_DEFS: List[Tuple[str, str, Dict[str, Any], Callable[[Dict[str, Any]], Dict[str, Any]]]] = [
+    ("read_file", "Read the complete contents of a file as text. DEPRECATED: Use read_text_file instead.",
+     _schema(_READ_PROPS, ["path"]), read_text_file),
+    ("read_text_file", "Read the complete contents of a file from the file system as text. Use 'head' or 'tail' "
+     "to read only the first or last N lines.", _schema(_READ_PROPS, ["path"]), read_text_file),
+    ("read_media_file", "Read an image or audio file. Returns the base64 encoded data and MIME type.",
+     _schema({"path": _S}, ["path"]), read_media_file),
+    ("read_multiple_files", "Read the contents of multiple files simultaneously. Failed reads for individual "
+     "files won't stop the entire operation.",
+     _schema({"paths": {"type": "array", "items": _S}}, ["paths"]), read_multiple_files),
+    ("write_file", "Create a new file or completely overwrite an existing file with new content.",
+     _schema({"path": _S, "content": _S}, ["path", "content"]), write_file),
+    ("edit_file", "Make line-based edits to a text file. Each edit replaces exact line sequences with new content. "
+     "Returns a git-style diff showing the changes made.",
+     _schema({"path": _S, "edits": {"type": "array", "items": {
+         "type": "object", "properties": {"oldText": {**_S, "description": "Text to search for - must match exactly"},
+                                          "newText": {**_S, "description": "Text to replace with"}},
+         "required": ["oldText", "newText"], "additionalProperties": False}},
+              "dryRun": {"type": "boolean", "default": False, "description": "Preview changes using git-style diff format"}},
+             ["path", "edits"]), edit_file),
+    ("create_directory", "Create a new directory or ensure a directory exists, including nested directories.",
+     _schema({"path": _S}, ["path"]), create_directory),
+    ("list_directory", "Get a detailed listing of all files and directories in a specified path. "
+     "Results distinguish files and directories with [FILE] and [DIR] prefixes.",
+     _schema({"path": _S}, ["path"]), list_directory),
+    ("list_directory_with_sizes", "Get a detailed listing of all files and directories in a specified path, "
+     "including sizes.", _schema({"path": _S, "sortBy": {"type": "string", "enum": ["name", "size"], "default": "name",
+                                                        "description": "Sort entries by name or size"}}, ["path"]),
+     list_directory_with_sizes),
+    ("directory_tree", "Get a recursive tree view of files and directories as a JSON structure.",
+     _schema({"path": _S}, ["path"]), directory_tree),
+    ("move_file", "Move or rename files and directories.",
+     _schema({"source": _S, "destination": _S}, ["source", "destination"]), move_file),
+    ("search_files", "Recursively search for files and directories matching a pattern "
+     "(case-insensitive substring of the name).",
+     _schema({"path": _S, "pattern": _S, "excludePatterns": {"type": "array", "items": _S, "default": []}},
+             ["path", "pattern"]), search_files),
+    ("get_file_info", "Retrieve detailed metadata about a file or directory.",
+     _schema({"path": _S}, ["path"]), get_file_info),
+    ("list_allowed_directories", "Returns the list of directories that this server is allowed to access.",
+     _schema({}, []), list_allowed_directories),
+]
+
+TOOLS: List[Dict[str, Any]] = [{"name": n, "description": d, "inputSchema": s} for n, d, s, _ in _DEFS]
+TOOL_IMPL: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {n: f for n, _, _, f in _DEFS}
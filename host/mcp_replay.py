@@ -0,0 +1,292 @@
+"""
+Record & replay del tráfico MCP registrado en logs/mcp_<name>.jsonl.
+
+MCPServer/MCPHttpServer ya registran cada mensaje ({"ts", "dir": "out"|"in", "obj"}).
+Este script reutiliza esos logs de dos formas:
+
+  drive  reenvía los requests grabados a un servidor vivo respetando el ritmo
+         original (o acelerado con --speed) y compara la latencia con la grabada.
+         La latencia se mide desde el instante programado: si el servidor se
+         atrasa, el atraso se ve en la cola de la distribución.
+
+  serve  servidor MCP por stdio que contesta con las respuestas grabadas
+         (initialize, tools/list y tools/call por nombre + argumentos), para
+         correr el chat/UI o bench_load sin npx, GitHub ni red.
+         MCP_REPLAY_DIR=logs hace que MCPFleet use este modo para fs/gh.
+
+Los logs viejos no traen "ts": en ese caso drive usa --gap-ms entre requests y
+serve responde sin demora.
+
+Uso:
+    python host/mcp_replay.py drive logs/mcp_filesystem.jsonl --launch "npx -y @modelcontextprotocol/server-filesystem ./Filesystem" [--speed 10]
+    python host/mcp_replay.py drive logs/mcp_invest.jsonl --invest [--speed 0] [--parallel]
+    python host/mcp_replay.py drive logs/mcp_local.jsonl --url http://127.0.0.1:8000 [--rpc-path /rpc]
+    python host/mcp_replay.py serve logs/mcp_github.jsonl [--delay recorded|none|<ms>] [--speed 1]
+"""
+import sys, os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import argparse, json, shlex, threading, time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+HANDSHAKE = ("initialize", "notifications/initialized", "shutdown")
+
+# -------- Lectura del log --------
+class Exchange:
+    """Un request grabado y (si llegó) su respuesta."""
+    __slots__ = ("method", "params", "ts", "response", "latency_ms")
+
+    def __init__(self, method: str, params: Dict[str, Any], ts: Optional[float]):
+        self.method = method
+        self.params = params
+        self.ts = ts
+        self.response: Optional[Dict[str, Any]] = None
+        self.latency_ms: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return f"tools/call:{self.params.get('name')}" if self.method == "tools/call" else self.method
+
+def load_sessions(path: str) -> List[List[Exchange]]:
+    """
+    Agrupa el log en sesiones (cada initialize abre una) y empareja respuestas
+    por id dentro de la sesión. Ignora stderr, meta y basura de framing.
+    """
+    sessions: List[List[Exchange]] = []
+    pending: Dict[Any, Exchange] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            obj, ts = rec.get("obj"), rec.get("ts")
+            if not isinstance(obj, dict):
+                continue
+            if rec.get("dir") == "out" and "method" in obj:
+                if obj["method"] == "initialize" or not sessions:
+                    sessions.append([])
+                    pending = {}
+                ex = Exchange(obj["method"], obj.get("params") or {}, ts)
+                sessions[-1].append(ex)
+                if "id" in obj:
+                    pending[obj["id"]] = ex
+            elif rec.get("dir") == "in" and "id" in obj and "method" not in obj:
+                ex = pending.pop(obj["id"], None)
+                if ex is not None:
+                    ex.response = obj
+                    if ex.ts is not None and ts is not None:
+                        ex.latency_ms = (ts - ex.ts) * 1000.0
+    return [s for s in sessions if s]
+
+# -------- drive --------
+def _pct(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else 0.0
+
+def _client(args):
+    # chatbot.config exige OPENAI_API_KEY; el replay no usa el LLM y debe correr sin credenciales
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    from chatbot.mcp_runtime import MCPServer, MCPHttpServer
+    if args.url:
+        return MCPHttpServer("replay", args.url, args.rpc_path)
+    launch = [sys.executable, "-m", "invest_mcp.main"] if args.invest else shlex.split(args.launch)
+    return MCPServer("replay", launch)
+
+def _call(cli, ex: Exchange, timeout: float) -> Dict[str, Any]:
+    from chatbot.mcp_runtime import MCPHttpServer
+    params = dict(ex.params)
+    params.pop("_meta", None)  # tokens de progreso / traceparent de la grabación
+    if isinstance(cli, MCPHttpServer):
+        if ex.method == "tools/call":
+            return cli.tools_call(params.get("name"), params.get("arguments") or {}, timeout=timeout)
+        cli.seq += 1
+        rsp = cli._send({"jsonrpc": "2.0", "id": cli.seq, "method": ex.method, "params": params}, timeout=timeout)
+        if "error" in rsp:
+            raise RuntimeError(json.dumps(rsp["error"]))
+        return rsp.get("result") or {}
+    return cli.request(ex.method, params, timeout=timeout)
+
+def _drive_session(args, session: List[Exchange], stats: Dict[str, Dict[str, List[float]]],
+                   lock: threading.Lock) -> None:
+    cli = _client(args)
+    cli.start()
+    calls = [ex for ex in session if ex.method not in HANDSHAKE and
+             (not args.only or ex.label.split(":")[-1] in args.only or ex.method in args.only)]
+    t_rec0 = next((ex.ts for ex in calls if ex.ts is not None), None)
+    t0 = time.perf_counter()
+    prev_at = 0.0
+    try:
+        for i, ex in enumerate(calls):
+            if args.speed > 0 and t_rec0 is not None and ex.ts is not None:
+                at = (ex.ts - t_rec0) / args.speed
+            else:
+                at = prev_at + (args.gap_ms / 1000.0 if i else 0.0)
+            prev_at = at
+            wait = t0 + at - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            sched = t0 + at
+            ok = True
+            try:
+                res = _call(cli, ex, args.timeout)
+                ok = not (isinstance(res, dict) and res.get("isError"))
+            except Exception:
+                ok = False
+            dt = (time.perf_counter() - sched) * 1000.0
+            rec_ok = ex.response is not None and "error" not in ex.response and \
+                not (ex.response.get("result") or {}).get("isError")
+            with lock:
+                st = stats[ex.label]
+                st["replay"].append(dt)
+                if ex.latency_ms is not None:
+                    st["recorded"].append(ex.latency_ms)
+                if not ok:
+                    st["errors"].append(1.0)
+                if ex.response is not None and ok != rec_ok:
+                    st["mismatch"].append(1.0)
+    finally:
+        cli.stop()
+
+def drive(args) -> int:
+    sessions = load_sessions(args.log)
+    if args.sessions:
+        sessions = sessions[-args.sessions:]
+    stats: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+    if args.parallel:
+        threads = [threading.Thread(target=_drive_session, args=(args, s, stats, lock)) for s in sessions]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    else:
+        for s in sessions:
+            _drive_session(args, s, stats, lock)
+    elapsed = time.perf_counter() - t0
+    total = sum(len(v["replay"]) for v in stats.values())
+    print(f"{len(sessions)} sesiones, {total} requests en {elapsed:.2f}s "
+          f"({'paralelo' if args.parallel else 'secuencial'}, speed={args.speed or 'máx'})")
+    print(f"{'request':<36} {'n':>5} {'err':>4} {'≠grab':>5} {'p50':>9} {'p99':>9} {'grab p50':>9} {'grab p99':>9}")
+    for label, st in sorted(stats.items()):
+        rp, rc = st["replay"], st["recorded"]
+        print(f"{label[:36]:<36} {len(rp):>5} {len(st['errors']):>4} {len(st['mismatch']):>5} "
+              f"{_pct(rp, .5):>9.1f} {_pct(rp, .99):>9.1f} "
+              f"{(f'{_pct(rc, .5):9.1f}' if rc else '        -')} {(f'{_pct(rc, .99):9.1f}' if rc else '        -')}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({k: {kk: vv for kk, vv in v.items()} for k, v in stats.items()}, f)
+    return 0
+
+# -------- serve --------
+def _key(name: Any, arguments: Any) -> Tuple[str, str]:
+    return str(name), json.dumps(arguments or {}, sort_keys=True)
+
+class ReplayServer:
+    """Respuestas grabadas indexadas por método y, para tools/call, por (nombre, argumentos)."""
+    def __init__(self, sessions: List[List[Exchange]], delay: str, speed: float):
+        self.exact: Dict[Tuple[str, str], List[Exchange]] = defaultdict(list)
+        self.by_name: Dict[str, List[Exchange]] = defaultdict(list)
+        self.by_method: Dict[str, Exchange] = {}
+        self._rr: Dict[Any, int] = defaultdict(int)
+        self.delay, self.speed = delay, speed
+        for s in sessions:
+            for ex in s:
+                if ex.response is None:
+                    continue
+                if ex.method == "tools/call":
+                    self.exact[_key(ex.params.get("name"), ex.params.get("arguments"))].append(ex)
+                    self.by_name[str(ex.params.get("name"))].append(ex)
+                else:
+                    self.by_method[ex.method] = ex  # la última grabada
+
+    def _next(self, key: Any, options: List[Exchange]) -> Exchange:
+        i = self._rr[key] % len(options)
+        self._rr[key] += 1
+        return options[i]
+
+    def lookup(self, method: str, params: Dict[str, Any]) -> Optional[Exchange]:
+        if method == "tools/call":
+            k = _key(params.get("name"), params.get("arguments"))
+            if self.exact.get(k):
+                return self._next(k, self.exact[k])
+            by_name = self.by_name.get(str(params.get("name")))
+            return self._next(params.get("name"), by_name) if by_name else None
+        return self.by_method.get(method)
+
+    def _sleep(self, ex: Exchange) -> None:
+        if self.delay == "none":
+            return
+        if self.delay == "recorded":
+            if ex.latency_ms is not None and self.speed > 0:
+                time.sleep(ex.latency_ms / 1000.0 / self.speed)
+            return
+        time.sleep(float(self.delay) / 1000.0)
+
+    def handle(self, msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        mid, method = msg.get("id"), msg.get("method")
+        if mid is None:
+            return None
+        if method == "shutdown":
+            return {"jsonrpc": "2.0", "id": mid, "result": {}}
+        ex = self.lookup(method, msg.get("params") or {})
+        if ex is None:
+            if method == "tools/list":
+                return {"jsonrpc": "2.0", "id": mid, "result": {"tools": self._synth_tools()}}
+            return {"jsonrpc": "2.0", "id": mid, "error": {"code": -32601,
+                    "message": f"mcp_replay: sin respuesta grabada para {method}"}}
+        self._sleep(ex)
+        rsp = {k: v for k, v in ex.response.items() if k != "id"}
+        rsp["id"] = mid
+        return rsp
+
+    def _synth_tools(self) -> List[Dict[str, Any]]:
+        # Log sin tools/list grabado: se anuncian las tools que sí tienen respuestas
+        return [{"name": n, "description": "replay", "inputSchema": {"type": "object"}} for n in sorted(self.by_name)]
+
+def serve(args) -> int:
+    srv = ReplayServer(load_sessions(args.log), args.delay, args.speed)
+    for raw in sys.stdin:
+        if not raw.strip():
+            continue
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            continue
+        rsp = srv.handle(msg)
+        if rsp is not None:
+            sys.stdout.write(json.dumps(rsp, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+        if msg.get("method") == "shutdown":
+            break
+    return 0
+
+def main():
+    ap = argparse.ArgumentParser(description="Record & replay de logs MCP (mcp_<name>.jsonl)")
+    sub = ap.add_subparsers(dest="mode", required=True)
+    d = sub.add_parser("drive", help="Reenviar los requests grabados a un servidor vivo")
+    d.add_argument("log")
+    tgt = d.add_mutually_exclusive_group(required=True)
+    tgt.add_argument("--launch", help="Comando del servidor stdio")
+    tgt.add_argument("--invest", action="store_true", help="python -m invest_mcp.main")
+    tgt.add_argument("--url", help="Servidor HTTP (MCPHttpServer)")
+    d.add_argument("--rpc-path", default="")
+    d.add_argument("--speed", type=float, default=1.0, help="1 = ritmo original, 10 = 10x, 0 = sin esperas")
+    d.add_argument("--gap-ms", type=float, default=0.0, help="Separación si el log no tiene ts")
+    d.add_argument("--parallel", action="store_true", help="Cada sesión grabada en su propio cliente, a la vez")
+    d.add_argument("--sessions", type=int, default=0, help="Solo las N últimas sesiones")
+    d.add_argument("--only", nargs="*", default=[], help="Métodos o tools a incluir")
+    d.add_argument("--timeout", type=float, default=30.0)
+    d.add_argument("--out", default="", help="Guardar latencias (JSON)")
+    s = sub.add_parser("serve", help="Servidor stdio que contesta con las respuestas grabadas")
+    s.add_argument("log")
+    s.add_argument("--delay", default="none", help="none | recorded | <ms fijos>")
+    s.add_argument("--speed", type=float, default=1.0, help="Divide la demora grabada")
+    args = ap.parse_args()
+    sys.exit(drive(args) if args.mode == "drive" else serve(args))
+
+if __name__ == "__main__":
+    main()
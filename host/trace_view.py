@@ -0,0 +1,87 @@
+"""
+Vista en consola de las trazas exportadas con INVEST_MCP_TRACE=file:<ruta>.
+
+Lee las líneas OTLP/JSON (host y servidores escriben al mismo archivo), arma el
+árbol de spans de cada traza y muestra la latencia por salto, para ver en qué
+se fue el tiempo de un turno de chat.
+
+Uso:
+    python host/trace_view.py logs/traces.jsonl [--last 5] [--trace <traceId>] [--min-ms 0]
+"""
+import argparse, json
+from collections import defaultdict
+from typing import Any, Dict, List
+
+def _value(v: Dict[str, Any]) -> Any:
+    for k in ("stringValue", "intValue", "doubleValue", "boolValue"):
+        if k in v:
+            return v[k]
+    return None
+
+def load(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            for rs in json.loads(line).get("resourceSpans", []):
+                res = {a["key"]: _value(a["value"]) for a in rs.get("resource", {}).get("attributes", [])}
+                for ss in rs.get("scopeSpans", []):
+                    for sp in ss.get("spans", []):
+                        sp["service"] = res.get("service.name", "?")
+                        sp["attrs"] = {a["key"]: _value(a["value"]) for a in sp.get("attributes", [])}
+                        sp["startNs"] = int(sp["startTimeUnixNano"])
+                        sp["durMs"] = (int(sp["endTimeUnixNano"]) - sp["startNs"]) / 1e6
+                        traces[sp["traceId"]].append(sp)
+    return traces
+
+_SHOW = ("mcp.server", "mcp.tool", "cache.kind", "cache.result", "http.status_code", "llm.model")
+
+def render(spans: List[Dict[str, Any]], min_ms: float = 0.0) -> List[str]:
+    by_id = {s["spanId"]: s for s in spans}
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    roots = []
+    for s in spans:
+        p = s.get("parentSpanId")
+        (children[p] if p in by_id else roots).append(s)
+    t0 = min(s["startNs"] for s in spans)
+    out: List[str] = []
+
+    def walk(s: Dict[str, Any], depth: int):
+        if s["durMs"] < min_ms and depth > 0:
+            return
+        extra = " ".join(f"{k}={s['attrs'][k]}" for k in _SHOW if k in s["attrs"])
+        err = " ERROR" if (s.get("status") or {}).get("code") == 2 else ""
+        out.append(f"{(s['startNs'] - t0) / 1e6:>9.1f} {s['durMs']:>9.1f}  {'  ' * depth}{s['name']} "
+                   f"[{s['service']}]{err} {extra}".rstrip())
+        for c in sorted(children[s["spanId"]], key=lambda x: x["startNs"]):
+            walk(c, depth + 1)
+
+    for r in sorted(roots, key=lambda x: x["startNs"]):
+        walk(r, 0)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Árbol de spans por traza (OTLP/JSON)")
+    ap.add_argument("path")
+    ap.add_argument("--last", type=int, default=5, help="Cuántas trazas (las más recientes)")
+    ap.add_argument("--trace", default="", help="Solo esta traza")
+    ap.add_argument("--min-ms", type=float, default=0.0, help="Oculta spans más cortos")
+    args = ap.parse_args()
+
+    traces = load(args.path)
+    ids = [args.trace] if args.trace else \
+        sorted(traces, key=lambda t: min(s["startNs"] for s in traces[t]))[-args.last:]
+    for tid in ids:
+        spans = traces.get(tid) or []
+        if not spans:
+            print(f"traza {tid}: sin spans")
+            continue
+        print(f"\ntraza {tid} ({len(spans)} spans)")
+        print(f"{'inicio ms':>9} {'dur ms':>9}  span")
+        for line in render(spans, args.min_ms):
+            print(line)
+
+if __name__ == "__main__":
+    main()
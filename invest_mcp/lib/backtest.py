@@ -0,0 +1,281 @@
+# invest_mcp/lib/backtest.py
+from __future__ import annotations
+import os, itertools
+from datetime import date
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from multiprocessing import shared_memory
+import numpy as np
+
+from .context import check
+from .procpool import process_pool, terminate, wait_any
+
+TRADING_DAYS = 252
+
+# -------- Caminos de precios (retornos brutos P x T x N) --------
+def history_to_gross(hist: Dict[str, List[float]], symbols: List[str]) -> np.ndarray:
+    """
+    Convierte precios alineados por longitud en retornos brutos diarios (T x N).
+    """
+    L = min(len(hist[s]) for s in symbols)
+    P = np.array([hist[s][-L:] for s in symbols], dtype=np.float64).T  # L x N
+    return P[1:] / P[:-1]
+
+def make_paths(gross_hist: np.ndarray, mode: str, n_paths: int, n_days: int,
+               seed: int = 7, block_days: int = 21) -> np.ndarray:
+    """
+    Genera caminos (P x T x N) de retornos brutos:
+      - historical: el histórico tal cual (P=1, T=len(hist))
+      - bootstrap:  block bootstrap de filas históricas (preserva correlación)
+      - gbm:        log-retornos normales multivariados con media/cov históricas
+    """
+    if mode == "historical":
+        return np.ascontiguousarray(gross_hist[-n_days:][None, :, :])
+
+    rng = np.random.default_rng(seed)
+    H, N = gross_hist.shape
+    if mode == "bootstrap":
+        b = max(1, min(int(block_days), H))
+        n_blocks = -(-n_days // b)
+        starts = rng.integers(0, H - b + 1, size=(n_paths, n_blocks))
+        idx = (starts[:, :, None] + np.arange(b)[None, None, :]).reshape(n_paths, -1)[:, :n_days]
+        return np.ascontiguousarray(gross_hist[idx])
+
+    if mode == "gbm":
+        logr = np.log(gross_hist)
+        mu = logr.mean(axis=0)
+        cov = np.atleast_2d(np.cov(logr, rowvar=False))
+        z = rng.multivariate_normal(mu, cov, size=(n_paths, n_days), method="cholesky")
+        return np.exp(z)
+
+    raise ValueError(f"pathMode desconocido: {mode}")
+
+def business_days(n: int, end: Optional[date] = None) -> np.ndarray:
+    """Últimos n días hábiles (L-V) hasta 'end' inclusive."""
+    end64 = np.datetime64(end or date.today(), "D")
+    span = np.arange(end64 - np.timedelta64(int(n * 1.5) + 10, "D"), end64 + np.timedelta64(1, "D"))
+    days = span[np.is_busday(span)]
+    return days[-n:]
+
+def calendar_mask(dates: np.ndarray, frequency: str) -> np.ndarray:
+    """
+    True en el último día hábil de cada mes/trimestre/año.
+    """
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    if frequency == "monthly":
+        key = months
+    elif frequency == "quarterly":
+        key = months // 3
+    elif frequency == "annual":
+        key = months // 12
+    else:
+        raise ValueError(f"frequency desconocida: {frequency}")
+    mask = np.zeros(len(dates), dtype=bool)
+    mask[:-1] = key[1:] != key[:-1]
+    return mask
+
+# -------- Estrategias --------
+def expand_strategies(strategies: List[Dict[str, Any]], grid: Optional[Dict[str, Any]],
+                      default_cost_bps: float) -> List[Dict[str, Any]]:
+    """
+    Une la lista explícita con el producto cartesiano del grid:
+      grid = {periodDays:[...], thresholds:[...], calendar:[...], costBps:[...]}
+    """
+    out: List[Dict[str, Any]] = []
+    for s in strategies or []:
+        if not isinstance(s, dict):
+            raise ValueError("Cada estrategia debe ser object")
+        out.append({**s, "costBps": float(s.get("costBps", default_cost_bps))})
+    if grid:
+        costs = grid.get("costBps") or [default_cost_bps]
+        for p, c in itertools.product(grid.get("periodDays") or [], costs):
+            out.append({"mode": "periodic", "periodDays": int(p), "costBps": float(c)})
+        for th, c in itertools.product(grid.get("thresholds") or [], costs):
+            out.append({"mode": "threshold", "threshold": float(th), "costBps": float(c)})
+        for fr, c in itertools.product(grid.get("calendar") or [], costs):
+            out.append({"mode": "calendar", "frequency": str(fr), "costBps": float(c)})
+    for i, s in enumerate(out):
+        mode = s.get("mode")
+        if mode == "periodic" and int(s.get("periodDays", 0)) < 1:
+            raise ValueError("periodDays debe ser >= 1")
+        if mode == "threshold" and float(s.get("threshold", 0)) <= 0:
+            raise ValueError("threshold debe ser > 0")
+        if mode == "calendar" and s.get("frequency") not in ("monthly", "quarterly", "annual"):
+            raise ValueError("frequency debe ser monthly|quarterly|annual")
+        if mode not in ("periodic", "threshold", "calendar", "none"):
+            raise ValueError(f"mode desconocido: {mode}")
+        s["id"] = i
+    return out
+
+def _rebalance_days(mode: str, T: int, period: int, cal: Optional[np.ndarray]) -> np.ndarray:
+    if mode == "periodic":
+        return np.arange(period - 1, T, period)
+    if mode == "calendar":
+        return np.flatnonzero(cal[:T])
+    return np.empty(0, dtype=np.int64)
+
+def simulate(gross: np.ndarray, target: np.ndarray, strat: Dict[str, Any],
+             cal: Optional[np.ndarray], rf: float = 0.02) -> Dict[str, Any]:
+    """
+    Simula una estrategia sobre todos los caminos a la vez (vectorizado en P).
+    Costos = turnover * costBps, descontados del valor del portafolio.
+    Periódico/calendario avanzan por segmentos entre rebalanceos (cumprod);
+    umbral necesita revisar la deriva día a día. Ambos bucles pasan por
+    check(): una llamada cancelada no termina la estrategia en curso.
+    """
+    P, T, N = gross.shape
+    mode = strat["mode"]
+    cost_rate = float(strat.get("costBps", 0.0)) / 1e4
+    period = int(strat.get("periodDays", 0))
+    thr = float(strat.get("threshold", 0.0))
+
+    values = np.empty((P, T))
+    turnover = np.zeros(P)
+    costs = np.zeros(P)
+    n_reb = np.zeros(P)
+
+    if mode != "threshold":
+        v = np.ones(P)
+        s = 0
+        ends = [(int(e), True) for e in _rebalance_days(mode, T, period, cal)]
+        if not ends or ends[-1][0] != T - 1:
+            ends.append((T - 1, False))
+        for e, rebalance in ends:
+            check()
+            G = np.cumprod(gross[:, s:e + 1, :], axis=1)
+            values[:, s:e + 1] = v[:, None] * (G @ target)
+            if rebalance:
+                total = values[:, e]
+                h = v[:, None] * target * G[:, -1, :]
+                traded = np.abs(total[:, None] * target - h).sum(axis=1)
+                cost = traded * cost_rate
+                turnover += traded / total
+                costs += cost / total
+                n_reb += 1
+                v = total - cost
+                values[:, e] = v
+            s = e + 1
+    else:
+        h = np.tile(target, (P, 1))
+        for t in range(T):
+            if t % TRADING_DAYS == 0:
+                check()
+            h *= gross[:, t, :]
+            total = h.sum(axis=1)
+            mask = np.abs(h / total[:, None] - target).max(axis=1) > thr
+            if mask.any():
+                traded = np.abs(total[mask][:, None] * target - h[mask]).sum(axis=1)
+                cost = traded * cost_rate
+                h[mask] = (total[mask] - cost)[:, None] * target
+                turnover[mask] += traded / total[mask]
+                costs[mask] += cost / total[mask]
+                n_reb[mask] += 1
+                total = h.sum(axis=1)
+            values[:, t] = total
+
+    years = T / TRADING_DAYS
+    cagr = values[:, -1] ** (1.0 / years) - 1.0
+    daily = np.empty_like(values)
+    daily[:, 0] = values[:, 0] - 1.0
+    daily[:, 1:] = values[:, 1:] / values[:, :-1] - 1.0
+    vol = daily.std(axis=1) * np.sqrt(TRADING_DAYS)
+    peak = np.maximum.accumulate(np.maximum(values, 1.0), axis=1)
+    mdd = (1.0 - values / peak).max(axis=1)
+    sharpe = np.where(vol > 0, (cagr - rf) / np.where(vol > 0, vol, 1.0), 0.0)
+
+    p05, p50, p95 = np.percentile(cagr, [5, 50, 95])
+    params = {k: strat[k] for k in ("periodDays", "threshold", "frequency") if k in strat}
+    return {
+        "id": strat["id"],
+        "mode": mode,
+        **params,
+        "costBps": float(strat.get("costBps", 0.0)),
+        "cagrMean": float(cagr.mean()),
+        "cagrP05": float(p05),
+        "cagrP50": float(p50),
+        "cagrP95": float(p95),
+        "volAnnual": float(vol.mean()),
+        "sharpe": float(sharpe.mean()),
+        "maxDrawdown": float(mdd.mean()),
+        "turnoverAnnual": float(turnover.mean() / years),
+        "costDragAnnual": float(costs.mean() / years),
+        "rebalancesPerYear": float(n_reb.mean() / years),
+    }
+
+# -------- Pool de procesos con memoria compartida --------
+_W: Dict[str, Any] = {}
+
+def _worker_init(shm_name: str, shape: Tuple[int, ...], target: List[float],
+                 dates: Optional[List[str]], rf: float) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _W["shm"] = shm  # mantener referencia viva mientras viva el worker
+    _W["gross"] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _W["target"] = np.asarray(target, dtype=np.float64)
+    _W["dates"] = np.asarray(dates, dtype="datetime64[D]") if dates else None
+    _W["rf"] = rf
+
+def _worker_run(strats: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return _run_batch(_W["gross"], _W["target"], _W["dates"], strats, _W["rf"])
+
+def _run_batch(gross: np.ndarray, target: np.ndarray, dates: Optional[np.ndarray],
+               strats: List[Dict[str, Any]], rf: float,
+               on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    cals: Dict[str, np.ndarray] = {}
+    out = []
+    for s in strats:
+        cal = None
+        if s["mode"] == "calendar":
+            fr = s["frequency"]
+            if fr not in cals:
+                cals[fr] = calendar_mask(dates, fr)
+            cal = cals[fr]
+        out.append(simulate(gross, target, s, cal, rf))
+        if on_result is not None:
+            on_result(out[-1])
+    return out
+
+def run_grid(gross: np.ndarray, target: np.ndarray, strats: List[Dict[str, Any]],
+             workers: int = 0, rf: float = 0.02,
+             on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Evalúa todas las estrategias. Con workers > 1 reparte lotes entre procesos
+    que leen los caminos desde un bloque de memoria compartida (sin copiar/pickle).
+    on_result se llama en este proceso con cada resultado a medida que se completa.
+    """
+    T = gross.shape[1]
+    dates = business_days(T)
+    if workers <= 1 or len(strats) < 2:
+        return _run_batch(gross, target, dates, strats, rf, on_result)
+
+    workers = min(workers, len(strats))
+    shm = shared_memory.SharedMemory(create=True, size=gross.nbytes)
+    try:
+        buf = np.ndarray(gross.shape, dtype=np.float64, buffer=shm.buf)
+        buf[...] = gross
+        del buf
+        chunk = max(1, -(-len(strats) // (workers * 4)))
+        batches = [strats[i:i + chunk] for i in range(0, len(strats), chunk)]
+        init = (shm.name, gross.shape, target.tolist(), [str(d) for d in dates], rf)
+        ex = process_pool(workers, initializer=_worker_init, initargs=init)
+        results = []
+        try:
+            pending = {ex.submit(_worker_run, b) for b in batches}
+            while pending:
+                done = wait_any(pending)
+                pending -= done
+                for fut in done:
+                    part = fut.result()
+                    results.extend(part)
+                    if on_result is not None:
+                        for r in part:
+                            on_result(r)
+        except BaseException:
+            terminate(ex)  # p. ej. Cancelled: no espera los lotes en curso
+            raise
+        ex.shutdown()
+    finally:
+        shm.close()
+        shm.unlink()
+    return sorted(results, key=lambda r: r["id"])
+
+def default_workers() -> int:
+    return max(1, min(4, os.cpu_count() or 1))
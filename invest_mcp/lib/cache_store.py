@@ -0,0 +1,354 @@
+# invest_mcp/lib/cache_store.py
+from __future__ import annotations
+import atexit, gzip, hashlib, json, os, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+from . import metrics
+
+# Cache en disco de data_live (INVEST_MCP_CACHE_DIR): un archivo por clave
+# (<sha256>.json, o .json.gz comprimido) y un índice en memoria con timestamp,
+# tamaño, último acceso y hits de cada entrada, persistido en index.json.
+#
+#   * Un hit dentro del TTL no hace stat: el índice dice la edad y solo se abre el
+#     archivo. Un stat por clave solo cuando el índice no la tiene o la da por
+#     vencida (otro proceso que comparte el directorio pudo escribirla; un miss
+#     termina en un request al proveedor y el stat no se nota).
+#   * Presupuesto en bytes y en entradas: al pasarlo se desaloja por LRU (último
+#     acceso) o LFU (hits) hasta LOW_WATER del límite, así no se ordena en cada put.
+#   * Un hilo daemon persiste el índice cada FLUSH_S y cada SWEEP_S borra lo que
+#     pasó el TTL duro (nadie lo va a servir), incluidas claves que ya no se piden.
+#   * Al cargar, index.json se cruza con un listado del directorio: archivos de
+#     otros procesos o de versiones anteriores entran al índice por su mtime.
+
+MAX_BYTES = int(float(os.environ.get("INVEST_MCP_CACHE_MAX_MB", "256")) * 1024 * 1024)
+MAX_ENTRIES = int(os.environ.get("INVEST_MCP_CACHE_MAX_ENTRIES", "20000"))
+POLICY = os.environ.get("INVEST_MCP_CACHE_POLICY", "lru").strip().lower()
+COMPRESS = os.environ.get("INVEST_MCP_CACHE_COMPRESS", "0") == "1"
+COMPRESS_MIN = int(os.environ.get("INVEST_MCP_CACHE_COMPRESS_MIN", "2048"))
+SWEEP_S = float(os.environ.get("INVEST_MCP_CACHE_SWEEP_S", "300"))
+FLUSH_S = 5.0
+LOW_WATER = 0.9
+INDEX = "index.json"
+_EXT = {"json": ".json", "gz": ".json.gz"}
+
+def key_hash(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def _parse(name: str) -> Tuple[Optional[str], str]:
+    """(hash, codificación) de un archivo de entrada; (None, '') si no es una."""
+    if name.endswith(".json.gz"):
+        h, enc = name[:-8], "gz"
+    elif name.endswith(".json"):
+        h, enc = name[:-5], "json"
+    else:
+        return None, ""
+    if len(h) != 64 or any(c not in "0123456789abcdef" for c in h):
+        return None, ""
+    return h, enc
+
+class _Entry:
+    __slots__ = ("key", "ts", "size", "at", "hits", "enc")
+
+    def __init__(self, key: Optional[str], ts: float, size: int, at: float, hits: int, enc: str):
+        self.key = key      # None si se conoce solo por el archivo (otro proceso, versión anterior)
+        self.ts = ts        # cuándo se guardó
+        self.size = size    # bytes en disco
+        self.at = at        # último acceso (LRU)
+        self.hits = hits    # lecturas (LFU)
+        self.enc = enc
+
+    def to_list(self) -> List[Any]:
+        return [self.key, self.ts, self.size, self.at, self.hits, self.enc]
+
+class CacheStore:
+    def __init__(self, root: str, ttl: float = 86400.0):
+        self.root = root
+        self.ttl = ttl  # TTL duro: más viejo que esto se borra en el barrido
+        self._lock = threading.Lock()
+        self._idx: Dict[str, _Entry] = {}
+        self._bytes = 0
+        self._loaded = False
+        self._made = False
+        self._dirty = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.counts = {"hits": 0, "misses": 0, "statChecks": 0, "writes": 0, "evicted": 0,
+                       "expired": 0, "rawBytes": 0, "storedBytes": 0}
+        self.last_sweep: Optional[Dict[str, Any]] = None
+
+    def _path(self, h: str, enc: str) -> str:
+        return os.path.join(self.root, h + _EXT[enc])
+
+    # ----- índice -----
+    def _load(self) -> None:
+        """Carga index.json y lo cruza con el directorio (bajo el lock, una vez)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        saved: Dict[str, List[Any]] = {}
+        try:
+            with open(os.path.join(self.root, INDEX), "r", encoding="utf-8") as f:
+                saved = json.load(f).get("entries") or {}
+        except (OSError, ValueError, AttributeError):
+            pass
+        try:
+            it = os.scandir(self.root)
+        except OSError:
+            it = None  # el directorio se crea en la primera escritura
+        if it is not None:
+            now = time.time()
+            with it:
+                for de in it:
+                    h, enc = _parse(de.name)
+                    if h is None:
+                        if de.name.endswith(".tmp"):
+                            self._drop_tmp(de, now)
+                        continue
+                    rec = saved.get(h)
+                    if rec is not None and len(rec) == 6 and rec[5] == enc:
+                        e = _Entry(*rec)
+                    else:
+                        try:
+                            st = de.stat()
+                        except OSError:
+                            continue
+                        e = _Entry(None, st.st_mtime, st.st_size, st.st_mtime, 0, enc)
+                    prev = self._idx.get(h)
+                    if prev is not None:  # .json y .json.gz de la misma clave: queda el más nuevo
+                        old, e = (prev, e) if prev.ts <= e.ts else (e, prev)
+                        self._bytes -= prev.size
+                        self._unlink(self._path(h, old.enc))
+                    self._idx[h] = e
+                    self._bytes += e.size
+            self._made = True
+        self._start()
+
+    @staticmethod
+    def _drop_tmp(de: "os.DirEntry", now: float) -> None:
+        try:
+            if now - de.stat().st_mtime > 60:  # escritura interrumpida
+                os.remove(de.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _adopt(self, h: str, key: str) -> Optional[_Entry]:
+        """Busca el archivo en disco (escrito por otro proceso); actualiza el índice."""
+        found = None
+        with self._lock:
+            e = self._idx.get(h)
+        # la codificación que escribe este proceso y la que ya tenía en el índice
+        for enc in dict.fromkeys(("gz" if COMPRESS else "json", e.enc if e is not None else "json")):
+            try:
+                st = os.stat(self._path(h, enc))
+            except OSError:
+                continue
+            if found is None or st.st_mtime > found[0].st_mtime:
+                found = (st, enc)
+        with self._lock:
+            self.counts["statChecks"] += 1
+            e = self._idx.get(h)
+            if found is None:
+                if e is not None:
+                    self._bytes -= e.size
+                    del self._idx[h]
+                    self._dirty = True
+                return None
+            st, enc = found
+            if e is None or st.st_mtime > e.ts or e.enc != enc:
+                if e is not None:
+                    self._bytes -= e.size
+                e = self._idx[h] = _Entry(key, st.st_mtime, st.st_size, e.at if e else st.st_mtime,
+                                          e.hits if e else 0, enc)
+                self._bytes += e.size
+                self._dirty = True
+            return e
+
+    # ----- API -----
+    def get(self, key: str, max_age: float) -> Optional[Tuple[float, Any]]:
+        """(timestamp, obj) si la entrada no tiene más de max_age s; None si no."""
+        h = key_hash(key)
+        now = time.time()
+        with self._lock:
+            self._load()
+            e = self._idx.get(h)
+        if e is None or now - e.ts > max_age:
+            e = self._adopt(h, key)
+        if e is None or now - e.ts > max_age:
+            with self._lock:
+                self.counts["misses"] += 1
+            return None
+        try:
+            with open(self._path(h, e.enc), "rb") as f:
+                data = f.read()
+            obj = json.loads(gzip.decompress(data) if e.enc == "gz" else data)
+        except Exception:
+            with self._lock:
+                self.counts["misses"] += 1
+            return None
+        with self._lock:
+            e.at = now
+            e.hits += 1
+            e.key = key
+            self.counts["hits"] += 1
+            self._dirty = True
+        return e.ts, obj
+
+    def age(self, key: str) -> Optional[float]:
+        """Segundos desde que se guardó 'key' según el índice (sin tocar el disco)."""
+        with self._lock:
+            self._load()
+            e = self._idx.get(key_hash(key))
+        return time.time() - e.ts if e is not None else None
+
+    def put(self, key: str, obj: Any) -> None:
+        raw = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        enc = "gz" if COMPRESS and len(raw) >= COMPRESS_MIN else "json"
+        data = gzip.compress(raw, compresslevel=1) if enc == "gz" else raw
+        h = key_hash(key)
+        path = self._path(h, enc)
+        if not self._made:
+            os.makedirs(self.root, exist_ok=True)
+            self._made = True
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # los lectores de otros procesos nunca ven un archivo a medias
+        now = time.time()
+        with self._lock:
+            self._load()
+            prev = self._idx.get(h)
+            if prev is not None:
+                self._bytes -= prev.size
+                if prev.enc != enc:
+                    self._unlink(self._path(h, prev.enc))
+            self._idx[h] = _Entry(key, now, len(data), now, prev.hits if prev else 0, enc)
+            self._bytes += len(data)
+            self._dirty = True
+            self.counts["writes"] += 1
+            self.counts["rawBytes"] += len(raw)
+            self.counts["storedBytes"] += len(data)
+            over = len(self._idx) > MAX_ENTRIES or self._bytes > MAX_BYTES
+        if over:
+            self.evict()
+
+    def evict(self) -> int:
+        """Desaloja (LRU o LFU) hasta LOW_WATER del presupuesto si se pasó."""
+        with self._lock:
+            if len(self._idx) <= MAX_ENTRIES and self._bytes <= MAX_BYTES:
+                return 0
+            rank = (lambda kv: (kv[1].hits, kv[1].at)) if POLICY == "lfu" else (lambda kv: kv[1].at)
+            max_n, max_b = int(MAX_ENTRIES * LOW_WATER), int(MAX_BYTES * LOW_WATER)
+            victims: List[str] = []
+            for h, e in sorted(self._idx.items(), key=rank):
+                if len(self._idx) <= max_n and self._bytes <= max_b:
+                    break
+                del self._idx[h]
+                self._bytes -= e.size
+                victims.append(self._path(h, e.enc))
+            self.counts["evicted"] += len(victims)
+            self._dirty = True
+        for p in victims:
+            self._unlink(p)
+        metrics.inc("cache_evictions_total", len(victims), reason=POLICY)
+        return len(victims)
+
+    def sweep(self) -> Dict[str, Any]:
+        """Borra lo que pasó el TTL duro, aplica el presupuesto y persiste el índice."""
+        t0 = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            self._load()
+            expired = [(h, e) for h, e in self._idx.items() if now - e.ts > self.ttl]
+            for h, e in expired:
+                del self._idx[h]
+                self._bytes -= e.size
+            self.counts["expired"] += len(expired)
+            if expired:
+                self._dirty = True
+        for h, e in expired:
+            self._unlink(self._path(h, e.enc))
+        if expired:
+            metrics.inc("cache_evictions_total", len(expired), reason="expired")
+        evicted = self.evict()
+        self.flush()
+        with self._lock:
+            metrics.gauge_set("cache_entries", len(self._idx))
+            metrics.gauge_set("cache_bytes", self._bytes)
+        self.last_sweep = {"at": now, "expired": len(expired), "evicted": evicted,
+                           "ms": round((time.perf_counter() - t0) * 1000.0, 2)}
+        return self.last_sweep
+
+    def flush(self) -> None:
+        """Escribe index.json si cambió (atómico: tmp + replace)."""
+        with self._lock:
+            if not self._dirty or not self._made:
+                return
+            entries = {h: e.to_list() for h, e in self._idx.items()}
+            self._dirty = False
+        path = os.path.join(self.root, INDEX)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"v": 1, "entries": entries}, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+    # ----- mantenimiento en segundo plano -----
+    def _start(self) -> None:
+        if self._thread is not None or SWEEP_S <= 0:
+            return
+        self._thread = threading.Thread(target=self._loop, name="invest-cache-sweep", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _loop(self) -> None:
+        next_sweep = 0.0  # el primer barrido limpia lo que quedó de corridas anteriores
+        while not self._stop.wait(0 if next_sweep == 0.0 else FLUSH_S):
+            try:
+                if time.monotonic() >= next_sweep:
+                    self.sweep()
+                    next_sweep = time.monotonic() + SWEEP_S
+                else:
+                    self.flush()
+            except Exception:
+                pass
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._load()
+            by_kind: Dict[str, Dict[str, Any]] = {}
+            oldest = None
+            for e in self._idx.values():
+                kind = e.key.split(":", 1)[0] if e.key else "unknown"
+                k = by_kind.setdefault(kind, {"entries": 0, "bytes": 0, "compressed": 0})
+                k["entries"] += 1
+                k["bytes"] += e.size
+                k["compressed"] += e.enc == "gz"
+                oldest = e.ts if oldest is None else min(oldest, e.ts)
+            counts = dict(self.counts)
+            entries, size = len(self._idx), self._bytes
+        lookups = counts["hits"] + counts["misses"]
+        try:
+            index_bytes = os.path.getsize(os.path.join(self.root, INDEX))
+        except OSError:
+            index_bytes = 0
+        return {"dir": self.root, "entries": entries, "bytes": size, "maxEntries": MAX_ENTRIES,
+                "maxBytes": MAX_BYTES, "policy": POLICY, "compress": COMPRESS, "hardTtlS": self.ttl,
+                "oldestAgeS": round(now - oldest, 1) if oldest is not None else None,
+                "hitRatio": round(counts["hits"] / lookups, 4) if lookups else None,
+                "compressionRatio": round(counts["rawBytes"] / counts["storedBytes"], 2) if counts["storedBytes"] else None,
+                "indexBytes": index_bytes, "sweepS": SWEEP_S, "lastSweep": self.last_sweep,
+                "byKind": by_kind, **counts}
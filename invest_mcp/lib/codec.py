@@ -0,0 +1,131 @@
+# invest_mcp/lib/codec.py
+from __future__ import annotations
+import base64, json, sys
+from array import array
+from typing import Any, Dict, List, Optional
+
+from .context import freshness
+
+# Codificación compacta opcional de resultados (negociada en initialize).
+#   - columnar: listas de dicts homogéneos -> {"$n": N, "$cols": {k: [..]}}
+#   - floats "b64": columnas 100% float -> {"$f64": base64(float64 little-endian)}
+#   - json "orjson": serialización rápida si orjson está instalado
+# Sin dependencias pesadas: lo importan tanto el servidor como chatbot/mcp_runtime.
+
+CAPABILITY = "invest/compact"
+MIN_ROWS = 8
+
+try:  # opcional
+    import orjson as _orjson
+except Exception:  # pragma: no cover - depende del entorno
+    _orjson = None
+
+def has_orjson() -> bool:
+    return _orjson is not None
+
+def negotiate(requested: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Recibe capabilities.experimental["invest/compact"] del cliente y devuelve lo aceptado
+    (o None si el cliente no lo pidió).
+    """
+    if not isinstance(requested, dict):
+        return None
+    accepted = {
+        "columnar": bool(requested.get("columnar", True)),
+        "floats": "b64" if requested.get("floats") == "b64" else "json",
+        "json": "orjson" if (requested.get("json") == "orjson" and has_orjson()) else "json",
+        "minRows": max(1, int(requested.get("minRows", MIN_ROWS))),
+    }
+    return accepted
+
+# -------- JSON --------
+def dumps(obj: Any, fast: bool = False) -> str:
+    if fast and _orjson is not None:
+        return _orjson.dumps(obj, option=_orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+def loads(s: str) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(s)
+    return json.loads(s)
+
+# -------- Floats empaquetados --------
+def pack_f64(values: List[float]) -> Dict[str, str]:
+    arr = array("d", values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return {"$f64": base64.b64encode(arr.tobytes()).decode("ascii")}
+
+def unpack_f64(blob: str) -> List[float]:
+    arr = array("d")
+    arr.frombytes(base64.b64decode(blob))
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tolist()
+
+# -------- Columnar --------
+def _is_table(x: Any, min_rows: int) -> bool:
+    if not isinstance(x, list) or len(x) < min_rows or not isinstance(x[0], dict):
+        return False
+    keys = x[0].keys()
+    return all(isinstance(r, dict) and r.keys() == keys for r in x)
+
+def _encode_column(col: List[Any], opts: Dict[str, Any]) -> Any:
+    if opts.get("floats") == "b64" and col and all(type(v) is float for v in col):
+        return pack_f64(col)
+    return [encode(v, opts) for v in col]
+
+def encode(obj: Any, opts: Dict[str, Any]) -> Any:
+    """Aplica columnar/b64 recursivamente según lo negociado."""
+    min_rows = int(opts.get("minRows", MIN_ROWS))
+    if isinstance(obj, dict):
+        return {k: encode(v, opts) for k, v in obj.items()}
+    if isinstance(obj, list):
+        if opts.get("columnar", True) and _is_table(obj, min_rows):
+            keys = list(obj[0].keys())
+            return {"$n": len(obj), "$cols": {k: _encode_column([r[k] for r in obj], opts) for k in keys}}
+        if opts.get("floats") == "b64" and len(obj) >= min_rows and all(type(v) is float for v in obj):
+            return pack_f64(obj)
+        return [encode(v, opts) for v in obj]
+    return obj
+
+def decode(obj: Any) -> Any:
+    """Inverso de encode (lado cliente)."""
+    if isinstance(obj, dict):
+        if "$f64" in obj and len(obj) == 1:
+            return unpack_f64(obj["$f64"])
+        if "$cols" in obj and "$n" in obj:
+            n = int(obj["$n"])
+            cols = {k: decode(v) for k, v in obj["$cols"].items()}
+            return [{k: cols[k][i] for k in cols} for i in range(n)]
+        return {k: decode(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [decode(v) for v in obj]
+    return obj
+
+# -------- Resultado de tools --------
+def tool_result(payload: Dict[str, Any], is_error: bool = False) -> Dict[str, Any]:
+    """
+    Resultado de tool sin serializar. protocol.finalize_result agrega content[0].text
+    (modo clásico) o codifica structuredContent una sola vez (modo compacto).
+    Si la llamada sirvió datos de mercado, agrega dataFreshness al payload.
+    """
+    fresh = freshness()
+    if fresh is not None and isinstance(payload, dict) and "dataFreshness" not in payload:
+        payload = {**payload, "dataFreshness": fresh}
+    return {"structuredContent": payload, "isError": is_error}
+
+def finalize_result(result: Dict[str, Any], compact: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not isinstance(result, dict) or "structuredContent" not in result:
+        return result
+    if compact:
+        out = dict(result)
+        out["content"] = []
+        out["structuredContent"] = encode(result["structuredContent"], compact)
+        out["_meta"] = {**(result.get("_meta") or {}), CAPABILITY: True}
+        return out
+    if "content" not in result:
+        out = {"content": [{"type": "text", "text": json.dumps(result["structuredContent"], ensure_ascii=False)}]}
+        out.update(result)
+        return out
+    return result
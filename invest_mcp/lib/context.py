@@ -0,0 +1,166 @@
+# invest_mcp/lib/context.py
+from __future__ import annotations
+import contextvars, time
+from typing import Any, Callable, Dict, Optional
+
+# Contexto por llamada a tool: id del request, _meta del cliente y canal de notificaciones.
+# protocol.handle_request lo instala alrededor de TOOL_IMPL; las tools lo leen con current().
+#
+# Deadline: el cliente manda en _meta cuánto va a esperar (timeoutMs y, si pidió progreso,
+# maxTimeoutMs) y el contexto reproduce su cuenta: timeoutMs desde el inicio o desde el
+# último aviso de progreso emitido, con tope maxTimeoutMs. check() en los bucles largos y
+# antes de cada fetch corta la tool cuando el cliente ya no espera la respuesta, o cuando
+# llegó notifications/cancelled.
+
+Notifier = Callable[[str, Dict[str, Any]], None]
+
+class Cancelled(BaseException):
+    """
+    La llamada se abandonó (deadline vencido o notifications/cancelled). Deriva de
+    BaseException, como asyncio.CancelledError, para que los 'except Exception' de
+    las tools (fallbacks a datos sintéticos) no la traguen.
+    """
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+class CallContext:
+    def __init__(self, request_id: Any, meta: Optional[Dict[str, Any]] = None,
+                 notifier: Optional[Notifier] = None):
+        self.request_id = request_id
+        self.meta = meta or {}
+        self._notifier = notifier
+        self._last_progress = 0.0
+        self.started = time.monotonic()
+        self._alive_at = self.started  # inicio o último progreso emitido: el cliente reinicia su plazo
+        self.cancelled: Optional[str] = None
+        self.timeout = _seconds(self.meta.get("timeoutMs"))
+        self.max_timeout = _seconds(self.meta.get("maxTimeoutMs")) if self.meta.get("progressToken") is not None else None
+        self.freshness: Dict[str, Dict[str, Any]] = {}  # proveedor -> peor dato servido
+
+    def notify(self, method: str, params: Dict[str, Any]) -> bool:
+        if self._notifier is None:
+            return False
+        self._notifier(method, params)
+        return True
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        self.cancelled = reason
+
+    def deadline(self) -> Optional[float]:
+        if self.timeout is None:
+            return None
+        if self.max_timeout is None:
+            return self.started + self.timeout
+        return min(self._alive_at + self.timeout, self.started + max(self.timeout, self.max_timeout))
+
+    def remaining(self) -> Optional[float]:
+        d = self.deadline()
+        return None if d is None else d - time.monotonic()
+
+    def check(self) -> None:
+        if self.cancelled is not None:
+            raise Cancelled(self.cancelled)
+        d = self.deadline()
+        if d is not None and time.monotonic() >= d:
+            raise Cancelled("deadline")
+
+def _seconds(ms: Any) -> Optional[float]:
+    try:
+        return float(ms) / 1000.0 if ms is not None and float(ms) > 0 else None
+    except (TypeError, ValueError):
+        return None
+
+_CURRENT: contextvars.ContextVar[Optional[CallContext]] = contextvars.ContextVar("invest_call", default=None)
+
+def current() -> Optional[CallContext]:
+    return _CURRENT.get()
+
+def activate(ctx: CallContext) -> contextvars.Token:
+    return _CURRENT.set(ctx)
+
+def deactivate(token: contextvars.Token) -> None:
+    _CURRENT.reset(token)
+
+def check() -> None:
+    """Punto de cancelación cooperativa: lanza Cancelled si la llamada actual ya se abandonó."""
+    ctx = _CURRENT.get()
+    if ctx is not None:
+        ctx.check()
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Segundos hasta el deadline de la llamada actual (default si no hay)."""
+    ctx = _CURRENT.get()
+    left = ctx.remaining() if ctx is not None else None
+    return default if left is None else left
+
+def clamp_timeout(timeout: float) -> float:
+    """Timeout de una operación bloqueante (fetch) acotado por lo que le queda a la llamada."""
+    check()
+    left = remaining()
+    return timeout if left is None else max(0.001, min(timeout, left))
+
+# Frescura de los datos de mercado servidos en la llamada (data_live.cached_fetch):
+# por proveedor queda el peor caso, y tool_result lo agrega como dataFreshness.
+_FRESHNESS_RANK = {"fresh": 0, "stale": 1, "unavailable": 2}
+
+def note_freshness(provider: str, state: str, age_s: Optional[float], reason: Optional[str] = None) -> None:
+    ctx = _CURRENT.get()
+    if ctx is None:
+        return
+    prev = ctx.freshness.get(provider)
+    if prev is not None and _FRESHNESS_RANK[prev["state"]] > _FRESHNESS_RANK[state]:
+        return
+    entry: Dict[str, Any] = {"state": state}
+    if age_s is not None:
+        entry["ageS"] = round(max(age_s, (prev or {}).get("ageS", 0.0)), 1)
+    if reason:
+        entry["reason"] = reason
+    ctx.freshness[provider] = entry
+
+def freshness() -> Optional[Dict[str, Any]]:
+    """{state, maxAgeS, providers} de la llamada actual; None si no tocó datos live."""
+    ctx = _CURRENT.get()
+    if ctx is None or not ctx.freshness:
+        return None
+    provs = dict(ctx.freshness)
+    state = max((p["state"] for p in provs.values()), key=_FRESHNESS_RANK.__getitem__)
+    ages = [p["ageS"] for p in provs.values() if "ageS" in p]
+    return {"state": state, "maxAgeS": max(ages) if ages else None, "providers": provs}
+
+def wants_stream() -> bool:
+    """True si el cliente pidió recibir resultados parciales en chunks (_meta.streamChunks)."""
+    ctx = current()
+    return bool(ctx and ctx.meta.get("streamChunks") and ctx._notifier is not None)
+
+def emit_chunk(seq: int, data: Dict[str, Any]) -> bool:
+    ctx = current()
+    if ctx is None:
+        return False
+    return ctx.notify("notifications/invest/chunk", {"requestId": ctx.request_id, "seq": seq, **data})
+
+PROGRESS_MIN_INTERVAL = 0.1  # s entre notificaciones de progreso (salvo force)
+
+def progress(done: float, total: Optional[float] = None, message: Optional[str] = None,
+             partial: Optional[Dict[str, Any]] = None, force: bool = False) -> bool:
+    """
+    notifications/progress de MCP si el cliente mandó _meta.progressToken.
+    'partial' viaja como resultado parcial (p. ej. pesos actuales del optimizador).
+    Se limita a una notificación cada PROGRESS_MIN_INTERVAL salvo force=True.
+    """
+    ctx = current()
+    if ctx is None or ctx.meta.get("progressToken") is None or ctx._notifier is None:
+        return False
+    now = time.monotonic()
+    if not force and now - ctx._last_progress < PROGRESS_MIN_INTERVAL:
+        return False
+    ctx._last_progress = now
+    ctx._alive_at = now
+    params: Dict[str, Any] = {"progressToken": ctx.meta["progressToken"], "progress": done}
+    if total is not None:
+        params["total"] = total
+    if message:
+        params["message"] = message
+    if partial is not None:
+        params["partial"] = partial
+    return ctx.notify("notifications/progress", params)
@@ -1,43 +1,428 @@
 # invest_mcp/lib/data_live.py
 from __future__ import annotations
-import os, json, time, hashlib, requests, sys
-from typing import Dict, List, Tuple
-import pandas as pd
-import yfinance as yf
+import os, time, sys, threading, contextvars
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+from . import metrics, tracing
+from .cache_store import CacheStore
+from .context import check, clamp_timeout, current, note_freshness
+
+if TYPE_CHECKING:
+    from .priceframe import PriceFrame
+
+# pandas/yfinance/requests se importan en la primera descarga: initialize y
+# tools/list no deben pagar ~1s de imports (ver bench/bench_import.py).
 
 DEBUG = os.environ.get("INVEST_MCP_DEBUG", "0") == "1"
+# Sin red: las descargas fallan al instante y las tools caen a datos sintéticos (benchmarks reproducibles)
+OFFLINE = os.environ.get("INVEST_MCP_OFFLINE", "0") == "1"
 
 def _d(msg: str):
     if DEBUG:
         print(f"[data_live] {msg}", file=sys.stderr)
 
-# -------- Cache simple (archivos JSON) --------
+# -------- Cache en disco (lib/cache_store.py: índice, presupuesto, barrido) --------
 CACHE_DIR = os.environ.get("INVEST_MCP_CACHE_DIR", os.path.join(".cache","invest_mcp"))
-os.makedirs(CACHE_DIR, exist_ok=True)
+_cache_ready = False
+_stores: Dict[str, CacheStore] = {}
+_stores_lock = threading.Lock()
 
-def _cache_path(key: str) -> str:
-    h = hashlib.sha256(key.encode("utf-8")).hexdigest()
-    return os.path.join(CACHE_DIR, f"{h}.json")
+def _ensure_cache_dir():
+    global _cache_ready
+    if not _cache_ready:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _cache_ready = True
 
-def cache_load(key: str, ttl_seconds: int):
-    path = _cache_path(key)
-    if not os.path.exists(path): return None
+def cache_store() -> CacheStore:
+    """Store del CACHE_DIR actual (los benchmarks lo cambian entre corridas)."""
+    st = _stores.get(CACHE_DIR)
+    if st is None:
+        with _stores_lock:
+            st = _stores.setdefault(CACHE_DIR, CacheStore(CACHE_DIR))
+    st.ttl = HARD_TTL
+    return st
+
+# Frente en memoria compartido por todas las conexiones del proceso (transport_socket).
+# Guarda (timestamp, obj); los objetos se comparten: los llamadores no deben mutarlos.
+MEM_CACHE_MAX = int(os.environ.get("INVEST_MCP_MEM_CACHE", "512"))
+_mem: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+_mem_lock = threading.Lock()
+
+def _mem_put(key: str, ts: float, obj) -> None:
+    if MEM_CACHE_MAX <= 0: return
+    with _mem_lock:
+        _mem[key] = (ts, obj)
+        _mem.move_to_end(key)
+        while len(_mem) > MEM_CACHE_MAX:
+            _mem.popitem(last=False)
+
+def _cache_kind(key: str) -> str:
+    return key.split(":", 1)[0]
+
+def _cache_peek(key: str, max_age: float) -> Tuple[Optional[Tuple[float, object]], str]:
+    """(timestamp, obj) de memoria o disco si no tiene más de max_age s; y de dónde salió."""
+    with _mem_lock:
+        hit = _mem.get(key)
+    if hit is not None and time.time() - hit[0] <= max_age:
+        return hit, "mem"
     try:
-        st = os.stat(path)
-        if time.time() - st.st_mtime > ttl_seconds:
-            return None
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        hit = cache_store().get(key, max_age)
     except Exception:
-        return None
+        hit = None
+    if hit is None:
+        return None, "miss"
+    _mem_put(key, hit[0], hit[1])
+    return hit, "disk"
+
+def cache_load(key: str, ttl_seconds: int):
+    sp = tracing.start("cache.load", **{"cache.kind": _cache_kind(key)}) if tracing.ENABLED else None
+    hit, result = _cache_peek(key, ttl_seconds)
+    metrics.inc("cache_lookups_total", kind=_cache_kind(key), result=result)
+    if sp is not None:
+        sp.set("cache.result", result)
+        sp.end()
+    return hit[1] if hit is not None else None
 
 def cache_save(key: str, obj):
-    path = _cache_path(key)
+    _mem_put(key, time.time(), obj)
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(obj, f, ensure_ascii=False)
-    except Exception:
-        pass
+        cache_store().put(key, obj)
+    except Exception as e:
+        _d(f"cache_save {key}: {e}")
+
+# -------- Política de cache: stale-while-revalidate --------
+# Cada tipo de dato tiene un TTL blando (hasta ahí la entrada es fresca) y todos
+# comparten un TTL duro (INVEST_MCP_HARD_TTL): entre ambos la entrada se sirve al
+# instante como 'stale' y se refresca en segundo plano, una vez por clave. Sin
+# entrada usable se va al proveedor bloqueando; si falla se sirve lo que haya
+# dentro del TTL duro. Así una caída o un 429 del proveedor no se ve en el p99.
+#
+# Las claves son por símbolo (yf_ohlc:SPY:2y:1d): cualquier combinación de
+# símbolos reusa lo cacheado y el warmer (lib/warmer.py) calienta un símbolo una
+# vez para todas. Los que faltan se piden al proveedor en un solo request.
+def _ttl_opts(spec: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in spec.split(","):
+        k, _, v = part.partition("=")
+        try:
+            out[k.strip()] = float(v)
+        except ValueError:
+            continue
+    return out
+
+SOFT_TTL: Dict[str, float] = {"yf_ohlc": 600, "cg_simple": 30, "cg_hist_dated": 600, "cg_markets_changes": 60,
+                              **_ttl_opts(os.environ.get("INVEST_MCP_SOFT_TTL", ""))}
+HARD_TTL = float(os.environ.get("INVEST_MCP_HARD_TTL", "86400"))
+SWR = os.environ.get("INVEST_MCP_SWR", "1") == "1"
+REFRESH_WORKERS = int(os.environ.get("INVEST_MCP_REFRESH_WORKERS", "2"))
+
+# Un fetch que respondió sin datos para un símbolo (ticker inexistente) se cachea
+# así, para no volver a pedirlo en cada llamada durante su TTL.
+NO_DATA = {"$noData": True}
+
+_refreshing: set = set()
+_refresh_lock = threading.Lock()
+_refresh_pool = None
+
+def soft_ttl(key: str) -> float:
+    return SOFT_TTL.get(_cache_kind(key), 600)
+
+def cache_age(key: str) -> Optional[float]:
+    """Segundos desde que se guardó 'key' (None si no está); del índice, sin tocar el disco."""
+    with _mem_lock:
+        hit = _mem.get(key)
+    if hit is not None:
+        return time.time() - hit[0]
+    return cache_store().age(key)
+
+def _save_fetched(keys: Dict[str, str], got: Dict[str, Any]) -> None:
+    for sym, key in keys.items():
+        cache_save(key, got[sym] if sym in got else NO_DATA)
+
+def _refresh_later(keys: Dict[str, str], provider: str, fetch: Callable[[List[str]], Dict[str, Any]]) -> None:
+    """Refresco en segundo plano (fuera del contexto de la llamada: sin su deadline)."""
+    global _refresh_pool
+    br = breaker(provider)
+    with _refresh_lock:
+        todo = {s: k for s, k in keys.items() if k not in _refreshing}
+        if not todo or (br is not None and not br.ready()):
+            return
+        _refreshing.update(todo.values())
+        if _refresh_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _refresh_pool = ThreadPoolExecutor(max_workers=max(1, REFRESH_WORKERS),
+                                               thread_name_prefix="invest-refresh")
+    kind = _cache_kind(next(iter(todo.values())))
+
+    def _run() -> None:
+        try:
+            _save_fetched(todo, fetch(list(todo)))
+            metrics.inc("cache_refresh_total", kind=kind, result="ok")
+        except Exception as e:
+            metrics.inc("cache_refresh_total", kind=kind, result="error")
+            _d(f"refresh {kind} {list(todo)}: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.difference_update(todo.values())
+
+    _refresh_pool.submit(contextvars.Context().run, _run)
+
+def _reason(e: Exception) -> str:
+    if isinstance(e, CircuitOpen):
+        return "circuit_open"
+    return "offline" if isinstance(e, OfflineError) else "error"
+
+def cached_fetch_many(keys: Dict[str, str], provider: str, fetch: Callable[[List[str]], Dict[str, Any]],
+                      max_age: Optional[float] = None) -> Dict[str, Any]:
+    """
+    {símbolo: dato} para las claves de 'keys' (símbolo -> clave) según la política
+    de arriba; fetch(símbolos) trae los que falten en un solo request o lanza.
+    Los símbolos sin dato usable no aparecen (la tool cae a sintético). La
+    frescura de lo servido queda anotada en la llamada (dataFreshness del payload).
+    max_age (warmer) fuerza a pedir todo lo que tenga más de esos segundos.
+    """
+    out: Dict[str, Any] = {}
+    stale: Dict[str, str] = {}
+    missing: Dict[str, str] = {}
+    old: Dict[str, Tuple[float, Any]] = {}
+    for sym, key in keys.items():
+        kind = _cache_kind(key)
+        soft = SOFT_TTL.get(kind, 600) if max_age is None else max_age
+        sp = tracing.start("cache.load", **{"cache.kind": kind}) if tracing.ENABLED else None
+        hit, where = _cache_peek(key, max(soft, HARD_TTL))
+        age = time.time() - hit[0] if hit is not None else None
+        result = where if age is not None and age <= soft else ("stale" if hit is not None else "miss")
+        metrics.inc("cache_lookups_total", kind=kind, result=result)
+        if sp is not None:
+            sp.set("cache.result", result)
+            sp.end()
+        if hit is not None and hit[1] == NO_DATA:
+            if result == "stale" or result == "miss":
+                missing[sym] = key
+            continue
+        if result not in ("stale", "miss"):
+            note_freshness(provider, "fresh", age)
+            out[sym] = hit[1]
+        elif hit is not None and SWR and max_age is None:
+            note_freshness(provider, "stale", age)
+            out[sym] = hit[1]
+            stale[sym] = key
+        else:
+            missing[sym] = key
+            if hit is not None:
+                old[sym] = (age, hit[1])
+    if stale:
+        _refresh_later(stale, provider, fetch)
+    if not missing:
+        return out
+    try:
+        got = fetch(list(missing))
+        _save_fetched(missing, got)
+        err = None
+    except Exception as e:
+        _d(f"{provider} {list(missing)} error: {e}")
+        got, err = {}, e
+    for sym in missing:
+        if sym in got:
+            note_freshness(provider, "fresh", 0.0)
+            out[sym] = got[sym]
+        elif err is not None and sym in old:
+            note_freshness(provider, "stale", old[sym][0])
+            out[sym] = old[sym][1]
+        elif err is not None:
+            note_freshness(provider, "unavailable", None, _reason(err))
+    return out
+
+def cached_fetch(key: str, provider: str, fetch: Callable[[], Any],
+                 max_age: Optional[float] = None) -> Optional[Any]:
+    """cached_fetch_many para una sola clave: fetch() trae el dato o lanza."""
+    return cached_fetch_many({key: key}, provider, lambda _: {key: fetch()}, max_age).get(key)
+
+# -------- Símbolos pedidos recientemente (watchlist del warmer) --------
+RECENT_MAX = int(os.environ.get("INVEST_MCP_WARM_RECENT", "64"))
+_recent: "OrderedDict[str, float]" = OrderedDict()
+
+def note_requested(symbols: List[str]) -> None:
+    """Recuerda los símbolos pedidos por una tool (no los del warmer: corre sin CallContext)."""
+    if RECENT_MAX <= 0 or current() is None:
+        return
+    now = time.time()
+    with _mem_lock:
+        for s in symbols:
+            _recent[s] = now
+            _recent.move_to_end(s)
+        while len(_recent) > RECENT_MAX:
+            _recent.popitem(last=False)
+
+def recent_symbols(window_s: float) -> List[str]:
+    cutoff = time.time() - window_s
+    with _mem_lock:
+        return [s for s, ts in _recent.items() if ts >= cutoff]
+
+# -------- Circuit breakers por proveedor --------
+# closed: pasan todas las llamadas; BREAKER_FAILS fallos seguidos (excepción, 429,
+# 5xx o respuesta vacía) lo abren. open: se rechaza al instante (CircuitOpen)
+# durante BREAKER_COOLDOWN_S. half_open: pasa una sola llamada de prueba; si
+# responde bien se cierra, si falla vuelve a abrirse con el doble de espera
+# (hasta 4x).
+BREAKER_FAILS = int(os.environ.get("INVEST_MCP_BREAKER_FAILS", "3"))
+BREAKER_COOLDOWN_S = float(os.environ.get("INVEST_MCP_BREAKER_COOLDOWN_S", "30"))
+_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+class CircuitOpen(RuntimeError):
+    pass
+
+class Breaker:
+    def __init__(self, provider: str, fails: int, cooldown: float):
+        self.provider = provider
+        self.fails = fails
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.backoff = 1
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def _set(self, state: str) -> None:
+        self.state = state
+        metrics.gauge_set("breaker_state", _STATES[state], provider=self.provider)
+
+    def ready(self) -> bool:
+        """True si una llamada pasaría ahora (sin reservar la prueba de half_open)."""
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self.opened_at >= self.cooldown * self.backoff
+            return not (self.state == "half_open" and self.probing)
+
+    def before(self) -> None:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown * self.backoff:
+                self._set("half_open")
+                self.probing = False
+            if self.state == "open" or (self.state == "half_open" and self.probing):
+                metrics.inc("breaker_rejected_total", provider=self.provider)
+                raise CircuitOpen(f"{self.provider}: circuit open")
+            if self.state == "half_open":
+                self.probing = True
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.backoff = 1
+            self.probing = False
+            if self.state != "closed":
+                self._set("closed")
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open":
+                self.backoff = min(self.backoff * 2, 4)
+            elif self.failures < self.fails:
+                return
+            self.probing = False
+            self.opened_at = time.monotonic()
+            self._set("open")
+            metrics.inc("breaker_open_total", provider=self.provider)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures,
+                    "retryInS": round(max(0.0, self.opened_at + self.cooldown * self.backoff - time.monotonic()), 1)
+                    if self.state == "open" else 0.0}
+
+_breakers: Dict[str, Breaker] = {}
+_breakers_lock = threading.Lock()
+
+def breaker(provider: str) -> Optional[Breaker]:
+    """Breaker del proveedor (None con INVEST_MCP_BREAKER_FAILS=0)."""
+    if BREAKER_FAILS <= 0:
+        return None
+    with _breakers_lock:
+        br = _breakers.get(provider)
+        if br is None:
+            br = _breakers[provider] = Breaker(provider, BREAKER_FAILS, BREAKER_COOLDOWN_S)
+        return br
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        return {p: br.snapshot() for p, br in _breakers.items()}
+
+# -------- Imports diferidos --------
+class OfflineError(RuntimeError):
+    pass
+
+# Cada llamada al proveedor se mide en upstream_ms{provider}; los errores se cuentan aparte.
+# Antes de cada fetch se comprueba el deadline de la llamada y el timeout HTTP se acota a él.
+def _http_get(url: str, **kw):
+    if OFFLINE:
+        raise OfflineError("INVEST_MCP_OFFLINE=1")
+    kw["timeout"] = clamp_timeout(kw.get("timeout", 20))
+    br = breaker("coingecko")
+    if br is not None:
+        br.before()
+    import requests
+    with tracing.span("GET coingecko", kind="client", **{"http.url": url}) as sp, \
+            metrics.timer("upstream_ms", provider="coingecko"):
+        try:
+            r = requests.get(url, **kw)
+        except Exception:
+            metrics.inc("upstream_errors_total", provider="coingecko")
+            if br is not None:
+                br.failure()
+            raise
+        if sp is not None:
+            sp.set("http.status_code", r.status_code)
+            if r.status_code >= 400:
+                sp.status, sp.message = 2, f"HTTP {r.status_code}"
+    if r.status_code >= 400:
+        metrics.inc("upstream_errors_total", provider="coingecko")
+    if br is not None:
+        # 429 y 5xx hablan del proveedor; un 404 de un id mal mapeado no
+        if r.status_code == 429 or r.status_code >= 500:
+            br.failure()
+        else:
+            br.success()
+    return r
+
+def _yf_download(**kw):
+    if OFFLINE:
+        raise OfflineError("INVEST_MCP_OFFLINE=1")
+    check()
+    br = breaker("yfinance")
+    if br is not None:
+        br.before()
+    import yfinance as yf
+    with tracing.span("yfinance.download", kind="client", **{"yf.tickers": str(kw.get("tickers"))}), \
+            metrics.timer("upstream_ms", provider="yfinance"):
+        try:
+            df = yf.download(**kw)
+        except Exception:
+            metrics.inc("upstream_errors_total", provider="yfinance")
+            if br is not None:
+                br.failure()
+            raise
+    # yfinance no lanza ante 429/caídas: devuelve un frame vacío (que antes se cacheaba).
+    # Si todos los errores que anotó son de tickers inexistentes, el proveedor está bien.
+    if df is None or (getattr(df, "empty", False) and not _yf_no_data(yf)):
+        metrics.inc("upstream_errors_total", provider="yfinance")
+        if br is not None:
+            br.failure()
+        raise RuntimeError(f"yfinance: sin datos para {kw.get('tickers')}")
+    if br is not None:
+        br.success()
+    return df
+
+_NO_DATA_HINTS = ("delisted", "no data", "not found", "no timezone", "no price data")
+
+def _yf_no_data(yf) -> bool:
+    errors = getattr(getattr(yf, "shared", None), "_ERRORS", None) or {}
+    return bool(errors) and all(any(h in str(m).lower() for h in _NO_DATA_HINTS) for m in errors.values())
+
+def _multi_columns(df) -> bool:
+    """Equivale a isinstance(df.columns, pd.MultiIndex) sin importar pandas aquí."""
+    return getattr(df.columns, "nlevels", 1) > 1
 
 # -------- Universo / mapeos --------
 COINGECKO_IDS = {
@@ -82,49 +467,61 @@ def _cg_base_and_auth() -> Tuple[str, dict, dict, str]:
     return base, headers, q, "pub"
 
 # -------- Yahoo Finance (SPY/GLD/etc.) --------
-def fetch_yf_history(tickers: List[str], period: str = "2y", interval: str = "1d") -> Dict[str, List[float]]:
+# Los fetchers lanzan ante cualquier fallo y cached_fetch_many decide: dato viejo,
+# refresco en segundo plano o nada (la tool cae a sintético). max_age lo usa el warmer.
+def fetch_yf_history_dated(tickers: List[str], period: str = "5y", interval: str = "1d",
+                           max_age: Optional[float] = None) -> Dict[str, Dict[str, List]]:
+    """
+    Histórico diario con fechas y OHLC (auto_adjust):
+    {SYM: {"t": ["YYYY-MM-DD"...], "o": [...], "h": [...], "l": [...], "c": [...]}}
+    """
     if not tickers: return {}
-    key = f"yf_hist:{','.join(sorted(tickers))}:{period}:{interval}"
-    cached = cache_load(key, ttl_seconds=600)
-    if cached is not None:
-        return cached
-    _d(f"yfinance download tickers={tickers} period={period} interval={interval}")
-    df = yf.download(tickers=tickers, period=period, interval=interval, auto_adjust=True, progress=False)
-    out: Dict[str, List[float]] = {}
-    if isinstance(df.columns, pd.MultiIndex):
-        col = "Close" if "Close" in df.columns.levels[0] else ("Adj Close" if "Adj Close" in df.columns.levels[0] else None)
-        if col:
-            sub = df[col]
-            for t in sub.columns:
-                ser = sub[t].dropna()
-                if len(ser) >= 2:
-                    out[str(t)] = [float(x) for x in ser.tolist()]
-    else:
-        col = "Close" if "Close" in df.columns else ("Adj Close" if "Adj Close" in df.columns else None)
-        if col:
-            ser = df[col].dropna()
-            if len(ser) >= 2:
-                out[str(tickers[0])] = [float(x) for x in ser.tolist()]
-    cache_save(key, out)
-    return out
+    keys = {t: f"yf_ohlc:{t}:{period}:{interval}" for t in dict.fromkeys(tickers)}
+
+    def _fetch(missing: List[str]) -> Dict[str, Dict[str, List]]:
+        _d(f"yfinance download (ohlc) tickers={missing} period={period} interval={interval}")
+        df = _yf_download(tickers=missing, period=period, interval=interval, auto_adjust=True,
+                         progress=False, group_by="ticker")
+        out: Dict[str, Dict[str, List]] = {}
+        if df.empty:
+            return out
+        for t in missing:
+            try:
+                sub = df[t] if _multi_columns(df) else df
+            except KeyError:
+                continue
+            if "Close" not in sub.columns:
+                continue
+            sub = sub.dropna(subset=["Close"])
+            if len(sub) < 2:
+                continue
+            out[t] = {
+                "t": [ix.strftime("%Y-%m-%d") for ix in sub.index],
+                "o": [float(x) for x in sub["Open"].tolist()],
+                "h": [float(x) for x in sub["High"].tolist()],
+                "l": [float(x) for x in sub["Low"].tolist()],
+                "c": [float(x) for x in sub["Close"].tolist()],
+            }
+        return out
+
+    return cached_fetch_many(keys, "yfinance", _fetch, max_age)
 
 # -------- CoinGecko: simple/price (spot) --------
-def fetch_cg_simple_price(symbols: List[str], vs: str = "usd") -> Dict[str, float]:
+def fetch_cg_simple_price(symbols: List[str], vs: str = "usd",
+                          max_age: Optional[float] = None) -> Dict[str, float]:
     if not symbols: return {}
-    ids = [COINGECKO_IDS[s] for s in symbols if s in COINGECKO_IDS]
-    if not ids: return {}
+    syms = [s for s in dict.fromkeys(symbols) if s in COINGECKO_IDS]
+    if not syms: return {}
+    note_requested(syms)
 
     base, headers, q, mode = _cg_base_and_auth()
-    key = f"cg_simple:{','.join(sorted(ids))}:{vs}:{mode}"
-    cached = cache_load(key, ttl_seconds=30)
-    if cached is not None:
-        return cached
-
-    url = f"{base}/simple/price"
-    params = {"ids": ",".join(ids), "vs_currencies": vs, **q}
-    _d(f"GET {url} {params}")
-    try:
-        r = requests.get(url, params=params, headers=headers, timeout=15)
+    keys = {s: f"cg_simple:{COINGECKO_IDS[s]}:{vs}:{mode}" for s in syms}
+
+    def _fetch(missing: List[str]) -> Dict[str, float]:
+        url = f"{base}/simple/price"
+        params = {"ids": ",".join(COINGECKO_IDS[s] for s in missing), "vs_currencies": vs, **q}
+        _d(f"GET {url} {params}")
+        r = _http_get(url, params=params, headers=headers, timeout=15)
         _d(f"-> status={r.status_code}")
         r.raise_for_status()
         data = r.json()
@@ -136,73 +533,75 @@ def fetch_cg_simple_price(symbols: List[str], vs: str = "usd") -> Dict[str, floa
             price = obj.get(vs)
             if isinstance(price, (int, float)):
                 out[sym] = float(price)
-        cache_save(key, out)
         return out
-    except Exception as e:
-        _d(f"simple/price error: {e}")
-        return {}
+
+    return cached_fetch_many(keys, "coingecko", _fetch, max_age)
 
 # -------- CoinGecko: market_chart (histórico) --------
-def fetch_cg_history(symbols: List[str], days: int = 365, vs: str = "usd") -> Dict[str, List[float]]:
-    out: Dict[str, List[float]] = {}
+def fetch_cg_history_dated(symbols: List[str], days: int = 365, vs: str = "usd",
+                           max_age: Optional[float] = None) -> Dict[str, Dict[str, List]]:
+    """
+    market_chart con fechas: {SYM: {"t": [...], "c": [...]}} (un cierre por día UTC).
+    """
+    out: Dict[str, Dict[str, List]] = {}
     base, headers, q, mode = _cg_base_and_auth()
     for sym in symbols:
         cg_id = COINGECKO_IDS.get(sym)
         if not cg_id: continue
-        key = f"cg_hist:{cg_id}:{days}:{vs}:{mode}"
-        cached = cache_load(key, ttl_seconds=600)
-        if cached is not None:
-            out[sym] = cached
-            continue
-        url = f"{base}/coins/{cg_id}/market_chart"
-        params = {"vs_currency": vs, "days": days, **q}
-        _d(f"GET {url} {params}")
-        try:
-            r = requests.get(url, params=params, headers=headers, timeout=20)
+        key = f"cg_hist_dated:{cg_id}:{days}:{vs}:{mode}"
+
+        def _fetch(cg_id: str = cg_id, sym: str = sym) -> Dict[str, List]:
+            url = f"{base}/coins/{cg_id}/market_chart"
+            params = {"vs_currency": vs, "days": days, "interval": "daily", **q}
+            _d(f"GET {url} {params}")
+            r = _http_get(url, params=params, headers=headers, timeout=20)
             _d(f"-> status={r.status_code}")
             r.raise_for_status()
-            data = r.json()
-            prices = [float(p[1]) for p in data.get("prices", []) if p and p[1] is not None]
-            if len(prices) >= 2:
-                out[sym] = prices
-                cache_save(key, prices)
-        except Exception as e:
-            _d(f"market_chart error {sym}: {e}")
-            continue
+            by_day: Dict[str, float] = {}
+            for p in r.json().get("prices", []):
+                if not p or p[1] is None: continue
+                day = time.strftime("%Y-%m-%d", time.gmtime(p[0] / 1000.0))
+                by_day[day] = float(p[1])  # el último del día gana
+            if len(by_day) < 2:
+                raise ValueError(f"market_chart (dated) {sym}: serie vacía")
+            t = sorted(by_day)
+            return {"t": t, "c": [by_day[d] for d in t]}
+
+        ser = cached_fetch(key, "coingecko", _fetch, max_age)
+        if ser:
+            out[sym] = ser
     return out
 
-def fetch_cg_markets_changes(symbols: List[str], vs: str = "usd") -> Dict[str, Dict[str, float]]:
+def fetch_cg_markets_changes(symbols: List[str], vs: str = "usd",
+                             max_age: Optional[float] = None) -> Dict[str, Dict[str, float]]:
     """
     Retorna {SYM: {"ret1d": d, "ret7d": d, "ret30d": d}} en decimales (no %).
     Solo para símbolos mapeados a COINGECKO_IDS.
     """
-    out: Dict[str, Dict[str, float]] = {}
     if not symbols:
-        return out
-    ids = [COINGECKO_IDS[s] for s in symbols if s in COINGECKO_IDS]
-    if not ids:
-        return out
+        return {}
+    syms = [s for s in dict.fromkeys(symbols) if s in COINGECKO_IDS]
+    if not syms:
+        return {}
 
     base, headers, q, mode = _cg_base_and_auth()
-    key = f"cg_markets_changes:{','.join(sorted(ids))}:{vs}:{mode}"
-    cached = cache_load(key, ttl_seconds=60)  
-    if cached is not None:
-        return cached
-
-    url = f"{base}/coins/markets"
-    params = {
-        "vs_currency": vs,
-        "ids": ",".join(ids),
-        "price_change_percentage": "24h,7d,30d",
-        **q
-    }
-    _d(f"GET {url} {params}")
-    try:
-        r = requests.get(url, params=params, headers=headers, timeout=15)
+    keys = {s: f"cg_markets_changes:{COINGECKO_IDS[s]}:{vs}:{mode}" for s in syms}
+
+    def _fetch(missing: List[str]) -> Dict[str, Dict[str, float]]:
+        url = f"{base}/coins/markets"
+        params = {
+            "vs_currency": vs,
+            "ids": ",".join(COINGECKO_IDS[s] for s in missing),
+            "price_change_percentage": "24h,7d,30d",
+            **q
+        }
+        _d(f"GET {url} {params}")
+        r = _http_get(url, params=params, headers=headers, timeout=15)
         _d(f"-> status={r.status_code}")
         r.raise_for_status()
         data = r.json()
         inv = {v: k for k, v in COINGECKO_IDS.items()}
+        out: Dict[str, Dict[str, float]] = {}
         for row in data if isinstance(data, list) else []:
             cg_id = row.get("id")
             sym = inv.get(cg_id)
@@ -217,59 +616,90 @@ def fetch_cg_markets_changes(symbols: List[str], vs: str = "usd") -> Dict[str, D
             if isinstance(p30, (int, float)): ret["ret30d"] = float(p30) / 100.0
             if ret:
                 out[sym] = ret
-        cache_save(key, out)
         return out
-    except Exception as e:
-        _d(f"coins/markets error: {e}")
-        return {}
 
-# -------- Utilidades --------
-def align_min_length(series_dict: Dict[str, List[float]]) -> Dict[str, List[float]]:
-    if not series_dict: return {}
-    L = min(len(v) for v in series_dict.values())
-    if L < 2: return {}
-    return {k: v[-L:] for k, v in series_dict.items()}
+    return cached_fetch_many(keys, "coingecko", _fetch, max_age)
 
-def get_history(symbols: List[str], days: int = 252) -> Dict[str, List[float]]:
-    yf_syms, cg_syms = split_symbols(symbols)
-    out: Dict[str, List[float]] = {}
+# -------- Histórico para las tools (PriceFrame) --------
+# Ventanas que piden las tools; el warmer calienta exactamente estas claves (y
+# price_history comparte las de yfinance para lookbacks de hasta 2 años).
+HISTORY_PERIOD = "2y"
+CG_HISTORY_DAYS = 730
+
+def history_key(sym: str) -> str:
+    """Clave de cache del histórico que get_frame usa para 'sym' (la que calienta el warmer)."""
+    if sym in COINGECKO_IDS:
+        return f"cg_hist_dated:{COINGECKO_IDS[sym]}:{CG_HISTORY_DAYS}:usd:{_cg_base_and_auth()[3]}"
+    return f"yf_ohlc:{sym}:{HISTORY_PERIOD}:1d"
 
-    # yfinance
+def spot_key(sym: str) -> str:
+    return f"cg_simple:{COINGECKO_IDS[sym]}:usd:{_cg_base_and_auth()[3]}"
+
+def get_frame(symbols: List[str], days: int = 252) -> "PriceFrame":
+    """
+    Cierres de los últimos 'days' días hábiles como PriceFrame alineado por fecha
+    (cripto y acciones cada una en su calendario). Los símbolos sin dato live no
+    aparecen: la tool decide el fallback.
+    """
+    from .priceframe import PriceFrame
+    note_requested(symbols)
+    yf_syms, cg_syms = split_symbols(symbols)
+    series: Dict[str, Dict[str, List]] = {}
     try:
         if yf_syms:
-            out.update(fetch_yf_history(yf_syms, period="2y", interval="1d"))
+            series.update(fetch_yf_history_dated(yf_syms, period=HISTORY_PERIOD, interval="1d"))
     except Exception as e:
         _d(f"yfinance error: {e}")
-
-    # CoinGecko
     try:
         if cg_syms:
-            out.update(fetch_cg_history(cg_syms, days=730, vs="usd"))
+            series.update(fetch_cg_history_dated(cg_syms, days=CG_HISTORY_DAYS, vs="usd"))
     except Exception as e:
         _d(f"cg error: {e}")
+    return PriceFrame.from_dated({s: series[s] for s in symbols if s in series}).window(days)
+
+def get_history(symbols: List[str], days: int = 252) -> Dict[str, List[float]]:
+    """{símbolo: cierres} en las fechas en que cotizan todos (get_frame(...).to_lists())."""
+    frame = get_frame(symbols, days)
+    return {} if len(frame.common()) < 2 else frame.to_lists()
+
+def get_history_dated(symbols: List[str], days: int = 365) -> Dict[str, Dict[str, List]]:
+    """
+    Histórico con fechas por símbolo, SIN alinear (cada uno con su calendario:
+    cripto 7 días, acciones días hábiles). Recorta a los últimos 'days' días calendario.
+    """
+    note_requested(symbols)
+    yf_syms, cg_syms = split_symbols(symbols)
+    out: Dict[str, Dict[str, List]] = {}
+    years = max(1, -(-days // 365))
+    period = "max" if years > 10 else ("10y" if years > 5 else ("5y" if years > 2 else "2y"))
+    try:
+        if yf_syms:
+            out.update(fetch_yf_history_dated(yf_syms, period=period, interval="1d"))
+    except Exception as e:
+        _d(f"yfinance (dated) error: {e}")
+    try:
+        if cg_syms:
+            out.update(fetch_cg_history_dated(cg_syms, days=min(days, 3650), vs="usd"))
+    except Exception as e:
+        _d(f"cg (dated) error: {e}")
+    cutoff = time.strftime("%Y-%m-%d", time.gmtime(time.time() - days * 86400))
+    for sym, ser in list(out.items()):
+        i = next((k for k, d in enumerate(ser["t"]) if d >= cutoff), len(ser["t"]))
+        out[sym] = {k: v[i:] for k, v in ser.items()}
+    return out
+
+def last_and_returns(frame: "PriceFrame") -> List[dict]:
+    """
+    Último precio y retornos 1d/7d/30d de cada símbolo del frame (7d/30d en días
+    calendario desde su última cotización); 'last' de cripto con el spot de CoinGecko.
+    """
+    chg = frame.changes((7, 30))
+    last = frame.last()
+    quotes = [{"symbol": sym, "last": float(last[j]), "ret1d": float(chg[1][j]),
+               "ret7d": float(chg[7][j]), "ret30d": float(chg[30][j])}
+              for j, sym in enumerate(frame.symbols) if last[j] == last[j]]
 
-    out = align_min_length(out)
-    if not out: return {}
-    L = min(len(v) for v in out.values())
-    K = min(L, days)
-    return {k: v[-K:] for k, v in out.items()}
-
-def last_and_returns(series_dict: Dict[str, List[float]]) -> List[dict]:
-    def _ret(pr: List[float], d: int) -> float:
-        if len(pr) <= d: return 0.0
-        return (pr[-1] / pr[-1 - d]) - 1.0
-
-    quotes = []
-    for sym, pr in series_dict.items():
-        quotes.append({
-            "symbol": sym,
-            "last": float(pr[-1]),
-            "ret1d": _ret(pr, 1),
-            "ret7d": _ret(pr, 5),
-            "ret30d": _ret(pr, 21),
-        })
-
-    cg_syms = [s for s in series_dict.keys() if s in COINGECKO_IDS]
+    cg_syms = [q["symbol"] for q in quotes if q["symbol"] in COINGECKO_IDS]
     if cg_syms:
         spot = fetch_cg_simple_price(cg_syms, vs="usd")
         if spot:
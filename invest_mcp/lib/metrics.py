@@ -0,0 +1,208 @@
+# invest_mcp/lib/metrics.py
+from __future__ import annotations
+import threading, time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Registro de métricas en proceso (sin dependencias). Histogramas con buckets
+# logarítmicos fijos: se pueden sumar entre procesos (el fleet agrega los hijos)
+# y los percentiles salen por interpolación dentro del bucket.
+
+BOUNDS: List[float] = [0.1 * 2 ** (i / 2) for i in range(48)]  # 0.1 ms .. ~1.2e6 ms
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)  # último = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, v: float) -> None:
+        lo, hi = 0, len(BOUNDS)
+        while lo < hi:  # primer bound >= v
+            mid = (lo + hi) // 2
+            if BOUNDS[mid] < v: lo = mid + 1
+            else: hi = mid
+        self.counts[lo] += 1
+        self.count += 1
+        self.sum += v
+        self.min = min(self.min, v)
+        self.max = max(self.max, v)
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        for i, c in enumerate(other["buckets"]):
+            self.counts[i] += c
+        self.count += other["count"]
+        self.sum += other["sum"]
+        if other["count"]:
+            self.min = min(self.min, other["min"])
+            self.max = max(self.max, other["max"])
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cum = 0
+        for i, c in enumerate(self.counts):
+            if c and cum + c >= rank:
+                lo = BOUNDS[i - 1] if i > 0 else 0.0
+                hi = BOUNDS[i] if i < len(BOUNDS) else self.max
+                v = lo + (hi - lo) * ((rank - cum) / c)
+                return min(max(v, self.min), self.max)
+            cum += c
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {"count": self.count, "sum": self.sum,
+             "min": self.min if self.count else 0.0, "max": self.max, "buckets": list(self.counts)}
+        for q in QUANTILES:
+            d[f"p{int(q * 100)}"] = self.quantile(q)
+        return d
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hist: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.started = time.time()
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        k = _key(labels)
+        with self._lock:
+            h = self._hist.setdefault(name, {}).get(k)
+            if h is None:
+                h = self._hist[name][k] = Histogram()
+            h.observe(value)
+
+    def inc(self, name: str, n: float = 1.0, **labels: Any) -> None:
+        k = _key(labels)
+        with self._lock:
+            m = self._counters.setdefault(name, {})
+            m[k] = m.get(k, 0.0) + n
+
+    def gauge_add(self, name: str, n: float, **labels: Any) -> None:
+        k = _key(labels)
+        with self._lock:
+            m = self._gauges.setdefault(name, {})
+            m[k] = m.get(k, 0.0) + n
+
+    def gauge_set(self, name: str, v: float, **labels: Any) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_key(labels)] = v
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            hist = [{"name": n, "labels": dict(k), **h.to_dict()}
+                    for n, m in self._hist.items() for k, h in m.items()]
+            counters = [{"name": n, "labels": dict(k), "value": v}
+                        for n, m in self._counters.items() for k, v in m.items()]
+            gauges = [{"name": n, "labels": dict(k), "value": v}
+                      for n, m in self._gauges.items() for k, v in m.items()]
+        return {"uptimeS": time.time() - self.started, "histograms": hist,
+                "counters": counters, "gauges": gauges, "cacheHitRatio": cache_hit_ratio(counters)}
+
+REGISTRY = Registry()
+
+observe = REGISTRY.observe
+inc = REGISTRY.inc
+gauge_add = REGISTRY.gauge_add
+gauge_set = REGISTRY.gauge_set
+snapshot = REGISTRY.snapshot
+
+@contextmanager
+def timer(name: str, **labels: Any) -> Iterator[Dict[str, Any]]:
+    """Observa la duración en ms; el llamador puede agregar labels (p. ej. status) al dict."""
+    extra: Dict[str, Any] = {}
+    t0 = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        observe(name, (time.perf_counter() - t0) * 1000.0, **labels, **extra)
+
+def cache_hit_ratio(counters: List[Dict[str, Any]]) -> Dict[str, float]:
+    """{kind: hits / lookups} a partir de cache_lookups_total{kind,result}."""
+    hits: Dict[str, float] = {}
+    total: Dict[str, float] = {}
+    for c in counters:
+        if c["name"] != "cache_lookups_total":
+            continue
+        kind = c["labels"].get("kind", "?")
+        total[kind] = total.get(kind, 0.0) + c["value"]
+        if c["labels"].get("result") != "miss":
+            hits[kind] = hits.get(kind, 0.0) + c["value"]
+    return {k: hits.get(k, 0.0) / v for k, v in total.items() if v}
+
+# -------- Agregación (fleet) --------
+def merge(snapshots: Dict[str, Dict[str, Any]], label: str = "server") -> Dict[str, Any]:
+    """
+    Une snapshots de varios procesos: agrega el label 'server' y además suma
+    por (nombre, labels) sin 'server' para tener totales del fleet.
+    """
+    hist: Dict[Tuple[str, LabelKey], Histogram] = {}
+    counters: Dict[Tuple[str, LabelKey], float] = {}
+    gauges: Dict[Tuple[str, LabelKey], float] = {}
+    per_server: Dict[str, List[Dict[str, Any]]] = {"histograms": [], "counters": [], "gauges": []}
+    for src, snap in snapshots.items():
+        for kind in per_server:
+            per_server[kind].extend({**x, "labels": {**x["labels"], label: src}} for x in snap.get(kind, []))
+        for h in snap.get("histograms", []):
+            k = (h["name"], _key(h["labels"]))
+            hist.setdefault(k, Histogram()).merge(h)
+        for c in snap.get("counters", []):
+            k = (c["name"], _key(c["labels"]))
+            counters[k] = counters.get(k, 0.0) + c["value"]
+        for g in snap.get("gauges", []):
+            k = (g["name"], _key(g["labels"]))
+            gauges[k] = gauges.get(k, 0.0) + g["value"]
+    counter_list = [{"name": n, "labels": dict(k), "value": v} for (n, k), v in counters.items()]
+    return {
+        "servers": sorted(snapshots),
+        "histograms": [{"name": n, "labels": dict(k), **h.to_dict()} for (n, k), h in hist.items()],
+        "byServer": per_server,
+        "counters": counter_list,
+        "gauges": [{"name": n, "labels": dict(k), "value": v} for (n, k), v in gauges.items()],
+        "cacheHitRatio": cache_hit_ratio(counter_list),
+    }
+
+# -------- Prometheus (formato texto 0.0.4) --------
+def _prom_labels(labels: Dict[str, Any], extra: Optional[Dict[str, str]] = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in sorted(items.items())) + "}"
+
+def prometheus(snap: Optional[Dict[str, Any]] = None, prefix: str = "invest_") -> str:
+    snap = snap or snapshot()
+    out: List[str] = []
+    seen = set()
+    for h in sorted(snap.get("histograms", []), key=lambda x: x["name"]):
+        n = prefix + h["name"]
+        if n not in seen:
+            out.append(f"# TYPE {n} histogram")
+            seen.add(n)
+        cum = 0
+        for i, c in enumerate(h["buckets"]):
+            cum += c
+            le = f"{BOUNDS[i]:.6g}" if i < len(BOUNDS) else "+Inf"
+            out.append(f"{n}_bucket{_prom_labels(h['labels'], {'le': le})} {cum}")
+        out.append(f"{n}_sum{_prom_labels(h['labels'])} {h['sum']}")
+        out.append(f"{n}_count{_prom_labels(h['labels'])} {h['count']}")
+    for kind, typ in (("counters", "counter"), ("gauges", "gauge")):
+        for c in sorted(snap.get(kind, []), key=lambda x: x["name"]):
+            n = prefix + c["name"]
+            if n not in seen:
+                out.append(f"# TYPE {n} {typ}")
+                seen.add(n)
+            out.append(f"{n}{_prom_labels(c['labels'])} {c['value']}")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,193 @@
+# invest_mcp/lib/priceframe.py
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+# Panel de precios compartido por las tools: una matriz float64 (fechas x
+# símbolos) sobre la UNIÓN de los calendarios, con NaN donde un símbolo no cotizó
+# (fines de semana de las acciones, feriados). Nada se recorta por largo: cripto
+# (7 días) y acciones (días hábiles) quedan alineadas por fecha.
+#
+#   returns()   retornos de cada símbolo en SU calendario (contra su cotización
+#               anterior, aunque esté varias filas atrás)
+#   common()    solo las fechas en que cotizan todos (covarianzas)
+#
+# Las vistas derivadas (máscara, ffill, retornos) se calculan una vez por frame.
+# since()/window() recortan filas sin copiar (vistas de numpy).
+
+TRADING_DAYS = 252
+CALENDAR_DAYS = 365
+
+# Columnas ya convertidas a numpy, por identidad de la serie: los hits de cache de
+# data_live devuelven el mismo objeto, así un frame caliente no vuelve a parsear
+# cientos de fechas ISO por símbolo en cada llamada.
+_COLS_MAX = 256
+_cols: "OrderedDict[Tuple[int, str], Tuple[Any, np.ndarray, np.ndarray]]" = OrderedDict()
+_cols_lock = threading.Lock()
+
+def _column(ser: Dict[str, Sequence], field: str) -> Tuple[np.ndarray, np.ndarray]:
+    key = (id(ser), field)
+    with _cols_lock:
+        hit = _cols.get(key)
+        if hit is not None and hit[0] is ser:
+            _cols.move_to_end(key)
+            return hit[1], hit[2]
+    t = np.asarray(ser.get("t") or [], dtype="datetime64[D]")
+    v = np.asarray(ser.get(field) or [], dtype=np.float64)
+    with _cols_lock:
+        _cols[key] = (ser, t, v)  # guarda 'ser': su id no se reusa mientras esté aquí
+        while len(_cols) > _COLS_MAX:
+            _cols.popitem(last=False)
+    return t, v
+
+class PriceFrame:
+    __slots__ = ("values", "dates", "symbols", "_pos", "_cache")
+
+    def __init__(self, values: np.ndarray, dates: np.ndarray, symbols: Sequence[str]):
+        self.values = values        # (T, N) float64, NaN = sin cotización ese día
+        self.dates = dates          # (T,) datetime64[D] ascendente
+        self.symbols = list(symbols)
+        self._pos = {s: j for j, s in enumerate(self.symbols)}
+        self._cache: Dict[str, Any] = {}
+
+    @classmethod
+    def from_dated(cls, series: Dict[str, Dict[str, Sequence]], field: str = "c") -> "PriceFrame":
+        """{SYM: {"t": ["YYYY-MM-DD"...], field: [...]}} (get_history_dated / get_builtin_dated)."""
+        cols = []
+        for sym, ser in series.items():
+            t, v = _column(ser, field)
+            if len(t) and len(t) == len(v):
+                cols.append((sym, t, v))
+        if not cols:
+            return cls(np.empty((0, 0)), np.empty(0, dtype="datetime64[D]"), [])
+        dates = np.unique(np.concatenate([t for _, t, _ in cols]))
+        values = np.full((len(dates), len(cols)), np.nan)
+        for j, (_, t, v) in enumerate(cols):
+            values[np.searchsorted(dates, t), j] = v
+        return cls(values, dates, [s for s, _, _ in cols])
+
+    # ----- forma y acceso -----
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __contains__(self, sym: str) -> bool:
+        return sym in self._pos
+
+    @property
+    def empty(self) -> bool:
+        return not self.symbols or len(self.dates) == 0
+
+    def col(self, sym: str) -> np.ndarray:
+        return self.values[:, self._pos[sym]]
+
+    def select(self, symbols: Sequence[str]) -> "PriceFrame":
+        """Columnas pedidas que existan, en ese orden."""
+        syms = [s for s in dict.fromkeys(symbols) if s in self._pos]
+        if syms == self.symbols:
+            return self
+        return PriceFrame(self.values[:, [self._pos[s] for s in syms]], self.dates, syms)
+
+    def since(self, day: Any) -> "PriceFrame":
+        """Filas desde 'day' (incluido); vista sin copia."""
+        i = int(np.searchsorted(self.dates, np.datetime64(day, "D")))
+        return self if i == 0 else PriceFrame(self.values[i:], self.dates[i:], self.symbols)
+
+    def window(self, trading_days: int) -> "PriceFrame":
+        """Últimos 'trading_days' días hábiles, medidos en fechas (no en filas)."""
+        if self.empty:
+            return self
+        return self.since(self.dates[-1] - np.timedelta64(-(-trading_days * 7 // 5), "D"))
+
+    # ----- vistas derivadas (cacheadas) -----
+    def mask(self) -> np.ndarray:
+        m = self._cache.get("mask")
+        if m is None:
+            m = self._cache["mask"] = ~np.isnan(self.values)
+        return m
+
+    def _last_row(self) -> np.ndarray:
+        """(T, N) índice de la última fila con dato hasta cada fila (-1 si ninguna)."""
+        idx = self._cache.get("last_row")
+        if idx is None:
+            rows = np.arange(len(self.dates))[:, None]
+            idx = np.where(self.mask(), rows, -1)
+            idx = self._cache["last_row"] = np.maximum.accumulate(idx, axis=0) if len(idx) else idx
+        return idx
+
+    def filled(self) -> np.ndarray:
+        """Precios con forward-fill (NaN antes de la primera cotización)."""
+        f = self._cache.get("filled")
+        if f is None:
+            idx = self._last_row()
+            f = self.values[np.maximum(idx, 0), np.arange(len(self.symbols))]
+            f[idx < 0] = np.nan
+            self._cache["filled"] = f
+        return f
+
+    def returns(self, kind: str = "simple") -> np.ndarray:
+        """(T, N) retornos de cada símbolo contra su cotización anterior; NaN si no cotizó."""
+        key = f"ret_{kind}"
+        r = self._cache.get(key)
+        if r is None:
+            prev = np.full_like(self.values, np.nan)
+            prev[1:] = self.filled()[:-1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = self.values / prev
+                r = np.log(ratio) if kind == "log" else ratio - 1.0
+            self._cache[key] = r
+        return r
+
+    def common(self) -> "PriceFrame":
+        """Solo las fechas en que todos los símbolos cotizan."""
+        c = self._cache.get("common")
+        if c is None:
+            rows = self.mask().all(axis=1)
+            c = self if rows.all() else PriceFrame(self.values[rows], self.dates[rows], self.symbols)
+            self._cache["common"] = c
+        return c
+
+    def counts(self) -> np.ndarray:
+        return self.mask().sum(axis=0)
+
+    def periods_per_year(self) -> np.ndarray:
+        """Por símbolo: 365 si cotiza los fines de semana (cripto), si no 252."""
+        ppy = self._cache.get("ppy")
+        if ppy is None:
+            weekend = ((self.dates.view("int64") + 3) % 7 >= 5)[:, None]  # 1970-01-01 fue jueves
+            ppy = np.where((self.mask() & weekend).any(axis=0), CALENDAR_DAYS, TRADING_DAYS).astype(np.float64)
+            self._cache["ppy"] = ppy
+        return ppy
+
+    # ----- resúmenes -----
+    def last(self) -> np.ndarray:
+        """Último precio de cada símbolo (NaN si nunca cotizó)."""
+        return self.filled()[-1] if len(self.dates) else np.full(len(self.symbols), np.nan)
+
+    def changes(self, days: Sequence[int] = (7, 30)) -> Dict[int, np.ndarray]:
+        """
+        {1: retorno de la última sesión de cada símbolo, d: contra su precio de
+        hace d días calendario}, medidos desde SU última cotización (0 si no hay).
+        """
+        n = len(self.symbols)
+        if not len(self.dates):
+            return {d: np.zeros(n) for d in (1, *days)}
+        last_row = self._last_row()[-1]
+        cols = np.arange(n)
+        ok = last_row >= 0
+        last_px = self.last()
+        out = {1: np.where(ok, self.returns()[np.maximum(last_row, 0), cols], np.nan)}
+        last_day = self.dates[np.maximum(last_row, 0)]
+        filled = self.filled()
+        for d in days:
+            row = np.searchsorted(self.dates, last_day - np.timedelta64(d, "D"), side="right") - 1
+            base = np.where(row >= 0, filled[np.maximum(row, 0), cols], np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[d] = last_px / base - 1.0
+        return {k: np.nan_to_num(v, nan=0.0) for k, v in out.items()}
+
+    def to_lists(self) -> Dict[str, List[float]]:
+        """{símbolo: precios} solo con las fechas en que cotizan todos."""
+        c = self.common()
+        return {s: c.values[:, j].tolist() for j, s in enumerate(c.symbols)}
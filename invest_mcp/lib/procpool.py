@@ -0,0 +1,55 @@
+# invest_mcp/lib/procpool.py
+from __future__ import annotations
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Iterable, Set
+
+from .context import check
+
+# Pools de procesos de las tools (backtest_rebalance, bulk_rebalance).
+#
+# forkserver (spawn donde no existe) y no fork: en stdio el hilo lector del
+# servidor queda bloqueado en stdin con el lock del buffer tomado; un hijo
+# forkeado hereda ese lock y se cuelga en el sys.stdin.close() de
+# multiprocessing. El forkserver arranca limpio una sola vez, con numpy y los
+# motores precargados, así cada worker nuevo sale de un fork barato y no de un
+# intérprete que vuelve a importar todo en cada llamada.
+#
+# Mientras espera resultados, el proceso principal llama a check() cada
+# WAIT_POLL_S. Si la llamada se cancela, los workers se terminan en vez de
+# esperar a que acaben los lotes en curso.
+
+WAIT_POLL_S = 0.05
+PRELOAD = ["numpy", "invest_mcp.lib.backtest", "invest_mcp.lib.rebalance", "invest_mcp.tools.bulk_rebalance"]
+
+_ctx = None
+
+def _context():
+    global _ctx
+    if _ctx is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            _ctx = multiprocessing.get_context("forkserver")
+            _ctx.set_forkserver_preload(PRELOAD)
+        else:
+            _ctx = multiprocessing.get_context("spawn")
+    return _ctx
+
+def process_pool(workers: int, **kw: Any) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, mp_context=_context(), **kw)
+
+def wait_any(futures: Iterable[Future]) -> Set[Future]:
+    """Al menos un future terminado; lanza Cancelled si la llamada se abandona mientras tanto."""
+    futures = list(futures)
+    while True:
+        done, _ = wait(futures, timeout=WAIT_POLL_S, return_when=FIRST_COMPLETED)
+        check()
+        if done:
+            return done
+
+def terminate(ex: ProcessPoolExecutor) -> None:
+    """Cierra el pool sin esperar los lotes en curso (llamada cancelada o error)."""
+    procs = list((getattr(ex, "_processes", None) or {}).values())  # shutdown() los suelta
+    ex.shutdown(wait=False, cancel_futures=True)
+    for p in procs:
+        if p.is_alive():
+            p.terminate()
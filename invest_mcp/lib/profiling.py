@@ -0,0 +1,254 @@
+# invest_mcp/lib/profiling.py
+from __future__ import annotations
+import os, sys, time, threading, html
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Perfilado opcional de una llamada a tool. protocol.handle_request solo entra
+# aquí si INVEST_MCP_PROFILE está activo o el request trae _meta.profile: con
+# ambos apagados el costo es una consulta a un dict.
+#
+#   INVEST_MCP_PROFILE        "" (apagado) | "1"/"sample" | "cprofile"
+#   INVEST_MCP_PROFILE_TOOLS  "build_portfolio,backtest_rebalance" (vacío = todas)
+#   INVEST_MCP_PROFILE_MIN_MS solo se escriben archivos si la llamada tardó al menos esto
+#   INVEST_MCP_PROFILE_DIR    destino (por defecto logs/profiles)
+#
+# Por llamada: _meta.profile = true | "sample" | "cprofile" |
+#              {"mode": ..., "intervalMs": 5, "memory": true}
+#
+# Archivos por llamada (<stamp>_<tool>_<id>.*):
+#   .collapsed  pilas colapsadas "a;b;c N" (flamegraph.pl, speedscope, inferno)
+#   .svg        flame graph autocontenido
+#   .pstats     solo modo cprofile (python -m pstats / snakeviz)
+#   .alloc.txt  top de asignaciones por línea (tracemalloc)
+# Subprocesos (pools de backtest/bulk_rebalance) quedan fuera del perfil.
+
+MODES = ("sample", "cprofile")
+
+_env = os.environ.get("INVEST_MCP_PROFILE", "").strip().lower()
+ENV_MODE: Optional[str] = None if _env in ("", "0", "off", "false") else ("sample" if _env in ("1", "true", "on") else _env)
+if ENV_MODE is not None and ENV_MODE not in MODES:
+    # Igual que _meta.profile.mode: un valor mal escrito no se perfila como "sample" en silencio
+    raise ValueError(f"INVEST_MCP_PROFILE debe ser 0/1 o uno de {MODES}, no {_env!r}")
+ENV_TOOLS = {t.strip() for t in os.environ.get("INVEST_MCP_PROFILE_TOOLS", "").split(",") if t.strip()}
+MIN_MS = float(os.environ.get("INVEST_MCP_PROFILE_MIN_MS", "0"))
+PROFILE_DIR = os.environ.get("INVEST_MCP_PROFILE_DIR", os.path.join("logs", "profiles"))
+DEFAULT_INTERVAL_MS = 5.0
+TOP_N = 15
+
+# tracemalloc y cProfile son globales al proceso: un perfil a la vez (el resto corre normal)
+_busy = threading.Lock()
+
+def requested(tool: str, meta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Opciones de perfilado para esta llamada, o None."""
+    req = meta.get("profile")
+    if req is None or req is False:
+        if ENV_MODE is None or (ENV_TOOLS and tool not in ENV_TOOLS):
+            return None
+        return {"mode": ENV_MODE, "minMs": MIN_MS}
+    opts: Dict[str, Any] = {"mode": ENV_MODE or "sample", "minMs": 0.0}
+    if isinstance(req, str):
+        opts["mode"] = req
+    elif isinstance(req, dict):
+        opts.update(req)
+    if opts["mode"] not in MODES:
+        raise ValueError(f"'_meta.profile.mode' debe ser uno de {MODES}")
+    return opts
+
+# -------- Muestreo --------
+def _frame_label(code) -> str:
+    mod = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{mod}:{code.co_name}"
+
+class Sampler:
+    """
+    Muestrea la pila de un hilo cada interval_s (tiempo de pared, incluye esperas de I/O).
+    Las pilas se cortan en el frame 'root' (lo que está por encima no es de la tool).
+    """
+    def __init__(self, thread_id: int, interval_s: float, root=None):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.root = root
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._t = threading.Thread(target=self._run, name="invest-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            labels: List[str] = []
+            while frame is not None and frame.f_code is not self.root:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels and frame is not None and not labels[-1].startswith("profiling:"):
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def __enter__(self) -> "Sampler":
+        self._t.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._t.join()
+
+# -------- cProfile -> pilas colapsadas --------
+def _pstats_collapsed(stats: Dict[Tuple, Tuple], max_depth: int = 40, min_frac: float = 0.001) -> Counter:
+    """
+    Reconstruye pilas aproximadas desde el grafo caller->callee de pstats: el tiempo
+    propio de cada función se reparte entre sus callers en proporción a su tiempo
+    acumulado. Las ramas por debajo de min_frac del total se descartan.
+    Unidad: microsegundos.
+    """
+    label = lambda f: f[2] if f[0] == "~" else f"{os.path.splitext(os.path.basename(f[0]))[0]}:{f[2]}"
+    total = sum(v[2] for v in stats.values()) or 1.0
+    out: Counter = Counter()
+
+    def walk(fn, weight: float, path: List[str], seen: frozenset):
+        callers = stats.get(fn, (0, 0, 0, 0, {}))[4]
+        edges = [(c, e[3]) for c, e in callers.items() if c not in seen and e[3] > 0]
+        ct = sum(w for _, w in edges)
+        if not edges or len(path) >= max_depth or ct <= 0:
+            out[";".join(reversed(path))] += int(weight * 1e6)
+            return
+        for c, w in edges:
+            share = weight * w / ct
+            if share >= min_frac * total:
+                walk(c, share, path + [label(c)], seen | {c})
+
+    for fn, (_, _, tt, _, _) in stats.items():
+        if tt >= min_frac * total:
+            walk(fn, tt, [label(fn)], frozenset([fn]))
+    return out
+
+# -------- Flame graph SVG (sin dependencias) --------
+def flamegraph_svg(stacks: Counter, title: str, width: int = 1200, row: int = 16) -> str:
+    tree: Dict[str, Any] = {"n": 0, "c": {}}
+    for stack, n in stacks.items():
+        node = tree
+        node["n"] += n
+        for fr in stack.split(";"):
+            node = node["c"].setdefault(fr, {"n": 0, "c": {}})
+            node["n"] += n
+    total = tree["n"] or 1
+    rects: List[str] = []
+    depth_max = [0]
+
+    def draw(node, x: float, depth: int):
+        for name, child in sorted(node["c"].items()):
+            w = child["n"] / total * width
+            if w >= 0.5:
+                depth_max[0] = max(depth_max[0], depth)
+                hue = 20 + (hash(name) % 40)
+                pct = 100.0 * child["n"] / total
+                label = html.escape(name)
+                text = label if w > 7 * len(name) else (label[: int(w / 7)] if w > 21 else "")
+                rects.append(
+                    f'<g><title>{label} ({child["n"]}, {pct:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{{y{depth}}}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue},85%,60%)"/>'
+                    f'<text x="{x + 3:.1f}" y="{{t{depth}}}">{text}</text></g>')
+                draw(child, x, depth + 1)
+            x += w
+
+    draw(tree, 0.0, 0)
+    height = (depth_max[0] + 1) * row + 30
+    body = "\n".join(rects)
+    for d in range(depth_max[0] + 1):  # raíz abajo, como flamegraph.pl
+        y = height - (d + 1) * row
+        body = body.replace(f"{{y{d}}}", str(y)).replace(f"{{t{d}}}", str(y + row - 4))
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="monospace" font-size="11">'
+            f'<text x="4" y="16" font-size="13">{html.escape(title)}</text>\n{body}\n</svg>\n')
+
+# -------- Ejecución perfilada --------
+def _stamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%f")[:-3]
+
+def run(tool: str, request_id: Any, opts: Dict[str, Any], fn: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+    """Ejecuta fn() perfilada. Retorna (resultado, resumen para result._meta)."""
+    if not _busy.acquire(blocking=False):
+        return fn(), {"skipped": "otro perfil en curso"}
+    try:
+        return _run(tool, request_id, opts, fn)
+    finally:
+        _busy.release()
+
+def _run(tool: str, request_id: Any, opts: Dict[str, Any], fn: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+    import tracemalloc
+    mode = opts.get("mode", "sample")
+    memory = bool(opts.get("memory", True))
+    started_tm = memory and not tracemalloc.is_tracing()
+    if started_tm:
+        tracemalloc.start(1)  # 1 frame: basta para el top por línea y es lo más barato
+    if memory:
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+    prof = sampler = None
+    t0 = time.perf_counter()
+    try:
+        if mode == "cprofile":
+            import cProfile
+            prof = cProfile.Profile()
+            prof.enable()
+            try:
+                result = fn()
+            finally:
+                prof.disable()
+        else:
+            interval = float(opts.get("intervalMs", DEFAULT_INTERVAL_MS)) / 1000.0
+            with Sampler(threading.get_ident(), interval, root=_run.__code__) as sampler:
+                result = fn()
+        wall_ms = (time.perf_counter() - t0) * 1000.0
+        snap = tracemalloc.take_snapshot() if memory else None
+        peak = tracemalloc.get_traced_memory()[1] if memory else 0
+    finally:
+        if started_tm:
+            tracemalloc.stop()
+
+    info: Dict[str, Any] = {"mode": mode, "wallMs": round(wall_ms, 3)}
+    if memory:
+        info["allocPeakKB"] = round(peak / 1024, 1)
+    if wall_ms < float(opts.get("minMs", 0.0)):
+        return result, info
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    rid = str(request_id).replace(os.sep, "_")
+    base = os.path.join(PROFILE_DIR, f"{_stamp()}_{tool}_{rid}")
+    files: Dict[str, str] = {}
+    if prof is not None:
+        import pstats
+        prof.dump_stats(base + ".pstats")
+        files["pstats"] = base + ".pstats"
+        st = pstats.Stats(prof).stats
+        stacks = _pstats_collapsed(st)
+        top = sorted(st.items(), key=lambda kv: kv[1][2], reverse=True)[:TOP_N]
+        info["top"] = [{"fn": f"{os.path.basename(k[0])}:{k[1]}:{k[2]}", "calls": v[1],
+                        "selfMs": round(v[2] * 1000, 3), "cumMs": round(v[3] * 1000, 3)} for k, v in top]
+    else:
+        stacks = sampler.stacks
+        leaf = Counter()
+        for s, n in stacks.items():
+            leaf[s.rsplit(";", 1)[-1]] += n
+        info["samples"] = sum(stacks.values())
+        info["top"] = [{"fn": f, "samples": n} for f, n in leaf.most_common(TOP_N)]
+
+    with open(base + ".collapsed", "w", encoding="utf-8") as f:
+        for s, n in sorted(stacks.items()):
+            f.write(f"{s} {n}\n")
+    files["collapsed"] = base + ".collapsed"
+    with open(base + ".svg", "w", encoding="utf-8") as f:
+        f.write(flamegraph_svg(stacks, f"{tool} id={request_id} {mode} {wall_ms:.1f} ms"))
+    files["svg"] = base + ".svg"
+    if snap is not None:
+        # Diferencia neta vs. el inicio de la llamada, sin el propio perfilador
+        noise = [tracemalloc.Filter(False, p) for p in
+                 (__file__, tracemalloc.__file__, "*/profile.py", "*/threading.py", "<frozen importlib.*")]
+        diff = snap.filter_traces(noise).compare_to(before.filter_traces(noise), "lineno")
+        with open(base + ".alloc.txt", "w", encoding="utf-8") as f:
+            f.write(f"peak {peak / 1024:.1f} KiB (pico durante la llamada)\n")
+            f.write("retenido al terminar, por línea:\n")
+            for s in diff[:25]:
+                f.write(f"{s}\n")
+        files["alloc"] = base + ".alloc.txt"
+    info["files"] = files
+    return result, info
@@ -0,0 +1,208 @@
+# invest_mcp/lib/rebalance.py
+from __future__ import annotations
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+
+DEFAULT_LOT = 1.0            # acciones/ETFs: 1 acción
+DEFAULT_CRYPTO_LOT = 1e-5    # cripto: fracciones finas
+FRACTIONAL_LOT = 1e-4        # fractional=true sin lotSizes explícito
+
+# -------- Normalización de entradas --------
+def build_universe(accounts: List[Dict[str, Any]]) -> List[str]:
+    seen: Dict[str, None] = {}
+    for acc in accounts:
+        for x in (acc.get("current") or []):
+            s = x.get("symbol") if isinstance(x, dict) else None
+            if isinstance(s, str): seen.setdefault(s, None)
+        for t in (acc.get("targetWeights") or []):
+            s = t.get("symbol") if isinstance(t, dict) else None
+            if isinstance(s, str): seen.setdefault(s, None)
+    return list(seen.keys())
+
+def lot_vector(symbols: List[str], lot_sizes: Dict[str, float], fractional: bool,
+               crypto: Optional[set] = None) -> np.ndarray:
+    crypto = crypto or set()
+    out = np.empty(len(symbols))
+    for j, s in enumerate(symbols):
+        if s in lot_sizes:
+            out[j] = float(lot_sizes[s])
+        elif fractional:
+            out[j] = FRACTIONAL_LOT
+        else:
+            out[j] = DEFAULT_CRYPTO_LOT if s in crypto else DEFAULT_LOT
+    if (out <= 0).any():
+        raise ValueError("lotSizes debe ser > 0")
+    return out
+
+def account_matrices(accounts: List[Dict[str, Any]], symbols: List[str],
+                     prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Construye (H acciones, W pesos, C cash, X valor sin precio) con forma (A x N) / (A,).
+    Holdings aceptan 'shares' o 'amount' ($). Sin precio -> se congela como valor.
+    """
+    idx = {s: j for j, s in enumerate(symbols)}
+    A, N = len(accounts), len(symbols)
+    H = np.zeros((A, N))
+    W = np.zeros((A, N))
+    C = np.zeros(A)
+    X = np.zeros(A)
+    for i, acc in enumerate(accounts):
+        C[i] = float(acc.get("cash", 0) or 0)
+        for x in (acc.get("current") or []):
+            s = x.get("symbol")
+            if not isinstance(s, str): continue
+            j = idx[s]
+            p = prices[j]
+            if x.get("shares") is not None:
+                if np.isfinite(p): H[i, j] += float(x["shares"])
+            else:
+                amt = float(x.get("amount", 0))
+                if np.isfinite(p): H[i, j] += amt / p
+                else: X[i] += amt
+        for t in (acc.get("targetWeights") or []):
+            s = t.get("symbol")
+            w = float(t.get("weight", 0))
+            if not isinstance(s, str) or w < 0: continue
+            if np.isfinite(prices[idx[s]]):
+                W[i, idx[s]] += w
+    sw = W.sum(axis=1, keepdims=True)
+    W = np.where(sw > 1.0, W / np.where(sw > 0, sw, 1.0), W)
+    return H, W, C, X
+
+# -------- Solver vectorizado --------
+def solve_lots(H: np.ndarray, W: np.ndarray, C: np.ndarray, prices: np.ndarray, lots: np.ndarray,
+               cash_buffer: float = 0.0, min_trade: float = 0.0,
+               frozen_value: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Redondea a lotes minimizando el error de tracking cuadrático tras el redondeo.
+
+      1) piso de lotes objetivo (nunca excede el presupuesto)
+      2) trades con |valor ideal| < min_trade se congelan en la posición actual
+      3) reparte el cash sobrante por ganancia marginal 2*d*c - c^2 (greedy, vectorizado en A)
+      4) revierte trades redondeados por debajo de min_trade y repara cash negativo
+
+    Todo opera sobre matrices (A cuentas x N símbolos).
+    """
+    A, N = H.shape
+    px = np.where(np.isfinite(prices), prices, 0.0)
+    c = px * lots                                   # valor de un lote
+    held_val = H * px
+    V = held_val.sum(axis=1) + C
+    frozen_value = frozen_value if frozen_value is not None else np.zeros(A)
+    budget = V * (1.0 - cash_buffer)
+    target_val = W * budget[:, None]
+
+    ok = c > 0
+    Q = np.zeros((A, N))
+    Q[:, ok] = np.floor(target_val[:, ok] / c[ok] + 1e-9)
+
+    freeze = (np.abs(target_val - held_val) < min_trade) | ~ok[None, :]
+    Q = np.where(freeze, H / lots, Q)
+
+    def _cash(Qm: np.ndarray) -> np.ndarray:
+        return V - (Qm * c).sum(axis=1)
+
+    # 3) Greedy por ganancia: cada símbolo recibe a lo sumo un lote extra tras el piso
+    spare = _cash(Q) - V * cash_buffer
+    d = target_val - Q * c
+    gain = np.where(freeze, -np.inf, 2.0 * d * c - c * c)
+    gain = np.where(gain > 0, gain, -np.inf)
+    order = np.argsort(-gain, axis=1)
+    g_sorted = np.take_along_axis(gain, order, axis=1)
+    c_sorted = np.broadcast_to(c, (A, N))[np.arange(A)[:, None], order]
+    take = np.zeros((A, N), dtype=bool)
+    remaining = spare.copy()
+    cand = np.isfinite(g_sorted)
+    # Pasadas sucesivas: prefijo que cabe, luego saltar los que no caben
+    for _ in range(4):
+        cost_cand = np.where(cand & ~take, c_sorted, 0.0)
+        cum = np.cumsum(cost_cand, axis=1)
+        fits = cand & ~take & (cum <= remaining[:, None] + 1e-9)
+        if not fits.any():
+            break
+        take |= fits
+        remaining = remaining - np.where(fits, c_sorted, 0.0).sum(axis=1)
+        cand = cand & (c_sorted <= remaining[:, None] + 1e-9)
+    extra = np.zeros((A, N))
+    np.put_along_axis(extra, order, take.astype(float), axis=1)
+    Q = Q + extra
+
+    # 4) Trades redondeados bajo el mínimo -> no operar
+    if min_trade > 0:
+        small = np.abs(Q * lots - H) * px < min_trade
+        Q = np.where(small, H / lots, Q)
+
+    # Reparación: si el cash quedó negativo, recortar la compra más barata hasta cubrirlo
+    cash = _cash(Q)
+    for _ in range(N):
+        rows = np.flatnonzero(cash < -1e-9)
+        if not len(rows):
+            break
+        bought = (Q[rows] * lots - H[rows]) > 1e-12
+        cand_c = np.where(bought, c, np.inf)
+        j = np.argmin(cand_c, axis=1)
+        cj = cand_c[np.arange(len(rows)), j]
+        valid = np.isfinite(cj)
+        if not valid.any():
+            break
+        rows, j, cj = rows[valid], j[valid], cj[valid]
+        avail = Q[rows, j] - H[rows, j] / lots[j]
+        cut = np.minimum(np.ceil(-cash[rows] / cj - 1e-9), np.ceil(avail - 1e-9))
+        Q[rows, j] -= cut
+        cash = _cash(Q)
+
+    shares = Q * lots
+    final_val = shares * px
+    total = V + frozen_value
+    final_w = final_val / np.where(V > 0, V, 1.0)[:, None]
+    te = np.sqrt(((final_w - W * (1.0 - cash_buffer)) ** 2).sum(axis=1))
+    return {
+        "shares": shares,
+        "tradeShares": shares - H,
+        "finalValue": final_val,
+        "targetValue": target_val,
+        "cashAfter": cash,
+        "total": total,
+        "trackingError": te,
+    }
+
+# -------- Serialización por cuenta --------
+def account_payload(i: int, acc: Dict[str, Any], symbols: List[str], prices: np.ndarray,
+                    H: np.ndarray, W: np.ndarray, C: np.ndarray, sol: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    target_amounts = []
+    trades = []
+    cols = np.flatnonzero((W[i] > 0) | (H[i] != 0) | (sol["shares"][i] != 0))
+    # tolist() una vez por fila: evita convertir escalares numpy uno a uno
+    px = prices[cols].tolist()
+    tv = sol["targetValue"][i, cols].tolist()
+    sh = sol["shares"][i, cols].tolist()
+    fv = sol["finalValue"][i, cols].tolist()
+    dqs = sol["tradeShares"][i, cols].tolist()
+    for k, j in enumerate(cols.tolist()):
+        s = symbols[j]
+        p = px[k]
+        target_amounts.append({
+            "symbol": s,
+            "targetAmount": tv[k],
+            "lastPrice": p,
+            "targetShares": sh[k],
+            "finalAmount": fv[k],
+        })
+        dq = dqs[k]
+        if abs(dq) < 1e-12: continue
+        trades.append({
+            "symbol": s,
+            "action": "BUY" if dq > 0 else "SELL",
+            "shares": abs(dq),
+            "price": p,
+            "delta": dq * p,
+        })
+    return {
+        "accountId": acc.get("accountId", i),
+        "totalCurrent": float(sol["total"][i]),
+        "cashBefore": float(C[i]),
+        "cashAfter": float(sol["cashAfter"][i]),
+        "trackingError": float(sol["trackingError"][i]),
+        "targetAmounts": target_amounts,
+        "trades": trades,
+    }
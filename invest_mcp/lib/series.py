@@ -0,0 +1,128 @@
+# invest_mcp/lib/series.py
+from __future__ import annotations
+import base64, json
+from datetime import date, timedelta
+from typing import Dict, List, Any, Optional
+
+INTERVALS = ("1d", "1w", "1mo")
+FIELDS = ("o", "h", "l", "c")
+
+# -------- Serie <-> puntos --------
+def to_points(ser: Dict[str, List]) -> List[Dict[str, Any]]:
+    """{"t": [...], "c": [...], "o"?...} -> [{t, o?, h?, l?, c}] en orden cronológico."""
+    keys = [k for k in FIELDS if k in ser]
+    return [{"t": t, **{k: float(ser[k][i]) for k in keys}} for i, t in enumerate(ser["t"])]
+
+def clip(points: List[Dict[str, Any]], start: Optional[str], end: Optional[str]) -> List[Dict[str, Any]]:
+    """Filtra por rango ISO inclusivo [start, end]."""
+    return [p for p in points if (start is None or p["t"] >= start) and (end is None or p["t"] <= end)]
+
+# -------- Cambio de intervalo (1d -> 1w/1mo) --------
+def _period_start(t: str, interval: str) -> str:
+    d = date.fromisoformat(t)
+    if interval == "1w":
+        return (d - timedelta(days=d.weekday())).isoformat()  # lunes de la semana
+    return d.replace(day=1).isoformat()
+
+def _merge(bucket: List[Dict[str, Any]], label: str) -> Dict[str, Any]:
+    """Agrega puntos consecutivos en una vela: o=primero, h=máx, l=mín, c=último."""
+    first, last = bucket[0], bucket[-1]
+    out: Dict[str, Any] = {"t": label}
+    if "o" in first:
+        out["o"] = first["o"]
+        out["h"] = max(p["h"] for p in bucket)
+        out["l"] = min(p["l"] for p in bucket)
+    out["c"] = last["c"]
+    return out
+
+def resample(points: List[Dict[str, Any]], interval: str) -> List[Dict[str, Any]]:
+    """
+    Reagrupa puntos diarios en velas semanales (lunes) o mensuales (día 1).
+    La etiqueta 't' es el inicio del período, así las etiquetas son únicas y ordenadas.
+    """
+    if interval == "1d" or not points:
+        return points
+    if interval not in INTERVALS:
+        raise ValueError(f"'interval' debe ser uno de {list(INTERVALS)}")
+    out: List[Dict[str, Any]] = []
+    bucket: List[Dict[str, Any]] = []
+    label = None
+    for p in points:
+        k = _period_start(p["t"], interval)
+        if k != label and bucket:
+            out.append(_merge(bucket, label))
+            bucket = []
+        label = k
+        bucket.append(p)
+    if bucket:
+        out.append(_merge(bucket, label))
+    return out
+
+# -------- Downsampling --------
+def lttb(points: List[Dict[str, Any]], n: int) -> List[Dict[str, Any]]:
+    """
+    Largest-Triangle-Three-Buckets sobre el cierre: conserva n puntos reales
+    (incluye primero y último) preservando la forma visual de la serie.
+    """
+    L = len(points)
+    if n >= L or n < 3:
+        return points if n >= L else [points[0], points[-1]][:max(n, 1)]
+    import numpy as np
+    y = np.array([p["c"] for p in points], dtype=np.float64)
+    x = np.arange(L, dtype=np.float64)
+    edges = np.linspace(1, L - 1, n - 1).astype(np.int64)  # n-2 buckets interiores
+    keep = [0]
+    a = 0
+    for b in range(n - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # promedio del bucket siguiente (o el último punto)
+        nlo, nhi = hi, (edges[b + 2] if b + 2 < len(edges) else L)
+        ax, ay = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - ax) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (ay - y[a]))
+        a = lo + int(np.argmax(area))
+        keep.append(a)
+    keep.append(L - 1)
+    return [points[i] for i in keep]
+
+def ohlc_buckets(points: List[Dict[str, Any]], n: int) -> List[Dict[str, Any]]:
+    """
+    Agrupa en n velas contiguas (misma cantidad de puntos aprox.), etiquetadas con
+    la fecha de inicio. Conserva máximos/mínimos reales a diferencia de LTTB.
+    """
+    L = len(points)
+    if n >= L or n < 1:
+        return points
+    import numpy as np
+    edges = np.linspace(0, L, n + 1).astype(np.int64)
+    out = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        bucket = points[lo:hi]
+        if "o" not in bucket[0]:
+            cs = [p["c"] for p in bucket]
+            bucket = [{"o": cs[0], "h": max(cs), "l": min(cs), "c": cs[-1]}]
+        out.append(_merge(bucket, points[lo]["t"]))
+    return out
+
+def downsample(points: List[Dict[str, Any]], n: int, method: str = "lttb") -> List[Dict[str, Any]]:
+    if method == "lttb":
+        return lttb(points, n)
+    if method == "ohlc":
+        return ohlc_buckets(points, n)
+    raise ValueError("'method' debe ser lttb|ohlc")
+
+# -------- Cursor opaco --------
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(cursor + pad))
+        if not isinstance(state, dict):
+            raise ValueError
+        return state
+    except Exception:
+        raise ValueError("'cursor' inválido")
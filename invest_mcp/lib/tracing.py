@@ -0,0 +1,229 @@
+# invest_mcp/lib/tracing.py
+from __future__ import annotations
+import os, json, time, random, threading, atexit, contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Trazas distribuidas sin dependencias (modelo OpenTelemetry, export OTLP/JSON).
+# El contexto viaja como W3C traceparent en params._meta de JSON-RPC:
+#   host (chat.turn -> llm.chat / mcp.command -> mcp <method>)  --_meta.traceparent-->
+#   servidor (mcp.server <method> -> tool <name> -> cache.load / upstream)
+#
+#   INVEST_MCP_TRACE = ""                               apagado (start() retorna None)
+#                    | "file:logs/traces.jsonl" | ruta  una línea ExportTraceServiceRequest por lote
+#                    | "otlp" | "http://host:4318"      POST /v1/traces (OTEL_EXPORTER_OTLP_ENDPOINT)
+# Los hijos heredan la variable: host y servidores escriben al mismo destino.
+
+TARGET = os.environ.get("INVEST_MCP_TRACE", "").strip()
+ENABLED = TARGET.lower() not in ("", "0", "off", "false")
+BATCH_MAX = 256
+FLUSH_S = 1.0
+
+_KINDS = {"internal": 1, "server": 2, "client": 3}
+_service = os.environ.get("OTEL_SERVICE_NAME", "invest-mcp")
+
+def set_service(name: str) -> None:
+    """service.name del proceso (el host usa 'chat-host'; OTEL_SERVICE_NAME tiene prioridad)."""
+    global _service
+    _service = os.environ.get("OTEL_SERVICE_NAME", name)
+
+# -------- Spans --------
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attrs", "status", "message", "_token")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attrs = attrs
+        self.status = 0  # UNSET
+        self.message = ""
+        self._token: Optional[contextvars.Token] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attrs[key] = value
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self, error: Optional[str] = None) -> None:
+        if self.end_ns:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.status, self.message = 2, error  # ERROR
+        if self._token is not None:
+            try:
+                _CURRENT.reset(self._token)
+            except ValueError:
+                _CURRENT.set(None)  # terminado desde otro contexto
+        _exporter().add(self)
+
+_CURRENT: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("invest_span", default=None)
+
+def current() -> Optional[Span]:
+    return _CURRENT.get()
+
+def parse_traceparent(tp: Any) -> Optional[Tuple[str, str]]:
+    """'00-<trace 32hex>-<span 16hex>-<flags>' -> (trace_id, span_id)."""
+    if not isinstance(tp, str):
+        return None
+    parts = tp.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+def extract(meta: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+    return parse_traceparent((meta or {}).get("traceparent"))
+
+def inject(meta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Copia de meta con el traceparent del span actual (si lo hay)."""
+    sp = _CURRENT.get()
+    if sp is None:
+        return dict(meta or {})
+    return {**(meta or {}), "traceparent": sp.traceparent()}
+
+def start(name: str, kind: str = "internal", parent: Optional[Tuple[str, str]] = None,
+          **attrs: Any) -> Optional[Span]:
+    """
+    Abre un span hijo del actual (o de 'parent', el contexto remoto) y lo activa.
+    Con el tracing apagado retorna None; el llamador debe llamar sp.end().
+    """
+    if not ENABLED:
+        return None
+    if parent is None:
+        cur = _CURRENT.get()
+        parent = (cur.trace_id, cur.span_id) if cur is not None else None
+    trace_id = parent[0] if parent else "%032x" % random.getrandbits(128)
+    sp = Span(name, kind, trace_id, parent[1] if parent else None, attrs)
+    sp._token = _CURRENT.set(sp)
+    return sp
+
+@contextmanager
+def span(name: str, kind: str = "internal", parent: Optional[Tuple[str, str]] = None,
+         **attrs: Any) -> Iterator[Optional[Span]]:
+    sp = start(name, kind, parent, **attrs)
+    if sp is None:
+        yield None
+        return
+    try:
+        yield sp
+    except BaseException as e:
+        sp.end(error=f"{type(e).__name__}: {e}")
+        raise
+    sp.end()
+
+def ids() -> Dict[str, str]:
+    """{trace_id, span_id} del span actual para correlacionar logs; {} si no hay."""
+    sp = _CURRENT.get()
+    return {"trace_id": sp.trace_id, "span_id": sp.span_id} if sp is not None else {}
+
+# -------- OTLP/JSON --------
+def _attr(k: str, v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        val = {"boolValue": v}
+    elif isinstance(v, int):
+        val = {"intValue": str(v)}
+    elif isinstance(v, float):
+        val = {"doubleValue": v}
+    else:
+        val = {"stringValue": str(v)}
+    return {"key": k, "value": val}
+
+def _otlp_span(sp: Span) -> Dict[str, Any]:
+    d: Dict[str, Any] = {
+        "traceId": sp.trace_id, "spanId": sp.span_id, "name": sp.name, "kind": _KINDS.get(sp.kind, 1),
+        "startTimeUnixNano": str(sp.start_ns), "endTimeUnixNano": str(sp.end_ns),
+        "attributes": [_attr(k, v) for k, v in sp.attrs.items() if v is not None],
+        "status": {"code": sp.status, **({"message": sp.message} if sp.message else {})},
+    }
+    if sp.parent_id:
+        d["parentSpanId"] = sp.parent_id
+    return d
+
+def otlp_request(spans: List[Span]) -> Dict[str, Any]:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [_attr("service.name", _service), _attr("process.pid", os.getpid())]},
+        "scopeSpans": [{"scope": {"name": "invest_mcp.tracing"}, "spans": [_otlp_span(s) for s in spans]}],
+    }]}
+
+class _Exporter:
+    """Acumula spans terminados y los exporta por lotes desde un hilo daemon."""
+    def __init__(self, target: str):
+        self.target = target
+        self._buf: List[Span] = []
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+
+    def add(self, sp: Span) -> None:
+        with self._cv:
+            if self._thread is None or self._pid != os.getpid():  # primer span o tras fork
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop, name="invest-trace", daemon=True)
+                self._thread.start()
+            self._buf.append(sp)
+            if len(self._buf) >= BATCH_MAX:
+                self._cv.notify()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cv:
+                self._cv.wait(FLUSH_S)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._cv:
+            batch, self._buf = self._buf, []
+        if not batch:
+            return
+        body = json.dumps(otlp_request(batch), ensure_ascii=False)
+        try:
+            if self.target.startswith(("http://", "https://")) or self.target.lower() == "otlp":
+                self._post(body)
+            else:
+                self._append(body)
+        except Exception:
+            pass  # el tracing nunca rompe una llamada
+
+    def _append(self, body: str) -> None:
+        path = self.target[5:] if self.target.startswith("file:") else self.target
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        # O_APPEND + un solo write por lote: host e hijos pueden compartir el archivo
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (body + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def _post(self, body: str) -> None:
+        import urllib.request
+        base = self.target if self.target.lower() != "otlp" else \
+            os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "http://127.0.0.1:4318")
+        url = base.rstrip("/") + ("" if base.rstrip("/").endswith("/v1/traces") else "/v1/traces")
+        req = urllib.request.Request(url, data=body.encode("utf-8"), method="POST",
+                                     headers={"Content-Type": "application/json"})
+        urllib.request.urlopen(req, timeout=5).close()
+
+_EXPORTER: Optional[_Exporter] = None
+_exp_lock = threading.Lock()
+
+def _exporter() -> _Exporter:
+    global _EXPORTER
+    if _EXPORTER is None:
+        with _exp_lock:
+            if _EXPORTER is None:
+                _EXPORTER = _Exporter(TARGET)
+                atexit.register(_EXPORTER.flush)
+    return _EXPORTER
+
+def flush() -> None:
+    if _EXPORTER is not None:
+        _EXPORTER.flush()
@@ -0,0 +1,207 @@
+# invest_mcp/lib/warmer.py
+from __future__ import annotations
+import os, threading, time
+from typing import Any, Callable, Dict, List, Optional
+
+from . import data_live, metrics
+
+# Calentador de cache (INVEST_MCP_WARMER=1). Un hilo del servidor recorre una
+# watchlist (UNIVERSE + símbolos pedidos en las últimas INVEST_MCP_WARM_RECENT_S
+# + INVEST_MCP_WARM_SYMBOLS) y vuelve a pedir los históricos y el spot cuando su
+# entrada pasó INVEST_MCP_WARM_LEAD del TTL blando, antes de que venza: la
+# primera llamada del día encuentra la cache caliente en vez de esperar a
+# yfinance/CoinGecko.
+#
+# Los pedidos al proveedor se espacian según INVEST_MCP_WARM_RPM (por proveedor)
+# y se saltan con el breaker abierto. Si varios procesos comparten la cache en
+# disco (réplicas, pool prefork), solo calienta el que toma warmer.lock.
+
+ENABLED = os.environ.get("INVEST_MCP_WARMER", "0") == "1"
+LEAD = float(os.environ.get("INVEST_MCP_WARM_LEAD", "0.8"))
+RECENT_S = float(os.environ.get("INVEST_MCP_WARM_RECENT_S", "86400"))
+TICK_S = float(os.environ.get("INVEST_MCP_WARM_TICK_S", "5"))
+BATCH = int(os.environ.get("INVEST_MCP_WARM_BATCH", "20"))
+WITH_UNIVERSE = os.environ.get("INVEST_MCP_WARM_UNIVERSE", "1") == "1"
+EXTRA = [s.strip() for s in os.environ.get("INVEST_MCP_WARM_SYMBOLS", "").split(",") if s.strip()]
+RPM: Dict[str, float] = {"yfinance": 30, "coingecko": 10,
+                         **data_live._ttl_opts(os.environ.get("INVEST_MCP_WARM_RPM", ""))}
+
+class _Task:
+    """Un tipo de dato a mantener caliente: qué símbolos, con qué clave y cómo pedirlos."""
+    def __init__(self, name: str, provider: str, crypto: bool, batch: int,
+                 key: Callable[[str], str], fetch: Callable[[List[str], float], Any]):
+        self.name = name
+        self.provider = provider
+        self.crypto = crypto
+        self.batch = max(1, batch)
+        self.key = key
+        self.fetch = fetch
+        self.stats: Dict[str, Any] = {"runs": 0, "refreshed": 0, "failed": 0, "requests": 0,
+                                      "lastRunAt": None, "lastDurationMs": None, "lastRefreshed": 0,
+                                      "lastFailed": 0, "lastSkipped": None}
+        self.next_due: Optional[float] = None
+
+TASKS: List[_Task] = [
+    _Task("history", "yfinance", False, BATCH, data_live.history_key,
+          lambda syms, age: data_live.fetch_yf_history_dated(syms, data_live.HISTORY_PERIOD, "1d", max_age=age)),
+    _Task("crypto_history", "coingecko", True, 1, data_live.history_key,
+          lambda syms, age: data_live.fetch_cg_history_dated(syms, data_live.CG_HISTORY_DAYS, max_age=age)),
+    _Task("spot", "coingecko", True, 50, data_live.spot_key,
+          lambda syms, age: data_live.fetch_cg_simple_price(syms, max_age=age)),
+]
+
+def watchlist() -> Dict[str, List[str]]:
+    from invest_mcp.tools.data import UNIVERSE
+    return {"universe": list(UNIVERSE) if WITH_UNIVERSE else [],
+            "recent": data_live.recent_symbols(RECENT_S), "extra": list(EXTRA)}
+
+class Warmer:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_fd: Optional[int] = None
+        self._next_req: Dict[str, float] = {}
+        self.started_at: Optional[float] = None
+        self.leader = False
+
+    # ----- liderazgo entre procesos que comparten la cache -----
+    def _try_lead(self) -> bool:
+        if self.leader:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            self.leader = True  # sin flock (Windows): cada proceso calienta
+            return True
+        try:
+            data_live._ensure_cache_dir()
+            fd = os.open(os.path.join(data_live.CACHE_DIR, "warmer.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            try:
+                os.close(fd)
+            except Exception:
+                pass
+            return False
+        self._lock_fd = fd
+        self.leader = True
+        return True
+
+    # ----- ciclo -----
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._loop, name="invest-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            if self._try_lead():
+                try:
+                    self.tick()
+                except Exception as e:
+                    data_live._d(f"warmer: {e}")
+            self._wake.wait(TICK_S)
+            self._wake.clear()
+
+    def _due(self, task: _Task, symbols: List[str]) -> List[str]:
+        """Símbolos cuya entrada falta o pasó LEAD de su TTL blando; actualiza next_due."""
+        due: List[str] = []
+        next_due = None
+        now = time.time()
+        for sym in symbols:
+            key = task.key(sym)
+            age = data_live.cache_age(key)
+            lead = LEAD * data_live.soft_ttl(key)
+            if age is None or age >= lead:
+                due.append(sym)
+            else:
+                at = now + lead - age
+                next_due = at if next_due is None else min(next_due, at)
+        task.next_due = now if due else next_due
+        return due
+
+    def _pace(self, provider: str) -> bool:
+        """Espera el turno del proveedor (INVEST_MCP_WARM_RPM); False si hay que parar."""
+        rpm = RPM.get(provider, 10)
+        wait = self._next_req.get(provider, 0.0) - time.monotonic()
+        if wait > 0 and self._stop.wait(wait):
+            return False
+        self._next_req[provider] = time.monotonic() + (60.0 / rpm if rpm > 0 else 0.0)
+        return True
+
+    def tick(self) -> None:
+        wl = watchlist()
+        symbols = list(dict.fromkeys(wl["universe"] + wl["recent"] + wl["extra"]))
+        for task in TASKS:
+            syms = [s for s in symbols if (s in data_live.COINGECKO_IDS) == task.crypto]
+            due = self._due(task, syms)
+            if not due:
+                continue
+            t0 = time.perf_counter()
+            refreshed = failed = 0
+            skipped = None
+            for i in range(0, len(due), task.batch):
+                br = data_live.breaker(task.provider)
+                if br is not None and not br.ready():
+                    skipped = "circuit_open"
+                    failed += len(due) - i
+                    break
+                if not self._pace(task.provider):
+                    return
+                batch = due[i:i + task.batch]
+                max_age = min(LEAD * data_live.soft_ttl(task.key(s)) for s in batch)
+                started = time.time()
+                try:
+                    task.fetch(batch, max_age)
+                except Exception as e:
+                    data_live._d(f"warmer {task.name}: {e}")
+                task.stats["requests"] += 1
+                ok = sum(1 for s in batch if (data_live.cache_age(task.key(s)) or 1e18) <= time.time() - started)
+                refreshed += ok
+                failed += len(batch) - ok
+            dt = (time.perf_counter() - t0) * 1000.0
+            task.stats.update({"runs": task.stats["runs"] + 1, "lastRunAt": time.time(),
+                               "lastDurationMs": round(dt, 1), "lastRefreshed": refreshed, "lastFailed": failed,
+                               "lastSkipped": skipped})
+            task.stats["refreshed"] += refreshed
+            task.stats["failed"] += failed
+            metrics.inc("warmer_refreshed_total", refreshed, task=task.name)
+            if failed:
+                metrics.inc("warmer_failed_total", failed, task=task.name)
+            metrics.observe("warmer_run_ms", dt, task=task.name)
+            self._due(task, syms)
+
+    def status(self) -> Dict[str, Any]:
+        wl = watchlist()
+        now = time.time()
+        tasks = []
+        for task in TASKS:
+            tasks.append({"task": task.name, "provider": task.provider, "batch": task.batch,
+                          "nextDueInS": round(max(0.0, task.next_due - now), 1) if task.next_due else None,
+                          **task.stats})
+        return {"enabled": ENABLED and not data_live.OFFLINE, "running": self._thread is not None,
+                "leader": self.leader, "startedAt": self.started_at, "tickS": TICK_S, "lead": LEAD,
+                "rpm": RPM, "watchlist": {k: len(v) for k, v in wl.items()},
+                "recentSymbols": wl["recent"], "breakers": data_live.breaker_states(), "tasks": tasks}
+
+WARMER = Warmer()
+
+def start() -> bool:
+    """Arranca el warmer si INVEST_MCP_WARMER=1 (y hay red); idempotente."""
+    if not ENABLED or data_live.OFFLINE:
+        return False
+    WARMER.start()
+    return True
+
+def status() -> Dict[str, Any]:
+    return WARMER.status()
@@ -1,4 +1,19 @@
+import argparse
 from invest_mcp.transport_stdio import run_stdio_loop
 
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Servidor MCP de inversiones")
+    ap.add_argument("--listen", default="",
+                    help="unix:/ruta.sock | tcp:127.0.0.1:8765 | http://127.0.0.1:8765/mcp (por defecto: stdio)")
+    args = ap.parse_args()
+    if args.listen.startswith("http:"):
+        from invest_mcp.transport_http import run_http_server
+        run_http_server(args.listen)
+    elif args.listen:
+        from invest_mcp.transport_socket import run_socket_server
+        run_socket_server(args.listen)
+    else:
+        run_stdio_loop()
+
 if __name__ == "__main__":
-    run_stdio_loop()
+    main()
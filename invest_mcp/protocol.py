@@ -1,13 +1,25 @@
-import sys, json, traceback, os, time
+import sys, json, traceback, os, time, threading, queue
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
-from .tools import TOOLS, TOOL_IMPL
+from typing import Dict, Any, Iterable, Optional, Tuple
+from .tools import TOOLS, TOOL_IMPL, PRELOAD, preload
+from .lib.context import CallContext, Cancelled, activate, deactivate
+from .lib import codec, metrics, profiling, tracing, warmer
 
 PROTOCOL_VERSION = "2025-06-18"
 
+# Generadas desde TOOLS: una tool nueva aparece sin tocar este texto
+INSTRUCTIONS = (
+    "Servidor MCP local de inversiones con herramientas: "
+    + ", ".join(t["name"] for t in TOOLS) + ". "
+    "Los resultados traen structuredContent; content[0].text solo en modo clásico "
+    f"(con {codec.CAPABILITY} negociado, content va vacío)."
+)
+
 # -------- Config de logging ----------
 LOG_FILE = os.environ.get("MCP_LOG_FILE", os.path.join("logs", "invest_mcp_server.log"))
 LOG_LEVEL = os.environ.get("MCP_LOG_LEVEL", "INFO").upper()  # INFO|DEBUG|ERROR
+LOG_STDERR = True  # transport_inproc lo apaga: dentro del host, stderr es la consola del chat
 
 def _ensure_log_dir():
     d = os.path.dirname(LOG_FILE)
@@ -25,18 +37,46 @@ def _writeline(s: str) -> None:
     except Exception:
         pass
     # También a stderr para anfitriones que leen logs de ahí
-    sys.stderr.write(s + "\n")
-    sys.stderr.flush()
+    if LOG_STDERR:
+        sys.stderr.write(s + "\n")
+        sys.stderr.flush()
 
 def log_json(event: str, **fields: Any) -> None:
     rec = {"ts": now_ts(), "event": event}
+    rec.update(tracing.ids())
     rec.update(fields)
     _writeline(json.dumps(rec, ensure_ascii=False))
 
-def jprint(obj: Dict[str, Any]) -> None:
-    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+# -------- Sesión (un cliente conectado) ----------
+class Session:
+    """
+    Estado por cliente: destino de escritura y codificación negociada en initialize.
+    stdio usa una única sesión global; otros transportes crean una por conexión.
+    """
+    def __init__(self, write=None):
+        self._write = write or _stdout_write
+        self.compact: Optional[Dict[str, Any]] = None
+        # Ámbito de los ids de request para notifications/cancelled (HTTP: el Mcp-Session-Id)
+        self.scope: Any = id(self)
+
+    def send(self, obj: Dict[str, Any]) -> None:
+        fast = bool(self.compact and self.compact.get("json") == "orjson")
+        line = codec.dumps(obj, fast=fast)
+        metrics.inc("bytes_out_total", len(line) + 1)
+        self._write(line)
+
+def _stdout_write(line: str) -> None:
+    sys.stdout.write(line + "\n")
     sys.stdout.flush()
 
+STDIO_SESSION = Session()
+
+def jprint(obj: Dict[str, Any], session: Optional[Session] = None) -> None:
+    (session or STDIO_SESSION).send(obj)
+
+def notify(method: str, params: Dict[str, Any], session: Optional[Session] = None) -> None:
+    jprint({"jsonrpc": "2.0", "method": method, "params": params}, session)
+
 def rsp_result(_id: Any, result: Dict[str, Any]) -> Dict[str, Any]:
     return {"jsonrpc": "2.0", "id": _id, "result": result}
 
@@ -46,55 +86,114 @@ def rsp_error(_id: Any, code: int, message: str, data: Optional[Dict[str, Any]]
         err["error"]["data"] = data
     return err
 
+# -------- Cancelación (notifications/cancelled) ----------
+# Llamadas en curso por (ámbito de sesión, id). Un cancelled que llega antes de que
+# su request empiece (encolado detrás de otro) se recuerda y se aplica al arrancar.
+_INFLIGHT: Dict[Tuple[Any, Any], CallContext] = {}
+_EARLY: "OrderedDict[Tuple[Any, Any], str]" = OrderedDict()
+_EARLY_MAX = 1024
+_INFLIGHT_LOCK = threading.Lock()
+
+def cancel(scope: Any, request_id: Any, reason: str = "cancelled") -> bool:
+    """Marca la llamada como cancelada; True si estaba en curso."""
+    key = (scope, request_id)
+    with _INFLIGHT_LOCK:
+        ctx = _INFLIGHT.get(key)
+        if ctx is None:
+            _EARLY[key] = reason
+            while len(_EARLY) > _EARLY_MAX:
+                _EARLY.popitem(last=False)
+            return False
+    ctx.cancel(reason)
+    return True
+
+def _register(key: Tuple[Any, Any], ctx: CallContext) -> None:
+    with _INFLIGHT_LOCK:
+        _INFLIGHT[key] = ctx
+        early = _EARLY.pop(key, None)
+    if early is not None:
+        ctx.cancel(early)
+
+def _unregister(key: Tuple[Any, Any]) -> None:
+    with _INFLIGHT_LOCK:
+        _INFLIGHT.pop(key, None)
+
 # -------- Handler de requests MCP ----------
-def handle_request(req: Dict[str, Any]) -> Optional[bool]:
+def handle_request(req: Dict[str, Any], session: Optional[Session] = None) -> Optional[bool]:
     """
     Retorna True si se debe terminar (shutdown), None/False en caso contrario.
     """
+    session = session or STDIO_SESSION
     t0 = time.perf_counter()
     method = req.get("method")
     _id = req.get("id")
     is_notification = _id is None
+    sp = tracing.start(f"mcp.server {method}", kind="server",
+                       parent=tracing.extract((req.get("params") or {}).get("_meta")),
+                       **{"rpc.method": method, "rpc.id": _id}) if tracing.ENABLED else None
 
     log_json("request", method=method, id=_id, has_params=("params" in req))
+    labels = {"method": str(method)}
+    status = "ok"
+    metrics.gauge_add("inflight_requests", 1)
 
     try:
         if method == "initialize":
+            caps = (req.get("params") or {}).get("capabilities") or {}
+            session.compact = codec.negotiate((caps.get("experimental") or {}).get(codec.CAPABILITY))
+            server_caps: Dict[str, Any] = {"tools": {"listChanged": True}, "logging": {}}
+            if session.compact:
+                server_caps["experimental"] = {codec.CAPABILITY: session.compact}
             result = {
                 "protocolVersion": PROTOCOL_VERSION,
-                "capabilities": {"tools": {"listChanged": True}, "logging": {}},
+                "capabilities": server_caps,
                 "serverInfo": {
                     "name": "uvg-invest-mcp-local",
                     "title": "UVG MCP Inversiones (Local) by Diegoval-dev",
                     "version": "0.1.0"
                 },
-                "instructions": (
-                    "Servidor MCP local de inversiones con herramientas: "
-                    "price_quote, risk_metrics, build_portfolio, rebalance_plan. "
-                    "Todos los retornos incluyen structuredContent y content."
-                )
+                "instructions": INSTRUCTIONS
             }
-            jprint(rsp_result(_id, result))
+            jprint(rsp_result(_id, result), session)
             return None
 
         if method == "notifications/initialized":
             log_json("info", msg="Cliente indicó initialized.")
+            if PRELOAD:
+                preload()  # ya respondimos initialize: calentar imports en segundo plano
+            if warmer.start():
+                log_json("info", msg="Warmer de cache iniciado", tick_s=warmer.TICK_S, rpm=warmer.RPM)
+            return None
+
+        if method == "notifications/cancelled":
+            params = req.get("params") or {}
+            reason = str(params.get("reason") or "cancelled")
+            running = cancel(session.scope, params.get("requestId"), reason)
+            log_json("info", msg="Cancelación recibida", request_id=params.get("requestId"),
+                     reason=reason, running=running)
             return None
 
         if method in ("ping", "notifications/ping"):
             if not is_notification:
-                jprint(rsp_result(_id, {"ok": True}))
+                jprint(rsp_result(_id, {"ok": True}), session)
             return None
 
         if method == "shutdown":
             if not is_notification:
-                jprint(rsp_result(_id, {"ok": True}))
+                jprint(rsp_result(_id, {"ok": True}), session)
             log_json("info", msg="Recibido shutdown. Cerrando servidor.")
             return True
 
+        if method == "server/metrics":
+            fmt = (req.get("params") or {}).get("format", "json")
+            snap = metrics.snapshot()
+            result = {"text": metrics.prometheus(snap)} if fmt == "prometheus" else snap
+            jprint(rsp_result(_id, result), session)
+            return None
+
         if method == "tools/list":
             result = {"tools": TOOLS, "nextCursor": None}
-            jprint(rsp_result(_id, result))
+            jprint(rsp_result(_id, result), session)
             return None
 
         if method == "tools/call":
@@ -102,37 +201,128 @@ def handle_request(req: Dict[str, Any]) -> Optional[bool]:
             name = params.get("name")
             arguments = params.get("arguments", {})
             if not isinstance(name, str):
+                status = "invalid_params"
                 err = rsp_error(_id, -32602, "Invalid 'name' for tools/call")
-                jprint(err)
+                jprint(err, session)
                 return None
+            labels["tool"] = name
             impl = TOOL_IMPL.get(name)
             if impl is None:
+                status = "unknown_tool"
                 err = rsp_error(_id, -32601, f"Unknown tool: {name}")
-                jprint(err)
+                jprint(err, session)
+                return None
+            def _notify(m: str, p: Dict[str, Any]) -> None:
+                notify(m, codec.encode(p, session.compact) if session.compact else p, session)
+            ctx = CallContext(_id, params.get("_meta") or {}, _notify)
+            prof = profiling.requested(name, ctx.meta) if (profiling.ENV_MODE or "profile" in ctx.meta) else None
+            key = (session.scope, _id)
+            _register(key, ctx)
+            token = activate(ctx)
+            try:
+                ctx.check()  # cancelada o vencida mientras esperaba turno
+                if prof is None:
+                    with tracing.span(f"tool {name}", **{"mcp.tool": name}):
+                        result = impl(arguments)
+                else:
+                    result, info = profiling.run(name, _id, prof, lambda: impl(arguments))
+                    result = {**result, "_meta": {**(result.get("_meta") or {}), "invest/profile": info}}
+                    log_json("profile", tool=name, id=_id, **info)
+            except Cancelled as c:
+                status = "deadline" if c.reason == "deadline" else "cancelled"
+                elapsed_ms = round((time.monotonic() - ctx.started) * 1000, 3)
+                metrics.inc("cancelled_total", tool=name, reason=status)
+                log_json("cancelled", tool=name, id=_id, reason=c.reason, elapsed_ms=elapsed_ms)
+                if status == "deadline":
+                    # Tras notifications/cancelled no se responde (spec MCP); el deadline sí avisa
+                    jprint(rsp_error(_id, -32800, "Request cancelled: deadline exceeded",
+                                     {"elapsedMs": elapsed_ms}), session)
                 return None
-            result = impl(arguments)
-            jprint(rsp_result(_id, result))
+            finally:
+                deactivate(token)
+                _unregister(key)
+            if result.get("isError"):
+                status = "tool_error"
+            jprint(rsp_result(_id, codec.finalize_result(result, session.compact)), session)
             return None
 
         if not is_notification:
             err = rsp_error(_id, -32601, f"Method not found: {method}")
-            jprint(err)
+            jprint(err, session)
         else:
             log_json("warn", msg="Notificación desconocida", method=method)
 
     except ValueError as ve:
+        status = "invalid_params"
         if _id is not None:
             err = rsp_error(_id, -32602, "Invalid params", {"detail": str(ve)})
-            jprint(err)
+            jprint(err, session)
         log_json("error", where="handle_request", method=method, id=_id, detail=str(ve))
     except Exception:
+        status = "error"
         tb = traceback.format_exc()
         if _id is not None:
             err = rsp_error(_id, -32000, "Internal server error")
-            jprint(err)
+            jprint(err, session)
         log_json("error", where="handle_request", method=method, id=_id, traceback=tb)
     finally:
         dt = time.perf_counter() - t0
+        metrics.gauge_add("inflight_requests", -1)
+        metrics.observe("request_ms", dt * 1000, **labels)
+        metrics.inc("requests_total", **labels, status=status)
         log_json("response", method=method, id=_id, duration_ms=round(dt * 1000, 3))
+        if sp is not None:
+            sp.set("mcp.status", status)
+            if "tool" in labels:
+                sp.set("mcp.tool", labels["tool"])
+            sp.end(error=None if status == "ok" else status)
+            if method == "shutdown":
+                tracing.flush()
 
     return None
+
+# -------- Lectura de un flujo de mensajes (stdio, socket) ----------
+def parse_line(raw: Any, where: str) -> Optional[Dict[str, Any]]:
+    metrics.inc("bytes_in_total", len(raw))
+    line = raw.strip()
+    if not line:
+        return None
+    try:
+        msg = json.loads(line)
+    except json.JSONDecodeError:
+        sample = line[:200].decode("utf-8", "replace") if isinstance(line, bytes) else line[:200]
+        log_json("error", where=where, msg="JSON inválido", sample=sample)
+        return None
+    if not isinstance(msg, dict) or msg.get("jsonrpc") != "2.0":
+        log_json("error", where=where, msg="Mensaje no JSON-RPC 2.0")
+        return None
+    return msg
+
+def serve(lines: Iterable[Any], session: Optional[Session] = None, where: str = "transport") -> None:
+    """
+    Atiende los mensajes en orden en este hilo hasta EOF o shutdown. Un hilo lector
+    sigue leyendo mientras corre una tool: notifications/cancelled se aplica al
+    instante (la tool la ve en su próximo check()) y el resto se encola.
+    """
+    q: "queue.SimpleQueue" = queue.SimpleQueue()
+
+    def _reader() -> None:
+        try:
+            for raw in lines:
+                msg = parse_line(raw, where)
+                if msg is None:
+                    continue
+                if msg.get("method") == "notifications/cancelled":
+                    handle_request(msg, session)
+                else:
+                    q.put(msg)
+        except (OSError, ValueError):
+            pass  # conexión cerrada
+        finally:
+            q.put(None)
+
+    threading.Thread(target=_reader, name=f"{where}-reader", daemon=True).start()
+    while True:
+        msg = q.get()
+        if msg is None or handle_request(msg, session):
+            return
@@ -1,15 +1,57 @@
 # invest_mcp/tools/__init__.py
+import importlib, os, threading
 from typing import Dict, Any, List, Callable
 from .price_quote import DEF as PQ_DEF, IMPL as PQ_IMPL
 from .risk_metrics import DEF as RM_DEF, IMPL as RM_IMPL
 from .build_portfolio import DEF as BP_DEF, IMPL as BP_IMPL
 from .rebalance_plan import DEF as RB_DEF, IMPL as RB_IMPL
+from .backtest_rebalance import DEF as BT_DEF, IMPL as BT_IMPL
+from .bulk_rebalance import DEF as BK_DEF, IMPL as BK_IMPL
+from .price_history import DEF as PH_DEF, IMPL as PH_IMPL
+from .cache_warmer import DEF as CW_DEF, IMPL as CW_IMPL
+from .cache_stats import DEF as CS_DEF, IMPL as CS_IMPL
 
-TOOLS: List[dict] = [PQ_DEF, RM_DEF, BP_DEF, RB_DEF]
+TOOLS: List[dict] = [PQ_DEF, RM_DEF, BP_DEF, RB_DEF, BT_DEF, BK_DEF, PH_DEF, CW_DEF, CS_DEF]
 
 TOOL_IMPL: Dict[str, Callable[[dict], Dict[str, Any]]] = {
     "price_quote": PQ_IMPL,
     "risk_metrics": RM_IMPL,
     "build_portfolio": BP_IMPL,
     "rebalance_plan": RB_IMPL,
+    "backtest_rebalance": BT_IMPL,
+    "bulk_rebalance": BK_IMPL,
+    "price_history": PH_IMPL,
+    "cache_warmer": CW_IMPL,
+    "cache_stats": CS_IMPL,
 }
+
+# Módulos pesados que los tools importan en su primera llamada. Los DEF de arriba
+# son estáticos, así initialize/tools/list no los cargan.
+HEAVY_MODULES = (
+    "numpy",
+    "invest_mcp.lib.rebalance",
+    "invest_mcp.lib.backtest",
+    "requests",
+    "pandas",
+    "yfinance",
+)
+PRELOAD = os.environ.get("INVEST_MCP_PRELOAD", "0") == "1"
+_preload_started = False
+
+def _import_all() -> None:
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass  # el tool reportará el error real en su llamada
+
+def preload(background: bool = True) -> None:
+    """Importa HEAVY_MODULES una sola vez, por defecto en un hilo daemon."""
+    global _preload_started
+    if _preload_started:
+        return
+    _preload_started = True
+    if background:
+        threading.Thread(target=_import_all, name="invest-preload", daemon=True).start()
+    else:
+        _import_all()
@@ -0,0 +1,168 @@
+# invest_mcp/tools/backtest_rebalance.py
+import time
+from typing import Dict, Any, List
+from .data import get_builtin_prices, UNIVERSE
+from invest_mcp.lib.data_live import get_history
+from invest_mcp.lib.codec import tool_result
+from invest_mcp.lib.context import check, progress
+
+MAX_STRATEGIES = 500
+MAX_PATHS = 5000
+MAX_YEARS = 30
+
+DEF = {
+    "name": "backtest_rebalance",
+    "title": "Backtest Monte Carlo de estrategias de rebalanceo",
+    "description": (
+        "Simula rebalanceo periódico, por umbral y calendario sobre caminos históricos o sintéticos "
+        "(bootstrap/GBM) con costos de transacción; evalúa un grid de estrategias en paralelo."
+    ),
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "targetWeights": {
+                "type": "array",
+                "items": {"type":"object","properties":{
+                    "symbol":{"type":"string"},
+                    "weight":{"type":"number"}
+                },"required":["symbol","weight"]}
+            },
+            "strategies": {
+                "type": "array",
+                "description": "Lista explícita: {mode: periodic|threshold|calendar|none, periodDays?, threshold?, frequency?, costBps?}",
+                "items": {"type": "object"}
+            },
+            "grid": {
+                "type": "object",
+                "description": "Producto cartesiano: {periodDays:[], thresholds:[], calendar:[], costBps:[]}",
+                "properties": {
+                    "periodDays": {"type":"array","items":{"type":"integer"}},
+                    "thresholds": {"type":"array","items":{"type":"number"}},
+                    "calendar": {"type":"array","items":{"type":"string"}},
+                    "costBps": {"type":"array","items":{"type":"number"}}
+                }
+            },
+            "costBps": {"type":"number","description":"Costo por $ operado en bps (default 10)", "default": 10},
+            "years": {"type":"number","description":"Horizonte simulado en años", "default": 10},
+            "paths": {"type":"integer","description":"Número de caminos Monte Carlo", "default": 200},
+            "pathMode": {"type":"string","description":"bootstrap|gbm|historical", "default": "bootstrap"},
+            "blockDays": {"type":"integer","description":"Tamaño de bloque del bootstrap", "default": 21},
+            "seed": {"type":"integer", "default": 7},
+            "riskFree": {"type":"number", "default": 0.02},
+            "workers": {"type":"integer","description":"Procesos en paralelo (0/1 = en proceso)"},
+            "useLive": {"type":"boolean","description":"Usar datos en vivo", "default": True}
+        },
+        "required": ["targetWeights"]
+    },
+    "outputSchema": {
+        "type": "object",
+        "properties": {
+            "strategies": {"type":"array","items":{"type":"object"}},
+            "best": {"type":"object"},
+            "paths": {"type":"integer"},
+            "days": {"type":"integer"},
+            "pathMode": {"type":"string"},
+            "dataSource": {"type":"string"},
+            "dataFreshness": {"type":"object","description":"fresh|stale|unavailable y edad del dato por proveedor"},
+            "workers": {"type":"integer"},
+            "elapsedMs": {"type":"number"}
+        },
+        "required": ["strategies", "paths", "days"]
+    }
+}
+
+def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(args, dict): raise ValueError("'arguments' debe ser object")
+    # numpy y el motor se cargan en la primera llamada (arranque rápido del servidor)
+    import numpy as np
+    from invest_mcp.lib.backtest import (
+        history_to_gross, make_paths, expand_strategies, run_grid, default_workers, TRADING_DAYS
+    )
+    t0 = time.perf_counter()
+    tgt = args.get("targetWeights") or []
+    if not isinstance(tgt, list) or not tgt:
+        raise ValueError("'targetWeights' requerido")
+
+    weights: Dict[str, float] = {}
+    for t in tgt:
+        s = t.get("symbol")
+        w = float(t.get("weight", 0))
+        if isinstance(s, str) and s in UNIVERSE and w > 0:
+            weights[s] = weights.get(s, 0.0) + w
+    if not weights:
+        raise ValueError("No hay símbolos válidos con peso > 0")
+
+    cost_bps = float(args.get("costBps", 10))
+    years = float(args.get("years", 10))
+    n_paths = int(args.get("paths", 200))
+    path_mode = str(args.get("pathMode", "bootstrap"))
+    use_live = bool(args.get("useLive", True))
+    workers = int(args.get("workers", default_workers()))
+    rf = float(args.get("riskFree", 0.02))
+    if not (0 < years <= MAX_YEARS):
+        raise ValueError(f"'years' debe estar en (0, {MAX_YEARS}]")
+    if not (1 <= n_paths <= MAX_PATHS):
+        raise ValueError(f"'paths' debe estar en [1, {MAX_PATHS}]")
+
+    strats = expand_strategies(args.get("strategies") or [], args.get("grid"), cost_bps)
+    if not strats:
+        strats = expand_strategies([{"mode": "none"}, {"mode": "calendar", "frequency": "quarterly"},
+                                    {"mode": "threshold", "threshold": 0.05}], None, cost_bps)
+    if len(strats) > MAX_STRATEGIES:
+        raise ValueError(f"Máximo {MAX_STRATEGIES} estrategias por llamada")
+
+    # 1) Histórico (live o sintético) -> retornos brutos
+    syms = list(weights.keys())
+    hist: Dict[str, List[float]] = {}
+    source = "synthetic"
+    if use_live:
+        try:
+            hist = get_history(syms, days=int(years * TRADING_DAYS) + 1) or {}
+            if hist: source = "live"
+        except Exception:
+            hist = {}
+    if not hist:
+        prices = get_builtin_prices()
+        hist = {s: prices[s] for s in syms if s in prices}
+
+    syms = [s for s in syms if s in hist and len(hist[s]) >= 2]
+    if not syms:
+        raise ValueError("Sin historial suficiente para los símbolos pedidos")
+    target = np.array([weights[s] for s in syms], dtype=np.float64)
+    target /= target.sum()
+
+    # 2) Caminos y grid
+    gross_hist = history_to_gross(hist, syms)
+    n_days = int(round(years * TRADING_DAYS))
+    if path_mode == "historical":
+        n_days = min(n_days, gross_hist.shape[0])
+        n_paths = 1
+    gross = make_paths(gross_hist, path_mode, n_paths, n_days,
+                       seed=int(args.get("seed", 7)), block_days=int(args.get("blockDays", 21)))
+
+    progress(0, len(strats), f"Caminos listos ({gross.shape[0]}x{gross.shape[1]})", force=True)
+    state = {"done": 0, "best": None}
+    def _on_result(r: Dict[str, Any]) -> None:
+        check()
+        state["done"] += 1
+        if state["best"] is None or r["sharpe"] > state["best"]["sharpe"]:
+            state["best"] = r
+        progress(state["done"], len(strats), f"Estrategia {state['done']}/{len(strats)}",
+                 partial={"bestSoFar": state["best"]}, force=state["done"] == len(strats))
+
+    results = run_grid(gross, target, strats, workers=workers, rf=rf, on_result=_on_result)
+    best = max(results, key=lambda r: r["sharpe"]) if results else None
+
+    payload = {
+        "symbols": syms,
+        "weights": [float(w) for w in target],
+        "strategies": results,
+        "best": best,
+        "paths": int(gross.shape[0]),
+        "days": int(gross.shape[1]),
+        "pathMode": path_mode,
+        "dataSource": source,
+        "workers": workers,
+        "elapsedMs": round((time.perf_counter() - t0) * 1000, 3),
+    }
+    return tool_result(payload)
@@ -1,8 +1,13 @@
 # invest_mcp/tools/build_portfolio.py
-import json
-from typing import Dict, Any, List
-from .data import get_builtin_prices, UNIVERSE
-from invest_mcp.lib.data_live import get_history
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Any
+from .data import builtin_frame, UNIVERSE
+from invest_mcp.lib.data_live import get_frame
+from invest_mcp.lib.codec import tool_result
+from invest_mcp.lib.context import check, progress
+
+if TYPE_CHECKING:
+    import numpy as np
 
 DEF = {
     "name": "build_portfolio",
@@ -38,71 +43,22 @@ DEF = {
             }},
             "expectedAnnualReturn": {"type": "number"},
             "volAnnual": {"type": "number"},
-            "sharpe": {"type": "number"}
+            "sharpe": {"type": "number"},
+            "dataFreshness": {"type": "object", "description": "fresh|stale|unavailable y edad del dato por proveedor"}
         },
         "required": ["targetWeights", "allocations"]
     }
 }
 
-def _daily_returns(p: List[float]) -> List[float]:
-    return [(p[i] / p[i - 1] - 1.0) for i in range(1, len(p))]
-
-def _mean(xs: List[float]) -> float:
-    return sum(xs) / len(xs)
-
-def _pstdev(xs: List[float]) -> float:
-    m = _mean(xs)
-    return (sum((x - m) ** 2 for x in xs) / len(xs)) ** 0.5
-
-def _cov_matrix(series: List[List[float]]) -> List[List[float]]:
-    """
-    series: lista de n activos, cada uno con lista de retornos diarios.
-    Devuelve covarianza poblacional alineando por la longitud mínima T.
-    """
-    n = len(series)
-    if n < 2:
-        raise ValueError("Se requieren al menos 2 series para covarianza")
-
-    T = min(len(s) for s in series)
-    if T < 2:
-        raise ValueError("Cada serie debe tener al menos 2 puntos")
-
-    S = [s[-T:] for s in series]  # recorta por el final (últimos T)
-    mus = [_mean(s) for s in S]
-
-    C = [[0.0] * n for _ in range(n)]
-    for i in range(n):
-        for j in range(n):
-            acc = 0.0
-            mi, mj = mus[i], mus[j]
-            si, sj = S[i], S[j]
-            for t in range(T):
-                acc += (si[t] - mi) * (sj[t] - mj)
-            C[i][j] = acc / T  # poblacional (consistente con pstdev)
-    return C
-
-def _matvec(C: List[List[float]], w: List[float]) -> List[float]:
-    return [sum(C[i][j] * w[j] for j in range(len(w))) for i in range(len(w))]
-
-def _dot(a: List[float], b: List[float]) -> float:
-    return sum(x * y for x, y in zip(a, b))
-
-def _project_simplex(v: List[float]) -> List[float]:
+def _project_simplex(v: np.ndarray) -> np.ndarray:
     # Proyección al simplex {w>=0, sum w = 1} (Michelot)
+    import numpy as np
     n = len(v)
-    u = sorted(v, reverse=True)
-    css = 0.0
-    rho = -1
-    theta = 0.0
-    for i in range(n):
-        css += u[i]
-        t = (css - 1.0) / (i + 1)
-        if u[i] - t > 0:
-            rho = i
-            theta = t
-    if rho == -1:
-        theta = (sum(u) - 1.0) / n
-    return [max(0.0, x - theta) for x in v]
+    u = np.sort(v)[::-1]
+    t = (np.cumsum(u) - 1.0) / np.arange(1, n + 1)
+    rho = np.nonzero(u - t > 0)[0]
+    theta = t[rho[-1]] if rho.size else (u.sum() - 1.0) / n
+    return np.maximum(v - theta, 0.0)
 
 def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
     if not isinstance(args, dict):
@@ -119,33 +75,38 @@ def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
     if not allowed:
         raise ValueError("No hay símbolos válidos en 'allowedSymbols'")
 
-    # 1) Series de precios (live o sintético)
-    hist: Dict[str, List[float]] = {}
+    # 1) Panel de precios (live o sintético)
+    import numpy as np
+    frame = None
     if use_live:
         try:
-            hist = get_history(allowed, days=252)
+            frame = get_frame(allowed, days=252)
         except Exception:
-            hist = {}
+            frame = None
 
-    if not hist:
-        prices = get_builtin_prices()
-        hist = {s: prices[s][-252:] for s in allowed if s in prices}
+    if frame is None or frame.empty:
+        frame = builtin_frame().select(allowed).window(252)
 
-    # 2) Retornos diarios
-    series_map = {s: _daily_returns(p) for s, p in hist.items() if len(p) >= 2}
-    if len(series_map) < 2:
-        raise ValueError("Se requieren >=2 símbolos con historial suficiente")
+    iters = 1500
+    total = iters + 2
+    progress(1, total, f"Datos listos ({len(frame.symbols)} símbolos)", force=True)
 
-    symbols = list(series_map.keys())
-    R = [series_map[s] for s in symbols]
+    # 2) Retornos diarios en las fechas en que cotizan todos (cripto y acciones alineadas por fecha)
+    common = frame.common()
+    R = common.returns()[1:]
+    if len(common.symbols) < 2:
+        raise ValueError("Se requieren >=2 símbolos con historial suficiente")
+    if len(R) < 2:
+        raise ValueError("Cada serie debe tener al menos 2 puntos")
+    symbols = common.symbols
 
-    # 3) Estadísticos (anualizados)
-    mus_d = [_mean(rets) for rets in R]
-    mu_a = [(1 + m) ** 252 - 1 for m in mus_d]
+    # 3) Estadísticos (anualizados con las sesiones del calendario común)
+    ppy = float(common.periods_per_year().min())
+    mu_a = (1 + R.mean(axis=0)) ** ppy - 1
 
-    # 4) Covarianza (diaria -> anual)
-    C_d = _cov_matrix(R)
-    C_a = [[c * 252 for c in row] for row in C_d]
+    # 4) Covarianza poblacional (diaria -> anual)
+    C_a = np.cov(R, rowvar=False, bias=True) * ppy
+    progress(2, total, "Covarianza lista", force=True)
 
     # 5) Optimización Markowitz (long-only, sum w=1)
     #    Mapeo más agresivo para niveles altos:
@@ -153,28 +114,31 @@ def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
     gamma = gamma_map.get(risk_level, 10.0)
 
     n = len(symbols)
-    w = [1.0 / n] * n                     
+    w = np.full(n, 1.0 / n)
     lr = 0.01
     max_w = float(args.get("maxWeight", 0.7))
 
-    for _ in range(1500):
-        Cw = _matvec(C_a, w)
-        grad = [-mu_a[i] + gamma * Cw[i] for i in range(n)]
-        w = [w[i] - lr * grad[i] for i in range(n)]
+    for k in range(iters):
+        check()  # el cliente ya no espera: no seguir optimizando
+        Cw = C_a @ w
+        if k % 50 == 0:
+            # objetivo: -mu'w + (gamma/2) w'Cw
+            obj = float(-mu_a @ w + 0.5 * gamma * (w @ Cw))
+            progress(2 + k, total, f"Iteración {k}/{iters} objetivo={obj:.6f}",
+                     partial={"symbols": symbols, "weights": w.tolist(), "objective": obj})
+        grad = -mu_a + gamma * Cw
         # Proyección al simplex
-        w = _project_simplex(w)
+        w = _project_simplex(w - lr * grad)
 
         # Tope por activo (opcional) + re-normalización
         if max_w < 1.0:
-            w = [min(wi, max_w) for wi in w]
-            s = sum(w)
-            if s <= 0:
-                w = [1.0 / n] * n   # fallback numérico
-            else:
-                w = [wi / s for wi in w]
-
-    exp_ret = _dot(mu_a, w)
-    vol = (_dot(w, _matvec(C_a, w))) ** 0.5
+            w = np.minimum(w, max_w)
+            s = w.sum()
+            w = w / s if s > 0 else np.full(n, 1.0 / n)  # fallback numérico
+
+    progress(total, total, "Optimización terminada", force=True)
+    exp_ret = float(mu_a @ w)
+    vol = float(w @ C_a @ w) ** 0.5
     rf = 0.02
     sharpe = (exp_ret - rf) / (vol if vol > 0 else 1e-9)
 
@@ -187,8 +151,4 @@ def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
         "volAnnual": vol,
         "sharpe": sharpe
     }
-    return {
-        "content": [{"type": "text", "text": json.dumps(payload, ensure_ascii=False)}],
-        "structuredContent": payload,
-        "isError": False
-    }
+    return tool_result(payload)
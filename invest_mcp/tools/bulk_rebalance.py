@@ -0,0 +1,215 @@
+# invest_mcp/tools/bulk_rebalance.py
+import time
+from collections import deque
+from typing import Dict, Any, List, Iterator, Optional
+from .rebalance_plan import price_snapshot, plan_accounts
+from invest_mcp.lib.context import check, wants_stream, emit_chunk, progress
+from invest_mcp.lib.codec import tool_result
+
+MAX_ACCOUNTS = 100000
+OPTION_KEYS = ("lotSizes", "fractional", "minTrade", "cashBuffer")
+
+DEF = {
+    "name": "bulk_rebalance",
+    "title": "Rebalanceo masivo multi-cuenta",
+    "description": (
+        "Planes de rebalanceo para miles de cuentas con un único snapshot de precios. "
+        "Procesa por lotes (vectorizado o en pool de procesos) y puede emitir los resultados en chunks."
+    ),
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "accounts": {
+                "type": "array",
+                "description": "[{accountId, current, targetWeights? | model?, cash?}]",
+                "items": {"type":"object"}
+            },
+            "models": {
+                "type": "object",
+                "description": "{nombre: [{symbol, weight}]} referenciados por accounts[].model"
+            },
+            "batchSize": {"type":"integer","description":"Cuentas por lote", "default": 500},
+            "workers": {"type":"integer","description":"Procesos en paralelo (0/1 = en proceso)", "default": 0},
+            "lotSizes": {"type":"object"},
+            "fractional": {"type":"boolean", "default": False},
+            "minTrade": {"type":"number", "default": 0},
+            "cashBuffer": {"type":"number", "default": 0},
+            "prices": {"type":"object","description":"{SYM: precio} para fijar precios"},
+            "useLive": {"type":"boolean", "default": True}
+        },
+        "required": ["accounts"]
+    },
+    "outputSchema": {
+        "type": "object",
+        "properties": {
+            "accountsProcessed": {"type":"integer"},
+            "accountsFailed": {"type":"integer"},
+            "chunks": {"type":"integer"},
+            "streamed": {"type":"boolean"},
+            "tradesTotal": {"type":"integer"},
+            "buyTotal": {"type":"number"},
+            "sellTotal": {"type":"number"},
+            "trackingErrorMean": {"type":"number"},
+            "trackingErrorMax": {"type":"number"},
+            "prices": {"type":"object"},
+            "dataSource": {"type":"string"},
+            "dataFreshness": {"type":"object","description":"fresh|stale|unavailable y edad del dato por proveedor"},
+            "unpriced": {"type":"array","items":{"type":"string"}},
+            "accounts": {"type":"array","items":{"type":"object"}},
+            "elapsedMs": {"type":"number"}
+        },
+        "required": ["accountsProcessed", "chunks", "streamed"]
+    }
+}
+
+def _account_error(acc: Dict[str, Any]) -> Optional[str]:
+    """Lo que account_matrices no podría convertir; None si la cuenta es válida."""
+    for key in ("current", "targetWeights"):
+        items = acc.get(key) or []
+        if not isinstance(items, list) or not all(isinstance(x, dict) for x in items):
+            return f"'{key}' debe ser un array de objects"
+    try:
+        float(acc.get("cash", 0) or 0)
+        for x in acc.get("current") or []:
+            float(x["shares"]) if x.get("shares") is not None else float(x.get("amount", 0))
+        for t in acc.get("targetWeights") or []:
+            float(t.get("weight", 0))
+    except (TypeError, ValueError) as e:
+        return f"Valor numérico inválido: {e}"
+    return None
+
+def _resolve_models(accounts: List[Dict[str, Any]], models: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Copias de las cuentas con accountId y targetWeights resueltos (no toca las del
+    caller). Una cuenta mal formada queda como {accountId, error} y no tumba la llamada.
+    """
+    out = []
+    for i, acc in enumerate(accounts):
+        if not isinstance(acc, dict):
+            out.append({"accountId": i, "error": "La cuenta debe ser object"})
+            continue
+        acc = {**acc, "accountId": acc.get("accountId", i)}
+        if acc.get("targetWeights") is None and acc.get("model") is not None:
+            tw = models.get(acc["model"])
+            if tw is None:
+                raise ValueError(f"Modelo desconocido: {acc['model']} (accounts[{i}])")
+            acc["targetWeights"] = tw
+        err = _account_error(acc)
+        out.append({"accountId": acc["accountId"], "error": err} if err else acc)
+    return out
+
+def _plan_batch(batch: List[Dict[str, Any]], snapshot: Dict[str, float], opts: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Un lote con el snapshot compartido; ejecutable en proceso o en un worker."""
+    import numpy as np
+    from invest_mcp.lib.rebalance import build_universe
+    valid = [a for a in batch if "error" not in a]
+    res: List[Dict[str, Any]] = []
+    if valid:
+        syms = build_universe(valid)
+        vec = np.array([snapshot.get(s, np.nan) for s in syms], dtype=np.float64)
+        res = plan_accounts(valid, opts, prices=vec, symbols=syms)["accounts"]
+        for a in res:
+            if a["totalCurrent"] <= 0:
+                a["error"] = "El portafolio actual tiene total <= 0"
+    # Las inválidas vuelven en su posición del lote
+    planned = iter(res)
+    return [a if "error" in a else next(planned) for a in batch]
+
+def _iter_batches(batches: List[List[Dict[str, Any]]], snapshot: Dict[str, float],
+                  opts: Dict[str, Any], workers: int) -> Iterator[List[Dict[str, Any]]]:
+    if workers <= 1 or len(batches) < 2:
+        for b in batches:
+            yield _plan_batch(b, snapshot, opts)
+        return
+    from invest_mcp.lib.procpool import process_pool, terminate, wait_any
+    # Ventana acotada de futures: no acumula todos los resultados en memoria
+    ex = process_pool(workers)
+    pending: deque = deque()
+    it = iter(batches)
+    try:
+        for b in it:
+            pending.append(ex.submit(_plan_batch, b, snapshot, opts))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            wait_any([pending[0]])  # en orden; mira check() mientras espera
+            yield pending.popleft().result()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append(ex.submit(_plan_batch, nxt, snapshot, opts))
+    except BaseException:
+        terminate(ex)  # llamada cancelada (o generador cerrado): no espera los lotes en curso
+        raise
+    ex.shutdown()
+
+def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(args, dict): raise ValueError("'arguments' debe ser object")
+    import numpy as np
+    from invest_mcp.lib.rebalance import build_universe
+    t0 = time.perf_counter()
+    accounts = args.get("accounts")
+    if not isinstance(accounts, list) or not accounts:
+        raise ValueError("'accounts' debe ser un array no vacío")
+    if len(accounts) > MAX_ACCOUNTS:
+        raise ValueError(f"Máximo {MAX_ACCOUNTS} cuentas por llamada")
+    buf = float(args.get("cashBuffer", 0.0))
+    if not (0.0 <= buf < 1.0):
+        raise ValueError("'cashBuffer' debe estar en [0, 1)")
+    batch_size = max(1, int(args.get("batchSize", 500)))
+    workers = int(args.get("workers", 0))
+
+    accounts = _resolve_models(accounts, args.get("models") or {})
+
+    # 1) Un único snapshot de precios para todas las cuentas
+    symbols = build_universe(accounts)
+    vec, sources, ds = price_snapshot(symbols, bool(args.get("useLive", True)), args.get("prices") or {})
+    snapshot = {s: float(p) for s, p in zip(symbols, vec) if np.isfinite(p)}
+    unpriced = [s for s in symbols if s not in snapshot]
+    opts = {k: args[k] for k in OPTION_KEYS if k in args}
+
+    # 2) Lotes -> chunks (stream) o acumulado inline
+    stream = wants_stream()
+    batches = [accounts[i:i + batch_size] for i in range(0, len(accounts), batch_size)]
+    inline: List[Dict[str, Any]] = []
+    n_ok = n_fail = n_trades = chunks = 0
+    buy = sell = te_sum = te_max = 0.0
+    for seq, res in enumerate(_iter_batches(batches, snapshot, opts, workers)):
+        check()
+        for a in res:
+            if a.get("error"):
+                n_fail += 1
+                continue
+            n_ok += 1
+            te_sum += a["trackingError"]
+            te_max = max(te_max, a["trackingError"])
+            for t in a["trades"]:
+                n_trades += 1
+                if t["delta"] > 0: buy += t["delta"]
+                else: sell -= t["delta"]
+        chunks += 1
+        progress(min(len(accounts), chunks * batch_size), len(accounts),
+                 f"Lote {chunks}/{len(batches)}", force=chunks == len(batches))
+        if stream:
+            emit_chunk(seq, {"accounts": res})
+        else:
+            inline.extend(res)
+
+    payload = {
+        "accountsProcessed": n_ok,
+        "accountsFailed": n_fail,
+        "chunks": chunks,
+        "streamed": stream,
+        "tradesTotal": n_trades,
+        "buyTotal": buy,
+        "sellTotal": sell,
+        "trackingErrorMean": te_sum / n_ok if n_ok else 0.0,
+        "trackingErrorMax": te_max,
+        "prices": snapshot,
+        "priceSources": sources,
+        "dataSource": ds,
+        "unpriced": unpriced,
+        "elapsedMs": round((time.perf_counter() - t0) * 1000, 3),
+    }
+    if not stream:
+        payload["accounts"] = inline
+    return tool_result(payload)
@@ -0,0 +1,43 @@
+# invest_mcp/tools/cache_stats.py
+from typing import Dict, Any
+from invest_mcp.lib import data_live
+from invest_mcp.lib.codec import tool_result
+
+DEF = {
+    "name": "cache_stats",
+    "title": "Estado de la cache de datos de mercado",
+    "description": (
+        "Entradas y bytes de la cache en disco por tipo de dato, presupuesto y política de "
+        "desalojo, hits/misses, compresión y último barrido; 'sweep' fuerza un barrido."
+    ),
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "sweep": {"type":"boolean","description":"Borrar ahora lo vencido y aplicar el presupuesto", "default": False}
+        }
+    },
+    "outputSchema": {
+        "type": "object",
+        "properties": {
+            "entries": {"type":"integer"},
+            "bytes": {"type":"integer"},
+            "maxEntries": {"type":"integer"},
+            "maxBytes": {"type":"integer"},
+            "policy": {"type":"string"},
+            "byKind": {"type":"object"},
+            "memEntries": {"type":"integer"},
+            "lastSweep": {"type":["object","null"]}
+        },
+        "required": ["entries","bytes","policy","byKind"]
+    }
+}
+
+def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
+    store = data_live.cache_store()
+    if bool(args.get("sweep", False)):
+        store.sweep()
+    payload = store.stats()
+    with data_live._mem_lock:
+        payload["memEntries"] = len(data_live._mem)
+    payload["memMax"] = data_live.MEM_CACHE_MAX
+    return tool_result(payload)
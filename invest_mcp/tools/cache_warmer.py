@@ -0,0 +1,36 @@
+# invest_mcp/tools/cache_warmer.py
+from typing import Dict, Any
+from invest_mcp.lib import warmer
+from invest_mcp.lib.codec import tool_result
+
+DEF = {
+    "name": "cache_warmer",
+    "title": "Estado del calentador de cache",
+    "description": (
+        "Watchlist, próximo vencimiento y estadísticas de la última pasada del warmer que "
+        "refresca históricos y spot antes de que venza su TTL (INVEST_MCP_WARMER=1)."
+    ),
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "runNow": {"type":"boolean","description":"Despertar el warmer para una pasada inmediata", "default": False}
+        }
+    },
+    "outputSchema": {
+        "type": "object",
+        "properties": {
+            "enabled": {"type":"boolean"},
+            "running": {"type":"boolean"},
+            "leader": {"type":"boolean","description":"Este proceso tiene warmer.lock (calienta la cache compartida)"},
+            "watchlist": {"type":"object"},
+            "rpm": {"type":"object"},
+            "tasks": {"type":"array","items":{"type":"object"}}
+        },
+        "required": ["enabled","running","tasks"]
+    }
+}
+
+def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
+    if bool(args.get("runNow", False)):
+        warmer.WARMER.wake()
+    return tool_result(warmer.status())
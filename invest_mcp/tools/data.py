@@ -1,7 +1,11 @@
 # invest_mcp/tools/data.py
 from __future__ import annotations
 import math, random
-from typing import Dict, List, Tuple
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from invest_mcp.lib.priceframe import PriceFrame
 
 # Universo base (acciones/índices/commodities/cripto)
 UNIVERSE = {
@@ -45,3 +49,39 @@ def get_builtin_prices() -> Dict[str, List[float]]:
         "BTC": _gen_series(46, 50000.0, 0.35, 0.75),
         "ETH": _gen_series(47, 2500.0, 0.40, 0.95),
     }
+
+
+def business_dates(n: int, end: date = None) -> List[str]:
+    """Últimos n días hábiles (L-V) en ISO, terminando en 'end' (hoy por defecto)."""
+    d = end or date.today()
+    out: List[str] = []
+    while len(out) < n:
+        if d.weekday() < 5:
+            out.append(d.isoformat())
+        d -= timedelta(days=1)
+    return out[::-1]
+
+def get_builtin_dated() -> Dict[str, Dict[str, List]]:
+    """
+    Series sintéticas con fechas hábiles: {SYM: {"t": [...], "c": [...]}}.
+    """
+    prices = get_builtin_prices()
+    out: Dict[str, Dict[str, List]] = {}
+    for s, ps in prices.items():
+        out[s] = {"t": business_dates(len(ps)), "c": ps}
+    return out
+
+_frame_cache: Dict[str, "PriceFrame"] = {}
+
+def builtin_frame() -> "PriceFrame":
+    """
+    get_builtin_dated() como PriceFrame, generado una vez por día (las series son
+    deterministas; solo cambian las fechas). Las tools no deben mutarlo.
+    """
+    from invest_mcp.lib.priceframe import PriceFrame
+    today = date.today().isoformat()
+    frame = _frame_cache.get(today)
+    if frame is None:
+        _frame_cache.clear()
+        frame = _frame_cache[today] = PriceFrame.from_dated(get_builtin_dated())
+    return frame
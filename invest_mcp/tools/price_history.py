@@ -0,0 +1,149 @@
+# invest_mcp/tools/price_history.py
+from datetime import date
+from typing import Dict, Any, List, Optional
+from .data import UNIVERSE, get_builtin_dated
+from invest_mcp.lib.data_live import get_history_dated
+from invest_mcp.lib.series import (
+    INTERVALS, to_points, clip, resample, downsample, encode_cursor, decode_cursor
+)
+from invest_mcp.lib.codec import tool_result
+
+MAX_DAYS = 3650 * 2
+MAX_POINTS = 10000
+MAX_PAGE = 20000
+
+DEF = {
+    "name": "price_history",
+    "title": "Histórico de precios para gráficas",
+    "description": (
+        "Series de precios por símbolo (OHLC para acciones, cierre para cripto) con cambio de "
+        "intervalo 1d/1w/1mo, downsampling en servidor (LTTB u OHLC) y paginación por cursor."
+    ),
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "symbols": {"type":"array","items":{"type":"string"}},
+            "days": {"type":"integer","description":"Lookback en días calendario (si no hay 'start')", "default": 365},
+            "start": {"type":"string","description":"Fecha inicial ISO (YYYY-MM-DD)"},
+            "end": {"type":"string","description":"Fecha final ISO (YYYY-MM-DD)"},
+            "interval": {"type":"string","description":"1d|1w|1mo", "default": "1d"},
+            "maxPoints": {"type":"integer","description":"Puntos máximos por símbolo y página (0 = sin downsampling)", "default": 500},
+            "method": {"type":"string","description":"lttb|ohlc", "default": "lttb"},
+            "pageSize": {"type":"integer","description":"Puntos (tras el intervalo) por página antes de reducir", "default": 5000},
+            "cursor": {"type":"string","description":"nextCursor de la página anterior"},
+            "useLive": {"type":"boolean","description":"Usar datos live", "default": True}
+        },
+        "required": ["symbols"]
+    },
+    "outputSchema": {
+        "type": "object",
+        "properties": {
+            "series": {"type":"array","items":{"type":"object"}},
+            "interval": {"type":"string"},
+            "method": {"type":"string"},
+            "nextCursor": {"type":["string","null"]},
+            "dataSource": {"type":"string"},
+            "dataFreshness": {"type":"object","description":"fresh|stale|unavailable y edad del dato por proveedor"}
+        },
+        "required": ["series","nextCursor","dataSource"]
+    }
+}
+
+def _iso(v: Any, name: str) -> Optional[str]:
+    if v is None:
+        return None
+    try:
+        return date.fromisoformat(str(v)).isoformat()
+    except ValueError:
+        raise ValueError(f"'{name}' debe ser fecha ISO (YYYY-MM-DD)")
+
+def _page_end(series: Dict[str, List[Dict[str, Any]]], after: Optional[str], page_size: int) -> Optional[str]:
+    """
+    Fin de ventana común: la fecha del punto 'page_size' más temprana entre los
+    símbolos que aún tienen más datos. Todos los símbolos avanzan la misma ventana.
+    """
+    end = None
+    for pts in series.values():
+        rest = [p["t"] for p in pts if after is None or p["t"] > after]
+        if len(rest) > page_size:
+            t = rest[page_size - 1]
+            end = t if end is None or t < end else end
+    return end
+
+def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(args, dict): raise ValueError("'arguments' debe ser object")
+    syms = args.get("symbols")
+    if not isinstance(syms, list) or not syms:
+        raise ValueError("'symbols' debe ser un array no vacío")
+    syms = [s for s in syms if isinstance(s, str) and s in UNIVERSE]
+    if not syms:
+        raise ValueError(f"Símbolos válidos: {sorted(UNIVERSE)}")
+
+    interval = str(args.get("interval", "1d"))
+    if interval not in INTERVALS:
+        raise ValueError(f"'interval' debe ser uno de {list(INTERVALS)}")
+    method = str(args.get("method", "lttb"))
+    if method not in ("lttb", "ohlc"):
+        raise ValueError("'method' debe ser lttb|ohlc")
+    max_points = int(args.get("maxPoints", 500))
+    page_size = int(args.get("pageSize", 5000))
+    if not (0 <= max_points <= MAX_POINTS):
+        raise ValueError(f"'maxPoints' debe estar en [0, {MAX_POINTS}]")
+    if not (1 <= page_size <= MAX_PAGE):
+        raise ValueError(f"'pageSize' debe estar en [1, {MAX_PAGE}]")
+
+    start = _iso(args.get("start"), "start")
+    end = _iso(args.get("end"), "end")
+    days = int(args.get("days", 365))
+    if start:
+        days = (date.today() - date.fromisoformat(start)).days + 1
+    if not (1 <= days <= MAX_DAYS):
+        raise ValueError(f"'days' debe estar en [1, {MAX_DAYS}]")
+    after = decode_cursor(args["cursor"]).get("after") if args.get("cursor") else None
+
+    # 1) Histórico con fechas (live -> sintético por símbolo)
+    raw: Dict[str, Dict[str, List]] = {}
+    if bool(args.get("useLive", True)):
+        try:
+            raw = get_history_dated(syms, days=days) or {}
+        except Exception:
+            raw = {}
+    sources = {s: "live" for s in raw}
+    missing = [s for s in syms if s not in raw]
+    if missing:
+        builtin = get_builtin_dated()
+        for s in missing:
+            raw[s] = builtin[s]
+            sources[s] = "synthetic"
+    if not start:
+        start = date.fromordinal(date.today().toordinal() - days + 1).isoformat()
+
+    # 2) Rango + intervalo sobre la serie completa (etiquetas estables entre páginas)
+    full = {s: resample(clip(to_points(raw[s]), start, end), interval) for s in syms}
+
+    # 3) Página común por fecha y downsampling dentro de la página
+    page_end = _page_end(full, after, page_size)
+    series = []
+    for s in syms:
+        page = [p for p in full[s] if (after is None or p["t"] > after) and (page_end is None or p["t"] <= page_end)]
+        pts = downsample(page, max_points, method) if max_points else page
+        series.append({
+            "symbol": s,
+            "name": UNIVERSE[s]["name"],
+            "source": sources[s],
+            "rawPoints": len(page),
+            "returnedPoints": len(pts),
+            "points": pts,
+        })
+
+    n_live = sum(1 for s in syms if sources[s] == "live")
+    payload = {
+        "series": series,
+        "interval": interval,
+        "method": method,
+        "start": start,
+        "end": end or date.today().isoformat(),
+        "nextCursor": encode_cursor({"after": page_end}) if page_end else None,
+        "dataSource": "live" if n_live == len(syms) else ("mixed" if n_live else "synthetic"),
+    }
+    return tool_result(payload)
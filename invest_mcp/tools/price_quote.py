@@ -1,10 +1,14 @@
 # invest_mcp/tools/price_quote.py
-import json
-from typing import Dict, Any, List
-from .data import UNIVERSE, get_builtin_prices
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple
+from .data import UNIVERSE, builtin_frame
 from invest_mcp.lib.data_live import (
-    get_history, last_and_returns, fetch_cg_simple_price, COINGECKO_IDS
+    get_frame, last_and_returns, fetch_cg_simple_price, COINGECKO_IDS
 )
+from invest_mcp.lib.codec import tool_result
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 DEF = {
@@ -24,32 +28,32 @@ DEF = {
         "type":"object",
         "properties":{
             "quotes":{"type":"array","items":{"type":"object"}},
-            "dataSource":{"type":"string"}
+            "dataSource":{"type":"string"},
+            "dataFreshness":{"type":"object","description":"fresh|stale|unavailable y edad del dato por proveedor"}
         },
         "required":["quotes","dataSource"]
     }
 }
 
-def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
-    syms: List[str] = list(dict.fromkeys(args.get("symbols") or []))
-    if not syms: raise ValueError("'symbols' requerido")
-    use_live = bool(args.get("useLive", True))
-    days = int(args.get("days", 60))
-
+def collect_quotes(syms: List[str], use_live: bool = True, days: int = 60) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Ruta de cotización compartida (live/cache -> spot CoinGecko -> sintético).
+    Retorna (quotes, dataSource). rebalance_plan usa collect_last (solo 'last').
+    """
     quotes: List[Dict[str, Any]] = []
     live_count = 0
     synthetic_count = 0
 
-    hist = {}
+    frame = None
     if use_live:
         try:
-            hist = get_history(syms, days=max(days, 60)) or {}
+            frame = get_frame(syms, days=max(days, 60))
         except Exception:
-            hist = {}
+            frame = None
 
-    # 1) Si hay histórico, úsalo (después sobreescribimos 'last' vía spot cuando aplique)
-    if hist:
-        for q in last_and_returns(hist):
+    # 1) Si hay histórico, úsalo (last_and_returns ya pone el spot en 'last' de cripto)
+    if frame is not None and not frame.empty:
+        for q in last_and_returns(frame):
             sym = q["symbol"]
             q["name"] = UNIVERSE.get(sym, {}).get("name", sym)
             q["currency"] = "USD"
@@ -97,19 +101,17 @@ def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
     # 3) Fallback sintético
     missing = [s for s in syms if s not in have]
     if missing:
-        prices = get_builtin_prices()
-        for s in missing:
-            ps = prices.get(s)
-            if not ps or len(ps) < 22:
-                continue
-            def _ret(p, d): return (p[-1]/p[-1-d]-1.0) if len(p) > d else 0.0
+        synth = builtin_frame().select(missing)
+        chg = synth.changes((7, 30))
+        last = synth.last()
+        for j, s in enumerate(synth.symbols):
             quotes.append({
                 "symbol": s,
                 "name": UNIVERSE.get(s, {}).get("name", s),
-                "last": float(ps[-1]),
-                "ret1d": _ret(ps,1),
-                "ret7d": _ret(ps,5),
-                "ret30d": _ret(ps,21),
+                "last": float(last[j]),
+                "ret1d": float(chg[1][j]),
+                "ret7d": float(chg[7][j]),
+                "ret30d": float(chg[30][j]),
                 "currency": UNIVERSE.get(s, {}).get("currency", "UNKNOWN"),
                 "source": "synthetic"
             })
@@ -122,10 +124,55 @@ def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
         ds = "live"
     else:
         ds = "synthetic"
+    return quotes, ds
+
+def collect_last(syms: List[str], use_live: bool = True) -> Tuple[np.ndarray, Dict[str, str], str]:
+    """
+    Solo el último precio de cada símbolo, alineado a 'syms' (NaN si no hay), por la
+    misma ruta que collect_quotes pero sin retornos ni /coins/markets (rebalance_plan).
+    Retorna (precios, fuente por símbolo, dataSource).
+    """
+    import numpy as np
+    pos = {s: i for i, s in enumerate(syms)}
+    px = np.full(len(syms), np.nan)
+    sources: Dict[str, str] = {}
+    if use_live:
+        try:
+            frame = get_frame(syms, days=10)
+        except Exception:
+            frame = None
+        if frame is not None and not frame.empty:
+            last = frame.last()
+            for j, s in enumerate(frame.symbols):
+                if np.isfinite(last[j]):
+                    px[pos[s]] = last[j]
+                    sources[s] = "live-hist"
+        crypto = [s for s in syms if s in COINGECKO_IDS]
+        if crypto:
+            for s, v in (fetch_cg_simple_price(crypto, vs="usd") or {}).items():
+                px[pos[s]] = float(v)
+                sources.setdefault(s, "live-spot")
+    live_count = len(sources)
+    missing = [s for s in syms if s not in sources]
+    synth = builtin_frame().select(missing)
+    for s, v in zip(synth.symbols, synth.last()):
+        px[pos[s]] = v
+        sources[s] = "synthetic"
+    synthetic_count = len(synth.symbols)
+    if live_count and synthetic_count:
+        ds = "mixed"
+    elif live_count:
+        ds = "live"
+    else:
+        ds = "synthetic"
+    return px, sources, ds
+
+def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
+    syms: List[str] = list(dict.fromkeys(args.get("symbols") or []))
+    if not syms: raise ValueError("'symbols' requerido")
+    use_live = bool(args.get("useLive", True))
+    days = int(args.get("days", 60))
 
+    quotes, ds = collect_quotes(syms, use_live=use_live, days=days)
     payload = {"quotes": quotes, "dataSource": ds}
-    return {
-        "content": [{"type": "text", "text": json.dumps(payload, ensure_ascii=False)}],
-        "structuredContent": payload,
-        "isError": False
-    }
\ No newline at end of file
+    return tool_result(payload)
@@ -1,12 +1,19 @@
 # invest_mcp/tools/rebalance_plan.py
-import json
-from typing import Dict, Any, List
-from .data import get_builtin_prices
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+from .price_quote import collect_last
+from invest_mcp.lib.data_live import COINGECKO_IDS
+from invest_mcp.lib.codec import tool_result
+if TYPE_CHECKING:
+    import numpy as np
 
 DEF = {
     "name": "rebalance_plan",
     "title": "Plan de rebalanceo (trades sugeridos)",
-    "description": "Dado holdings actuales y pesos objetivo, propone trades en $ (aprox).",
+    "description": (
+        "Dado holdings actuales y pesos objetivo, propone trades en acciones (lotes enteros o fraccionarios) "
+        "usando el último precio live/cache; soporta varias cuentas por llamada."
+    ),
     "inputSchema": {
         "type": "object",
         "properties": {
@@ -14,8 +21,9 @@ DEF = {
                 "type": "array",
                 "items": {"type":"object","properties":{
                     "symbol":{"type":"string"},
-                    "amount":{"type":"number"}
-                },"required":["symbol","amount"]}
+                    "amount":{"type":"number","description":"Valor en $"},
+                    "shares":{"type":"number","description":"Alternativa a amount"}
+                },"required":["symbol"]}
             },
             "targetWeights": {
                 "type": "array",
@@ -23,61 +31,114 @@ DEF = {
                     "symbol":{"type":"string"},
                     "weight":{"type":"number"}
                 },"required":["symbol","weight"]}
-            }
-        },
-        "required": ["current","targetWeights"]
+            },
+            "cash": {"type":"number","description":"Efectivo disponible en la cuenta"},
+            "accounts": {
+                "type": "array",
+                "description": "Modo multi-cuenta: [{accountId, current, targetWeights, cash?}] (reemplaza current/targetWeights)",
+                "items": {"type":"object"}
+            },
+            "lotSizes": {"type":"object","description":"{SYM: tamaño de lote en acciones}"},
+            "fractional": {"type":"boolean","description":"Permitir acciones fraccionarias", "default": False},
+            "minTrade": {"type":"number","description":"Trade mínimo en $ (menores se omiten)", "default": 0},
+            "cashBuffer": {"type":"number","description":"Fracción del total a mantener en cash", "default": 0},
+            "prices": {"type":"object","description":"{SYM: precio} para fijar precios"},
+            "useLive": {"type":"boolean","description":"Usar precios live/cache", "default": True}
+        }
     },
     "outputSchema": {
         "type": "object",
         "properties": {
             "totalCurrent":{"type":"number"},
             "targetAmounts":{"type":"array","items":{"type":"object","properties":{
-                "symbol":{"type":"string"},"targetAmount":{"type":"number"},"lastPrice":{"type":"number"}
+                "symbol":{"type":"string"},"targetAmount":{"type":"number"},"lastPrice":{"type":"number"},
+                "targetShares":{"type":"number"},"finalAmount":{"type":"number"}
             },"required":["symbol","targetAmount","lastPrice"]}},
             "trades":{"type":"array","items":{"type":"object","properties":{
-                "symbol":{"type":"string"},"action":{"type":"string"},"delta":{"type":"number"}
-            },"required":["symbol","action","delta"]}}
-        },
-        "required":["totalCurrent","targetAmounts","trades"]
+                "symbol":{"type":"string"},"action":{"type":"string"},"delta":{"type":"number"},
+                "shares":{"type":"number"},"price":{"type":"number"}
+            },"required":["symbol","action","delta"]}},
+            "cashAfter":{"type":"number"},
+            "trackingError":{"type":"number"},
+            "accounts":{"type":"array","items":{"type":"object"}},
+            "dataSource":{"type":"string"},
+            "dataFreshness":{"type":"object","description":"fresh|stale|unavailable y edad del dato por proveedor"}
+        }
     }
 }
 
+def price_snapshot(symbols: List[str], use_live: bool, overrides: Dict[str, Any]) -> Tuple[np.ndarray, Dict[str, str], str]:
+    """
+    Último precio por símbolo vía la misma ruta que price_quote (live/cache -> sintético).
+    'prices' del request tiene prioridad. Sin precio -> NaN.
+    """
+    import numpy as np
+    px = {s: float(v) for s, v in (overrides or {}).items() if isinstance(v, (int, float)) and v > 0}
+    sources = {s: "request" for s in px}
+    need = [s for s in symbols if s not in px]
+    ds = "request"
+    vec = np.array([px.get(s, np.nan) for s in symbols], dtype=np.float64)
+    if need:
+        last, got, ds = collect_last(need, use_live=use_live)
+        idx = [i for i, s in enumerate(symbols) if s not in px]
+        vec[idx] = last
+        sources.update(got)
+    return vec, sources, ds
+
+def plan_accounts(accounts: List[Dict[str, Any]], args: Dict[str, Any],
+                  prices: Optional[np.ndarray] = None, symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Resuelve varias cuentas en una pasada matricial. Si 'prices'/'symbols' vienen
+    dados (snapshot compartido) no se vuelve a cotizar.
+    """
+    import numpy as np
+    from invest_mcp.lib.rebalance import (
+        build_universe, lot_vector, account_matrices, solve_lots, account_payload
+    )
+    if symbols is None:
+        symbols = build_universe(accounts)
+    sources: Dict[str, str] = {}
+    ds = "request"
+    if prices is None:
+        prices, sources, ds = price_snapshot(symbols, bool(args.get("useLive", True)), args.get("prices") or {})
+
+    lots = lot_vector(symbols, args.get("lotSizes") or {}, bool(args.get("fractional", False)),
+                      crypto=set(COINGECKO_IDS))
+    H, W, C, X = account_matrices(accounts, symbols, prices)
+    sol = solve_lots(H, W, C, prices, lots,
+                     cash_buffer=float(args.get("cashBuffer", 0.0)),
+                     min_trade=float(args.get("minTrade", 0.0)),
+                     frozen_value=X)
+    out = [account_payload(i, acc, symbols, prices, H, W, C, sol) for i, acc in enumerate(accounts)]
+    unpriced = [s for s, p in zip(symbols, prices) if not np.isfinite(p)]
+    return {"accounts": out, "priceSources": sources, "dataSource": ds, "unpriced": unpriced}
+
 def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
     if not isinstance(args, dict): raise ValueError("'arguments' debe ser object")
-    curr = args.get("current") or []
-    tgt = args.get("targetWeights") or []
-    if not isinstance(curr, list) or not isinstance(tgt, list):
-        raise ValueError("'current' y 'targetWeights' deben ser arrays")
+    accounts = args.get("accounts")
+    single = accounts is None
+    if single:
+        curr = args.get("current") or []
+        tgt = args.get("targetWeights") or []
+        if not isinstance(curr, list) or not isinstance(tgt, list):
+            raise ValueError("'current' y 'targetWeights' deben ser arrays")
+        accounts = [{"current": curr, "targetWeights": tgt, "cash": args.get("cash", 0)}]
+    elif not isinstance(accounts, list) or not accounts:
+        raise ValueError("'accounts' debe ser un array no vacío")
 
-    # Valor actual con último precio sintético (si amount ya viene en $, perfecto; asumimos $)
-    # Para robustez, recalculamos target en $ a partir de suma actual.
-    total = sum(float(x.get("amount",0)) for x in curr)
-    if total <= 0:
-        raise ValueError("El portafolio actual tiene total <= 0")
+    buf = float(args.get("cashBuffer", 0.0))
+    if not (0.0 <= buf < 1.0):
+        raise ValueError("'cashBuffer' debe estar en [0, 1)")
 
-    prices = get_builtin_prices()
-    target_amounts = []
-    for t in tgt:
-        s = t.get("symbol")
-        w = float(t.get("weight", 0))
-        if s not in prices or w < 0: continue
-        last = float(prices[s][-1])
-        target_amounts.append({"symbol": s, "targetAmount": w*total, "lastPrice": last})
+    res = plan_accounts(accounts, args)
+    for a in res["accounts"]:
+        if a["totalCurrent"] <= 0:
+            raise ValueError(f"El portafolio actual tiene total <= 0 (cuenta {a['accountId']})")
 
-    # Indexar current por símbolo
-    by_sym = {x["symbol"]: float(x.get("amount",0)) for x in curr if isinstance(x.get("symbol"), str)}
-    trades = []
-    for ta in target_amounts:
-        s = ta["symbol"]
-        desired = ta["targetAmount"]
-        current_amt = by_sym.get(s, 0.0)
-        delta = desired - current_amt
-        if abs(delta) < 1e-6: continue
-        trades.append({"symbol": s, "action": "BUY" if delta>0 else "SELL", "delta": delta})
-
-    payload = {"totalCurrent": total, "targetAmounts": target_amounts, "trades": trades}
-    return {
-        "content": [{"type":"text","text": json.dumps(payload, ensure_ascii=False)}],
-        "structuredContent": payload,
-        "isError": False
-    }
+    if single:
+        payload = {k: v for k, v in res["accounts"][0].items() if k != "accountId"}
+        payload.update({"priceSources": res["priceSources"], "dataSource": res["dataSource"],
+                        "unpriced": res["unpriced"]})
+    else:
+        payload = res
+    return tool_result(payload)
@@ -1,7 +1,7 @@
-import json, statistics
-from typing import Dict, Any, List
-from invest_mcp.lib.data_live import get_history
-from .data import get_builtin_prices
+from typing import Dict, Any
+from invest_mcp.lib.data_live import get_frame
+from .data import builtin_frame
+from invest_mcp.lib.codec import tool_result
 
 DEF = {
     "name": "risk_metrics",
@@ -24,16 +24,15 @@ DEF = {
                 "properties": {"symbol":{"type":"string"}, "meanAnnual":{"type":"number"},
                                "volAnnual":{"type":"number"}, "sharpe":{"type":"number"}},
                 "required":["symbol","meanAnnual","volAnnual","sharpe"]
-            }}
+            }},
+            "dataFreshness": {"type":"object","description":"fresh|stale|unavailable y edad del dato por proveedor"}
         },
         "required":["metrics"]
     }
 }
 
-def _daily_returns(prices: List[float]) -> List[float]:
-    return [(prices[i]/prices[i-1]-1.0) for i in range(1, len(prices))]
-
 def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
+    import numpy as np
     if not isinstance(args, dict): raise ValueError("'arguments' debe ser object")
     syms = args.get("symbols") or []
     rf = float(args.get("riskFree", 0.02))
@@ -41,34 +40,32 @@ def IMPL(args: Dict[str, Any]) -> Dict[str, Any]:
     use_live = bool(args.get("useLive", True))
     if not syms: raise ValueError("'symbols' no puede estar vacío")
 
-    hist = {}
+    frame = None
     if use_live:
         try:
-            hist = get_history(syms, days=lb)
+            frame = get_frame(syms, days=lb)
         except Exception:
-            hist = {}
+            frame = None
 
-    if not hist:
+    if frame is None or frame.empty:
         # Fallback sintético
-        allp = get_builtin_prices()
-        for s in syms:
-            if s in allp:
-                hist[s] = allp[s][-lb:]
+        frame = builtin_frame().select(syms).window(lb)
 
-    out = []
-    for s, p in hist.items():
-        rets = _daily_returns(p)
-        if len(rets) < 2: continue
-        mu_d = statistics.mean(rets)
-        vol_d = statistics.pstdev(rets)
-        mu_a = (1+mu_d)**252 - 1
-        vol_a = vol_d * (252**0.5)
-        sharpe = (mu_a - rf) / vol_a if vol_a > 0 else 0.0
-        out.append({"symbol": s, "meanAnnual": mu_a, "volAnnual": vol_a, "sharpe": sharpe})
+    # Retornos de cada símbolo en su propio calendario, anualizados con sus
+    # sesiones por año (252 acciones, 365 cripto)
+    R = frame.returns()
+    n = (~np.isnan(R)).sum(axis=0)
+    ok = n >= 2
+    Rk = R[:, ok]
+    with np.errstate(invalid="ignore"):
+        mu_d = np.nanmean(Rk, axis=0)
+        vol_d = np.nanstd(Rk, axis=0)
+    ppy = frame.periods_per_year()[ok]
+    mu_a = (1 + mu_d) ** ppy - 1
+    vol_a = vol_d * np.sqrt(ppy)
+    sharpe = np.where(vol_a > 0, (mu_a - rf) / np.where(vol_a > 0, vol_a, 1.0), 0.0)
+    out = [{"symbol": s, "meanAnnual": float(m), "volAnnual": float(v), "sharpe": float(sh)}
+           for s, m, v, sh in zip([s for s, k in zip(frame.symbols, ok) if k], mu_a, vol_a, sharpe)]
 
     payload = {"metrics": out}
-    return {
-        "content": [{"type":"text","text": json.dumps(payload, ensure_ascii=False)}],
-        "structuredContent": payload,
-        "isError": False
-    }
\ No newline at end of file
+    return tool_result(payload)
@@ -0,0 +1,229 @@
+import os, json, gzip, time, uuid, asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, List
+from .protocol import Session, handle_request, log_json
+from .lib import codec, metrics
+
+# Streamable HTTP (MCP 2025-06-18) sobre asyncio, sin dependencias externas:
+#   POST <path>   un mensaje JSON-RPC; responde application/json o text/event-stream (SSE)
+#   DELETE <path> cierra la sesión (Mcp-Session-Id)
+#   GET /healthz  para el balanceador
+# Las tools son bloqueantes: corren en un ThreadPoolExecutor; el event loop solo hace I/O.
+
+KEEPALIVE_S = float(os.environ.get("INVEST_MCP_HTTP_KEEPALIVE", "75"))
+WORKERS = int(os.environ.get("INVEST_MCP_HTTP_WORKERS", "16"))
+SESSION_TTL_S = 3600.0
+MAX_BODY = 32 * 1024 * 1024
+GZIP_MIN = 1024
+
+_REASONS = {200: "OK", 202: "Accepted", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class _SessionState:
+    """Estado que sobrevive entre POSTs de un mismo cliente (Mcp-Session-Id)."""
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.compact: Optional[Dict[str, Any]] = None
+        self.last_seen = time.time()
+
+class _RequestSession(Session):
+    """Session efímera por POST: encola cada mensaje marcando si es la respuesta final."""
+    def __init__(self, push, compact: Optional[Dict[str, Any]]):
+        super().__init__(write=lambda line: None)
+        self._push = push
+        self.compact = compact
+
+    def send(self, obj: Dict[str, Any]) -> None:
+        fast = bool(self.compact and self.compact.get("json") == "orjson")
+        line = codec.dumps(obj, fast=fast)
+        metrics.inc("bytes_out_total", len(line) + 1)
+        self._push(("id" in obj and "method" not in obj), line)
+
+def _head(status: int, headers: List[Tuple[str, str]]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}"] + [f"{k}: {v}" for k, v in headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+class HttpServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, path: str = "/mcp", workers: int = WORKERS):
+        self.host, self.port, self.path = host, port, path
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="invest-http")
+        self.sessions: Dict[str, _SessionState] = {}
+
+    # ----- HTTP/1.1 con keep-alive -----
+    async def _conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    break
+                if not line:
+                    break
+                parts = line.decode("latin-1").rstrip("\r\n").split(" ")
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+                headers: Dict[str, str] = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                n = int(headers.get("content-length") or 0)
+                if n > MAX_BODY:
+                    await self._reply(writer, 413, b"", headers, keep=False)
+                    break
+                body = await reader.readexactly(n) if n else b""
+                metrics.inc("bytes_in_total", len(body))
+                conn = headers.get("connection", "").lower()
+                keep = (version == "HTTP/1.1" and conn != "close") or conn == "keep-alive"
+                await self._dispatch(method, target.split("?", 1)[0], headers, body, writer, keep)
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _reply(self, writer: asyncio.StreamWriter, status: int, body: bytes, req_headers: Dict[str, str],
+                     keep: bool, ctype: str = "application/json", extra: Optional[List[Tuple[str, str]]] = None) -> None:
+        hs = [("Content-Type", ctype), ("Connection", "keep-alive" if keep else "close")]
+        if len(body) >= GZIP_MIN and "gzip" in req_headers.get("accept-encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            hs.append(("Content-Encoding", "gzip"))
+        hs.append(("Content-Length", str(len(body))))
+        writer.write(_head(status, hs + (extra or [])) + body)
+        await writer.drain()
+
+    # ----- MCP -----
+    def _session(self, headers: Dict[str, str]) -> Tuple[Optional[_SessionState], bool]:
+        sid = headers.get("mcp-session-id")
+        if not sid:
+            return None, True  # modo sin estado (p. ej. detrás de un balanceador sin afinidad)
+        st = self.sessions.get(sid)
+        if st is not None:
+            st.last_seen = time.time()
+        return st, st is not None
+
+    def _sweep(self) -> None:
+        cutoff = time.time() - SESSION_TTL_S
+        for sid in [k for k, v in self.sessions.items() if v.last_seen < cutoff]:
+            del self.sessions[sid]
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes,
+                        writer: asyncio.StreamWriter, keep: bool) -> None:
+        if path == "/healthz":
+            await self._reply(writer, 200, b'{"ok":true}', headers, keep)
+            return
+        if path == "/metrics" and method == "GET":
+            await self._reply(writer, 200, metrics.prometheus().encode("utf-8"), headers, keep,
+                              ctype="text/plain; version=0.0.4")
+            return
+        if path != self.path:
+            await self._reply(writer, 404, b"", headers, keep)
+            return
+        if method == "DELETE":
+            self.sessions.pop(headers.get("mcp-session-id", ""), None)
+            await self._reply(writer, 204, b"", headers, keep)
+            return
+        if method != "POST":
+            # No ofrecemos stream GET iniciado por el servidor
+            await self._reply(writer, 405, b"", headers, keep, extra=[("Allow", "POST, DELETE")])
+            return
+        try:
+            msg = json.loads(body)
+        except ValueError:
+            err = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}
+            await self._reply(writer, 400, json.dumps(err).encode("utf-8"), headers, keep)
+            return
+        if not isinstance(msg, dict) or msg.get("jsonrpc") != "2.0":
+            err = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+            await self._reply(writer, 400, json.dumps(err).encode("utf-8"), headers, keep)
+            return
+
+        extra: List[Tuple[str, str]] = []
+        if msg.get("method") == "initialize":
+            self._sweep()
+            state: Optional[_SessionState] = _SessionState()
+            self.sessions[state.id] = state
+            extra.append(("Mcp-Session-Id", state.id))
+        else:
+            state, ok = self._session(headers)
+            if not ok:
+                await self._reply(writer, 404, b"", headers, keep)
+                return
+
+        loop = asyncio.get_running_loop()
+        q: asyncio.Queue = asyncio.Queue()
+        sess = _RequestSession(lambda final, line: loop.call_soon_threadsafe(q.put_nowait, (final, line)),
+                               state.compact if state else None)
+        if state is not None:
+            sess.scope = state.id  # los ids de request son por Mcp-Session-Id, no por POST
+        if msg.get("method") == "notifications/cancelled":
+            handle_request(msg, sess)  # no espera turno detrás de los workers ocupados
+            await self._reply(writer, 202, b"", headers, keep, extra=extra)
+            return
+        fut = loop.run_in_executor(self.pool, handle_request, msg, sess)
+        fut.add_done_callback(lambda _: q.put_nowait(None))
+
+        if "id" not in msg:
+            await fut
+            await self._reply(writer, 202, b"", headers, keep, extra=extra)
+            return
+
+        sse = "text/event-stream" in headers.get("accept", "")
+        streaming = False
+        final_line: Optional[str] = None
+        while True:
+            item = await q.get()
+            if item is None:
+                break
+            final, line = item
+            if final and not streaming:
+                final_line = line
+                continue
+            if not sse and not final:
+                continue  # el cliente solo acepta JSON: se descartan notificaciones
+            if not streaming:
+                # Primera notificación antes de la respuesta: se cambia a SSE
+                writer.write(_head(200, [("Content-Type", "text/event-stream"), ("Cache-Control", "no-cache"),
+                                         ("Transfer-Encoding", "chunked"),
+                                         ("Connection", "keep-alive" if keep else "close")] + extra))
+                streaming = True
+            data = f"event: message\ndata: {line}\n\n".encode("utf-8")
+            writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+            await writer.drain()
+        if state is not None and msg.get("method") == "initialize":
+            state.compact = sess.compact
+        if streaming:
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        elif final_line is not None:
+            await self._reply(writer, 200, final_line.encode("utf-8"), headers, keep, extra=extra)
+        else:
+            await self._reply(writer, 500, b"", headers, keep)
+
+    async def serve(self) -> None:
+        server = await asyncio.start_server(self._conn, self.host, self.port, limit=MAX_BODY)
+        log_json("startup", msg="Servidor MCP HTTP iniciado (invest)", host=self.host, port=self.port, path=self.path)
+        async with server:
+            await server.serve_forever()
+
+def parse_http_address(addr: str) -> Tuple[str, int, str]:
+    """"http:127.0.0.1:8765/mcp" | "http://127.0.0.1:8765/mcp" -> (host, port, path)."""
+    rest = addr.split(":", 1)[1].lstrip("/")
+    hostport, _, path = rest.partition("/")
+    host, _, port = hostport.rpartition(":")
+    return host or "127.0.0.1", int(port), "/" + (path or "mcp")
+
+def run_http_server(addr: str) -> None:
+    host, port, path = parse_http_address(addr)
+    try:
+        asyncio.run(HttpServer(host, port, path).serve())
+    except KeyboardInterrupt:
+        pass
+    log_json("shutdown", msg="Servidor MCP HTTP detenido (invest)")
@@ -0,0 +1,51 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from . import protocol
+from .protocol import Session, handle_request
+
+# Transporte en proceso: el host llama a handle_request directamente, sin
+# subproceso ni JSON. Mismas semánticas que stdio (errores JSON-RPC, progreso,
+# métricas, trazas); lo usa MCPEmbeddedServer en chatbot/mcp_runtime.py.
+protocol.LOG_STDERR = False
+
+Notification = Callable[[Dict[str, Any]], None]
+
+class CaptureSession(Session):
+    """
+    Session en memoria: la respuesta y las notificaciones quedan como dicts.
+    Con on_notification las notificaciones se entregan al instante (progreso,
+    chunks); sin él se acumulan (workers de proceso, que no pueden llamar al host).
+    """
+    def __init__(self, on_notification: Optional[Notification] = None):
+        super().__init__(write=lambda line: None)
+        self.on_notification = on_notification
+        self.response: Optional[Dict[str, Any]] = None
+        self.notifications: List[Dict[str, Any]] = []
+
+    def send(self, obj: Dict[str, Any]) -> None:
+        if "id" in obj and "method" not in obj:
+            self.response = obj
+        elif self.on_notification is not None:
+            self.on_notification(obj)
+        else:
+            self.notifications.append(obj)
+
+def call(req: Dict[str, Any], on_notification: Optional[Notification] = None, scope: Any = None
+         ) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Un request JSON-RPC -> (respuesta o None si era notificación, notificaciones acumuladas).
+    'scope' identifica al cliente para cancel(): los ids de request son suyos.
+    """
+    sess = CaptureSession(on_notification)
+    if scope is not None:
+        sess.scope = scope
+    handle_request(req, sess)
+    return sess.response, sess.notifications
+
+def cancel(scope: Any, request_id: Any, reason: str = "timeout") -> bool:
+    """Equivale a notifications/cancelled: la tool se corta en su próximo check()."""
+    return protocol.cancel(scope, request_id, reason)
+
+def worker_init() -> None:
+    """Initializer de los workers de proceso: precarga los imports pesados."""
+    from .tools import preload
+    preload(background=False)
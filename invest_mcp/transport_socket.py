@@ -0,0 +1,86 @@
+import os, signal, socket, socketserver, threading
+from typing import Optional, Tuple
+from .protocol import Session, log_json, serve
+
+# Dirección: "unix:/ruta.sock", "tcp:127.0.0.1:8765" o una ruta simple (unix)
+def parse_address(addr: str) -> Tuple[str, object]:
+    if addr.startswith("tcp:"):
+        host, _, port = addr[4:].rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    if addr.startswith("unix:"):
+        addr = addr[5:]
+    return "unix", addr
+
+class _Conn(socketserver.StreamRequestHandler):
+    """Una conexión = una sesión MCP (NDJSON). Cada conexión corre en su propio hilo."""
+
+    def setup(self):
+        super().setup()
+        lock = threading.Lock()
+        def _write(line: str) -> None:
+            data = (line + "\n").encode("utf-8")
+            with lock:
+                self.connection.sendall(data)
+        self.session = Session(write=_write)
+
+    def handle(self):
+        peer = self.client_address if self.client_address else "unix"
+        log_json("connect", transport="socket", peer=str(peer))
+        try:
+            # shutdown cierra solo esta conexión; el servidor sigue atendiendo a los demás
+            serve(self.rfile, self.session, where="transport_socket")
+        except (ConnectionError, OSError):
+            pass
+        log_json("disconnect", transport="socket", peer=str(peer))
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def make_server(addr: str) -> socketserver.BaseServer:
+    kind, target = parse_address(addr)
+    if kind == "tcp":
+        return _TCPServer(target, _Conn)
+    path = str(target)
+    if os.path.exists(path):
+        # Socket huérfano de una ejecución anterior: solo se borra si nadie escucha
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            raise RuntimeError(f"Ya hay un servidor escuchando en {path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+        finally:
+            probe.close()
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    return _UnixServer(path, _Conn)
+
+def _on_sigterm(signum, frame):
+    raise SystemExit(0)
+
+def run_socket_server(addr: str, ready: Optional[threading.Event] = None) -> None:
+    server = make_server(addr)
+    log_json("startup", msg="Servidor MCP socket iniciado (invest)", address=addr)
+    if ready is not None:
+        ready.set()
+    if threading.current_thread() is threading.main_thread():
+        # SIGTERM -> salida ordenada (borra el .sock en el finally)
+        signal.signal(signal.SIGTERM, _on_sigterm)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        kind, target = parse_address(addr)
+        if kind == "unix":
+            try:
+                os.unlink(str(target))
+            except OSError:
+                pass
+        log_json("shutdown", msg="Servidor MCP socket detenido (invest)")
@@ -9,6 +9,7 @@ from datetime import datetime
 from chatbot.llm import LLM
 from chatbot.mcp_runtime import MCPFleet, handle_command_line
 from chatbot.config import FS_ROOT, GITHUB_PERSONAL_ACCESS_TOKEN, WFM_JWT
+from invest_mcp.lib import tracing
 
 st.set_page_config(page_title="MCP Chat UI", page_icon="🤖", layout="wide")
 
@@ -257,6 +258,24 @@ def render_mcp_result(tool_key: str, result: Dict[str, Any]):
                 st.markdown(f"- **Último:** {last}")
         return
 
+    if tool_key == "invest:price_history":
+        data = norm["data"] or {}
+        series = data.get("series", [])
+        st.write("### Histórico de precios")
+        if not series:
+            st.json(data); return
+        import pandas as pd
+        cols = {s["symbol"]: pd.Series({p["t"]: p["c"] for p in s.get("points", [])}) for s in series}
+        df = pd.DataFrame(cols).sort_index()
+        df.index = pd.to_datetime(df.index)
+        st.line_chart(df)
+        st.caption(" · ".join(
+            f"{s['symbol']}: {s.get('returnedPoints')}/{s.get('rawPoints')} pts ({s.get('source','?')})" for s in series
+        ) + f" · intervalo {data.get('interval','1d')} · {data.get('method','')}")
+        if data.get("nextCursor"):
+            st.code(f"nextCursor: {data['nextCursor']}", language="text")
+        return
+
     if tool_key == "wfm:wfm_price_snapshot":
         data = norm["data"] or {}
         st.write("### Warframe.Market — Price snapshot")
@@ -487,7 +506,10 @@ for m in st.session_state.messages:
             title = m.get("tool_header") or m.get("tool_key") or "resultado"
             st.markdown(f"**{title}**")
             # Llama tus renderers como antes (omitidos aquí)
-            st.json(m["result"])
+            if m.get("tool_key") == "invest:price_history":
+                render_mcp_result(m["tool_key"], m["result"])
+            else:
+                st.json(m["result"])
         else:
             st.markdown(m["content"])
 
@@ -503,39 +525,40 @@ if user_msg:
 
 if st.session_state.pending_text:
     text = st.session_state.pending_text
+    # st.rerun() lanza para cortar el script: queda fuera del span
+    with tracing.span("chat.turn", **{"chat.ui": "streamlit"}):
+        with st.chat_message("assistant"):
+            with st.spinner("Pensando…"):
+                answer = call_llm_with_router(st.session_state.history, text, st.session_state.fleet)
+            st.markdown(answer)
+
+        st.session_state.messages.append({"role": "assistant", "content": answer})
+        st.session_state.history.append({"role": "assistant", "content": answer})
+
+        for raw in answer.splitlines():
+            line = raw.strip()
+            if not line.startswith("!"):
+                continue
 
-    with st.chat_message("assistant"):
-        with st.spinner("Pensando…"):
-            answer = call_llm_with_router(st.session_state.history, text, st.session_state.fleet)
-        st.markdown(answer)
-
-    st.session_state.messages.append({"role": "assistant", "content": answer})
-    st.session_state.history.append({"role": "assistant", "content": answer})
-
-    for raw in answer.splitlines():
-        line = raw.strip()
-        if not line.startswith("!"):
-            continue
-
-        if line.lower().startswith("!mcp "):
-            try:
-                res = handle_command_line(line, st.session_state.fleet)
-                payload = json.loads(line[4:].strip())
-                tool = payload.get("tool","?")
-                server = payload.get("server")
-                tool_key = f"{server}:{tool}" if server else f"mcp:{tool}"
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "kind": "tool",
-                    "tool_key": tool_key,
-                    "tool_header": f"{tool_key} ✓",
-                    "result": res,
-                })
-            except Exception as e:
-                st.session_state.messages.append({"role":"assistant", "content": f"!mcp ✗\n\n```\n{e}\n```"})
+            if line.lower().startswith("!mcp "):
+                try:
+                    res = handle_command_line(line, st.session_state.fleet)
+                    payload = json.loads(line[4:].strip())
+                    tool = payload.get("tool","?")
+                    server = payload.get("server")
+                    tool_key = f"{server}:{tool}" if server else f"mcp:{tool}"
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "kind": "tool",
+                        "tool_key": tool_key,
+                        "tool_header": f"{tool_key} ✓",
+                        "result": res,
+                    })
+                except Exception as e:
+                    st.session_state.messages.append({"role":"assistant", "content": f"!mcp ✗\n\n```\n{e}\n```"})
 
-        # legacy: !fs / !gh / !invest / !wfm / !local (si aún los usas)
-        # (Puedes dejar tu lógica legacy aquí si la necesitas)
+            # legacy: !fs / !gh / !invest / !wfm / !local (si aún los usas)
+            # (Puedes dejar tu lógica legacy aquí si la necesitas)
 
     st.session_state.pending_text = None
     st.rerun()
\ No newline at end of file